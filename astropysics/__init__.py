@@ -42,5 +42,5 @@ _ignore_add_docs = False
 #instrument registry along with site
 #objcat testing w/ M31 catalog
 #ZODB/Web objcat integration
-#pipeline gui and mid-saving
+#pipeline gui
 #Phot reworking/clean up docs
\ No newline at end of file
@@ -121,6 +121,7 @@ class EphemerisObject(object):
         from ..obstools import jd2000
         
         self._jd = jd2000
+        self._juliandate = None
         self._jdhook(jd2000,jd2000)
         
         self.name = name
@@ -130,15 +131,23 @@ class EphemerisObject(object):
         return self._jd
     def _setJd(self,val):
         from operator import isSequenceType
-        from ..obstools import calendar_to_jd
+        from ..obstools import calendar_to_jd,JulianDate
         from datetime import datetime
         
-        if val == 'now':
-            jd =  calendar_to_jd(datetime.utcnow(),tz=None)
+        juliandate = None
+        if isinstance(val,JulianDate):
+            juliandate = val
+        elif val == 'now':
+            juliandate = calendar_to_jd(datetime.utcnow(),tz=None,twopart=True)
         elif hasattr(val,'year') or isSequenceType(val):
-            jd = calendar_to_jd(val)
-        else:
+            juliandate = calendar_to_jd(val,twopart=True)
+        
+        if juliandate is None:
             jd = val
+        elif juliandate.shape == ():
+            jd = float(juliandate)
+        else:
+            jd = juliandate.jd
         if self._validrange is not None:
             from warnings import warn
             if self._validrange[0] is not None and jd < self._validrange[0]:
@@ -147,11 +156,29 @@ class EphemerisObject(object):
                 warn('JD {0} is above the valid range for this EphemerisObject'.format(jd),EphemerisAccuracyWarning)
         
         self._jdhook(self._jd,jd)
-        self._jd = jd        
+        self._jd = jd
+        self._juliandate = juliandate
     jd = property(_getJd,_setJd,doc="""
     Julian Date at which to calculate the orbital elements. Can be set either as
-    a scalar JD, 'now', :class:`datetime.datetime` object or a compatible tuple.
+    a scalar JD, 'now', :class:`datetime.datetime` object, a compatible tuple,
+    or a :class:`~astropysics.obstools.JulianDate`. Getting it always gives a
+    float - use :attr:`juliandate` for the full precision value.
     """)
+    
+    @property
+    def juliandate(self):
+        """
+        The current value of :attr:`jd` as a
+        :class:`~astropysics.obstools.JulianDate`.  This retains the full
+        precision of the time :attr:`jd` was set with if it was set as a
+        :class:`~astropysics.obstools.JulianDate` or a date/time.
+        """
+        from ..obstools import JulianDate
+        
+        if self._juliandate is None:
+            return JulianDate(self._jd)
+        else:
+            return self._juliandate
        
     def _jdhook(self,oldjd,newjd):
         """
@@ -210,7 +237,8 @@ class EphemerisObject(object):
         
         :param jds: 
             A sequence of julian dates at which to compute the coordinates, a
-            scalar JD, or None to use the :attr:`jd` attribute's current value.
+            scalar JD, a :class:`~astropysics.obstools.JulianDate`, or None to
+            use the :attr:`jd` attribute's current value.
         :param coordsys: 
             A :class:`astropysics.coords.coordsys.CooordinateSystem` class that
             specifies the type of the output coordinates, or None to use the
@@ -230,7 +258,13 @@ class EphemerisObject(object):
             single = True
             res = (self._getCoordObj(),)
         else:
-            if isinstance(jds,np.ndarray):
+            from ..obstools import JulianDate
+            
+            if isinstance(jds,JulianDate):
+                if jds.shape == ():
+                    single = True
+                    jds = (jds,)
+            elif isinstance(jds,np.ndarray):
                 if jds.shape == ():
                     single = True
                 jds = jds.ravel()
@@ -238,7 +272,7 @@ class EphemerisObject(object):
                 single = True
                 jds = (jds,)
             
-            jd0 = self.jd
+            jd0 = self.juliandate if self._juliandate is not None else self.jd
             try:
                 res = []
                 for jd in jds:
@@ -74,8 +74,11 @@ def earth_rotation_angle(jd,degrees=True):
     """
     Earth Rotation Angle (ERA) for a given Julian Date.
     
-    :param jd: The Julian Date or a sequence of JDs
-    :type jd: scalar or array-like
+    :param jd: 
+        The Julian Date or a sequence of JDs. A
+        :class:`~astropysics.obstools.JulianDate` can be used for full
+        precision.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
     :param degrees: 
         If True, the ERA is returned in degrees, if None, 1=full rotation.  
         Otherwise, radians.
@@ -84,10 +87,18 @@ def earth_rotation_angle(jd,degrees=True):
     :returns: ERA or an array of angles (if `jd` is an array) 
     
     """
-    from ..obstools import jd2000
-    
-    d = jd - jd2000 #days since 2000
-    res = (0.7790572732640 + 0.00273781191135448*d + (d%1.0))%1.0
+    from ..obstools import jd2000,JulianDate
+    
+    if isinstance(jd,JulianDate):
+        #fractional days are taken from each part separately, as in SOFA era00
+        d1 = jd.jd1 - jd2000
+        d2 = jd.jd2
+        d = d1 + d2
+        dfrac = d1%1.0 + d2%1.0
+    else:
+        d = jd - jd2000 #days since 2000
+        dfrac = d%1.0
+    res = (0.7790572732640 + 0.00273781191135448*d + dfrac)%1.0
     
     if degrees is None:
         return res
@@ -115,8 +126,11 @@ def greenwich_sidereal_time(jd,apparent=True):
     """
     Computes the Greenwich Sidereal Time for a given Julian Date.
     
-    :param jd: The Julian Date or a sequence of JDs, UT1
-    :type jd: scalar or array-like
+    :param jd: 
+        The Julian Date or a sequence of JDs, UT1. A
+        :class:`~astropysics.obstools.JulianDate` can be used for full
+        precision.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
     :param apparent: 
         If True, the Greenwich Apparent Sidereal Time (GAST) is returned,
         using the method in the SOFA function iauGst00b, which
@@ -140,6 +154,8 @@ def greenwich_sidereal_time(jd,apparent=True):
     
     era = earth_rotation_angle(jd,False) #in radians
     
+    #only the rotation angle needs the full precision of a JulianDate
+    jd = np.asarray(jd,dtype=float)
     t = (jd - 2451545.0)/36525
     #Why is Circular 179 different from SOFA? Using the SOFA value
     #gmst = era + _gmst_poly_circular179(t)
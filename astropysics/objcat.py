@@ -131,12 +131,11 @@ class CatalogNode(object):
         call this from a child object with the child as the Source to check
         for cycles in the graph
         """
-        if source is self:
-            raise CycleError('cycle detected in graph assignment attempt')
-        if self._parent is None:
-            return None
-        else:
-            return self.parent._cycleCheck(source)
+        node = self
+        while node is not None:
+            if source is node:
+                raise CycleError('cycle detected in graph assignment attempt')
+            node = node._parent
 
     def _getParent(self):
         return self._parent
@@ -146,6 +145,8 @@ class CatalogNode(object):
             val._children.append(self)
 
         if self._parent is not None:
+            for idx in _ancestor_indexes(self):
+                idx.removeSubtree(self)
             #TODO: optimize this by storing index somewhere?
             for i,c in enumerate(self._parent._children):
                 if c is self:
@@ -155,6 +156,10 @@ class CatalogNode(object):
             del self._parent._children[i]
         self._parent = val
 
+        if val is not None:
+            for idx in _ancestor_indexes(self):
+                idx.addSubtree(self)
+
     parent=property(_getParent,_setParent)
 
 
@@ -231,7 +236,7 @@ class CatalogNode(object):
         this gives the number of total nodes at this point in the tree
         (including self - e.g. a leaf in the tree returns 1)
         """
-        return sum([c.nnodes for c in self._children],1)
+        return sum(1 for n in self.iterNodes())
 
     def idstr(self):
         """
@@ -253,10 +258,98 @@ class CatalogNode(object):
             return '{0}/{1}/{2}'.format(i,j,obj.idstr())
 
 
+    def iterNodes(self,traversal='postorder',includeself=True):
+        """
+        Generates the nodes of the subtree starting at this node, without
+        recursion and without building any lists, so it can be used on deep
+        trees and stopped early (e.g. with ``break`` ).  Changing the tree
+        while iterating affects the nodes that have not yet been reached.
+
+        :param traversal:
+            The traversal order of the tree - see :meth:`visit` for the
+            options.
+        :param includeself:
+            If False, this node itself will not be generated (only the
+            sub-trees).  Ignored if `traversal` is None.
+        :type includeself: bool
+
+        :returns: An iterator over the :class:`CatalogNode` objects.
+
+        :except ValueError: If `traversal` is invalid.
+        """
+        if traversal is None: #as for visit, this ignores includeself
+            yield self
+            return
+        elif traversal == 'level' or traversal == 'breadthfirst':
+            q = deque([self] if includeself else self._children)
+            while q:
+                node = q.popleft()
+                yield node
+                q.extend(node._children)
+            return
+        elif traversal == 'postorder':
+            traversal = -1
+        elif traversal == 'preorder':
+            traversal = 0
+        elif type(traversal) is not int and type(traversal) is not float:
+            raise ValueError('unrecognized traversal type')
+
+        #the root of each subtree is generated before the child at rootpos
+        if type(traversal) is int:
+            def rootpos(nchildren):
+                return traversal if traversal >= 0 else nchildren+1+traversal
+        else:
+            def rootpos(nchildren):
+                if traversal >= 0:
+                    return int(traversal*nchildren)
+                else: #counted from the end, as for negative integers
+                    return nchildren+1+int(traversal*(nchildren+1))
+
+        #frames are [node,next child index,root position,root not yet done]
+        stack = [[self,0,rootpos(len(self._children)),includeself]]
+        while stack:
+            frame = stack[-1]
+            node,i,pos,doroot = frame
+            children = node._children
+            if doroot and (i >= pos or i >= len(children)):
+                frame[3] = False
+                yield node
+            elif i < len(children):
+                frame[1] = i+1
+                child = children[i]
+                stack.append([child,0,rootpos(len(child._children)),True])
+            else:
+                stack.pop()
+
+    def iterVisit(self,func,traversal='postorder',filter=False,includeself=True):
+        """
+        Generates the return values of `func` for the nodes of this subtree.
+        This is the lazy form of :meth:`visit` - the arguments are the same, but
+        `func` is only called as the returned iterator is advanced.
+
+        :returns: An iterator over the return values of `func` .
+        """
+        nodes = self.iterNodes(traversal,includeself)
+        if callable(filter):
+            for node in nodes:
+                if filter(node):
+                    val = func(node)
+                    if val is not None:
+                        yield val
+        elif filter is False:
+            for node in nodes:
+                yield func(node)
+        else:
+            for node in nodes:
+                val = func(node)
+                if val is not filter:
+                    yield val
+
     def visit(self,func,traversal='postorder',filter=False,includeself=True):
         """
         This function walks through the object and all its children, executing
-        func(:class:`CatalogNode`) and returning a list of the return values
+        func(:class:`CatalogNode`) and returning a list of the return values.
+        See :meth:`iterVisit` and :meth:`iterNodes` to walk the tree lazily.
 
         :param func: The function to call as ``func(node)`` on each node.
         :type func: a callable
@@ -294,63 +387,7 @@ class CatalogNode(object):
         :returns: A list with the return values of `visitfunc` at each visited node.
 
         """
-        if callable(filter):
-            oldfunc = func
-            def func(*args,**kwargs):
-                if filter(args[0]):
-                    return oldfunc(*args,**kwargs)
-                else:
-                    return None
-            filterval = None
-        else:
-            filterval = filter
-
-        if type(traversal) is int:
-            retvals = []
-            doroot = True
-            for i,c in enumerate(self._children):
-                if i == traversal and includeself:
-                    retvals.append(func(self))
-                    doroot = False
-                retvals.extend(c.visit(func,traversal))
-            if doroot and includeself:
-                retvals.append(func(self))
-        elif type(traversal) is float:
-            retvals = []
-            doroot = True
-            travi = int(traversal*self._children)
-            for i,c in enumerate(self._children):
-                if i == travi and includeself:
-                    retvals.append(func(self))
-                    doroot = False
-                retvals.extend(c.visit(func,traversal))
-            if doroot and includeself:
-                retvals.append(func(self))
-        elif traversal == 'postorder': #None means postorder
-            retvals = []
-            for c in self._children:
-                retvals.extend(c.visit(func,traversal))
-            if  includeself:
-                retvals.append(func(self))
-        elif traversal == 'preorder':
-            retvals = self.visit(func,0,filter,includeself)
-        elif traversal == 'level' or traversal == 'breadthfirst':
-            retvals=[]
-            q = deque()
-            if includeself:
-                q.append(self)
-            while len(q)>0:
-                elem = q.popleft()
-                retvals.append(func(elem))
-                q.extend(elem._children)
-        elif traversal is None:
-            retvals = [func(self)]
-        else:
-            raise ValueError('unrecognized traversal type')
-
-        if filterval is not False:
-            retvals = [v for v in retvals if v is not filterval]
-        return retvals
+        return list(self.iterVisit(func,traversal,filter,includeself))
 
     def save(self,file,savechildren=True,**kwargs):
         """
@@ -379,6 +416,14 @@ class CatalogNode(object):
             self._parent = oldpar
             self._children = oldchildren
 
+    def saveBinary(self,dirname,overwrite=False):
+        """
+        Save this node and its subtree to a directory in the binary format of
+        :func:`saveBinary`, which is faster to load than :meth:`save` for
+        :class:`ColumnarCatalog` objects and can load their fields lazily.
+        """
+        return saveBinary(self,dirname,overwrite)
+
     #this is a staticmethod to keep both save and load methods in the same
     #place - they are also available at the package level
     @staticmethod
@@ -566,6 +611,10 @@ class FieldNode(CatalogNode,Sequence):
         field.node = self
         self._fieldnames.append(field.name)
 
+        for idx in _ancestor_indexes(self):
+            if idx.fieldname == field.name:
+                idx.addNode(self)
+
     def delField(self,fieldname):
         try:
             self._fieldnames.remove(fieldname)
@@ -576,6 +625,10 @@ class FieldNode(CatalogNode,Sequence):
         except ValueError:
             raise KeyError('Field "%s" not found'%fieldname)
 
+        for idx in _ancestor_indexes(self):
+            if idx.fieldname == fieldname:
+                idx.removeNode(self)
+
     def fields(self):
         """
         this yields an iterator over all of the Field objects (rather than
@@ -753,11 +806,12 @@ class FieldNode(CatalogNode,Sequence):
             else:
                 includeself = True
 
-            def f(node):
-                if hasattr(node,'setToSource'):
-                    node.setToSource(src,missing)
-                    return node
-            return node.visit(f,traversal=traversal,includeself=includeself,filter=None)
+            nodes = []
+            for n in node.iterNodes(traversal,includeself):
+                if hasattr(n,'setToSource'):
+                    n.setToSource(src,missing)
+                    nodes.append(n)
+            return nodes
         else: #assume iterable
             vals = []
             for n in node:
@@ -918,29 +972,39 @@ class FieldNode(CatalogNode,Sequence):
             except (KeyError,IndexError,TypeError,AttributeError):
                 return False
 
-        if filter is not False and not callable(filter):
-            def maskfilter(node,fieldname):
-                return visitfunc(node,fieldname)!=filter
+        #walk the tree once and apply the filter in the same way as visit
+        if callable(filter):
+            nodes = [n for n in node.iterNodes(traversal,includeself) if filter(n)]
         else:
-            maskfilter = filter
+            nodes = list(node.iterNodes(traversal,includeself))
+        dropnone = callable(filter)
 
         lsts = []
         masks = []
-        maskfilterp = maskfilter
+        keeps = []
         for fn in fieldnames:
-            lsts.append(node.visit(partial(visitfunc,fieldname=fn),traversal=traversal,filter=filter,includeself=includeself))
-            if filter is not False and not callable(filter):
-                maskfilterp = partial(maskfilter,fieldname=fn)
-            masks.append(node.visit(partial(maskfunc,fieldname=fn),traversal=traversal,filter=maskfilterp,includeself=includeself))
-
-        lsts = [np.array(l) for l in lsts]
-        #lists of objects sometimes becomes arrays of lists instead of the intended result - this fixes that
-        lsts = [np.array(a.ravel()[0],dtype=object) if a.shape==tuple() else a for a in lsts]
-        #now skip over anything that's masked as missing
-        if missing=='skip':
-            m = np.array(masks[0])
-            lsts = [a[m] for a in lsts]
-
+            vals = [visitfunc(n,fn) for n in nodes]
+            mask = [maskfunc(n,fn) for n in nodes]
+            if filter is False or dropnone:
+                keep = None
+                if dropnone:
+                    vals = [v for v in vals if v is not None]
+            else:
+                keep = [v!=filter for v in vals]
+                vals = [v for v in vals if v is not filter]
+                mask = [m for m,k in zip(mask,keep) if k]
+            lsts.append(vals)
+            masks.append(mask)
+            keeps.append(keep)
+
+        def filtered(func,fn,keep,dropnone):
+            if keep is None:
+                vals = [func(n,fn) for n in nodes]
+            else:
+                vals = [func(n,fn) for n,k in zip(nodes,keep) if k]
+            if dropnone:
+                vals = [v for v in vals if v is not None]
+            return vals
 
         if sources:
             def srcfunc(node,fieldname):
@@ -948,13 +1012,12 @@ class FieldNode(CatalogNode,Sequence):
                     return getattr(node,fieldname).currentobj.source
                 except (KeyError,IndexError,TypeError,AttributeError):
                     return None
-            if filter is not False and not callable(filter):
-                srcs = [node.visit(partial(srcfunc,fieldname=fn),traversal=traversal,filter=partial(maskfilter,fieldname=fn),includeself=includeself) for fn in fieldnames]
-            else:
-                srcs = [node.visit(partial(srcfunc,fieldname=fn),traversal=traversal,filter=filter,includeself=includeself) for fn in fieldnames]
+            srcs = [filtered(srcfunc,fn,keep,filter is not False) for fn,keep in zip(fieldnames,keeps)]
 
             if sources != 'object':
                 srcs = [[str(s) for s in f]  for f in srcs]
+        else:
+            srcs = None
 
         if errors:
             def errfunc(node,fieldname):
@@ -962,11 +1025,28 @@ class FieldNode(CatalogNode,Sequence):
                     return getattr(node,fieldname).currentobj.errors
                 except (KeyError,IndexError,TypeError,AttributeError),e:
                     return (0,0)
-            if filter is not False and not callable(filter):
-                errs = [node.visit(partial(errfunc,fieldname=fn),traversal=traversal,filter=partial(maskfilter,fieldname=fn),includeself=includeself) for fn in fieldnames]
-            else:
-                errs = [node.visit(partial(errfunc,fieldname=fn),traversal=traversal,filter=maskfilter,includeself=includeself) for fn in fieldnames]
+            errs = [filtered(errfunc,fn,keep,filter is not False) for fn,keep in zip(fieldnames,keeps)]
+        else:
+            errs = None
 
+        return FieldNode._extractedToArrays(fieldnames,lsts,masks,srcs,errs,
+                                            missing,sources,errors,asrec)
+
+    @staticmethod
+    def _extractedToArrays(fieldnames,lsts,masks,srcs,errs,missing,sources,
+                           errors,asrec):
+        """
+        Converts the per-field lists of values, masks, sources, and errors
+        gathered by :meth:`extractFieldAtNode` into the requested output
+        arrays.
+        """
+        lsts = [np.array(l) for l in lsts]
+        #lists of objects sometimes becomes arrays of lists instead of the intended result - this fixes that
+        lsts = [np.array(a.ravel()[0],dtype=object) if a.shape==tuple() else a for a in lsts]
+        #now skip over anything that's masked as missing
+        if missing=='skip':
+            m = np.array(masks[0])
+            lsts = [a[m] for a in lsts]
 
         if asrec:
             from operator import isMappingType,isSequenceType
@@ -1083,8 +1163,14 @@ class FieldNode(CatalogNode,Sequence):
     def getFieldValueNodesAtNode(node,fieldname,value,visitkwargs={}):
         """
         Searches through the tree and returns all nodes for which a particular
-        field name has the requested value
+        field name has the requested value.  If `node` is a :class:`Catalog`
+        with an index on the field (see :meth:`Catalog.addIndex`), the index is
+        used and the nodes are in no particular order.
         """
+        idxs = getattr(node,'_indexes',None)
+        if idxs and fieldname in idxs and visitkwargs.get('traversal','postorder') is not None:
+            return idxs[fieldname].find(value)
+
         def visitfunc(node):
             if hasattr(node,fieldname):
                 v = getattr(node,fieldname)
@@ -1484,6 +1570,192 @@ class Field(MutableSequence):
         return [v.errors if hasattr(v,'errors') else (0,0) for v in self._vals]
 
 
+class ADSCache(object):
+    """
+    A persistent on-disk cache for pages retrieved from ADS_ by :class:`Source`
+    objects, so that bibliographic lookups need not be repeated across
+    sessions.  Each page is stored in its own file in `dirname`, entries older
+    than `ttl` are treated as missing, and the least recently used entries are
+    removed when the total size of the cache exceeds `maxsize`.  It is safe to
+    use from multiple threads.
+
+    Use :meth:`Source.useADSCache` to have :class:`Source` objects use a cache.
+    """
+    def __init__(self,dirname=None,ttl=30*86400,maxsize=32*2**20):
+        """
+        :param dirname:
+            The directory in which to store the cache, or None to use the
+            'adscache' directory in the astropysics data directory (see
+            :func:`astropysics.config.get_data_dir`).  It will be created if it
+            does not exist when the first entry is stored.
+        :type dirname: str or None
+        :param ttl:
+            The time in seconds after which an entry expires, or None to keep
+            entries until they are evicted.
+        :type ttl: float or None
+        :param maxsize:
+            The maximum total size of the cache in bytes, or None for no limit.
+        :type maxsize: int or None
+        """
+        from threading import RLock
+
+        if dirname is None:
+            import os
+            from .config import get_data_dir
+            dirname = os.path.join(get_data_dir(False),'adscache')
+        self.dirname = dirname
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = RLock()
+        self._size = None #computed when needed
+
+    def _path(self,url):
+        import os
+        from hashlib import sha1
+
+        return os.path.join(self.dirname,sha1(url).hexdigest())
+
+    def __getitem__(self,url):
+        """
+        Returns the page stored for `url`
+
+        :except KeyError: If the page is not in the cache or has expired.
+        """
+        import os
+        from time import time
+        from cPickle import load
+
+        fn = self._path(url)
+        with self._lock:
+            try:
+                st = os.stat(fn)
+                with open(fn,'rb') as f:
+                    storedurl,text = load(f)
+            except (IOError,OSError,EOFError,ValueError):
+                raise KeyError(url)
+
+            now = time()
+            if storedurl != url:
+                raise KeyError(url)
+            if self.ttl is not None and now - st.st_mtime > self.ttl:
+                self._remove(fn)
+                raise KeyError(url)
+            #record the access time for eviction, keeping the store time
+            os.utime(fn,(now,st.st_mtime))
+        return text
+
+    def __setitem__(self,url,text):
+        import os
+        from tempfile import mkstemp
+        from cPickle import dump
+
+        with self._lock:
+            if not os.path.isdir(self.dirname):
+                os.makedirs(self.dirname)
+            fn = self._path(url)
+            if self._size is not None and os.path.exists(fn):
+                self._size -= os.path.getsize(fn)
+
+            fd,tmpfn = mkstemp(dir=self.dirname,prefix='.tmp')
+            with os.fdopen(fd,'wb') as f:
+                dump((url,text),f,-1)
+            os.rename(tmpfn,fn)
+
+            if self._size is not None:
+                self._size += os.path.getsize(fn)
+            self._evict()
+
+    def __delitem__(self,url):
+        with self._lock:
+            if not self._remove(self._path(url)):
+                raise KeyError(url)
+
+    def __contains__(self,url):
+        try:
+            self[url]
+            return True
+        except KeyError:
+            return False
+
+    def get(self,url,default=None):
+        """
+        Returns the page for `url`, or `default` if it is not in the cache.
+        """
+        try:
+            return self[url]
+        except KeyError:
+            return default
+
+    def _remove(self,fn):
+        import os
+
+        try:
+            sz = os.path.getsize(fn)
+            os.remove(fn)
+        except OSError:
+            return False
+        if self._size is not None:
+            self._size -= sz
+        return True
+
+    def _entries(self):
+        #(access time,size,filename) for all entries
+        import os
+
+        if not os.path.isdir(self.dirname):
+            return []
+        entries = []
+        for fn in os.listdir(self.dirname):
+            if not fn.startswith('.'):
+                fn = os.path.join(self.dirname,fn)
+                try:
+                    st = os.stat(fn)
+                except OSError:
+                    continue
+                entries.append((st.st_atime,st.st_size,fn))
+        return entries
+
+    @property
+    def size(self):
+        """
+        The total size of the entries in the cache in bytes.
+        """
+        with self._lock:
+            if self._size is None:
+                self._size = sum([e[1] for e in self._entries()])
+            return self._size
+
+    def _evict(self):
+        if self.maxsize is None or self.size <= self.maxsize:
+            return
+        entries = self._entries()
+        entries.sort()
+        for at,sz,fn in entries:
+            if self._size <= self.maxsize:
+                break
+            self._remove(fn)
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        with self._lock:
+            for at,sz,fn in self._entries():
+                self._remove(fn)
+            self._size = 0
+
+def _urlopenADS(url,timeout):
+    #default backend for Source.adsbackend
+    from urllib2 import urlopen
+    from contextlib import closing
+
+    if timeout is None:
+        with closing(urlopen(url)) as page:
+            return page.read()
+    else:
+        with closing(urlopen(url,timeout=timeout)) as page:
+            return page.read()
+
 class _SourceMeta(type):
     def __call__(cls,*args,**kwargs):
         obj = type.__call__(cls,*args,**kwargs)
@@ -1549,6 +1821,9 @@ class Source(object):
     #the URL to use for looking up ADS entries
     adstimeout = 1
     #time in seconds before giving up on a search for ADS entries
+    adsbackend = None
+    #callable as adsbackend(url,timeout) that returns the text of the page at
+    #url, raising urllib2.HTTPError if it does not exist, or None for urllib2
 
     def getBibcode(self):
         """
@@ -1598,9 +1873,6 @@ class Source(object):
 
     @staticmethod
     def _findADScode(loc):
-        from urllib2 import urlopen,HTTPError,URLError
-        from contextlib import closing
-
         #assume all is correct if the adsurl is not available
         if not Source.adsurl:
             return loc
@@ -1618,53 +1890,181 @@ class Source(object):
             url = 'http://%s/abs/%s'%(Source.adsurl,loc)
 
         url += '?data_type=PLAINTEXT'
-        try:
-            if Source.adstimeout is None:
-                with closing(urlopen(url)) as page: #raises exceptions if url DNE
-                    for l in page:
-                        if 'Bibliographic Code:' in l:
-                            return l.replace('Bibliographic Code:','').strip()
-            else:
-                with closing(urlopen(url,timeout=Source.adstimeout)) as page: #raises exceptions if url DNE
-                    for l in page:
-                        if 'Bibliographic Code:' in l:
-                            return l.replace('Bibliographic Code:','').strip()
-        except HTTPError:
-            raise SourceDataError('Requested location %s does not exist at url %s'%(loc,url))
-        except URLError,e:
-            if e.reason=='timed out':
-                raise SourceDataError('Lookup of Bibliographic code failed due to timeout')
-            raise
+        for l in Source._getADSPage(url,loc).splitlines():
+            if 'Bibliographic Code:' in l:
+                return l.replace('Bibliographic Code:','').strip()
         raise SourceDataError('Bibliographic entry for the location %s had no ADS code, or parsing problem'%loc)
 
+    @staticmethod
+    def _adsURL(adscode,datatype):
+        return 'http://%s/abs/%s>data_type=%s'%(Source.adsurl,adscode,datatype)
+
+    @staticmethod
+    def _getADSPage(url,loc=None):
+        """
+        Returns the text of an ADS page, from the caches if present.
+        """
+        from urllib2 import HTTPError,URLError
+
+        pages = Source._adspagecache
+        if pages is not None and url in pages:
+            return pages[url]
+        cache = Source.adscache
+        text = None if cache is None else cache.get(url)
+
+        if text is None:
+            backend = Source.adsbackend
+            if getattr(backend,'im_self',False) is None:
+                #plain functions become unbound methods as class attributes
+                backend = backend.im_func
+            if backend is None:
+                backend = _urlopenADS
+            try:
+                text = backend(url,Source.adstimeout)
+            except HTTPError:
+                raise SourceDataError('Requested location %s does not exist at url %s'%(url if loc is None else loc,url))
+            except URLError,e:
+                if e.reason=='timed out':
+                    raise SourceDataError('Lookup of Bibliographic code failed due to timeout')
+                raise
+            if cache is not None:
+                cache[url] = text
+
+        if pages is not None:
+            pages[url] = text
+        return text
 
     _adsxmlcache = {}
+    _adspagecache = {}
+    adscache = None
+    #An ADSCache object for ADS pages that persists across sessions, or None
 
     @staticmethod
     def clearADSCache(adscode=None, disable=False):
         """
         this clears the cache of the specified adscode, or everything, if
-        the adscode is None
+        the adscode is None.  Entries are also removed from the persistent
+        cache, if one is in use.
         """
         if adscode is None:
-            Source._adsxmlcache.clear()
+            if Source._adsxmlcache is not None:
+                Source._adsxmlcache.clear()
+                Source._adspagecache.clear()
+            if Source.adscache is not None:
+                Source.adscache.clear()
         else:
-            del Source._adsxmlcache[adscode]
+            if Source._adsxmlcache is not None:
+                Source._adsxmlcache.pop(adscode,None)
+                for url in Source._adspagecache.keys():
+                    if adscode in url:
+                        del Source._adspagecache[url]
+            if Source.adscache is not None:
+                for url in (Source._adsURL(adscode,'XML'),
+                            Source._adsURL(adscode,'BIBTEX'),
+                            'http://%s/abs/%s?data_type=PLAINTEXT'%(Source.adsurl,adscode)):
+                    try:
+                        del Source.adscache[url]
+                    except KeyError:
+                        pass
+        if disable:
+            Source.useADSCache(False)
 
     @staticmethod
-    def useADSCache(enable=True):
+    def useADSCache(enable=True,persistent=None):
         """
         This is used to disable or enable the cache for ADS lookups - if the
         enable argument is True, the cache is enable (or unaltered if it
         is already active)) and if it is False, it will be disabled
 
-        note that if the cache is disabled, all entries are lost
+        note that if the cache is disabled, all entries are lost (although
+        entries in the persistent cache are kept on disk)
+
+        `persistent` sets the persistent cache used in addition to the
+        in-memory cache. It can be True to use an :class:`ADSCache` in the
+        default location, a directory name or an :class:`ADSCache` object to
+        use that cache, False to stop using the persistent cache, or None to
+        leave it unaltered.
         """
         if enable:
             if Source._adsxmlcache is None:
                 Source._adsxmlcache = {}
+                Source._adspagecache = {}
         else:
             Source._adsxmlcache = None
+            Source._adspagecache = None
+            Source.adscache = None
+
+        if persistent is None:
+            pass
+        elif persistent is True:
+            Source.adscache = ADSCache()
+        elif persistent is False:
+            Source.adscache = None
+        elif isinstance(persistent,basestring):
+            Source.adscache = ADSCache(persistent)
+        elif isinstance(persistent,ADSCache):
+            Source.adscache = persistent
+        else:
+            raise TypeError('invalid persistent cache %s'%persistent)
+
+    @staticmethod
+    def fetchADSData(sources,datatypes=('XML','BIBTEX'),nthreads=8):
+        """
+        Retrieves data from ADS_ for many :class:`Source` objects at once, using
+        several concurrent requests.  The data is stored in the caches (see
+        :meth:`useADSCache`), so later lookups for these sources do not need
+        the network. This does nothing useful if the caches are disabled.
+
+        :param sources: The :class:`Source` objects to retrieve data for.
+        :type sources: sequence of :class:`Source` objects
+        :param datatypes:
+            The ADS data types to retrieve: 'XML' for the data used for
+            :attr:`authors`, :attr:`title` and similar, and 'BIBTEX' for
+            :meth:`getBibEntry`.
+        :type datatypes: sequence of strings
+        :param int nthreads: The maximum number of concurrent requests.
+
+        :returns:
+            A list of (source,exception) tuples for the lookups that failed.
+            Sources without a bibcode are skipped.
+        """
+        if not Source.adsurl:
+            raise SourceDataError('ADS URL not provided, so bibliographic lookup cannot occur.')
+
+        srcurls = [(src,Source._adsURL(src._adscode,dt)) for src in sources
+                   if src._adscode is not None for dt in datatypes]
+        pages = Source._fetchADSPages([url for src,url in srcurls],nthreads)
+        return [(src,pages[url]) for src,url in srcurls if isinstance(pages[url],Exception)]
+
+    @staticmethod
+    def _fetchADSPages(urls,nthreads):
+        #get pages with at most nthreads concurrent requests, returning a dict
+        #mapping the urls to the text or the exception raised
+        from threading import Thread
+        from Queue import Queue,Empty
+
+        todo = Queue()
+        for url in set(urls):
+            todo.put(url)
+        pages = {}
+
+        def worker():
+            while True:
+                try:
+                    url = todo.get_nowait()
+                except Empty:
+                    return
+                try:
+                    pages[url] = Source._getADSPage(url)
+                except Exception,e:
+                    pages[url] = e
+
+        threads = [Thread(target=worker) for i in range(max(int(nthreads),1))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return pages
 
     def _getADSXMLRec(self):
         adscode = self._adscode
@@ -1676,12 +2076,9 @@ class Source(object):
         if Source._adsxmlcache is not None and adscode in Source._adsxmlcache:
             xmlrec = Source._adsxmlcache[adscode]
         else:
-            from urllib2 import urlopen
-            from contextlib import closing
             from xml.dom.minidom import parseString
 
-            with closing(urlopen('http://%s/abs/%s>data_type=XML'%(Source.adsurl,adscode))) as f:
-                xmld = parseString(f.read())
+            xmld = parseString(Source._getADSPage(Source._adsURL(adscode,'XML')))
 
             recs = xmld.getElementsByTagName('record')
             if len(recs) > 1:
@@ -1705,25 +2102,14 @@ class Source(object):
         :returns: A string with the BibTeX formatted entry for this source.
 
         """
-        from urllib2 import urlopen,URLError
-        from contextlib import closing
-
         if self._adscode is None:
             raise SourceDataError('No location provided for additional source data')
         if not Source.adsurl:
             raise SourceDataError('ADS URL not provided, so bibliographic lookup cannot occur.')
-        try:
-            if Source.adstimeout is None:
-                with closing(urlopen('http://%s/abs/%s>data_type=BIBTEX'%(Source.adsurl,self._adscode))) as xf:
-                    res = xf.read()
-            else:
-                with closing(urlopen('http://%s/abs/%s>data_type=BIBTEX'%(Source.adsurl,self._adscode),timeout=Source.adstimeout)) as xf:
-                    res = xf.read()
-        except URLError,e:
-            if e.reason=='timed out':
-                raise SourceDataError('Lookup of Bibliographic code failed due to timeout')
-            raise
 
+        res = Source._getADSPage(Source._adsURL(self._adscode,'BIBTEX'))
+        if '@' not in res:
+            raise SourceDataError('No BibTeX entry found for %s'%self)
         return res[(res.index('@')):]
 
     def openADSAbstract(self,opentype=None,**kwargs):
@@ -1755,7 +2141,7 @@ class Source(object):
         openfunc(self.adsabs,**kwargs)
 
     @staticmethod
-    def build_bibliography(sources='all',fn=None):
+    def build_bibliography(sources='all',fn=None,nthreads=8):
         """
         Generates and returns BibTeX bibliography for :class:`Source` objects.
 
@@ -1764,6 +2150,7 @@ class Source(object):
             :class:`Source` objects.
         :param fn:
             A filename at which to save the BibTeX content, or None to not save.
+        :param int nthreads: The maximum number of concurrent ADS requests.
 
         :returns:
             bibstr,fail where `bibstr` is a string with the BibTeX content and
@@ -1773,8 +2160,42 @@ class Source(object):
         :raises TypeError:
             If `sources` is not a list of :class:`Source` objects or 'all'
         """
+        if sources == 'all':
+            sources = Source._singdict.values()
+        else:
+            sources = list(sources)
+            for src in sources:
+                if not isinstance(src,Source):
+                    raise TypeError('sources must be Source objects or "all"')
 
-
+        fail = [src for src in sources if src._adscode is None]
+        sources = [src for src in sources if src._adscode is not None]
+        if not Source.adsurl:
+            return '',fail+sources
+
+        #look up the entries concurrently, as this is usually limited by latency
+        urls = [Source._adsURL(src._adscode,'BIBTEX') for src in sources]
+        pages = Source._fetchADSPages(urls,nthreads)
+
+        entries = []
+        adscodes = set()
+        for src,url in zip(sources,urls):
+            page = pages[url]
+            if isinstance(page,Exception):
+                if not isinstance(page,(SourceDataError,IOError)):
+                    raise page
+                fail.append(src)
+            elif '@' not in page:
+                fail.append(src)
+            elif src._adscode not in adscodes:
+                adscodes.add(src._adscode)
+                entries.append(page[page.index('@'):].strip())
+
+        bibstr = '\n\n'.join(entries)
+        if fn is not None:
+            with open(fn,'w') as f:
+                f.write(bibstr)
+        return bibstr,fail
 
     @property
     def authors(self):
@@ -2019,7 +2440,7 @@ class DerivedValue(FieldValue):
         the value will be returned as None and will be marked valid
 
     """
-    __slots__=('_f','_ferr','_value','_errs','_valid','_fieldwr')
+    __slots__=('_f','_ferr','_value','_errs','_valid','_fieldwr','_depvals')
     #TODO: auto-reassign nodepath from source if Field moves
     failedvalueaction = 'raise'
 
@@ -2063,6 +2484,7 @@ class DerivedValue(FieldValue):
         self._valid = False
         self._value = None
         self._errs = None
+        self._depvals = None #dependency values for _value, if comparable
 
         self._fieldwr = None
         self._source = DependentSource(defaults,sourcenode,self._invalidateNotifier)
@@ -2078,6 +2500,7 @@ class DerivedValue(FieldValue):
         super(DerivedValue,self).__setstate__(d)
         self._value = d['_value']
         self._valid = False
+        self._depvals = None
         self._fieldwr = None
         self._f = d['_f'] #TODO: find some way to work around this?
 
@@ -2186,6 +2609,7 @@ class DerivedValue(FieldValue):
                         uerr = np.sum(np.power(uerrs,2))**0.5
                         lerr = np.sum(np.power(lerrs,2))**0.5
                         self._errs = (uerr,lerr)
+                self._depvals = deps if _memoizable(deps) else None
                 self._valid = True
             except (ValueError,IndexError,CycleError,AttributeError,TypeError),e:
                 if isinstance(e,CycleError) and ' at ' not in e.args[0]:
@@ -2207,6 +2631,7 @@ class DerivedValue(FieldValue):
 
 
 
+                self._depvals = None
                 if self.failedvalueaction == 'raise':
                     if len(e.args) == 2 and isinstance(e.args[1],list):
                         fields = [self._f.func_code.co_varnames[i] for i in e.args[1]]
@@ -2638,16 +3063,434 @@ class Catalog(CatalogNode):
 
     def getFieldValueNodes(self,fieldname,value):
         """
-        Searches the Catalog and finds all objects with the requested name
+        Searches the Catalog and finds all objects with the requested value of
+        a field.  If the field has an index (see :meth:`addIndex`), the index is
+        used instead of searching, and the nodes are in no particular order.
         """
         return FieldNode.getFieldValueNodesAtNode(self,fieldname,value,{'includeself':False})
 
+    def getFieldRangeNodes(self,fieldname,lower=None,upper=None):
+        """
+        Searches the Catalog and finds all objects for which a field has a value
+        between `lower` and `upper` (inclusive).  If the field has an index (see
+        :meth:`addIndex`), the index is used instead of searching, and the nodes
+        are in no particular order.
+
+        :param fieldname: The name of the field to check.
+        :type fieldname: string
+        :param lower: The lower bound, or None for no lower bound.
+        :param upper: The upper bound, or None for no upper bound.
+
+        :returns: A list of the matching :class:`FieldNode` objects.
+        """
+        idxs = getattr(self,'_indexes',None)
+        if idxs and fieldname in idxs:
+            return idxs[fieldname].findRange(lower,upper)
+
+        def visitfunc(node):
+            if isinstance(node,FieldNode) and fieldname in node._fieldnames:
+                try:
+                    v = getattr(node,fieldname)()
+                except (IndexError,ValueError,TypeError,AttributeError,CycleError):
+                    return None
+                if (lower is None or v >= lower) and (upper is None or v <= upper):
+                    return node
+        return self.visit(visitfunc,includeself=False,filter=None)
+
     def locateName(self,name):
         """
         Searches the Catalog and finds all objects with the requested name
         """
         return FieldNode.getFieldValueNodesAtNode(self,'name',name,{'includeself':False})
 
+    def addIndex(self,fieldname,kind='hash'):
+        """
+        Creates an index of the nodes in this catalog by the value of a field.
+        The index is kept up to date as values change and nodes are added or
+        removed, and is then used by :meth:`getFieldValueNodes`,
+        :meth:`getFieldRangeNodes`, and :meth:`locateName` instead of
+        searching the whole catalog.  Indexes are not saved when the catalog is
+        pickled.
+
+        :param fieldname: The name of the field to index.
+        :type fieldname: string
+        :param kind:
+            The type of index to build. Can be:
+
+                * 'hash'
+                    A :class:`HashFieldIndex` - fastest for finding particular
+                    values.
+                * 'sorted'
+                    A :class:`SortedFieldIndex` - fast for both particular
+                    values and ranges of values.
+
+        :returns: The new :class:`FieldIndex` object.
+
+        :except ValueError: If `kind` is invalid.
+        """
+        if kind == 'hash':
+            cls = HashFieldIndex
+        elif kind == 'sorted':
+            cls = SortedFieldIndex
+        else:
+            raise ValueError('invalid index kind "%s"'%kind)
+
+        idxs = getattr(self,'_indexes',None)
+        if idxs is None:
+            idxs = self._indexes = {}
+        elif fieldname in idxs:
+            self.delIndex(fieldname)
+        idx = idxs[fieldname] = cls(self,fieldname)
+        return idx
+
+    def delIndex(self,fieldname):
+        """
+        Removes the index for a field created with :meth:`addIndex` .
+
+        :param fieldname: The name of the indexed field.
+        :type fieldname: string
+
+        :except KeyError: If the field has no index.
+        """
+        idxs = getattr(self,'_indexes',None)
+        if not idxs or fieldname not in idxs:
+            raise KeyError('No index for field "%s"'%fieldname)
+        idx = idxs.pop(fieldname)
+        idx.removeSubtree(self)
+
+    @property
+    def indexes(self):
+        """
+        A dictionary mapping field names to the :class:`FieldIndex` objects for
+        this catalog.
+        """
+        return dict(getattr(self,'_indexes',None) or {})
+
+
+#<------------------------------Field indexes---------------------------------->
+def _ancestor_indexes(node):
+    """
+    Yields the :class:`FieldIndex` objects of all catalogs above `node` .
+    """
+    parent = node._parent
+    while parent is not None:
+        idxs = getattr(parent,'_indexes',None)
+        if idxs:
+            for idx in idxs.values():
+                yield idx
+        parent = parent._parent
+
+class FieldIndex(object):
+    """
+    An index of the :class:`FieldNode` objects below a :class:`Catalog` by the
+    current value of one of their fields, used to find the nodes with a
+    particular value without walking the catalog tree.  These are created with
+    :meth:`Catalog.addIndex` .
+
+    The index is kept up to date through notifiers on the indexed
+    :class:`Fields<Field>` (see :meth:`Field.registerNotifier`), and as nodes
+    and fields are added to or removed from the catalog.  Changed nodes are
+    re-indexed the next time the index is used, so :class:`DerivedValue`
+    objects are only computed if needed.  :class:`ColumnarCatalog` objects in
+    the tree are indexed from their arrays, which are re-sorted when the column
+    has changed since the last lookup.
+
+    Lookups return the nodes in no particular order.
+
+    *Subclassing*
+        * Subclasses must implement the :meth:`_insert`, :meth:`_remove`,
+          :meth:`_find`, and :meth:`_findRange` methods, and should call
+          FieldIndex.__init__ after setting up their own storage.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self,catalog,fieldname):
+        self.fieldname = fieldname
+        self._nodes = {} #id(node):node for all nodes with the field
+        self._keys = {} #id(node):key for nodes currently in the index
+        self._fields = {} #id(node):Field with a registered notifier
+        self._notifiers = {} #id(node):notifier - the Field only has a weakref
+        self._dirty = {} #id(node):node for nodes that need re-indexing
+        self._colcats = {} #id(catalog):ColumnarCatalog
+        self._colcache = {} #id(catalog):(column,version,sortedvalues,rows)
+
+        self.addSubtree(catalog)
+
+    def __len__(self):
+        self._update()
+        return len(self._keys) + sum([len(self._colIndex(c)[0]) for c in self._colcats.values()])
+
+    @abstractmethod
+    def _insert(self,key,node):
+        """
+        Adds `node` to the index with the value `key` .
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _remove(self,key,node):
+        """
+        Removes `node` (with value `key` ) from the index.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _find(self,value):
+        """
+        Returns a list of the indexed nodes with value equal to `value` .
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _findRange(self,lower,upper):
+        """
+        Returns a list of the indexed nodes with lower <= value <= upper, where
+        None means no bound.
+        """
+        raise NotImplementedError
+
+    def _walk(self,node):
+        #iterate over a subtree without descending into the rows of ColumnarCatalogs
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            yield n
+            if isinstance(n,ColumnarCatalog):
+                if len(n._children) != n._nrows:
+                    stack.extend([c for c in n._children if not isinstance(c,ColumnarNode)])
+            else:
+                stack.extend(n._children)
+
+    def addNode(self,node):
+        """
+        Adds a single node (but not its children) to the index, or re-checks it
+        if it is already present.
+        """
+        nid = id(node)
+        if isinstance(node,ColumnarCatalog):
+            self._colcats[nid] = node
+        elif isinstance(node,ColumnarNode) or not isinstance(node,FieldNode):
+            pass
+        elif self.fieldname not in getattr(node,'_fieldnames',()):
+            #also reached during FieldNode.__init__ before the fields exist
+            self.removeNode(node)
+        else:
+            field = getattr(node,self.fieldname)
+            if self._fields.get(nid) is not field:
+                dirty = self._dirty
+                def notifier(oldvalobj,newvalobj):
+                    dirty[nid] = node
+                field.registerNotifier(notifier,False)
+                self._notifiers[nid] = notifier
+                self._fields[nid] = field
+            self._nodes[nid] = node
+            self._dirty[nid] = node
+
+    def removeNode(self,node):
+        """
+        Removes a single node (but not its children) from the index.
+        """
+        nid = id(node)
+        if isinstance(node,ColumnarCatalog):
+            self._colcats.pop(nid,None)
+            self._colcache.pop(nid,None)
+        elif nid in self._nodes:
+            del self._nodes[nid]
+            del self._fields[nid]
+            del self._notifiers[nid] #this kills the Field's weakref
+            self._dirty.pop(nid,None)
+            if nid in self._keys:
+                self._remove(self._keys.pop(nid),node)
+
+    def addSubtree(self,node):
+        """
+        Adds `node` and all nodes below it to the index.
+        """
+        for n in self._walk(node):
+            self.addNode(n)
+
+    def removeSubtree(self,node):
+        """
+        Removes `node` and all nodes below it from the index.
+        """
+        for n in self._walk(node):
+            self.removeNode(n)
+
+    def _update(self):
+        #re-index any nodes that have changed
+        while self._dirty:
+            nid,node = self._dirty.popitem()
+            if nid in self._keys:
+                self._remove(self._keys.pop(nid),node)
+            try:
+                key = getattr(node,self.fieldname)()
+            except (IndexError,ValueError,TypeError,AttributeError,CycleError):
+                continue #empty or underivable values are not indexed
+            self._keys[nid] = key
+            self._insert(key,node)
+
+    def _colIndex(self,colcat):
+        #sorted current values and the matching rows for a ColumnarCatalog
+        col = colcat._columns.get(self.fieldname)
+        if col is None:
+            return np.array([]),np.array([],dtype=int)
+        cached = self._colcache.get(id(colcat))
+        if cached is None or cached[0] is not col or cached[1] != col.version:
+            vals,present = col.getCurrent()
+            rows = np.flatnonzero(present)
+            vals = vals[present]
+            order = vals.argsort(kind='mergesort')
+            cached = (col,col.version,vals[order],rows[order])
+            self._colcache[id(colcat)] = cached
+        return cached[2],cached[3]
+
+    def _colFind(self,colcat,lower,upper,lowerside='left',upperside='right'):
+        #nodes of a ColumnarCatalog with sorted values between lower and upper
+        vals,rows = self._colIndex(colcat)
+        try:
+            i = 0 if lower is None else vals.searchsorted(lower,lowerside)
+            j = len(vals) if upper is None else vals.searchsorted(upper,upperside)
+        except (TypeError,ValueError):
+            return []
+        return colcat.getNodes(rows[i:j])
+
+    def find(self,value):
+        """
+        Finds the nodes for which the current value of the field is `value` .
+
+        :returns: A list of the matching :class:`FieldNode` objects.
+        """
+        self._update()
+        nodes = self._find(value)
+        for colcat in self._colcats.values():
+            nodes.extend(self._colFind(colcat,value,value))
+        return nodes
+
+    def findRange(self,lower=None,upper=None):
+        """
+        Finds the nodes for which the current value of the field is between
+        `lower` and `upper` (inclusive).
+
+        :param lower: The lower bound, or None for no lower bound.
+        :param upper: The upper bound, or None for no upper bound.
+
+        :returns: A list of the matching :class:`FieldNode` objects.
+        """
+        self._update()
+        nodes = self._findRange(lower,upper)
+        for colcat in self._colcats.values():
+            nodes.extend(self._colFind(colcat,lower,upper))
+        return nodes
+
+class HashFieldIndex(FieldIndex):
+    """
+    A :class:`FieldIndex` that uses a hash table, for fast lookups of nodes
+    with a particular value.  Range lookups must check every value.  Nodes with
+    unhashable values are compared one at a time.
+    """
+    def __init__(self,catalog,fieldname):
+        self._table = {} #value:{id(node):node}
+        self._unhashable = {} #id(node):node
+        FieldIndex.__init__(self,catalog,fieldname)
+
+    def _insert(self,key,node):
+        try:
+            self._table.setdefault(key,{})[id(node)] = node
+        except TypeError:
+            self._unhashable[id(node)] = node
+
+    def _remove(self,key,node):
+        try:
+            nodes = self._table.get(key)
+        except TypeError:
+            del self._unhashable[id(node)]
+            return
+        del nodes[id(node)]
+        if not nodes:
+            del self._table[key]
+
+    def _find(self,value):
+        try:
+            nodes = self._table.get(value,{}).values()
+        except TypeError:
+            nodes = []
+        for nid,node in self._unhashable.iteritems():
+            try:
+                if self._keys[nid] == value:
+                    nodes.append(node)
+            except ValueError: #array comparisons
+                pass
+        return nodes
+
+    def _findRange(self,lower,upper):
+        nodes = []
+        for key,knodes in self._table.iteritems():
+            if (lower is None or key >= lower) and (upper is None or key <= upper):
+                nodes.extend(knodes.values())
+        return nodes
+
+class SortedFieldIndex(FieldIndex):
+    """
+    A :class:`FieldIndex` that keeps the values in sorted order, for fast
+    lookups of both particular values and ranges of values.  Nodes with values
+    that cannot be ordered (e.g. NaN or arrays) are compared one at a time for
+    equality and are never included in ranges.
+    """
+    def __init__(self,catalog,fieldname):
+        self._sortkeys = []
+        self._sortnodes = []
+        self._unordered = {} #id(node):node
+        FieldIndex.__init__(self,catalog,fieldname)
+
+    @staticmethod
+    def _orderable(key):
+        try:
+            return bool(key == key) and not bool(key < key)
+        except (TypeError,ValueError):
+            return False
+
+    def _insert(self,key,node):
+        from bisect import bisect_right
+
+        if self._orderable(key):
+            i = bisect_right(self._sortkeys,key)
+            self._sortkeys.insert(i,key)
+            self._sortnodes.insert(i,node)
+        else:
+            self._unordered[id(node)] = node
+
+    def _remove(self,key,node):
+        from bisect import bisect_left,bisect_right
+
+        if self._unordered.pop(id(node),None) is None:
+            for i in range(bisect_left(self._sortkeys,key),bisect_right(self._sortkeys,key)):
+                if self._sortnodes[i] is node:
+                    del self._sortkeys[i]
+                    del self._sortnodes[i]
+                    break
+
+    def _find(self,value):
+        from bisect import bisect_left,bisect_right
+
+        if self._orderable(value):
+            nodes = self._sortnodes[bisect_left(self._sortkeys,value):bisect_right(self._sortkeys,value)]
+        else:
+            nodes = []
+        for nid,node in self._unordered.iteritems():
+            try:
+                if self._keys[nid] == value:
+                    nodes.append(node)
+            except ValueError: #array comparisons
+                pass
+        return nodes
+
+    def _findRange(self,lower,upper):
+        from bisect import bisect_left,bisect_right
+
+        i = 0 if lower is None else bisect_left(self._sortkeys,lower)
+        j = len(self._sortkeys) if upper is None else bisect_right(self._sortkeys,upper)
+        return self._sortnodes[i:j]
+
 
 class _StructuredFieldNodeMeta(ABCMeta):
     #Metaclass is used to check at class creation-time that fields all match names
@@ -2743,6 +3586,9 @@ class StructuredFieldNode(FieldNode):
             dvo.field = fobj
             fobj._nocheckinsert(0,dvo)
 
+        for idx in _ancestor_indexes(self):
+            idx.addNode(self)
+
         for k,v in kwargs.iteritems():
             self[k] = v
 
@@ -2872,6 +3718,9 @@ class StructuredFieldNode(FieldNode):
         for dv,fobj in dvs:
             fobj.insert(0,DerivedValue(dv._f,self,dv.flinkdict,dv._ferr))
 
+        for idx in _ancestor_indexes(self):
+            idx.addNode(self)
+
         self._altered = False
         self.addField = types.MethodType(StructuredFieldNode.addField,self,StructuredFieldNode)
         self.delField = types.MethodType(StructuredFieldNode.delField,self,StructuredFieldNode)
@@ -2914,8 +3763,1136 @@ def derivedFieldFunc(f=None,name=None,type=None,defaultval=None,
 #add this as a static class function for compatibility with older versions (for now)
 StructuredFieldNode.derivedFieldFunc = staticmethod(derivedFieldFunc)
 
+#<------------------------------Columnar catalogs------------------------------>
+def _column_dtype(type):
+    """
+    Determines the numpy data type used to store the values of a field of the
+    given type in a :class:`ColumnarCatalog` - numeric python types (or
+    sequences of them) are stored natively, and anything else as objects.
+    """
+    numtypes = (bool,int,float,complex)
+    if isinstance(type,np.dtype): #fields of this type hold whole arrays
+        return np.dtype(object)
+    elif type in numtypes:
+        return np.dtype(type)
+    elif isinstance(type,tuple) and len(type)>0 and all([t in numtypes for t in type]):
+        return np.result_type(*type)
+    else:
+        return np.dtype(object)
+
+def _as_object_array(values):
+    """
+    Converts a sequence of values to a 1D object array without numpy
+    interpreting sequence elements as extra dimensions.  Scalars (including
+    strings) are returned as-is so that they broadcast on assignment.
+    """
+    if isinstance(values,basestring) or not np.iterable(values):
+        return values
+    if isinstance(values,np.ndarray) and values.ndim == 1:
+        return values.astype(object)
+    arr = np.empty(len(values),dtype=object)
+    for i,v in enumerate(values):
+        arr[i] = v
+    return arr
+
+class _FieldColumn(object):
+    """
+    The storage for a single field of a :class:`ColumnarCatalog`.
+
+    For each :class:`Source` with values in the field (keyed by the index of
+    the source in the catalog), `layers` holds a [values,uppererrors,
+    lowererrors,present] list of arrays along the rows, where the error arrays
+    are None until errors are set.  `current` is the index of the current
+    source for each row, or -1 if the row has no value.  `version` is
+    incremented whenever the values change.
+
+    Columns read by :func:`loadBinary` have a `_loader` that reads the arrays
+    the first time `current` or `layers` is used.
+    """
+    __slots__=('name','type','units','descr','dtype','default','_current',
+               '_layers','version','_loader')
+    _statenames = ('name','type','units','descr','dtype','default','current',
+                   'layers','version')
+
+    def __init__(self,name,type,units,descr,dtype,nrows):
+        self.name = name
+        self.type = type
+        self.units = units
+        self.descr = descr
+        self.dtype = dtype
+        self.default = None #(source index,value) for new rows, if any
+        self._loader = None
+        self.current = -np.ones(nrows,dtype=int)
+        self.layers = {}
+        self.version = 0
+
+    def __getstate__(self):
+        return dict([(k,getattr(self,k)) for k in self._statenames])
+    def __setstate__(self,d):
+        self._loader = None
+        for k in self._statenames:
+            setattr(self,k,d[k])
+
+    def _load(self):
+        loader = self._loader
+        self._loader = None
+        self._current,self._layers = loader()
+
+    def _getCurrent(self):
+        if self._loader is not None:
+            self._load()
+        return self._current
+    def _setCurrent(self,val):
+        if self._loader is not None:
+            self._load()
+        self._current = val
+    current = property(_getCurrent,_setCurrent)
+
+    def _getLayers(self):
+        if self._loader is not None:
+            self._load()
+        return self._layers
+    def _setLayers(self,val):
+        if self._loader is not None:
+            self._load()
+        self._layers = val
+    layers = property(_getLayers,_setLayers)
+
+    @property
+    def nrows(self):
+        return self.current.size
+
+    @property
+    def errdtype(self):
+        return np.dtype(object) if self.dtype == object else np.dtype(float)
+
+    def layer(self,srcind):
+        """
+        Returns the layer for the source index `srcind`, creating it if needed.
+        """
+        lay = self.layers.get(srcind)
+        if lay is None:
+            n = self.nrows
+            if self.dtype == object:
+                vals = np.empty(n,dtype=object)
+            else:
+                vals = np.zeros(n,dtype=self.dtype)
+            lay = self.layers[srcind] = [vals,None,None,np.zeros(n,dtype=bool)]
+        return lay
+
+    def set(self,rows,srcind,values,uerr=None,lerr=None,setcurr=True):
+        """
+        Sets the values (and errors) from the source index `srcind` for the
+        given rows (an index, an index array, a boolean array, or a slice).
+        Rows without a current value always take on the new source as current.
+        """
+        lay = self.layer(srcind)
+        lay[0][rows] = values
+        if uerr is None:
+            uerr = lerr
+        if uerr is None:
+            if lay[1] is not None:
+                lay[1][rows] = 0
+                lay[2][rows] = 0
+        else:
+            if lay[1] is None:
+                lay[1] = np.zeros(self.nrows,dtype=self.errdtype)
+                lay[2] = np.zeros(self.nrows,dtype=self.errdtype)
+            lay[1][rows] = uerr
+            lay[2][rows] = uerr if lerr is None else lerr
+        lay[3][rows] = True
+        self.version += 1
+
+        if setcurr:
+            self.current[rows] = srcind
+        else:
+            cur = self.current[rows]
+            self.current[rows] = np.where(cur<0,srcind,cur)
+
+    def remove(self,rows,srcind):
+        """
+        Removes the values from the source index `srcind` for the given rows.
+        Rows for which that source was current take the first remaining source
+        as current.
+        """
+        lay = self.layers.get(srcind)
+        if lay is None:
+            return
+        self.version += 1
+
+        if isinstance(rows,slice):
+            rows = np.arange(self.nrows)[rows]
+        else:
+            rows = np.atleast_1d(rows)
+            if rows.dtype == bool:
+                rows = np.flatnonzero(rows)
+
+        lay[3][rows] = False
+        if self.dtype == object:
+            lay[0][rows] = None
+
+        stale = rows[self.current[rows] == srcind]
+        self.current[stale] = -1
+        for si in sorted(self.layers):
+            if stale.size == 0:
+                break
+            present = self.layers[si][3][stale]
+            self.current[stale[present]] = si
+            stale = stale[~present]
+
+        if not lay[3].any():
+            del self.layers[srcind]
+
+    def grow(self,n):
+        """
+        Adds `n` rows, set to the default value if there is one.
+        """
+        defind = None if self.default is None else self.default[0]
+        self.version += 1
+        self.current = np.concatenate((self.current,np.repeat(-1 if defind is None else defind,n)))
+        for si,lay in self.layers.iteritems():
+            if self.dtype == object:
+                newvals = np.empty(n,dtype=object)
+            else:
+                newvals = np.zeros(n,dtype=self.dtype)
+            if si == defind:
+                newvals.fill(self.default[1])
+            lay[0] = np.concatenate((lay[0],newvals))
+            if lay[1] is not None:
+                lay[1] = np.concatenate((lay[1],np.zeros(n,dtype=self.errdtype)))
+                lay[2] = np.concatenate((lay[2],np.zeros(n,dtype=self.errdtype)))
+            lay[3] = np.concatenate((lay[3],np.repeat(si == defind,n)))
+
+    def take(self,inds):
+        """
+        Replaces the rows with those selected by the index or boolean array
+        `inds` .
+        """
+        self.current = self.current[inds]
+        self.version += 1
+        for lay in self.layers.itervalues():
+            for i,arr in enumerate(lay):
+                if arr is not None:
+                    lay[i] = arr[inds]
+
+    def getCurrent(self,errors=False):
+        """
+        Returns an array of the current value for each row and a boolean array
+        that is False for rows without a value.  Rows without a value are None
+        (so the value array is then an object array).  If `errors` is True,
+        (uppererror,lowererror) arrays are also returned as a third value.
+        """
+        cur = self.current
+        present = cur >= 0
+        vals = np.empty(cur.size,dtype=self.dtype if present.all() else object)
+        if errors:
+            uerr = np.zeros(cur.size,dtype=self.errdtype)
+            lerr = np.zeros(cur.size,dtype=self.errdtype)
+        for si,lay in self.layers.iteritems():
+            sel = cur == si
+            vals[sel] = lay[0][sel]
+            if errors and lay[1] is not None:
+                uerr[sel] = lay[1][sel]
+                lerr[sel] = lay[2][sel]
+
+        if errors:
+            return vals,present,(uerr,lerr)
+        else:
+            return vals,present
+
+    def getErrors(self,row,srcind):
+        lay = self.layers[srcind]
+        if lay[1] is None:
+            return 0,0
+        return lay[1].item(row),lay[2].item(row)
+
+class ColumnarFieldView(MutableSequence):
+    """
+    A :class:`Field`-like view of a field for one row of a
+    :class:`ColumnarCatalog`, as returned by attribute access on a
+    :class:`ColumnarNode` (e.g. ``node.fieldname``).
+
+    :class:`FieldValue` objects are generated from (and stored into) the
+    catalog's arrays as needed, so altering a :class:`FieldValue` taken from
+    this view does not change the catalog.
+    """
+    __slots__=('_node','_col')
+
+    def __init__(self,node,col):
+        self._node = node
+        self._col = col
+
+    def __call__(self):
+        row = self._node._row
+        si = self._col.current[row]
+        if si < 0:
+            raise IndexError('Field %s empty'%self._col.name)
+        return self._col.layers[si][0].item(row)
+
+    def __str__(self):
+        return 'Field %s:[%s]'%(self._col.name,', '.join([str(v) for v in self]))
+
+    def strCurr(self):
+        """
+        returns a string with the current value instead of the list of
+        values (the behavior of str(Field_obj)
+        """
+        try:
+            return 'Field %s: %s'%(self.name,self())
+        except IndexError:
+            return 'Field %s empty'%self.name
+
+    def _sourceInds(self):
+        #indecies of the sources with values in this row, current first
+        row = self._node._row
+        col = self._col
+        cur = col.current[row]
+        inds = [si for si in sorted(col.layers) if si != cur and col.layers[si][3][row]]
+        if cur >= 0:
+            inds.insert(0,cur)
+        return inds
+
+    def _index(self,key):
+        #the source index of `key` if it has a value in this row
+        if type(key) is int:
+            return self._sourceInds()[key]
+
+        if key is None:
+            key = Source(None)
+        elif isinstance(key,basestring):
+            if 'derived' in key:
+                raise IndexError('field has only 0 DerivedValues')
+            key = Source(key)
+        elif not isinstance(key,Source):
+            raise TypeError('key not a Source key or index')
+
+        si = self._node._parent._srcinds.get(key)
+        if si is None or si not in self._col.layers or not self._col.layers[si][3][self._node._row]:
+            raise KeyError('Field does not have %s'%key)
+        return si
+
+    def _valueObject(self,si):
+        row = self._node._row
+        lay = self._col.layers[si]
+        src = self._node._parent._sources[si]
+        val = lay[0].item(row)
+        if lay[1] is not None:
+            uerr,lerr = lay[1].item(row),lay[2].item(row)
+            if not (uerr == 0 and lerr == 0):
+                return ObservedErroredValue(src,val,uerr,None if lerr == uerr else lerr)
+        return ObservedValue(src,val)
+
+    def _convertValue(self,val):
+        """
+        Converts a :class:`FieldValue` or (source,value) tuple to a (source
+        index,value,uppererror,lowererror) tuple, checking the type.
+        """
+        from operator import isSequenceType
+        from .utils import check_type
+
+        col = self._col
+        if isinstance(val,(DerivedValue,LinkValue)):
+            raise TypeError('ColumnarCatalogs can only store observed values')
+        elif isinstance(val,FieldValue) or (hasattr(val,'source') and hasattr(val,'value')):
+            src,v = val.source,val.value
+            uerr,lerr = val.errors if hasattr(val,'errors') else (None,None)
+        elif isSequenceType(val) and len(val)==2:
+            src,v = val
+            uerr = lerr = None
+            if isinstance(v,tuple) and col.type is not tuple:
+                v,uerr,lerr = (v+(None,None))[:3]
+        else:
+            raise TypeError('Input %s not FieldValue-compatible'%str(val))
+
+        try:
+            for x in (v,uerr,lerr):
+                check_type(col.type,x)
+        except TypeError,e:
+            if col.type==float:
+                try:
+                    v = float(v)
+                except (ValueError,TypeError):
+                    raise e
+            else:
+                raise
+        if v is None and col.dtype != object:
+            raise TypeError('None cannot be stored in the %s column for field %s'%(col.dtype,col.name))
+
+        return self._node._parent._sourceIndex(src),v,uerr,lerr
+
+    def __len__(self):
+        return len(self._sourceInds())
+
+    def __contains__(self,val):
+        try:
+            self._index(val)
+            return True
+        except (KeyError,IndexError):
+            return False
+
+    def __getitem__(self,key):
+        return self._valueObject(self._index(key))
+
+    def __setitem__(self,key,val):
+        row = self._node._row
+        if type(key) is int:
+            key = self._node._parent._sources[self._index(key)]
+        if not isinstance(val,FieldValue):
+            val = (key,val)
+        si,v,uerr,lerr = self._convertValue(val)
+        self._col.set(row,si,v,uerr,lerr,setcurr=False)
+
+    def __delitem__(self,key):
+        self._col.remove(self._node._row,self._index(key))
+
+    def insert(self,key,val):
+        """
+        Insert a value into this field.  Only the current value is ordered in
+        columnar storage, so this sets `val` as the current value if `key` is
+        0, and otherwise simply adds it.
+        """
+        si,v,uerr,lerr = self._convertValue(val)
+        self._col.set(self._node._row,si,v,uerr,lerr,setcurr=(key==0))
+
+    def _getCurr(self):
+        si = self._col.current[self._node._row]
+        if si < 0:
+            raise IndexError('Field %s empty'%self._col.name)
+        return self._valueObject(si)
+    def _setCurr(self,val):
+        row = self._node._row
+        try:
+            self._col.current[row] = self._index(val)
+            self._col.version += 1
+        except (KeyError,IndexError,TypeError):
+            si,v,uerr,lerr = self._convertValue(val)
+            self._col.set(row,si,v,uerr,lerr,setcurr=True)
+    currentobj = property(_getCurr,_setCurr)
+
+    @property
+    def currentsource(self):
+        return self.currentobj.source
+
+    @property
+    def currenterror(self):
+        si = self._col.current[self._node._row]
+        if si < 0:
+            raise IndexError('Field %s empty'%self._col.name)
+        return self._col.getErrors(self._node._row,si)
+
+    @property
+    def name(self):
+        return self._col.name
+
+    @property
+    def units(self):
+        return self._col.units
+
+    @property
+    def description(self):
+        return self._col.descr
+
+    @property
+    def type(self):
+        return self._col.type
+
+    @property
+    def node(self):
+        return self._node
+
+    def _getDefault(self):
+        return self[None].value
+    def _setDefault(self,val):
+        self[None] = val
+    def _delDefault(self):
+        del self[None]
+    default = property(_getDefault,_setDefault,_delDefault)
+
+    @property
+    def values(self):
+        return [v() for v in self]
+
+    @property
+    def sources(self):
+        return [v.source for v in self]
+
+    @property
+    def sourcenames(self):
+        return [str(v.source) for v in self]
+
+    @property
+    def observed(self):
+        return [o for o in self if o.source._str != 'None']
+
+    @property
+    def derived(self):
+        return []
+
+    @property
+    def errors(self):
+        return [self._col.getErrors(self._node._row,si) for si in self._sourceInds()]
+
+class ColumnarNode(FieldNode):
+    """
+    A :class:`FieldNode` that is a lightweight view of one row of a
+    :class:`ColumnarCatalog` - its values are stored in the catalog's arrays
+    rather than in :class:`Field` objects of its own.
+
+    Value access and assignment (``node['fieldname']``, ``node['fieldname'] =
+    (source,value)``, etc.) behave as for any :class:`FieldNode`, while
+    attribute access (``node.fieldname``) gives a :class:`ColumnarFieldView`.
+    All nodes in the catalog share the same fields, so they cannot be added or
+    removed from a single node - use :meth:`ColumnarCatalog.addField` and
+    :meth:`ColumnarCatalog.delField` instead.
+
+    Creating a ColumnarNode adds a row to its parent catalog (use
+    :meth:`ColumnarCatalog.addRows` to add many at once), and setting its
+    parent to None removes the row.  It cannot be moved to another parent - use
+    :meth:`toFieldNode` to copy it to a regular :class:`FieldNode`.
+    """
+    __slots__=('_row',)
+
+    def __init__(self,parent,**kwargs):
+        if not isinstance(parent,ColumnarCatalog):
+            raise TypeError('the parent of a ColumnarNode must be a ColumnarCatalog')
+        self._children = ()
+        self._parent = None
+        self._row = None
+        parent._addRowNodes([self])
+
+        for k,v in kwargs.iteritems():
+            self[k] = v
+
+    def __getstate__(self):
+        return {'_parent':self._parent,'_row':self._row}
+    def __setstate__(self,d):
+        self._parent = d['_parent']
+        self._row = d['_row']
+        self._children = ()
+
+    def __str__(self):
+        return 'ColumnarNode (row %s) with fields %s'%(self._row,self._fieldnames)
+
+    def __getattr__(self,name):
+        if not name.startswith('_'):
+            cat = self._parent
+            if cat is not None and name in cat._columns:
+                return ColumnarFieldView(self,cat._columns[name])
+        raise AttributeError("'%s' object has no attribute '%s'"%(self.__class__.__name__,name))
+
+    @property
+    def _fieldnames(self):
+        cat = self._parent
+        return [] if cat is None else cat._fieldnames
+
+    @property
+    def row(self):
+        """
+        The index of the row of the parent :class:`ColumnarCatalog` this node
+        is a view of (or None if it has been removed from the catalog).
+        """
+        return self._row
+
+    def _setParent(self,val):
+        if val is self._parent:
+            return
+        elif val is None:
+            self._parent.deleteRows(self)
+        else:
+            raise TypeError('ColumnarNodes cannot be moved to another parent - use toFieldNode to copy the row instead')
+    parent = property(CatalogNode._getParent,_setParent)
+
+    def addField(self,field):
+        raise TypeError('fields are shared by all nodes of a ColumnarCatalog - use ColumnarCatalog.addField')
+
+    def delField(self,fieldname):
+        raise TypeError('fields are shared by all nodes of a ColumnarCatalog - use ColumnarCatalog.delField')
+
+    def __getitem__(self,key):
+        cat = self._parent
+        cols = {} if cat is None else cat._columns
+        iserr = issrc = False
+        try:
+            col = cols[key]
+        except (KeyError,TypeError):
+            try:
+                if isinstance(key,basestring):
+                    if key.endswith('_src'):
+                        key = key[:-4]
+                        issrc = True
+                    elif key.endswith('_err'):
+                        key = key[:-4]
+                        iserr = True
+                    else:
+                        raise IndexError
+                else:
+                    key = cat._fieldnames[key]
+                col = cols[key]
+            except (IndexError,TypeError,KeyError,AttributeError):
+                raise IndexError('Field "%s" not found'%key)
+
+        si = col.current[self._row]
+        if si < 0: #field empty
+            return None
+        elif issrc:
+            return cat._sources[si]
+        elif iserr:
+            return col.getErrors(self._row,si)
+        else:
+            return col.layers[si][0].item(self._row)
+
+    def toFieldNode(self,parent=None):
+        """
+        Copies the values of this row into a new regular :class:`FieldNode` .
+
+        :param parent: The parent of the new node.
+        :type parent: :class:`CatalogNode` or None
+
+        :returns: The new :class:`FieldNode`
+        """
+        node = FieldNode(parent)
+        for fn in self._fieldnames:
+            col = self._parent._columns[fn]
+            fi = Field(fn,col.type,units=col.units,descr=col.descr)
+            node.addField(fi)
+            for v in getattr(self,fn):
+                fi._nocheckinsert(len(fi),v)
+        return node
+
+class ColumnarCatalog(Catalog):
+    """
+    A :class:`Catalog` that stores the field values of its children in columns
+    of NumPy arrays rather than in :class:`Field` objects attached to each node.
+
+    Each field has an array of values (and optionally upper and lower errors)
+    for each :class:`Source` that has values in the field, and an array with
+    the index of the current source in each row. The children are
+    :class:`ColumnarNode` objects that act as views into a single row, so the
+    catalog needs only a few arrays per field and one small object per row.
+    All rows share the fields added with :meth:`addField` .
+
+    Rows can be added with :meth:`addRows` (or by creating a
+    :class:`ColumnarNode` with this catalog as the parent), and values can be
+    set through the nodes as for any :class:`FieldNode`, or in bulk with
+    :meth:`setFieldValues` or :func:`arrayToNodes` . :meth:`extractField`,
+    :meth:`setToSource`, :meth:`getFieldValueNodes`, and :meth:`locateName`
+    operate directly on the arrays, and rows can be selected with boolean
+    arrays (e.g. from array comparisons on the output of :meth:`extractField`).
+
+    Other nodes (e.g. :class:`ActionNode` objects) can also be children of a
+    ColumnarCatalog, although the methods above then fall back on visiting
+    each node as for a regular :class:`Catalog` .
+
+    .. note::
+        Only observed values (with or without errors) can be stored - columnar
+        fields do not support :class:`DerivedValue` or :class:`LinkValue`
+        objects.
+    """
+    def __init__(self,name='default Catalog',parent=None,fields=None,nrows=0):
+        """
+        :param name: The name of the catalog.
+        :param parent: The parent of this catalog or None for a root catalog.
+        :param fields:
+            A sequence of field names or :class:`Field` objects to add as
+            columns (see :meth:`addField` ).
+        :param nrows: The number of (empty) rows to create.
+        :type nrows: int
+        """
+        #storage must exist before the parent is set for any FieldIndex above
+        self._fieldnames = []
+        self._columns = {}
+        self._sources = []
+        self._srcinds = {}
+        self._nrows = 0
+        super(ColumnarCatalog,self).__init__(name,parent)
+
+        if fields is not None:
+            for fi in fields:
+                self.addField(fi)
+        if nrows:
+            self.addRows(nrows)
+
+    def __str__(self):
+        return 'ColumnarCatalog %s'%self.name
+
+    def __getstate__(self):
+        d = super(ColumnarCatalog,self).__getstate__()
+        #rows are stored as the number of consecutive rows, not as nodes
+        children = []
+        for c in self._children:
+            if isinstance(c,ColumnarNode):
+                if children and type(children[-1]) is int:
+                    children[-1] += 1
+                else:
+                    children.append(1)
+            else:
+                children.append(c)
+        d['_children'] = children
+        d['name'] = self.name
+        d['_fieldnames'] = self._fieldnames
+        d['_columns'] = self._columns
+        d['_sources'] = self._sources
+        d['_nrows'] = self._nrows
+        return d
+    def __setstate__(self,d):
+        super(ColumnarCatalog,self).__setstate__(d)
+        children = []
+        row = 0
+        for c in self._children:
+            if type(c) is int:
+                for i in range(row,row+c):
+                    node = ColumnarNode.__new__(ColumnarNode)
+                    node._children = ()
+                    node._parent = self
+                    node._row = i
+                    children.append(node)
+                row += c
+            else:
+                children.append(c)
+        self._children = children
+        self.name = d['name']
+        self._fieldnames = d['_fieldnames']
+        self._columns = d['_columns']
+        self._sources = d['_sources']
+        self._srcinds = dict([(s,i) for i,s in enumerate(self._sources)])
+        self._nrows = d['_nrows']
+
+    @property
+    def nrows(self):
+        """
+        The number of rows (i.e. :class:`ColumnarNode` children) in this
+        catalog.
+        """
+        return self._nrows
+
+    @property
+    def fieldnames(self):
+        return tuple(self._fieldnames)
+
+    @property
+    def sources(self):
+        """
+        A tuple of the :class:`Source` objects with values in this catalog.
+        """
+        return tuple(self._sources)
+
+    def _sourceIndex(self,src):
+        #index of a source in _sources, adding it if necessary
+        if not isinstance(src,Source):
+            src = Source(src)
+        i = self._srcinds.get(src)
+        if i is None:
+            i = self._srcinds[src] = len(self._sources)
+            self._sources.append(src)
+        return i
+
+    def _rowNodes(self):
+        #the ColumnarNode children in row order
+        if len(self._children) == self._nrows:
+            return self._children
+        else:
+            return [c for c in self._children if isinstance(c,ColumnarNode)]
+
+    def _rowIndex(self,rows):
+        """
+        Converts `rows` to a slice, integer array, or boolean array to select
+        rows of the columns.
+        """
+        if rows is None:
+            return slice(None)
+        elif isinstance(rows,slice):
+            return rows
+        elif isinstance(rows,ColumnarNode):
+            rows = [rows]
+
+        if not isinstance(rows,np.ndarray):
+            rows = list(rows) if np.iterable(rows) else [rows]
+            if len(rows)>0 and isinstance(rows[0],ColumnarNode):
+                for n in rows:
+                    if n._parent is not self:
+                        raise ValueError('node %s is not a row of %s'%(n,self))
+                rows = [n._row for n in rows]
+        rows = np.asarray(rows)
+
+        if rows.dtype == bool:
+            if rows.shape != (self._nrows,):
+                raise ValueError('boolean row selection does not match the number of rows')
+            return rows
+        else:
+            return rows.astype(int)
+
+    def _addRowNodes(self,nodes):
+        #adds new rows for the given (unattached) ColumnarNodes
+        start = self._nrows
+        for col in self._columns.itervalues():
+            col.grow(len(nodes))
+        for i,n in enumerate(nodes):
+            n._parent = self
+            n._row = start+i
+        self._nrows += len(nodes)
+        self._children.extend(nodes)
+
+    def addRows(self,n=1):
+        """
+        Adds rows to this catalog.  Any fields with a default value are set to
+        that value, and all others are empty.
+
+        :param n: The number of rows to add.
+        :type n: int
+
+        :returns: A list of the new :class:`ColumnarNode` objects.
+        """
+        nodes = []
+        for i in range(n):
+            node = ColumnarNode.__new__(ColumnarNode)
+            node._children = ()
+            nodes.append(node)
+        self._addRowNodes(nodes)
+        return nodes
+
+    def deleteRows(self,rows):
+        """
+        Removes rows from this catalog.  The :class:`ColumnarNode` objects for
+        the removed rows are left without a parent (and without values).
+
+        :param rows:
+            The rows to remove as a :class:`ColumnarNode`, a sequence of them, an
+            index or sequence of indecies, or a boolean array.
+        """
+        keep = np.ones(self._nrows,dtype=bool)
+        keep[self._rowIndex(rows)] = False
+        for col in self._columns.itervalues():
+            col.take(keep)
+        newinds = np.cumsum(keep)-1
+
+        children = []
+        for c in self._children:
+            if isinstance(c,ColumnarNode):
+                if keep[c._row]:
+                    c._row = int(newinds[c._row])
+                else:
+                    c._parent = c._row = None
+                    continue
+            children.append(c)
+        self._children = children
+        self._nrows = int(keep.sum())
+
+    def removeChild(self,node):
+        if isinstance(node,ColumnarNode) and node._parent is self:
+            self.deleteRows(node)
+        else:
+            super(ColumnarCatalog,self).removeChild(node)
+    removeChild.__doc__ = Catalog.removeChild.__doc__
+
+    def reorderChildren(self,neworder,inverseinds=False):
+        super(ColumnarCatalog,self).reorderChildren(neworder,inverseinds)
+        #reorder the columns to match the new order of the rows
+        nodes = self._rowNodes()
+        inds = np.array([n._row for n in nodes],dtype=int)
+        for col in self._columns.itervalues():
+            col.take(inds)
+        for i,n in enumerate(nodes):
+            n._row = i
+    reorderChildren.__doc__ = Catalog.reorderChildren.__doc__
+
+    def getNodes(self,rows=None):
+        """
+        Selects rows of this catalog.
+
+        :param rows:
+            An index or sequence of indecies, a boolean array with an entry for
+            each row (e.g. ``cat.getNodes(cat.extractField('mag')<20)`` ), or
+            None for all rows.
+
+        :returns: A list of the selected :class:`ColumnarNode` objects.
+        """
+        nodes = self._rowNodes()
+        rows = self._rowIndex(rows)
+        if isinstance(rows,slice):
+            return list(nodes[rows])
+        elif rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return [nodes[i] for i in rows]
+
+    def addField(self,field,dtype=None):
+        """
+        Adds a field to all of the rows of this catalog.
+
+        :param field:
+            The name of the field, or a :class:`Field` object giving the name,
+            type, units, description, and default value (any other values in
+            the :class:`Field` are ignored).
+        :type field: string or :class:`Field`
+        :param dtype:
+            The numpy data type used to store the values of the field. If None,
+            it is inferred from the type of the field: numeric types are stored
+            in numeric arrays and everything else in object arrays.
+
+        :except ValueError: If the field is already present.
+        """
+        if isinstance(field,basestring):
+            field = Field(field)
+        elif not isinstance(field,Field):
+            raise ValueError('input value is not a Field')
+
+        name = field.name
+        if name in self._columns:
+            raise ValueError('Field name "%s" already present'%name)
+        if hasattr(ColumnarNode,name):
+            raise ValueError('Field name "%s" conflicts with a ColumnarNode attribute'%name)
+
+        if dtype is None:
+            dtype = _column_dtype(field.type)
+        col = _FieldColumn(name,field.type,field.units,field.description,
+                           np.dtype(dtype),self._nrows)
+        if None in field:
+            si = self._sourceIndex(None)
+            col.default = (si,field.default)
+            lay = col.layer(si)
+            lay[0].fill(field.default)
+            lay[3].fill(True)
+            col.current.fill(si)
+
+        self._columns[name] = col
+        self._fieldnames.append(name)
+
+    def delField(self,fieldname):
+        """
+        Removes a field from all rows of this catalog.
+
+        :except KeyError: If the field is not present.
+        """
+        try:
+            del self._columns[fieldname]
+        except KeyError:
+            raise KeyError('Field "%s" not found'%fieldname)
+        self._fieldnames.remove(fieldname)
+
+    def setFieldValues(self,fieldname,source,values,errors=None,rows=None,
+                       setcurr=True):
+        """
+        Sets the values of a field for many rows at once.
+
+        :param fieldname: The name of the field (added if not already present).
+        :type fieldname: string
+        :param source: The source of the values.
+        :type source: :class:`Source` or string
+        :param values:
+            An array of values for the selected rows, or a single value to
+            apply to all of them.
+        :param errors:
+            None for no errors, an array of symmetric errors, or a
+            (uppererrors,lowererrors) tuple of arrays.
+        :param rows: The rows to set (see :meth:`getNodes` ), or None for all.
+        :param setcurr:
+            If True, `source` becomes the current source for these rows.
+            Otherwise, it is only made current for rows that had no value.
+        :type setcurr: bool
+        """
+        if fieldname not in self._columns:
+            self.addField(fieldname)
+        col = self._columns[fieldname]
+
+        if errors is None:
+            uerr = lerr = None
+        elif isinstance(errors,tuple):
+            uerr,lerr = errors
+        else:
+            uerr,lerr = errors,None
+
+        if col.dtype == object:
+            values = _as_object_array(values)
+            if uerr is not None:
+                uerr = _as_object_array(uerr)
+            if lerr is not None:
+                lerr = _as_object_array(lerr)
+
+        col.set(self._rowIndex(rows),self._sourceIndex(source),values,uerr,lerr,setcurr)
+
+    def setToSource(self,src,missing='skip',fieldnames=None,rows=None):
+        """
+        Sets `src` as the current source of the fields of rows in this catalog
+        that have a value from that source.
+
+        :param src: The source to make current.
+        :type src: :class:`Source` or string
+        :param missing:
+            The action to take for rows without a value from `src` : 'skip' to
+            do nothing, 'raise'/'exception' to raise a ValueError, 'warn' to
+            issue a warning for each field with missing rows, or a callable
+            that will be called as missing(src,field,node) for each such row.
+        :param fieldnames:
+            A sequence of the names of the fields to set, or None for all.
+        :param rows: The rows to set (see :meth:`getNodes` ), or None for all.
+        """
+        if not isinstance(src,Source):
+            src = Source(src)
+        if fieldnames is None:
+            fieldnames = self._fieldnames
+        rowinds = self._rowIndex(rows)
+        si = self._srcinds.get(src)
+
+        for fn in fieldnames:
+            col = self._columns[fn]
+            cur = col.current[rowinds]
+            if si in col.layers:
+                present = col.layers[si][3][rowinds]
+                cur[present] = si
+                col.current[rowinds] = cur
+                col.version += 1
+            else:
+                present = np.zeros(cur.shape,dtype=bool)
+
+            if not present.all():
+                if callable(missing):
+                    nodes = self._rowNodes()
+                    for i in np.arange(self._nrows)[rowinds][~present]:
+                        missing(src,getattr(nodes[i],fn),nodes[i])
+                elif missing == 'raise' or missing == 'exception':
+                    raise ValueError('could not find src %s in field %s for %i rows'%(src,fn,(~present).sum()))
+                elif missing == 'warn':
+                    from warnings import warn
+                    warn('could not find src %s in field %s for %i rows'%(src,fn,(~present).sum()))
+                elif missing != 'skip':
+                    raise ValueError('invalid missing action')
+
+    @_add_docs_and_sig(FieldNode.extractFieldAtNode)
+    def extractField(self,*args,**kwargs):
+        """
+        Generate an array of the values for the requested fieldnames in the rows
+        of this :class:`ColumnarCatalog`.
+
+        This is taken directly from the column arrays if all of the children
+        are :class:`ColumnarNode` objects, `converter` is None, and `filter`
+        is False or a boolean array with an entry for each row.  Otherwise, it
+        falls back on visiting the children as for :meth:`Catalog.extractField`.
+
+        The other arguments are for :meth:`FieldNode.extractFieldAtNode` :
+        {docstr:extractFieldAtNode}
+        """
+        from inspect import getcallargs
+
+        kwargs['includeself'] = False
+        cargs = getcallargs(FieldNode.extractFieldAtNode,self,*args,**kwargs)
+        del cargs['node']
+
+        filter = cargs['filter']
+        if isinstance(filter,np.ndarray):
+            rowmask = self._rowIndex(filter)
+            if rowmask.dtype != bool:
+                raise ValueError('array filters must be boolean arrays')
+            cargs['filter'] = lambda n:isinstance(n,ColumnarNode) and rowmask[n._row]
+        elif filter is False:
+            rowmask = slice(None)
+        else:
+            rowmask = None
+
+        if (rowmask is None or cargs['converter'] is not None or
+            cargs['traversal'] is None or len(self._children) != self._nrows):
+            return FieldNode.extractFieldAtNode(self,**cargs)
+
+        fieldnames = cargs['fieldnames']
+        missing = cargs['missing']
+        sources = cargs['sources']
+        errors = cargs['errors']
+
+        if isinstance(fieldnames,basestring):
+            if ',' in fieldnames:
+                fieldnames = fieldnames.split(',')
+            else:
+                fieldnames = [fieldnames]
+        if missing in ('exception','raise','skip','mask','masked'):
+            missingval = 0
+        else:
+            missingval = missing
+
+        if sources == 'object':
+            srcarr = np.array(self._sources+[None],dtype=object)
+        else:
+            srcarr = np.array([str(s) for s in self._sources]+['None'],dtype=object)
+
+        n = np.arange(self._nrows)[rowmask].size
+        lsts,masks,srcs,errs = [],[],[],[]
+        for fn in fieldnames:
+            col = self._columns.get(fn)
+            if col is None:
+                if missing == 'exception' or missing == 'raise':
+                    raise IndexError('Field "%s" not found'%fn)
+                lsts.append([missingval]*n)
+                masks.append(np.zeros(n,dtype=bool))
+                srcs.append([srcarr[-1]]*n)
+                errs.append([(0,0)]*n)
+            else:
+                vals,present,(uerr,lerr) = col.getCurrent(errors=True)
+                vals = vals[rowmask]
+                lsts.append(vals.tolist() if vals.dtype == object else vals)
+                masks.append(np.ones(n,dtype=bool))
+                srcs.append(srcarr[col.current[rowmask]].tolist())
+                errs.append(zip(uerr[rowmask].tolist(),lerr[rowmask].tolist()))
+
+        return FieldNode._extractedToArrays(fieldnames,lsts,masks,
+                                            srcs if sources else None,
+                                            errs if errors else None,
+                                            missing,sources,errors,
+                                            cargs['asrec'])
+
+    def getFieldNames(self):
+        """
+        Searches the Catalog and finds all field names present in the children
+        """
+        if len(self._children) == self._nrows:
+            return set(self._fieldnames)
+        else:
+            return super(ColumnarCatalog,self).getFieldNames()
+
+    def getFieldValueNodes(self,fieldname,value):
+        """
+        Finds all rows for which the current value of the field `fieldname` is
+        equal to `value` .  If the field has an index (see :meth:`addIndex`),
+        the index is used and the nodes are in no particular order.
+        """
+        idxs = getattr(self,'_indexes',None)
+        if len(self._children) != self._nrows or (idxs and fieldname in idxs):
+            return super(ColumnarCatalog,self).getFieldValueNodes(fieldname,value)
+
+        col = self._columns.get(fieldname)
+        if col is None:
+            return []
+        vals,present = col.getCurrent()
+        match = np.asarray(vals == value)
+        if match.shape != vals.shape: #value was not compared elementwise
+            match = np.array([v == value for v in vals],dtype=bool)
+        return self.getNodes(match & present)
+
+    def getFieldRangeNodes(self,fieldname,lower=None,upper=None):
+        """
+        Finds all rows for which the current value of the field `fieldname` is
+        between `lower` and `upper` (inclusive), where None means no bound.
+        """
+        idxs = getattr(self,'_indexes',None)
+        if len(self._children) != self._nrows or (idxs and fieldname in idxs):
+            return super(ColumnarCatalog,self).getFieldRangeNodes(fieldname,lower,upper)
+
+        col = self._columns.get(fieldname)
+        if col is None:
+            return []
+        vals,present = col.getCurrent()
+        match = present.copy()
+        if lower is not None:
+            match[present] &= vals[present] >= lower
+        if upper is not None:
+            match[present] &= vals[present] <= upper
+        return self.getNodes(match)
+
+    def locateName(self,name):
+        """
+        Searches the Catalog and finds all objects with the requested name
+        """
+        return self.getFieldValueNodes('name',name)
+
 def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
-                 converters=None,namefield=None,setcurr=True):
+                 converters=None,namefield=None,setcurr=True,key=None,
+                 colconverters=None):
     """
     Applies values from an array to CatalogNodes.
 
@@ -2939,7 +4916,18 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
 
     matcher is a callable called as matcher(arrayrow,node) - if it returns
     False, the array will be matched to the next node - if True, the array
-    values will be applied to the node
+    values will be applied to the node.  Array rows that match no node are
+    skipped.
+
+    key matches array rows to nodes by value, which is much faster than a
+    matcher for large arrays.  It is either a 2-tuple (column,fieldname), where
+    column is the name of a structured array field or the index of the column
+    in the array (as for `fields`) and fieldname is the name of the field of the
+    nodes that is compared to it, or a single string to use as both.  Each row
+    is applied to the node with the same current value in the field (or the
+    first one found if there are several), and rows that match no node are
+    skipped.  The key column is only applied to the nodes if it is also in
+    `fields`.
 
     converters  are either a sequence of callables or a mapping from indecies
     to callables or structured array field names to callables that will be
@@ -2948,12 +4936,24 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
     as converter((value,uerr,lerr)). If converters is None, no converting
     is performed.
 
+    colconverters are the same as converters, but are called once for each
+    column with an array of all of the values as converter(values) (or
+    converter((values,uerrs,lerrs)) with errors) and should return an array of
+    converted values or a (values,uerrs,lerrs) tuple of arrays.  These are much
+    faster than converters if they use array operations.
+
 
     namefield is a field name that will be set to a unique code of the form
     'src-i' where i is element index of the array row (or None to apply
     no name).  It can also be a 2-tuple (name,converter) where converter is
     a callable of the form converter(i) that should return the value to
     apply to the field.
+
+    If nodes is a ColumnarCatalog (with only ColumnarNode children) or a
+    sequence of rows of the same ColumnarCatalog, and no matcher is given, the
+    values are set directly on the catalog's columns, with the converters
+    applied to each column in turn.  New fields are then stored in arrays of
+    the same type as the values, if they are numeric.
     """
     from operator import isSequenceType,isMappingType
     from inspect import getargspec
@@ -2961,15 +4961,25 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
     if not isinstance(source,Source):
         source = Source(source)
 
+    colcat = targetrows = None
     if isinstance(nodes,CatalogNode):
         if isinstance(matcher,basestring):
             traversal = matcher
             matcher = None
         else:
             traversal = 'preorder'
-        nodes = nodes.visit(lambda n:n,traversal,lambda n:isinstance(n,FieldNode))
+        if isinstance(nodes,ColumnarCatalog) and matcher is None and \
+           len(nodes.children) == nodes.nrows:
+            colcat = nodes
+        else:
+            nodes = [n for n in nodes.iterNodes(traversal) if isinstance(n,FieldNode)]
     else:
         nodes = list(nodes)
+        if matcher is None and len(nodes)>0 and isinstance(nodes[0],ColumnarNode):
+            parent = nodes[0]._parent
+            if parent is not None and all([isinstance(n,ColumnarNode) and n._parent is parent for n in nodes]):
+                colcat = parent
+                targetrows = np.array([n._row for n in nodes],dtype=int)
 
     if isinstance(fields,basestring):
             fields={0:fields}
@@ -2985,6 +4995,13 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
     else:
         converters = dict(converters) #copy
 
+    if colconverters is None:
+        colconverters = {}
+    elif not isMappingType(colconverters):
+        colconverters = dict([t for t in enumerate(colconverters)])
+    else:
+        colconverters = dict(colconverters) #copy
+
     array = np.array(values,copy=False).T #now first dimension is along nodes and second is fields
     if errors is None:
         lerrors = uerrors = None
@@ -3010,6 +5027,9 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
         for k in converters.keys():
             if k in nms:
                 converters[nms.index(k)] = converters[k]
+        for k in colconverters.keys():
+            if k in nms:
+                colconverters[nms.index(k)] = colconverters[k]
     elif len(array.shape)==1:
         #1d array
         if len(fields)!=1:
@@ -3046,6 +5066,8 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
         if i not in converters:
             convseq.append(lambda val:val)
         else:
+            if i in colconverters:
+                raise ValueError('field %s has both a converter and a column converter'%fieldseq[i])
             convseq.append(converters[i])
 
     convseq = tuple(convseq)
@@ -3067,34 +5089,145 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
                     else:
                         raise ValueError('converter for field %s has wrong number of arguments'%fieldseq[i])
 
-    if matcher is None and len(array) != len(nodes):
-        raise ValueError('with no matcher, the number of nodes must match the size of the array')
-
+    def column(fiind,sel=None):
+        #the values and errors for a field, after any column converter
+        if array.dtype.names is None:
+            vals = array[:,fiind]
+        else:
+            vals = array[array.dtype.names[fiind]]
+        if uerrors is not None and uerrors[fiind] is not None:
+            ue = np.asarray(uerrors[fiind])
+            le = ue if lerrors is None else np.asarray(lerrors[fiind])
+        else:
+            ue = le = None
+        if sel is not None:
+            vals = vals[sel]
+            if ue is not None:
+                ue,le = ue[sel],le[sel]
+
+        if fiind in colconverters:
+            res = colconverters[fiind](vals if ue is None else (vals,ue,le))
+            if isinstance(res,tuple):
+                vals,ue,le = res
+                if le is None:
+                    le = ue
+            else:
+                vals = res
+                ue = le = None
+        return vals,ue,le
 
-    for i,a in enumerate(array):
-        if matcher is None:
-            n = nodes[0]
-            del nodes[0]
+    if key is not None:
+        if isinstance(key,basestring):
+            keycol = keyfield = key
+        else:
+            keycol,keyfield = key
+        if isinstance(keycol,basestring):
+            if array.dtype.names is None or keycol not in array.dtype.names:
+                raise ValueError('key column "%s" not in the array'%keycol)
+            keyvals = array[keycol].tolist()
+        elif array.dtype.names is None:
+            keyvals = array[:,keycol].tolist()
         else:
+            keyvals = array[array.dtype.names[keycol]].tolist()
+
+    if colcat is not None:
+        #set whole columns at once
+        if key is not None:
+            #map key values to rows, and find the row matching each array row
+            lookup = {}
+            col = colcat._columns.get(keyfield)
+            if col is not None:
+                kvals,present = col.getCurrent()
+                crows = np.arange(colcat.nrows) if targetrows is None else targetrows
+                for r,v,p in zip(crows.tolist(),kvals[crows].tolist(),present[crows].tolist()):
+                    if p and v not in lookup:
+                        lookup[v] = r
+            rowsel = np.array([lookup.get(k,-1) for k in keyvals],dtype=int)
+            sel = rowsel >= 0
+            rows = rowsel[sel]
+            if sel.all():
+                sel = None
+        else:
+            nrows = colcat.nrows if targetrows is None else len(targetrows)
+            if len(array) != nrows:
+                raise ValueError('with no matcher, the number of nodes must match the size of the array')
+            sel = None
+            rows = targetrows
+        arrrows = array if sel is None else array[sel]
+
+        for fiind,fi in enumerate(fieldseq):
+            if fi is None:
+                continue
+            vals,ue,le = column(fiind,sel)
+            errs = None if ue is None else (ue,le)
+
+            if fiind in converters:
+                conv = convseq[fiind]
+                ins = vals if errs is None else zip(vals,ue,le)
+                if twoargseq[fiind]:
+                    res = [conv(v,a) for v,a in zip(ins,arrrows)]
+                else:
+                    res = [conv(v) for v in ins]
+                #converted values may be (value,uerr,lerr) tuples, as for Fields
+                if any([isinstance(r,tuple) for r in res]):
+                    res = [r if isinstance(r,tuple) else (r,) for r in res]
+                    vals = [r[0] for r in res]
+                    ue = [r[1] if len(r)>1 and r[1] is not None else 0 for r in res]
+                    le = [r[2] if len(r)>2 and r[2] is not None else u for r,u in zip(res,ue)]
+                    errs = (ue,le)
+                else:
+                    vals = res
+                    errs = None
+
+            if fi not in colcat._columns:
+                dtype = np.asarray(vals).dtype
+                colcat.addField(fi,dtype if dtype.kind in 'biufc' else None)
+            colcat.setFieldValues(fi,source,vals,errs,rows=rows,setcurr=setcurr)
+        return
+
+    if key is not None:
+        keyed = {}
+        for n in nodes:
+            try:
+                keyed.setdefault(getattr(n,keyfield)(),n)
+            except (IndexError,ValueError,TypeError,AttributeError,CycleError):
+                pass #nodes without a (hashable) key value can't be matched
+        matched = [keyed.get(k) for k in keyvals]
+    elif matcher is None:
+        if len(array) != len(nodes):
+            raise ValueError('with no matcher, the number of nodes must match the size of the array')
+        matched = nodes
+    else:
+        matched = []
+        for a in array:
             #find the node that a matcher matches, and remove it if it is matched to get log(N) run time
             for j,n in enumerate(nodes):
                 if matcher(a,n):
+                    del nodes[j]
                     break
             else:
-                j = None
-            if j is not None:
-                del nodes[j]
+                n = None
+            matched.append(n)
+
+    #convert whole columns to lists first, rather than indexing each element
+    cols = [None if fi is None else column(fiind) for fiind,fi in enumerate(fieldseq)]
+    cols = [None if c is None else [None if x is None else np.asarray(x).tolist() for x in c] for c in cols]
+
+    for i,(a,n) in enumerate(zip(array,matched)):
+        if n is None:
+            continue
 
         for fi in fieldseq:
             if fi is not None and fi not in n.fieldnames:
                 n.addField(fi)
 
-        for fiind,v in enumerate(a):
-            if fieldseq[fiind] is not None:
+        for fiind,col in enumerate(cols):
+            if col is not None:
                 fi = getattr(n,fieldseq[fiind])
-                if uerrors is not None and uerrors[fiind] is not None:
-                    ue = uerrors[fiind][i]
-                    v = (v,ue,ue if lerrors is None else lerrors[fiind][i])
+                vals,ue,le = col
+                v = vals[i]
+                if ue is not None:
+                    v = (v,ue[i],le[i])
                 if twoargseq[fiind]:
                     fi[source] = convseq[fiind](v,a)
                 else:
@@ -3104,7 +5237,7 @@ def arrayToNodes(values,source,fields,nodes,errors=None,matcher=None,
 
 def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFieldNode,
                    converters=None,filter=None,namefield=None,nameconv=None,
-                   setcurr=True):
+                   setcurr=True,colconverters=None):
     """
     Generates a catalog of nodes from the array of data.
 
@@ -3117,6 +5250,11 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
     nodetype is the class to use to create the nodes (usually a subclass of
     ``StructuredFieldNode``)
 
+    If nodetype is ColumnarNode or parent is a ColumnarCatalog, the rows are
+    all added to the ColumnarCatalog at once (a new ColumnarCatalog is created
+    if parent is a string) and the values are set on whole columns, which is
+    much faster for large arrays.
+
     filter is a function that will be called on the array row and if it
     returns True, a node will be created, and if False, that row will be
     skipped
@@ -3131,8 +5269,11 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
     if namefiled is None, no name will be applied
 
     """
+    columnar = nodetype is ColumnarNode or isinstance(parent,ColumnarCatalog)
     if isinstance(parent,basestring):
-        parent = Catalog(parent)
+        parent = ColumnarCatalog(parent) if columnar else Catalog(parent)
+    if columnar and not isinstance(parent,ColumnarCatalog):
+        raise ValueError('ColumnarNode objects must have a ColumnarCatalog as the parent')
 
     source = Source(source)
     if namefield:
@@ -3145,6 +5286,33 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
             nameseq = nameconv
             nameconv = lambda i:nameseq[i]
 
+    array = np.array(values,copy=False)
+
+    if columnar:
+        if filter:
+            mask = np.array([bool(filter(a)) for a in array.T],dtype=bool)
+            inds = np.flatnonzero(mask)
+            if array.dtype.names is None and len(array.shape) == 1:
+                subset = lambda e:np.asarray(e)[mask]
+            else:
+                subset = lambda e:[None if x is None else np.asarray(x)[mask] for x in e]
+            array = array[...,mask]
+            if isinstance(errors,tuple):
+                errors = tuple([None if e is None else subset(e) for e in errors])
+            elif errors is not None:
+                errors = subset(errors)
+        else:
+            inds = np.arange(array.shape[-1])
+
+        start = parent.nrows
+        nodes = parent.addRows(len(inds))
+        if namefield:
+            parent.setFieldValues(namefield,source,[nameconv(i) for i in inds],
+                                  rows=slice(start,None),setcurr=setcurr)
+        arrayToNodes(array,source,fields,nodes,errors=errors,converters=converters,
+                     setcurr=setcurr,colconverters=colconverters)
+        return parent
+
     if filter:
         def matcher(arrayrow,node):
             return filter(arrayrow)
@@ -3152,8 +5320,6 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
         filter = lambda a:True
         matcher = None
 
-    array = np.array(values,copy=False)
-
     nodes = []
     for i,a in enumerate(array.T):
         if filter(a):
@@ -3168,7 +5334,7 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
                 nfi[source] = nameconv(i)
 
     arrayToNodes(array,source,fields,nodes,errors=errors,converters=converters,
-                 matcher=matcher,setcurr=setcurr)
+                 matcher=matcher,setcurr=setcurr,colconverters=colconverters)
 
     if parent is None:
         return nodes
@@ -3179,6 +5345,584 @@ def arrayToCatalog(values,source,fields,parent,errors=None,nodetype=StructuredFi
 
 
 
+#<------------------------------Binary catalog files--------------------------->
+_binaryversion = 1
+
+def _saveColumnChunk(col,dirname,chunk,rows=slice(None)):
+    """
+    Writes the given rows of a :class:`_FieldColumn` to files in `dirname`
+    for chunk number `chunk`, and returns the chunk information for the index.
+    Numeric arrays are written with :func:`numpy.save` so they can be
+    memory-mapped, while object arrays are pickled.
+    """
+    import os,cPickle
+
+    def write(arr,name):
+        fn = os.path.join(dirname,'%i.%s'%(chunk,name))
+        if arr.dtype == object:
+            with open(fn+'.pkl','wb') as f:
+                cPickle.dump(arr.tolist(),f,2)
+        else:
+            np.save(fn+'.npy',np.ascontiguousarray(arr))
+
+    current = col.current[rows]
+    write(current,'current')
+    layers = {}
+    for si,lay in col.layers.iteritems():
+        present = lay[3][rows]
+        if not present.any():
+            continue
+        write(lay[0][rows],'%i.values'%si)
+        write(present,'%i.present'%si)
+        if lay[1] is not None:
+            write(lay[1][rows],'%i.uerr'%si)
+            write(lay[2][rows],'%i.lerr'%si)
+        layers[si] = lay[1] is not None
+    return {'nrows':len(current),'layers':layers}
+
+def _columnLoader(dirname,meta,chunks,mmap):
+    """
+    Returns a function that reads the arrays of a column saved by
+    :func:`saveBinary` (and :func:`appendBinary`) and returns the
+    (current,layers) for a :class:`_FieldColumn` .
+    """
+    import os
+
+    def read(chunk,name,dtype):
+        fn = os.path.join(dirname,'%i.%s'%(chunk,name))
+        if dtype == object:
+            import cPickle
+
+            with open(fn+'.pkl','rb') as f:
+                return _as_object_array(cPickle.load(f))
+        else:
+            return np.load(fn+'.npy',mmap_mode='c' if mmap else None)
+
+    def loader():
+        dtype = meta['dtype']
+        errdtype = np.dtype(object) if dtype == object else np.dtype(float)
+        if len(chunks) == 1:
+            current = read(0,'current',int)
+            layers = {}
+            for si,haserr in chunks[0]['layers'].iteritems():
+                lay = [read(0,'%i.values'%si,dtype),None,None,
+                       read(0,'%i.present'%si,bool)]
+                if haserr:
+                    lay[1] = read(0,'%i.uerr'%si,errdtype)
+                    lay[2] = read(0,'%i.lerr'%si,errdtype)
+                layers[si] = lay
+            return current,layers
+
+        #several chunks must be joined, filling in sources that are missing
+        current = np.concatenate([read(i,'current',int) for i in range(len(chunks))])
+        sis = set()
+        for ch in chunks:
+            sis.update(ch['layers'])
+        layers = {}
+        for si in sis:
+            haserr = any([ch['layers'].get(si,False) for ch in chunks])
+            parts = [[],[],[],[]]
+            for i,ch in enumerate(chunks):
+                n = ch['nrows']
+                if si in ch['layers']:
+                    parts[0].append(read(i,'%i.values'%si,dtype))
+                    parts[3].append(read(i,'%i.present'%si,bool))
+                else:
+                    vals = np.empty(n,dtype=object) if dtype == object else np.zeros(n,dtype=dtype)
+                    parts[0].append(vals)
+                    parts[3].append(np.zeros(n,dtype=bool))
+                if haserr:
+                    if ch['layers'].get(si,False):
+                        parts[1].append(read(i,'%i.uerr'%si,errdtype))
+                        parts[2].append(read(i,'%i.lerr'%si,errdtype))
+                    else:
+                        parts[1].append(np.zeros(n,dtype=errdtype))
+                        parts[2].append(np.zeros(n,dtype=errdtype))
+            layers[si] = [None if len(p) == 0 else np.concatenate(p) for p in parts]
+        return current,layers
+
+    return loader
+
+def _columnarCatalogs(node):
+    """
+    Yields the :class:`ColumnarCatalog` objects in a tree in preorder, without
+    visiting their rows.
+    """
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n,ColumnarCatalog):
+            yield n
+            if len(n._children) == n._nrows:
+                continue
+            children = [c for c in n._children if not isinstance(c,ColumnarNode)]
+        else:
+            children = n._children
+        stack.extend(reversed(children))
+
+def _readBinaryIndex(dirname):
+    import os,cPickle
+
+    fn = os.path.join(dirname,'index.pkl')
+    if not os.path.exists(fn):
+        raise IOError('%s is not a binary catalog directory'%dirname)
+    with open(fn,'rb') as f:
+        index = cPickle.load(f)
+    if index.get('version') != _binaryversion:
+        raise IOError('binary catalog %s has unsupported version %s'%(dirname,index.get('version')))
+    return index
+
+def _writeBinaryIndex(dirname,index):
+    #write to a new file and then replace the old one to never leave a partial index
+    import os,cPickle
+
+    fn = os.path.join(dirname,'index.pkl')
+    with open(fn+'.new','wb') as f:
+        cPickle.dump(index,f,2)
+    if os.path.exists(fn):
+        os.remove(fn)
+    os.rename(fn+'.new',fn)
+
+def saveBinary(node,dirname,overwrite=False):
+    """
+    Saves a catalog tree to a directory in a binary format that is much faster
+    to load than :func:`save` for :class:`ColumnarCatalog` objects, can load
+    their fields lazily, and can have rows appended with :func:`appendBinary` .
+
+    Each field of each :class:`ColumnarCatalog` in the tree is saved as a set of
+    NumPy ``.npy`` files (or pickles for fields that are not numeric), while
+    the rest of the tree (and the catalog structure) is pickled in a single
+    file, as for :func:`save` .  As with :func:`save`, the parent of `node` (and
+    everything above it) is not saved.
+
+    :param node: The node at the root of the tree to save.
+    :type node: :class:`CatalogNode`
+    :param dirname: The name of the directory to create.
+    :type dirname: string
+    :param overwrite:
+        If True, the files of an existing directory will be replaced.
+        Otherwise, an :exc:`IOError` is raised if `dirname` already exists.
+    :type overwrite: bool
+    """
+    import os,shutil,tempfile
+
+    exists = os.path.exists(dirname)
+    if exists:
+        if not overwrite:
+            raise IOError('%s already exists'%dirname)
+        if not os.path.exists(os.path.join(dirname,'index.pkl')):
+            raise IOError('%s exists but is not a binary catalog'%dirname)
+
+    #the tree is written to a new directory that then replaces the old one, as
+    #the columns being saved may be lazily loaded from the files being replaced
+    parent = os.path.dirname(os.path.abspath(dirname))
+    tmpdir = tempfile.mkdtemp(prefix='.'+os.path.basename(dirname)+'.',dir=parent)
+    try:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpdir,0777&~umask)
+        _writeBinaryTree(node,tmpdir)
+    except:
+        shutil.rmtree(tmpdir,ignore_errors=True)
+        raise
+
+    if exists:
+        olddir = tmpdir+'.old'
+        os.rename(dirname,olddir)
+        try:
+            os.rename(tmpdir,dirname)
+        except:
+            os.rename(olddir,dirname)
+            shutil.rmtree(tmpdir,ignore_errors=True)
+            raise
+        shutil.rmtree(olddir)
+    else:
+        os.rename(tmpdir,dirname)
+
+def _writeBinaryTree(node,dirname):
+    #writes the files of saveBinary to the existing directory `dirname`
+    import os,cPickle
+
+    catalogs = {}
+    colkeys = {} #id(column):column key
+    columns = {}
+    for n in _columnarCatalogs(node):
+        fields = {}
+        for fn in n._fieldnames:
+            col = n._columns[fn]
+            key = len(columns)
+            coldir = os.path.join(dirname,'c%i'%key)
+            os.mkdir(coldir)
+            meta = dict([(k,getattr(col,k)) for k in ('name','type','units','descr','dtype','default')])
+            columns[key] = {'meta':meta,'chunks':[_saveColumnChunk(col,coldir,0)]}
+            colkeys[id(col)] = key
+            fields[fn] = key
+        catalogs[len(catalogs)] = {'name':n.name,'fields':fields,
+                                   'sources':list(n._sources),
+                                   'nrows':n._nrows}
+
+    def persistent_id(obj):
+        if isinstance(obj,_FieldColumn):
+            return str(colkeys[id(obj)])
+        return None
+
+    oldpar = node._parent
+    node._parent = None
+    try:
+        with open(os.path.join(dirname,'tree.pkl'),'wb') as f:
+            p = cPickle.Pickler(f,2)
+            p.persistent_id = persistent_id
+            p.dump(node)
+    finally:
+        node._parent = oldpar
+
+    index = {'version':_binaryversion,'catalogs':catalogs,'columns':columns}
+    _writeBinaryIndex(dirname,index)
+
+def appendBinary(dirname,catalog,target=None):
+    """
+    Appends the rows of a :class:`ColumnarCatalog` to a catalog saved with
+    :func:`saveBinary` .  The new rows are written to new files, so the files
+    already saved are not changed (other than the small index file).
+
+    :param dirname: The directory the tree was saved to.
+    :type dirname: string
+    :param catalog:
+        The catalog with the rows to append. It must have the same fields as the
+        saved catalog.  Only the rows are appended - any other children are
+        ignored.
+    :type catalog: :class:`ColumnarCatalog`
+    :param target:
+        The name of the saved :class:`ColumnarCatalog` to append the rows to, or
+        None if the tree has only one.
+    :type target: string or None
+
+    :except ValueError: If the target is not found or the fields do not match.
+    """
+    import os
+
+    index = _readBinaryIndex(dirname)
+    cats = index['catalogs']
+    if target is None:
+        if len(cats) != 1:
+            raise ValueError('target must be given if more than one ColumnarCatalog was saved')
+        catinfo = cats.values()[0]
+    else:
+        matches = [c for c in cats.itervalues() if c['name'] == target]
+        if len(matches) != 1:
+            raise ValueError('no single saved ColumnarCatalog named "%s"'%target)
+        catinfo = matches[0]
+    if set(catalog._fieldnames) != set(catinfo['fields']):
+        raise ValueError('fields of the appended catalog do not match the saved catalog')
+
+    #map the source indecies of the new rows to those of the saved catalog
+    srcinds = dict([(s,i) for i,s in enumerate(catinfo['sources'])])
+    simap = {-1:-1}
+    for i,src in enumerate(catalog._sources):
+        if src not in srcinds:
+            srcinds[src] = len(catinfo['sources'])
+            catinfo['sources'].append(src)
+        simap[i] = srcinds[src]
+
+    for fn,key in catinfo['fields'].iteritems():
+        col = catalog._columns[fn]
+        info = index['columns'][key]
+        if col.dtype != info['meta']['dtype']:
+            raise ValueError('field %s has dtype %s instead of %s'%(fn,col.dtype,info['meta']['dtype']))
+
+        newcol = _FieldColumn.__new__(_FieldColumn)
+        newcol._loader = None
+        newcol.current = np.array([simap[si] for si in col.current.tolist()],dtype=int)
+        newcol.layers = dict([(simap[si],lay) for si,lay in col.layers.iteritems()])
+        coldir = os.path.join(dirname,'c%i'%key)
+        info['chunks'].append(_saveColumnChunk(newcol,coldir,len(info['chunks'])))
+    catinfo['nrows'] += catalog._nrows
+
+    _writeBinaryIndex(dirname,index)
+
+def loadBinary(dirname,mmap=True):
+    """
+    Loads a catalog tree saved with :func:`saveBinary` .
+
+    The fields of :class:`ColumnarCatalog` objects are not read until they are
+    first used, and if `mmap` is True, numeric fields that have not had rows
+    appended are memory-mapped rather than read, so only the parts that are
+    used are read from disk.  Changes to memory-mapped fields are not written
+    back to the files.
+
+    :param dirname: The directory the tree was saved to.
+    :type dirname: string
+    :param mmap: If True, memory-map numeric fields where possible.
+    :type mmap: bool
+
+    :returns: The root :class:`CatalogNode` of the saved tree.
+
+    :except IOError: If `dirname` is not a binary catalog directory.
+    """
+    import os,cPickle
+
+    index = _readBinaryIndex(dirname)
+    columns = index['columns']
+
+    def persistent_load(pid):
+        key = int(pid)
+        info = columns[key]
+        col = _FieldColumn.__new__(_FieldColumn)
+        for k,v in info['meta'].iteritems():
+            setattr(col,k,v)
+        col.version = 0
+        col._loader = _columnLoader(os.path.join(dirname,'c%i'%key),
+                                    info['meta'],info['chunks'],mmap)
+        return col
+
+    with open(os.path.join(dirname,'tree.pkl'),'rb') as f:
+        u = cPickle.Unpickler(f)
+        u.persistent_load = persistent_load
+        root = u.load()
+
+    #add the rows (and sources) from appendBinary
+    for colcat,i in zip(_columnarCatalogs(root),sorted(index['catalogs'])):
+        catinfo = index['catalogs'][i]
+        for src in catinfo['sources'][len(colcat._sources):]:
+            colcat._sourceIndex(src)
+        nrows = catinfo['nrows'] - colcat._nrows
+        if nrows > 0:
+            nodes = []
+            for j in range(nrows):
+                n = ColumnarNode.__new__(ColumnarNode)
+                n._children = ()
+                n._parent = colcat
+                n._row = colcat._nrows + j
+                nodes.append(n)
+            colcat._children.extend(nodes)
+            colcat._nrows += nrows
+
+    return root
+
+#<------------------------Batch derived value evaluation----------------------->
+def _memoizable(deps):
+    """
+    Determines if a set of dependency values from
+    :meth:`DependentSource.getDeps` can be compared to decide if a
+    :class:`DerivedValue` is unchanged - mutable objects (e.g. linked nodes) may
+    have changed even if they are the same object.
+    """
+    immutable = (int,long,float,complex,bool,basestring,np.number,np.bool_,type(None))
+    for d in deps:
+        for x in d:
+            if not isinstance(x,immutable):
+                return False
+    return True
+
+def _samedeps(deps1,deps2):
+    """
+    Checks if two sets of dependency values are all equal.
+    """
+    if len(deps1) != len(deps2):
+        return False
+    try:
+        for d1,d2 in zip(deps1,deps2):
+            for x,y in zip(d1,d2):
+                if x is not y and not x == y:
+                    return False
+    except ValueError: #array comparisons
+        return False
+    return True
+
+def _evaluateDerivedVectorized(f,ferr,dvs,depss):
+    """
+    Computes the values of the :class:`DerivedValue` objects `dvs` , all with
+    function `f`, by calling `f` on arrays of the dependency values in `depss`.
+    Returns False without changing anything if the dependencies are not all
+    numeric scalars or `f` does not work on arrays.
+    """
+    n = len(dvs)
+    try:
+        cols = []
+        for i in range(len(depss[0])):
+            col = [np.array([d[i][j] for d in depss]) for j in range(3)]
+            for a in col:
+                if a.shape != (n,) or a.dtype.kind not in 'biufc':
+                    return False
+            cols.append(col)
+
+        with np.errstate(all='raise'):
+            if ferr:
+                res = [np.asarray(r) for r in f(*[tuple(c) for c in cols])]
+                if len(res) != 3:
+                    return False
+                res = [np.repeat(r,n) if r.shape == () else r for r in res]
+                if any([r.shape != (n,) for r in res]):
+                    return False
+                vals,uerrs,lerrs = [r.tolist() for r in res]
+                errs = zip(uerrs,lerrs)
+            else:
+                args = [c[0] for c in cols]
+                vals = np.asarray(f(*args))
+                if vals.shape != (n,):
+                    return False
+
+                #compute (df/dx)dx for all variables and add in quadrature
+                haserr = np.zeros(n,dtype=bool)
+                for v,u,l in cols:
+                    haserr |= (u != 0) | (l != 0)
+                errs = [(0,0)]*n
+                if haserr.any():
+                    uerr2 = np.zeros(n)
+                    lerr2 = np.zeros(n)
+                    for i,(v,u,l) in enumerate(cols):
+                        args[i] = v + u
+                        uerr2 += (np.asarray(f(*args)) - vals)**2
+                        args[i] = v - l
+                        lerr2 += (vals - np.asarray(f(*args)))**2
+                        args[i] = v
+                    uerrs = (uerr2**0.5).tolist()
+                    lerrs = (lerr2**0.5).tolist()
+                    for j in np.flatnonzero(haserr):
+                        errs[j] = (uerrs[j],lerrs[j])
+                vals = vals.tolist()
+    except (ValueError,IndexError,CycleError,AttributeError,TypeError,
+            ArithmeticError):
+        return False
+
+    for dv,val,err,deps in zip(dvs,vals,errs,depss):
+        dv._value = val
+        dv._errs = err
+        dv._depvals = deps if _memoizable(deps) else None
+        dv._valid = True
+    return True
+
+def _evaluateDerivedGroup(f,ferr,dvs,force,vectorize):
+    """
+    Computes the values of the :class:`DerivedValue` objects `dvs` , which
+    all have function `f` and have all of their derived dependencies computed.
+    Returns the number that were not found to be unchanged.
+    """
+    todo = []
+    depss = []
+    for dv in dvs:
+        try:
+            deps = dv._source.getDeps(geterrs=True)
+        except (ValueError,IndexError,CycleError,AttributeError,TypeError):
+            continue #left invalid to give the error when the value is used
+        if not force and dv._depvals is not None and _samedeps(deps,dv._depvals):
+            dv._valid = True
+        else:
+            todo.append(dv)
+            depss.append(deps)
+
+    if not (vectorize and len(todo) > 1 and _evaluateDerivedVectorized(f,ferr,todo,depss)):
+        for dv in todo:
+            dv._valid = False
+            try:
+                dv.value
+            except (ValueError,IndexError,CycleError,AttributeError,TypeError):
+                pass #left invalid to give the error when the value is used
+    return len(todo)
+
+def evaluateDerivedValues(node,fieldnames=None,force=False,vectorize=True):
+    """
+    Computes all :class:`DerivedValue` objects in the catalog tree at once,
+    instead of one at a time as their values are requested.
+
+    The derived values in the requested fields, along with any derived values
+    they depend on, are collected into a dependency graph and computed in
+    dependency order.  All values at the same step with the same function
+    (e.g. the same :func:`derivedFieldFunc` on many
+    :class:`StructuredFieldNode` objects) are computed with one call of the
+    function on arrays of their dependency values, and the errors are then
+    found from one call per dependency in each direction.  This only happens
+    if the dependencies are all numeric scalars and the function returns an
+    array of the right size - otherwise, the values are computed one at a time
+    as usual.
+
+    Derived values that were invalidated (see :meth:`DerivedValue.invalidate`)
+    but whose dependencies still have the same values are not recomputed, and
+    values that were never invalidated are skipped entirely, unless `force` is
+    True.  `force` must be used if the derived functions depend on anything
+    other than their arguments that has changed, such as the default
+    cosmology.
+
+    Values that cannot be derived (e.g. cycles or missing dependencies) are
+    left invalid, so that the usual exception or warning occurs when they are
+    used.
+
+    :param node: The root of the tree to compute the derived values for.
+    :type node: :class:`CatalogNode`
+    :param fieldnames:
+        The names of the fields to compute the derived values for, as a
+        sequence of strings or a comma-separated string, or None for all fields.
+    :param force:
+        If True, all derived values are recomputed, even if they are valid.
+    :type force: bool
+    :param vectorize:
+        If False, the values are all computed one at a time (but still in
+        dependency order).
+    :type vectorize: bool
+
+    :returns: The number of derived values that were computed.
+    """
+    if isinstance(fieldnames,basestring):
+        fieldnames = fieldnames.split(',')
+
+    #collect the derived values to compute
+    stack = []
+    for n in node.iterNodes():
+        if isinstance(n,FieldNode) and not isinstance(n,ColumnarNode):
+            if fieldnames is None:
+                fns = n._fieldnames
+            else:
+                fns = [fn for fn in fieldnames if fn in n._fieldnames]
+            for fn in fns:
+                for v in getattr(n,fn):
+                    if isinstance(v,DerivedValue) and (force or not v._valid):
+                        stack.append(v)
+
+    #build the dependency graph, including derived values they depend on
+    dvs = {} #id(dv):dv
+    nwaiting = {} #id(dv):number of dependencies not yet computed
+    dependents = {} #id(dv):[ids of dvs that depend on it]
+    while stack:
+        dv = stack.pop()
+        if id(dv) in dvs:
+            continue
+        dvs[id(dv)] = dv
+        nwaiting[id(dv)] = 0
+        try:
+            fields = dv._source.populateFieldRefs()
+        except (ValueError,IndexError,TypeError,AttributeError):
+            fields = [] #will fail when computed, and be left invalid
+        for fi in fields:
+            try:
+                dep = fi.currentobj
+            except (IndexError,AttributeError):
+                continue
+            if isinstance(dep,DerivedValue) and (force or not dep._valid):
+                nwaiting[id(dv)] += 1
+                dependents.setdefault(id(dep),[]).append(id(dv))
+                stack.append(dep)
+
+    #compute in topological order - anything in a cycle is never reached
+    ncomputed = 0
+    step = [dvs[i] for i,nw in nwaiting.iteritems() if nw == 0]
+    while step:
+        groups = {}
+        for dv in step:
+            groups.setdefault((dv._f,dv._ferr),[]).append(dv)
+        for (f,ferr),group in groups.iteritems():
+            ncomputed += _evaluateDerivedGroup(f,ferr,group,force,vectorize)
+
+        nextstep = []
+        for dv in step:
+            for i in dependents.get(id(dv),()):
+                nwaiting[i] -= 1
+                if nwaiting[i] == 0:
+                    nextstep.append(dvs[i])
+        step = nextstep
+
+    return ncomputed
+
+
 #<--------------------builtin/special purpose classes-------------------------->
 class SEDField(Field):
     """
@@ -4140,16 +6884,11 @@ class GraphAction(ActionNode):
         if node is None:
             node = self.parent
 
-        nodeidtopdnode={}
-        def visitfunc(node):
-            return node,None if node.parent is None else (node.parent,node)
-        nelist = node.visit(visitfunc,traversal=self.traversal)
-
         g = nx.DiGraph()
-        g.add_node(nelist[0][0])
-        for node,edge in nelist[1:]:
-            g.add_node(node)
-            g.add_edge(edge)
+        for n in node.iterNodes(self.traversal):
+            g.add_node(n)
+            if n is not node:
+                g.add_edge(n.parent,n)
         try:
             if isinstance(self.drawlayout,basestring):
                 pos = nx.pygraphviz_layout(g,prog=self.drawlayout)
@@ -104,6 +104,180 @@ mjdoffset = 2400000.5
 """
 Offset between Julian Date and Modified Julian Date - e.g. mjd = jd - mjdoffset
 """
+_unixepochjd = 2440587.5 #JD at 1970-01-01, the zero point of datetime64
+
+class JulianDate(object):
+    """
+    A Julian Date or an array of Julian Dates stored in two parts to preserve
+    precision. A single float64 JD has a resolution of ~20 microseconds, while
+    this representation is good to well below a nanosecond.
+
+    The date is stored as :attr:`jd1`, the JD of the preceding midnight (always
+    a half-integer), and :attr:`jd2`, the fraction of a day since that midnight
+    (always in [0,1)). Adding or subtracting a number of days (scalar or array)
+    gives a new :class:`JulianDate`, and subtracting two :class:`JulianDate`
+    objects gives the difference in days without loss of precision.
+
+    :class:`JulianDate` objects are accepted anywhere a JD is accepted in
+    :mod:`astropysics.obstools` and :mod:`astropysics.timescales`. Other
+    functions will see them as a single float JD via :func:`numpy.asarray`.
+
+    **Examples**
+
+    >>> jd = JulianDate(2451545,0.25)
+    >>> jd.jd1,jd.jd2
+    (2451544.5, 0.75)
+    >>> (jd + 0.5) - jd
+    0.5
+    >>> calendar_to_jd((2000,1,1,12,0,1e-6),twopart=True).jd2*86400
+    43200.000001
+
+    """
+
+    #make numpy defer to the arithmetic methods below
+    __array_priority__ = 1000
+
+    def __init__(self,jd1,jd2=0,mjd=False):
+        """
+        :param jd1:
+            The Julian Date, or the first part of it. Can also be another
+            :class:`JulianDate` object, in which case it will be copied.
+        :type jd1: scalar or array-like
+        :param jd2:
+            The second part of the Julian Date, added to `jd1`.
+        :type jd2: scalar or array-like
+        :param bool mjd:
+            If True, `jd1` and `jd2` are interpreted as a modified julian date.
+
+        """
+        jd2 = np.asarray(jd2,dtype=float)
+        if isinstance(jd1,JulianDate):
+            self._day,self._frac = self._normalize(jd1._day,jd1._frac + jd2)
+        elif mjd:
+            #add the integer part of the offset afterwards to keep it exact
+            day,self._frac = self._normalize(np.asarray(jd1,dtype=float),jd2)
+            self._day = day + (mjdoffset - .5)
+        else:
+            jd1 = np.asarray(jd1,dtype=float) - .5
+            self._day,self._frac = self._normalize(jd1,jd2)
+
+    @staticmethod
+    def _normalize(day,frac):
+        """
+        Splits `day` + `frac` into an integer day and a fraction in [0,1).
+        """
+        di = np.floor(day)
+        frac = frac + (day - di)
+        fi = np.floor(frac)
+        day = di + fi
+        frac = frac - fi
+
+        #floating point round-off can leave the fraction at exactly 1
+        over = frac >= 1
+        if np.any(over):
+            day = day + over
+            frac = frac - over
+        return day,frac
+
+    @property
+    def jd1(self):
+        """
+        The JD of the midnight preceding this date (always a half-integer).
+        """
+        return self._day + .5
+
+    @property
+    def jd2(self):
+        """
+        The fraction of a day since :attr:`jd1`.
+        """
+        return self._frac
+
+    @property
+    def jd(self):
+        """
+        The Julian Date as a float or array (losing precision).
+        """
+        return self._day + .5 + self._frac
+
+    @property
+    def mjd(self):
+        """
+        The Modified Julian Date as a float or array. Precision is better than
+        :attr:`jd`, as the MJD is a smaller number.
+        """
+        return (self._day - (mjdoffset - .5)) + self._frac
+
+    @property
+    def shape(self):
+        return self._day.shape
+
+    def __len__(self):
+        return len(self._day)
+
+    def __getitem__(self,key):
+        res = JulianDate.__new__(JulianDate)
+        res._day = self._day[key]
+        res._frac = self._frac[key]
+        return res
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __array__(self,dtype=None):
+        return np.asarray(self.jd,dtype=dtype)
+
+    def __float__(self):
+        return float(self.jd)
+
+    def __repr__(self):
+        return 'JulianDate({0!r},{1!r})'.format(self.jd1.tolist(),
+                                                self.jd2.tolist())
+
+    def __add__(self,other):
+        if isinstance(other,JulianDate):
+            raise TypeError('cannot add two JulianDate objects')
+        other = np.asarray(other,dtype=float)
+        res = JulianDate.__new__(JulianDate)
+        res._day,res._frac = self._normalize(self._day + np.floor(other),
+                                              self._frac + (other%1.0))
+        return res
+
+    __radd__ = __add__
+
+    def __sub__(self,other):
+        if isinstance(other,JulianDate):
+            return (self._day - other._day) + (self._frac - other._frac)
+        else:
+            return self + -np.asarray(other,dtype=float)
+
+    def __rsub__(self,other):
+        return np.asarray(other,dtype=float) - self.jd
+
+    def __lt__(self,other):
+        return self - other < 0 if isinstance(other,JulianDate) else self.jd < other
+    def __le__(self,other):
+        return self - other <= 0 if isinstance(other,JulianDate) else self.jd <= other
+    def __gt__(self,other):
+        return self - other > 0 if isinstance(other,JulianDate) else self.jd > other
+    def __ge__(self,other):
+        return self - other >= 0 if isinstance(other,JulianDate) else self.jd >= other
+    def __eq__(self,other):
+        if isinstance(other,JulianDate):
+            return (self._day == other._day) & (self._frac == other._frac)
+        elif isinstance(other,basestring):
+            return False
+        return self.jd == other
+    def __ne__(self,other):
+        return ~np.asarray(self.__eq__(other))
+
+    def toCalendar(self,**kwargs):
+        """
+        Converts this date to calendar form. Keyword arguments are passed into
+        :func:`jd_to_calendar`.
+        """
+        return jd_to_calendar(self,**kwargs)
 
 def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=False):
     """
@@ -111,14 +285,15 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
 
     :param jd:
         The Julian Date at which to compute the calendar date/time, a sequence
-        of JDs, or None for the current date/time at the moment the function is
-        called.
-    :type jd: scalar, array-like, or None
+        of JDs, a :class:`JulianDate`, or None for the current date/time at the
+        moment the function is called.
+    :type jd: scalar, array-like, :class:`JulianDate`, or None
     :param rounding:
         If non-0, Performs a fix for floating-point errors. It specifies the
-        number of milliseconds by which to round the result to the nearest
-        second. If 1000000 (one second), no milliseconds are recorded. If
-        larger, a ValueError is raised.
+        number of microseconds within which to round the result to the nearest
+        second. If 1000000 (one second), the result is rounded to the nearest
+        second and no microseconds are recorded. If larger, a ValueError is
+        raised. Otherwise, the result is rounded to the nearest microsecond.
     :type rounding: scalar
     :param output:
         Determines the format of the returned object and can be:
@@ -134,6 +309,12 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
             * 'fracarray'
                 An Nx3 array (year,month,day) where day includes the decimal
                 portion.
+            * 'datetime64'
+                An array of :class:`numpy.datetime64` (with microsecond
+                precision) in UTC, or a single one if the input is a scalar.
+                This is much faster than 'datetime' for large arrays, as no
+                python objects are created.  It is always in the (proleptic)
+                Gregorian calendar, so `gregorian` is ignored.
 
     :param gregorian:
         If True, the output will be in the Gregorian calendar. Otherwise, it
@@ -142,7 +323,7 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
     :type gregorian: bool or None
     :param bool mjd:
         If True, the input is interpreted as a modified julian date instead of a
-        standard julian date.
+        standard julian date. Ignored for :class:`JulianDate` inputs.
 
     :returns:
         The calendar date and time in a format determined by the `output`
@@ -169,32 +350,49 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
     from dateutil import tz
 
     if jd is None:
-        jd = calendar_to_jd(datetime.datetime.now(tz.tzlocal()))
-
-    jd = np.array(jd,copy=True,dtype=float)
-    scalar = jd.shape == ()
-    jd = jd.ravel()
+        jd = calendar_to_jd(datetime.datetime.now(tz.tzlocal()),twopart=True)
 
-    if mjd:
-        jd += mjdoffset
+    #work with the day number and fraction separately to preserve precision
+    if isinstance(jd,JulianDate):
+        scalar = jd.shape == ()
+        jd1 = jd.jd1.ravel()
+        jd2 = jd.jd2.ravel()
+    else:
+        jd1 = np.array(jd,copy=True,dtype=float)
+        scalar = jd1.shape == ()
+        jd1 = jd1.ravel()
+        jd2 = np.zeros_like(jd1)
+        if mjd:
+            #integer part of mjdoffset is added to the day number below
+            jd1 += mjdoffset%1
 
     if rounding > 1000000:
         raise ValueError('rounding cannot exceed a second')
-    elif rounding <= 0:
-        jd += .5
-    else:
-        rounding = int(rounding)
-        roundingfrac = rounding/86400000000
-        jd += .5 + roundingfrac
-
-    z = np.floor(jd).astype(int)
-    dec = jd - z #fractional piece
-
-    #fix slight floating-point errors if they hapepn TOOD:check
-    dgtr1 = dec>=1.0
-    dec[dgtr1] -= 1.0
-    z[dgtr1] += 1
 
+    z = np.floor(jd1)
+    dec = (jd1 - z) + (jd2 + .5) #fractional piece
+    zdec = np.floor(dec)
+    z = (z + zdec).astype(int)
+    dec -= zdec
+    if mjd and not isinstance(jd,JulianDate):
+        z += int(mjdoffset)
+
+    if output != 'fracarray':
+        #microseconds since midnight, rounded to the nearest second if within
+        #`rounding` microseconds of one
+        usec = np.round(dec*86400000000.).astype('int64')
+        if rounding > 0:
+            wholesec = ((usec + 500000)//1000000)*1000000
+            toround = np.abs(usec - wholesec) < rounding
+            usec[toround] = wholesec[toround]
+        nextday = usec >= 86400000000
+        usec[nextday] -= 86400000000
+        z[nextday] += 1
+
+    if output == 'datetime64':
+        res = (z - int(_unixepochjd + .5)).astype('datetime64[D]') + \
+              usec.astype('timedelta64[us]')
+        return res[0] if scalar else res
 
     if gregorian is None:
         gregorian = 2299161
@@ -225,34 +423,17 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
     year[month<=2] -= 4715
 
     if output == 'fracarray':
-        dec = dec-roundingfrac
-        dec[dec<0]=0
         return np.array((year,month,day+dec)).T
 
+    sec = usec//1000000
+    msec = usec - 1000000*sec
     if rounding == 1000000:
-        secdec = dec*86400
-        sec = secdec.astype(int)
-        min = sec//60
-        sec -= 60*min
-        hr = min//60
-        min -= 60*hr
-        #sec[sec==secdec] -= 1
         msec = None
-    else:
-        msec = (dec*86400000000.).astype('int64')
-        if rounding > 0:
-            div = (msec//1000000)*1000000
-            toround = (msec - div)<(2*rounding)
-            msec[toround] = div + rounding
-            msec  -= rounding
-
-        sec = msec//1000000
-        msec -= 1000000*sec
 
-        min = sec//60
-        sec -= 60*min
-        hr = min//60
-        min -= 60*hr
+    min = sec//60
+    sec -= 60*min
+    hr = min//60
+    min -= 60*hr
 
     if output == 'datetime':
         tzi = tz.tzutc()
@@ -274,7 +455,7 @@ def jd_to_calendar(jd,rounding=1000000,output='datetime',gregorian=None,mjd=Fals
 
 
 
-def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
+def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False,twopart=False):
 
     """
     Convert a calendar date and time to julian date.
@@ -288,6 +469,9 @@ def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
             * A :class:`datetime.datetime` or :class:`datetime.date` object
             * A sequence of :class:`datetime.datetime` or :class:`datetime.date`
               objects (a sequence will be returned).
+            * A :class:`numpy.datetime64` or an array of them (an array will be
+              returned). This is much faster than the other forms for large
+              numbers of times, as no python objects are created.
             * None : returns the JD at the moment the function is called.
 
         If the time is unspecified, it is taken to be noon (i.e. Julian Date =
@@ -310,16 +494,26 @@ def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
             * a :class:`datetime.tzinfo` object,
                 This object will be used for timezone information.
 
+        Time zones with daylight savings or other transitions are only
+        evaluated once per day present in the input, so large arrays of times
+        can be converted efficiently.
+
     :param gregorian:
         If True, the input will be interpreted as in the Gregorian calendar.
         Otherwise, it will be Julian. If None, it will be assumed to switch over
-        on October 4/15, 1582.
+        on October 4/15, 1582. Ignored for :class:`numpy.datetime64` inputs,
+        which are always Gregorian.
     :type gregorian: bool or None
     :param bool mjd:
         If True, a modified julian date is returned instead of the standard
-        julian date.
+        julian date.  Ignored if `twopart` is True.
+    :param bool twopart:
+        If True, a :class:`JulianDate` is returned, preserving the full
+        precision of the input times.
 
-    :returns: JD as a float, or a sequence of JDs if sequences were input.
+    :returns:
+        JD as a float, or a sequence of JDs if sequences were input (or a
+        :class:`JulianDate` if `twopart` is True).
 
 
     **Examples**
@@ -337,12 +531,17 @@ def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
     >>> tz = dateutil.tz.tzoffset('2',3*3600)
     >>> calendar_to_jd((2010,1,1),tz)
     2455197.875
+    >>> calendar_to_jd(np.array(['2004-03-05','2004-03-09T12'],dtype='datetime64'))
+    array([ 2453069.5,  2453074. ])
+    >>> calendar_to_jd(np.datetime64('2004-03-05'))
+    2453070.0
 
 
     """
     #Adapted from xidl  jdcnv.pro
-    from datetime import datetime,date,tzinfo
+    from datetime import datetime,date
 
+    dt64 = None
     if caltime is None:
         from dateutil.tz import tzlocal
         datetimes = [datetime.now(tzlocal())]
@@ -350,6 +549,13 @@ def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
     elif isinstance(caltime,datetime) or isinstance(caltime,date):
         datetimes = [caltime]
         scalarout = True
+    elif isinstance(caltime,np.datetime64) or \
+         (isinstance(caltime,np.ndarray) and caltime.dtype.kind == 'M'):
+        #numpy datetime64 - converted without creating any python objects
+        datetimes = None
+        dt64 = np.asarray(caltime)
+        scalarout = dt64.shape == ()
+        dt64 = dt64.ravel()
     elif all([isinstance(ct,datetime) or isinstance(ct,date) for ct in caltime]):
         datetimes = caltime
         scalarout = False
@@ -387,79 +593,131 @@ def calendar_to_jd(caltime,tz=None,gregorian=True,mjd=False):
             sec.append(dt.second)
             msec.append(dt.microsecond)
 
+    if dt64 is not None:
+        days = dt64.astype('datetime64[D]')
+        dayfrac = (dt64 - days)/np.timedelta64(1,'D')
+        jdn = days.astype('int64') + _unixepochjd
+        if np.datetime_data(dt64.dtype)[0] in ('Y','M','W','D'):
+            #dates without times are taken to be at noon
+            dayfrac = dayfrac + 0.5
+    else:
+        yr = np.array(yr,dtype='int64',copy=False).ravel()
+        month = np.array(month,dtype='int64',copy=False).ravel()
+        day = np.array(day,dtype='int64',copy=False).ravel()
+        hr = np.array(hr,dtype=float,copy=False).ravel()
+        min = np.array(min,dtype=float,copy=False).ravel()
+        sec = np.array(sec,dtype=float,copy=False).ravel()
+        msec = np.array(msec,dtype=float,copy=False).ravel()
+
+#        ly = ((month-14)/12).astype(int) #In leap years, -1 for Jan, Feb, else 0
+#        jdn = day - 32075l + 1461l*(yr+4800l+ly)//4
+
+#        jdn += 367l*(month - 2-ly*12)//12 - 3*((yr+4900l+ly)//100)//4
+
+#        res = jdn + (hr/24.0) + min/1440.0 + sec/86400.0 - 0.5
+
+        #this algorithm from meeus 2ed
+        m3 = month < 3
+        yr[m3] -= 1
+        month[m3] += 12
+
+        cen = yr//100
+
+        if gregorian is None:
+            gregorian = (1582,10,4)
+        if gregorian is True:
+            gregoffset = 2 - cen + cen//4
+        elif gregorian is False:
+            gregoffset = 0
+        else:
+            gregoffset = 2 - cen + cen//4
+            gmask = (yr>gregorian[0])&(month>gregorian[1])&(day>gregorian[2])
+            gregoffset[~gmask] = 0
 
 
-    yr = np.array(yr,dtype='int64',copy=False).ravel()
-    month = np.array(month,dtype='int64',copy=False).ravel()
-    day = np.array(day,dtype='int64',copy=False).ravel()
-    hr = np.array(hr,dtype=float,copy=False).ravel()
-    min = np.array(min,dtype=float,copy=False).ravel()
-    sec = np.array(sec,dtype=float,copy=False).ravel()
-    msec = np.array(msec,dtype=float,copy=False).ravel()
+        jdn = (365.25*(yr+4716)).astype(int) + \
+              (30.6001*(month + 1)).astype(int) + \
+                   day + gregoffset - 1524.5
+        dayfrac = hr/24.0 + min/1440.0 + sec/86400.0 + msec/86400000000.0
 
     #do tz conversion if tz is provided
-    if isinstance(tz,basestring) or isinstance(tz,tzinfo):
-        if isinstance(tz,basestring):
-            from dateutil import tz
-            tzi = tz.gettz(tz)
-        else:
-            tzi = tz
+    if tz is not None:
+        dayfrac = dayfrac - _utc_offsets(tz,jdn,dayfrac)/24.0
 
-        utcoffset = []
-        for t in zip(yr,month,day,hr,min,sec,msec):
-            #microsecond from float component of seconds
-
-            dt = datetime(*[int(ti) for ti in t],**dict(tzinfo=tzi))
-            utcdt = dt.utcoffset()
-            if utcdt is None:
-                utcoffset.append(0)
-            else:
-                utcoffset.append(utcdt.days*24 + (utcdt.seconds + utcdt.microseconds*1e-6)/3600)
+    if twopart:
+        res = JulianDate(jdn,dayfrac)
+    elif mjd:
+        res = (jdn - mjdoffset) + dayfrac
     else:
-        utcoffset = tz
+        res = jdn + dayfrac
 
-#    ly = ((month-14)/12).astype(int) #In leap years, -1 for Jan, Feb, else 0
-#    jdn = day - 32075l + 1461l*(yr+4800l+ly)//4
-
-#    jdn += 367l*(month - 2-ly*12)//12 - 3*((yr+4900l+ly)//100)//4
-
-#    res = jdn + (hr/24.0) + min/1440.0 + sec/86400.0 - 0.5
-
-    #this algorithm from meeus 2ed
-    m3 = month < 3
-    yr[m3] -= 1
-    month[m3] += 12
-
-    cen = yr//100
-
-    if gregorian is None:
-        gregorian = (1582,10,4)
-    if gregorian is True:
-        gregoffset = 2 - cen + cen//4
-    elif gregorian is False:
-        gregoffset = 0
+    if scalarout:
+        return res[0]
     else:
-        gregoffset = 2 - cen + cen//4
-        gmask = (yr>gregorian[0])&(month>gregorian[1])&(day>gregorian[2])
-        gregoffset[~gmask] = 0
+        return res
 
 
-    jdn = (365.25*(yr+4716)).astype(int) + \
-          (30.6001*(month + 1)).astype(int) + \
-               day + gregoffset - 1524.5
-    res = jdn + hr/24.0 + min/1440.0 + sec/86400.0
+def _utc_offsets(tz,jdn,dayfrac):
+    """
+    Computes the UTC offsets in hours for local times in a time zone.
 
-    if mjd:
-        res -= mjdoffset
+    Fixed-offset zones are evaluated once. Other zones (e.g. from the tz
+    database) are evaluated once per distinct day, and only times falling on a
+    day with a transition are evaluated individually.
 
-    if np.any(utcoffset):
-        res -= np.array(utcoffset)/24.0
+    :param tz:
+        The time zone as a string, :class:`datetime.tzinfo` object, or an hour
+        offset (see :func:`calendar_to_jd`).
+    :param jdn: The JD of the preceding midnight for each of the local times.
+    :type jdn: array-like
+    :param dayfrac: The fraction of a day past `jdn` for each of the local times.
+    :type dayfrac: array-like
 
-    if scalarout:
-        return res[0]
-    else:
-        return res
+    :returns: An array of UTC offsets in hours matching `jdn`.
 
+    :except ValueError: If `tz` is a string that is not a known time zone.
+    """
+    from datetime import datetime,timedelta,tzinfo
+
+    if isinstance(tz,basestring):
+        from dateutil.tz import gettz
+        tzi = gettz(tz)
+        if tzi is None:
+            raise ValueError('unrecognized time zone string '+tz)
+    elif isinstance(tz,tzinfo):
+        tzi = tz
+    else:
+        return np.zeros(np.shape(jdn)) + tz
+
+    def hroffset(dt):
+        off = dt.replace(tzinfo=tzi).utcoffset()
+        return 0 if off is None else off.total_seconds()/3600
+
+    try:
+        fixed = tzi.utcoffset(None)
+    except (TypeError,AttributeError):
+        fixed = None
+    if fixed is not None:
+        return np.zeros(np.shape(jdn)) + fixed.total_seconds()/3600
+
+    #local time as integer days since 1970 and fraction of a day
+    dayfrac = np.asarray(dayfrac,dtype=float)
+    wholedays = np.floor(dayfrac)
+    days = (np.asarray(jdn) - _unixepochjd + wholedays).astype('int64')
+    dayfrac = dayfrac - wholedays
+
+    epoch = datetime(1970,1,1)
+    udays,inv = np.unique(days,return_inverse=True)
+    dts = [epoch + timedelta(int(d)) for d in udays]
+    startoff = np.array([hroffset(dt) for dt in dts])
+    endoff = np.array([hroffset(dt + timedelta(1)) for dt in dts])
+
+    res = startoff[inv]
+    for i in np.where(startoff != endoff)[0]:
+        #a transition occurs during this day, so do each time separately
+        msk = inv == i
+        res[msk] = [hroffset(dts[i] + timedelta(0,f*86400)) for f in dayfrac[msk]]
+    return res
 
 def jd_to_epoch(jd,julian=True,asstring=False,mjd=False):
     """
@@ -467,7 +725,7 @@ def jd_to_epoch(jd,julian=True,asstring=False,mjd=False):
     years.
 
     :param jd: Julian Date for computing the epoch, or None for current epoch.
-    :type jd: scalar, array-like, or None
+    :type jd: scalar, array-like, :class:`JulianDate`, or None
     :param bool julian:
         If True, a Julian Epoch will be used (the year is exactly 365.25 days
         long). Otherwise, the epoch will be Besselian (assuming a tropical year
@@ -478,8 +736,8 @@ def jd_to_epoch(jd,julian=True,asstring=False,mjd=False):
         string Otherwise, scalars are returned (an int if a whole year, float if
         not).
     :param bool mjd:
-        If True, a modified julian date is returned instead of the standard
-        julian date.
+        If True, the input is interpreted as a modified julian date instead of a
+        standard julian date. Ignored for :class:`JulianDate` inputs.
 
     :returns:
         The epoch as a string (or list of strings if `jd` was array-like) if
@@ -490,17 +748,22 @@ def jd_to_epoch(jd,julian=True,asstring=False,mjd=False):
 
     """
     if jd is None:
-        jd = calendar_to_jd(None)
+        jd = calendar_to_jd(None,twopart=True)
+    elif not isinstance(jd,JulianDate):
+        jd = np.asarray(jd,dtype=float)
+        if mjd:
+            jd = jd + mjdoffset
+
+    jd0 = 2451545.0 if julian else 2415020.31352
+    if isinstance(jd,JulianDate):
+        days = (jd.jd1 - jd0) + jd.jd2
     else:
-        jd = np.array(jd,copy=False)
-
-    if mjd:
-        jd += mjdoffset
+        days = jd - jd0
 
     if julian:
-        epoch = 2000.0 + (jd - 2451545.0)/365.25
+        epoch = 2000.0 + days/365.25
     else:
-        epoch = 1900 + (jd - 2415020.31352)/365.242198781
+        epoch = 1900 + days/365.242198781
 
 
 
@@ -523,7 +786,7 @@ def jd_to_epoch(jd,julian=True,asstring=False,mjd=False):
         else:
             return epoch
 
-def epoch_to_jd(epoch,julian=True,mjd=False):
+def epoch_to_jd(epoch,julian=True,mjd=False,twopart=False):
     """
     Converts a Julian or Besselian Epoch to a Julian Day.
 
@@ -537,9 +800,13 @@ def epoch_to_jd(epoch,julian=True,mjd=False):
         epoch type.
     :param bool mjd:
         If True, a modified julian date is returned instead of the standard
-        julian date.
+        julian date. Ignored if `twopart` is True.
+    :param bool twopart:
+        If True, a :class:`JulianDate` is returned.
 
-    :returns: The Julian Day as a float or array (if `epoch` is array-like)
+    :returns:
+        The Julian Day as a float or array (if `epoch` is array-like), or a
+        :class:`JulianDate` if `twopart` is True.
 
     :Reference: http://www.iau-sofa.rl.ac.uk/2003_0429/sofa/epj.html
     """
@@ -554,18 +821,22 @@ def epoch_to_jd(epoch,julian=True,mjd=False):
     else:
         epoch = np.array(epoch,copy=False)
         if epoch.dtype.kind == 'S':
-            return np.array([epoch_to_jd(e,julian) for e in epoch])
-
+            res = np.array([epoch_to_jd(e,julian) for e in epoch])
+            if twopart:
+                return JulianDate(res)
+            return res - mjdoffset if mjd else res
 
     if julian:
-        res = (epoch - 2000)*365.25 + 2451545.0
+        jd0,days = 2451545.0,(epoch - 2000)*365.25
     else:
-        res = (epoch - 1900)*365.242198781 + 2415020.31352
+        jd0,days = 2415020.31352,(epoch - 1900)*365.242198781
 
-    if mjd:
-        return res - mjdoffset
+    if twopart:
+        return JulianDate(jd0,days)
+    elif mjd:
+        return (jd0 - mjdoffset) + days
     else:
-        return res
+        return jd0 + days
 
 
 def delta_AT(jdutc,usett=False):
@@ -573,116 +844,32 @@ def delta_AT(jdutc,usett=False):
     Computes the difference between International Atomic Time (TAI) and
     UTC, known as delta(AT).
 
-    Note that this is not valid before UTC (Jan 1,1960) beganand it is not
+    Note that this is not valid before UTC (Jan 1,1960) began and it is not
     correct for future dates, as leap seconds are not predictable. Hence,
     warnings are issued if before UTC or >5 years from the date of the
-    algorithm.
-
-    Implementation adapted from the matching `SOFA <http://www.iausofa.org/>`_
-    algorithm (dat.c).
+    leap second table. See :mod:`astropysics.timescales` for how the table is
+    loaded and updated.
 
-    :param utc:
+    :param jdutc:
         UTC time as a Julian Date (use :func:`calendar_to_jd` for calendar form
         inputs.)
-    :type utc: float
+    :type jdutc: float or array-like
     :param usett:
-        If True, the return value will be the difference between UTC and
-        Terrestrial Time (TT) instead of TAI (TT - TAI = 32.184 s).
+        If True, the return value will be the difference between Terrestrial
+        Time (TT) and UTC instead of TAI (TT - TAI = 32.184 s).
     :type usett: bool
 
-    :returns: TAI - UTC in seconds as a float (or TT - UTC if `usett` is True)
+    :returns:
+        TAI - UTC in seconds as a float or array (or TT - UTC if `usett` is
+        True)
 
     """
-    from warnings import warn
-
-
-    dt = jd_to_calendar(jdutc)
-
-    #get data from arrays defined below
-    drift = __dat_drift
-    cyear,cmonth,cdelat = __dat_changes
-
-    if dt.year > __dat_valid_year+5:
-        warn('delta(AT) requested for more than 5 years after current leap seconds (%i)'%dt.year)
+    from .timescales import delta_AT as dat,tt_minus_tai
 
-    m = 12*dt.year + dt.month
-    i = np.sum(__dat_m<m)-1
-    if i < 0:
-        warn('delta(AT) requested before 1960 (%i)'%dt.year)
-        i = 0
-    delat = cdelat[i]
-
-    #if pre leap seconds, account for drift
-    if i < drift.shape[0]:
-        fd = dt.hour/24+dt.minute/24/60+dt.second/24/3.6e3+dt.microsecond/24/3.6e9 #fraction of day
-        delat += (jdutc - mjdoffset + fd - drift[i,0]) * drift[i,1]
+    delat = dat(jdutc)
     if usett:
-        return delat - 32.184
-    else:
-        return delat
-
-#fixed arrays/values for delta_AT:
-__dat_valid_year = 2009
-#Reference dates (MJD) and drift rates (s/day), pre leap seconds
-__dat_drift = np.array([
-    [ 37300.0, 0.0012960 ],
-    [ 37300.0, 0.0012960 ],
-    [ 37300.0, 0.0012960 ],
-    [ 37665.0, 0.0011232 ],
-    [ 37665.0, 0.0011232 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 38761.0, 0.0012960 ],
-    [ 39126.0, 0.0025920 ],
-    [ 39126.0, 0.0025920 ]
-    ])
-#year,month,delat
-__dat_changes = np.array([
-    [ 1960,  1,  1.4178180 ],
-    [ 1961,  1,  1.4228180 ],
-    [ 1961,  8,  1.3728180 ],
-    [ 1962,  1,  1.8458580 ],
-    [ 1963, 11,  1.9458580 ],
-    [ 1964,  1,  3.2401300 ],
-    [ 1964,  4,  3.3401300 ],
-    [ 1964,  9,  3.4401300 ],
-    [ 1965,  1,  3.5401300 ],
-    [ 1965,  3,  3.6401300 ],
-    [ 1965,  7,  3.7401300 ],
-    [ 1965,  9,  3.8401300 ],
-    [ 1966,  1,  4.3131700 ],
-    [ 1968,  2,  4.2131700 ],
-    [ 1972,  1, 10.0       ],
-    [ 1972,  7, 11.0       ],
-    [ 1973,  1, 12.0       ],
-    [ 1974,  1, 13.0       ],
-    [ 1975,  1, 14.0       ],
-    [ 1976,  1, 15.0       ],
-    [ 1977,  1, 16.0       ],
-    [ 1978,  1, 17.0       ],
-    [ 1979,  1, 18.0       ],
-    [ 1980,  1, 19.0       ],
-    [ 1981,  7, 20.0       ],
-    [ 1982,  7, 21.0       ],
-    [ 1983,  7, 22.0       ],
-    [ 1985,  7, 23.0       ],
-    [ 1988,  1, 24.0       ],
-    [ 1990,  1, 25.0       ],
-    [ 1991,  1, 26.0       ],
-    [ 1992,  7, 27.0       ],
-    [ 1993,  7, 28.0       ],
-    [ 1994,  7, 29.0       ],
-    [ 1996,  1, 30.0       ],
-    [ 1997,  7, 31.0       ],
-    [ 1999,  1, 32.0       ],
-    [ 2006,  1, 33.0       ],
-    [ 2009,  1, 34.0       ]
-]).T
-__dat_m = 12*__dat_changes[0] + __dat_changes[1]
+        delat = delat + tt_minus_tai
+    return delat if delat.shape else float(delat)
 
 
 #<-------------------Site and Observing/Instrumentation-related---------------->
@@ -781,14 +968,14 @@ class Site(object):
         if val is None:
             self._currjd = None
         else:
-            if np.isscalar(val):
+            if np.isscalar(val) or isinstance(val,JulianDate):
                 self._currjd = val
             else:
                 self._currjd = calendar_to_jd(val)
     currentobsjd = property(_getCurrentobsjd,_setCurrentobsjd,doc="""
     Date and time to use for computing time-dependent values.  If set to None,
     the jd at the instant of calling will be used.  It can also be set as
-    datetime objects or (yr,mon,day,hr,min,sec) tuples.
+    datetime objects, (yr,mon,day,hr,min,sec) tuples, or a :class:`JulianDate`.
     """)
 
     def localSiderialTime(self,*args,**kwargs):
@@ -800,7 +987,8 @@ class Site(object):
             current local siderial time for this Site or uses the value of the
             :attr:`currentobsjd` property.
         * localSiderialTime(JD)
-            input argument is julian date UT1
+            input argument is julian date UT1 (a :class:`JulianDate` may be
+            used for full precision)
         * localSdierialTime(:class:`datetime.date`)
             compute the local siderial time for midnight on the given date
         * localSiderialTime(:class:`datetime.datetime`)
@@ -854,7 +1042,7 @@ class Site(object):
                 else: #only date provided
                     dtobj = datetime.datetime(args[0].year,args[0].month,
                                               args[0].day,tzinfo=self.tz)
-                jd = calendar_to_jd(dtobj,tz=None)
+                jd = calendar_to_jd(dtobj,tz=None,twopart=True)
             else:
                 jd = args[0]
         elif len(args) == 4:
@@ -863,12 +1051,12 @@ class Site(object):
             min = int(np.floor(60*(time - hr)))
             sec = int(np.floor(60*(60*(time-hr) - min)))
             msec = int(np.floor(1e6*(60*(60*(time-hr) - min) - sec)))
-            jd = calendar_to_jd(datetime.datetime(year,month,day,hr,min,sec,msec,self.tz),tz=None)
+            jd = calendar_to_jd(datetime.datetime(year,month,day,hr,min,sec,msec,self.tz),tz=None,twopart=True)
         elif len(args) == 6:
             year,month,day,hr,min,sec = args
             msec = int(1e6*(sec - np.floor(sec)))
             sec = int(np.floor(sec))
-            jd = calendar_to_jd(datetime.datetime(year,month,day,hr,min,sec,msec,self.tz),tz=None)
+            jd = calendar_to_jd(datetime.datetime(year,month,day,hr,min,sec,msec,self.tz),tz=None,twopart=True)
         else:
             raise TypeError('invalid number of input arguments')
 
@@ -1932,7 +2120,23 @@ class Extinction(object):
     optical depth is desired, f should return (-2.5/log(10))*tau(lambda)
 
     A0 is the normalization factor that gets multiplied into the reddening law.
+    
+    Band-integrated values of the law (see :meth:`bandIntegral`) are cached for
+    each combination of law, law parameters (named in `_lawattrs`), and band,
+    and shared by all instances. When the cache is full, the least recently
+    used value is discarded.
     """
+    
+    #names of the attributes that change the shape of the extinction law
+    _lawattrs = ()
+    #cache of band-integrated law values shared by all Extinction objects,
+    #mapping keys to [value,last use]
+    _bandcache = {}
+    #maximum number of entries in _bandcache
+    _bandcachesize = 1000
+    #counter used to order the uses of _bandcache entries
+    _bandcacheuse = 0
+    
     def  __init__(self,f=None,A0=1):
         if f is not None:
             if not callable(f):
@@ -1976,6 +2180,121 @@ class Extinction(object):
         else:
             return -1*self.correctPhotometry(0,band)
 
+    def _lawKey(self):
+        """
+        Returns a hashable key that identifies the shape of this extinction law.
+        """
+        #the function itself (rather than its id) is used so that the key keeps
+        #it alive and a new function cannot match a stale entry
+        return (self.__class__,tuple([getattr(self,a) for a in self._lawattrs]),
+                self.__dict__.get('f',None))
+    
+    def bandIntegral(self,band):
+        """
+        Computes the extinction law (without the `A0` normalization) averaged
+        over a band, weighted by the band response.  Results are cached, so
+        later calls for the same law, law parameters, and band do not evaluate
+        the law.
+        
+        Note that this is the first-order (small extinction) approximation of
+        the band extinction - it does not depend on the source spectrum or the
+        amount of extinction.
+        
+        :param band: 
+            A :class:`astropysics.phot.Band` object, the name of a band in
+            :data:`astropysics.phot.bands`, or a wavelength in angstroms (in
+            which case the law is evaluated at that wavelength).
+        
+        :returns: The band-averaged extinction law value.
+        """
+        from .phot import Band,bands
+        
+        if isinstance(band,basestring):
+            bandkey = band
+        elif isinstance(band,Band):
+            bandkey = band
+        else:
+            bandkey = float(band)
+        key = (self._lawKey(),bandkey)
+        
+        cache = Extinction._bandcache
+        Extinction._bandcacheuse += 1
+        entry = cache.get(key,None)
+        if entry is not None:
+            entry[1] = Extinction._bandcacheuse
+            val = entry[0]
+        else:
+            if isinstance(band,basestring):
+                band = bands[band]
+            if isinstance(band,Band):
+                oldunit = band.unit
+                try:
+                    band.unit = 'wavelength-angstrom'
+                    x,S = band.x,band.S
+                finally:
+                    band.unit = oldunit
+                val = np.trapz(S*self.f(x),x)/np.trapz(S,x)
+            else:
+                val = self.f(bandkey)
+            while cache and len(cache) >= Extinction._bandcachesize:
+                del cache[min(cache,key=lambda k:cache[k][1])]
+            cache[key] = [val,Extinction._bandcacheuse]
+        return val
+    
+    @staticmethod
+    def clearBandCache():
+        """
+        Clears the cache of band-integrated extinction law values.
+        """
+        Extinction._bandcache.clear()
+    
+    def Aband(self,bands):
+        """
+        Determines the band-integrated extinction for this extinction law in
+        one or more bands (see :meth:`bandIntegral`).
+        
+        :param bands: A band or sequence of bands as accepted by
+                      :meth:`bandIntegral`.
+        
+        :returns: The extinction in magnitudes as a scalar or an array with one
+                  value for each band.
+        """
+        return self.A0*self._bandIntegrals(bands)
+    
+    def _bandIntegrals(self,bands):
+        #bandIntegral for a band or an array of them for a sequence of bands
+        if isinstance(bands,basestring) or np.isscalar(bands) or not hasattr(bands,'__iter__'):
+            return self.bandIntegral(bands)
+        return np.array([self.bandIntegral(b) for b in bands])
+    
+    def correctBandPhotometry(self,mags,bands,A0=None):
+        """
+        Uses the band-integrated extinction law to correct an array of
+        magnitudes in one or more bands.
+        
+        :param mags: 
+            The magnitudes to correct. The last axis must match `bands` if it is
+            a sequence.
+        :type mags: array-like
+        :param bands: A band or sequence of bands as accepted by
+                      :meth:`bandIntegral`.
+        :param A0: 
+            The normalization of the extinction law for each source, as a
+            scalar or an array matching `mags` without the band axis, or None to
+            use :attr:`A0`.
+        
+        :returns: The corrected magnitudes as an array of the same shape as
+                  `mags`.
+        """
+        mags = np.array(mags,copy=False)
+        if A0 is None:
+            A0 = self.A0
+        coeffs = self._bandIntegrals(bands)
+        A0 = np.array(A0,copy=False)
+        if np.ndim(coeffs) > 0:
+            A0 = A0[...,np.newaxis]
+        return mags-A0*coeffs
+    
     def correctColor(self,colors,bands):
         """
         Uses the supplied extinction law to correct a color (or array of colors)
@@ -2153,6 +2472,8 @@ class _EBmVExtinction(Extinction):
     Base class for Extinction classes that get normalization from E(B-V)
     """
 
+    _lawattrs = ('Rv',)
+    
     def __init__(self,EBmV=1,Rv=3.1):
         super(_EBmVExtinction,self).__init__(f=None,A0=1)
         self.Rv=Rv
@@ -2169,12 +2490,55 @@ class _EBmVExtinction(Extinction):
 
     def f(self,lamb):
         raise NotImplementedError
+    
+    def coefficientTable(self,bands):
+        """
+        Computes the band-integrated extinction per unit reddening,
+        A_band/E(B-V), for this law (see :meth:`bandIntegral`).  These depend
+        only on the law, its parameters, and the band, and are cached.
+        
+        :param bands: A band or sequence of bands as accepted by
+                      :meth:`bandIntegral`.
+        
+        :returns: A_band/E(B-V) as a scalar or an array with one value per band.
+        """
+        from .phot import bandwl
+        
+        return self.Rv*self._bandIntegrals(bands)/self.f(bandwl['V'])
+    
+    def correctBandPhotometry(self,mags,bands,EBmV=None):
+        """
+        Uses the band-integrated extinction law to correct an array of
+        magnitudes in one or more bands for reddening.
+        
+        :param mags: 
+            The magnitudes to correct. The last axis must match `bands` if it is
+            a sequence.
+        :type mags: array-like
+        :param bands: A band or sequence of bands as accepted by
+                      :meth:`bandIntegral`.
+        :param EBmV: 
+            The E(B-V) for each source, as a scalar or an array matching `mags`
+            without the band axis, or None to use :attr:`EBmV`.
+        
+        :returns: The corrected magnitudes as an array of the same shape as
+                  `mags`.
+        """
+        mags = np.array(mags,copy=False)
+        if EBmV is None:
+            EBmV = self.EBmV
+        coeffs = self.coefficientTable(bands)
+        EBmV = np.array(EBmV,copy=False)
+        if np.ndim(coeffs) > 0:
+            EBmV = EBmV[...,np.newaxis]
+        return mags-EBmV*coeffs
 
 class FMExtinction(_EBmVExtinction):
     """
     Base class for Extinction classes that use the form from
     Fitzpatrick & Massa 90
     """
+    _lawattrs = ('C1','C2','C3','C4','x0','gamma','Rv')
 
     def __init__(self,C1,C2,C3,C4,x0,gamma,EBmV=1,Rv=3.1):
         self.x0 = x0
@@ -2267,7 +2631,298 @@ class SMCExtinction(FMExtinction):
     def __init__(self,EBmV=.2,Rv=2.74):
         super(SMCExtinction,self).__init__(-4.959,2.264,0.389,0.461,4.6,1,EBmV,Rv)
 
-def get_SFD_dust(long,lat,dustmap='ebv',interpolate=True):
+class SFDDustMap(object):
+    """
+    Provides values from the Schlegel, Finkbeiner, and Davis 1998 extinction
+    maps.  The map files are opened once (memory-mapped) and kept open until
+    :meth:`close` is called, so repeated lookups only read the pixels that are
+    needed.  Objects can also be used as context managers, e.g.::
+    
+        with SFDDustMap('ebv') as dustmap:
+            ebv = dustmap(l,b)
+            
+    Spline interpolation requires spline coefficients for the whole map, which
+    are computed on the first interpolated lookup and kept for later lookups.
+    If `npycache` is True, the maps (converted to native byte order) and the
+    spline coefficients are saved as .npy files next to the FITS maps, and
+    later :class:`SFDDustMap` objects memory-map those directly.
+    """
+    
+    _mapfns = {'ebv':'SFD_dust_4096_%s.fits',
+               'eb-v':'SFD_dust_4096_%s.fits',
+               'e(b-v)':'SFD_dust_4096_%s.fits',
+               'i100':'SFD_i100_4096_%s.fits',
+               'x':'SFD_xmap_%s.fits',
+               't':'SFD_temp_%s.fits',
+               'mask':'SFD_mask_4096_%s.fits'}
+    
+    def __init__(self,dustmap='ebv',mapdir=None,npycache=False):
+        """
+        :param dustmap:
+            Either a filename (if '%s' appears in the string, it will be
+            replaced with 'ngp' or 'sgp'), or one of:
+            
+            * 'i100'
+                100-micron map in MJy/Sr
+            * 'x'
+                X-map, temperature-correction factor
+            * 't'
+                Temperature map in degrees Kelvin for n=2 emissivity
+            * 'ebv'
+                E(B-V) in magnitudes
+            * 'mask'
+                Mask values
+                
+        :type dustmap: string
+        :param mapdir: 
+            The directory the map files are in, or None for the current
+            directory.
+        :type mapdir: string or None
+        :param npycache: 
+            If True, native .npy copies of the maps and their spline
+            coefficients are stored alongside the FITS files and used in place
+            of them.
+        :type npycache: bool
+        """
+        import os
+        
+        if not isinstance(dustmap,basestring):
+            raise ValueError('dustmap is not a string')
+        mapfn = self._mapfns.get(dustmap.lower(),dustmap)
+        if mapdir is not None:
+            mapfn = os.path.join(mapdir,mapfn)
+            
+        if '%s' in mapfn:
+            self._poles = {1:mapfn%'ngp',-1:mapfn%'sgp'}
+        else:
+            polename = os.path.basename(mapfn).split('.')[0].split('_')[-1].lower()
+            if polename == 'ngp':
+                self._poles = {1:mapfn}
+            elif polename == 'sgp':
+                self._poles = {-1:mapfn}
+            else:
+                raise ValueError("couldn't determine South/North from filename - should have 'sgp' or 'ngp in it somewhere")
+            
+        self.dustmap = dustmap
+        self.ismask = mapfn == self._mapfns['mask'] or dustmap.lower() == 'mask'
+        self.npycache = npycache
+        self._maps = None
+        self._fitsfiles = []
+        self._coeffs = {}
+        
+    def __del__(self):
+        self.close()
+        
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self,exc_type,exc_val,exc_tb):
+        self.close()
+        
+    @property
+    def isopen(self):
+        """
+        True if the map files are currently open.
+        """
+        return self._maps is not None
+        
+    def open(self):
+        """
+        Opens the map files (if they are not already open).  This is done
+        automatically on the first lookup.
+        """
+        if self._maps is None:
+            maps = {}
+            try:
+                for n,fn in self._poles.iteritems():
+                    maps[n] = self._loadMap(fn)
+                    if maps[n].shape[0] != maps[n].shape[1]:
+                        raise ValueError('map dimensions not equal - incorrect map file %s?'%fn)
+            except:
+                self._closeFiles()
+                raise
+            self._maps = maps
+            
+    def close(self):
+        """
+        Closes the map files and discards any spline coefficients that are held
+        in memory.  The map will be re-opened if it is used again.
+        """
+        self._maps = None
+        self._coeffs = {}
+        self._closeFiles()
+        
+    def _closeFiles(self):
+        for f in self._fitsfiles:
+            f.close()
+        self._fitsfiles = []
+        
+    def _npyFn(self,fn,suffix=''):
+        import os
+        return os.path.splitext(fn)[0]+suffix+'.npy'
+    
+    def _npyCurrent(self,npyfn,fn):
+        import os
+        return os.path.exists(npyfn) and os.path.getmtime(npyfn) >= os.path.getmtime(fn)
+        
+    def _loadMap(self,fn):
+        import pyfits
+        
+        if self.npycache:
+            npyfn = self._npyFn(fn)
+            if not self._npyCurrent(npyfn,fn):
+                data = pyfits.getdata(fn)
+                np.save(npyfn,data.astype(data.dtype.newbyteorder('=')))
+            return np.load(npyfn,mmap_mode='r')
+        else:
+            f = pyfits.open(fn,memmap=True)
+            self._fitsfiles.append(f)
+            return f[0].data
+        
+    def getSplineCoeffs(self,n,order):
+        """
+        Gets the spline coefficients for one of the maps.
+        
+        :param n: 1 for the north galactic pole map or -1 for the south.
+        :type n: int
+        :param order: The order of the spline.
+        :type order: int
+        
+        :returns: The spline coefficients as a 2D array.
+        """
+        from scipy.ndimage import spline_filter
+        
+        self.open()
+        key = (n,order)
+        if key not in self._coeffs:
+            if self.npycache:
+                fn = self._poles[n]
+                npyfn = self._npyFn(fn,'_spline%i'%order)
+                if not self._npyCurrent(npyfn,fn):
+                    np.save(npyfn,spline_filter(np.array(self._maps[n],dtype=float),order))
+                self._coeffs[key] = np.load(npyfn,mmap_mode='r')
+            else:
+                self._coeffs[key] = spline_filter(np.array(self._maps[n],dtype=float),order)
+        return self._coeffs[key]
+    
+    def __call__(self,long,lat,interpolate=True):
+        """
+        Gets map values at the given galactic coordinates.
+        
+        :param long: Galactic longitude in degrees.
+        :type long: scalar or array-like
+        :param lat: Galactic latitude in degrees.
+        :type lat: scalar or array-like
+        :param interpolate: 
+            If True, a cubic spline is used to interpolate between pixels, if
+            an integer, it specifies the order of the interpolating spline, and
+            if False (or 0) the nearest pixel value is used. Mask maps are
+            never interpolated.
+        :type interpolate: bool or int
+        
+        :returns: The map values as a scalar or an array matching the inputs.
+        """
+        from numpy import sin,cos
+        
+        scalar = np.isscalar(long) and np.isscalar(lat)
+        l,b = np.broadcast_arrays(np.array(long,dtype=float,ndmin=1)*pi/180,
+                                  np.array(lat,dtype=float,ndmin=1)*pi/180)
+        
+        if interpolate is True:
+            order = 3
+        else:
+            order = int(interpolate)
+        if self.ismask:
+            order = 0
+        
+        self.open()
+        retval = np.empty(l.shape)
+        if len(self._maps) == 1:
+            n = self._maps.keys()[0]
+            if np.any(n*b < 0):
+                from warnings import warn
+                warn('using %s map for latitudes in the opposite hemisphere'%('ngp' if n==1 else 'sgp'))
+            masks = {n:np.ones(l.shape,dtype=bool)}
+        else:
+            masks = {1:b >= 0,-1:b < 0}
+            
+        for n,m in masks.iteritems():
+            if not np.any(m):
+                continue
+            mapd = self._maps[n]
+            npix = mapd.shape[0]
+            lm,bm = l[m],b[m]
+            
+            #project from galactic longitude/latitude to lambert pixels (see SFD98)
+            x = npix/2*cos(lm)*(1-n*sin(bm))**0.5+npix/2-0.5
+            y = -npix/2*n*sin(lm)*(1-n*sin(bm))**0.5+npix/2-0.5
+            #now remap indecies - numpy arrays have y and x convention switched from SFD98 appendix
+            x,y = y,x
+            
+            if order == 0:
+                xi = np.clip(np.round(x).astype(int),0,npix-1)
+                yi = np.clip(np.round(y).astype(int),0,npix-1)
+                retval[m] = mapd[xi,yi]
+            elif order == 1:
+                #bilinear interpolation directly on the map pixels, without
+                #extrapolating into the outer half of the edge pixels
+                x = np.clip(x,0,npix-1)
+                y = np.clip(y,0,npix-1)
+                x0 = np.clip(np.floor(x).astype(int),0,npix-2)
+                y0 = np.clip(np.floor(y).astype(int),0,npix-2)
+                dx,dy = x-x0,y-y0
+                retval[m] = mapd[x0,y0]*(1-dx)*(1-dy) + mapd[x0+1,y0]*dx*(1-dy) + \
+                            mapd[x0,y0+1]*(1-dx)*dy + mapd[x0+1,y0+1]*dx*dy
+            else:
+                from scipy.ndimage import map_coordinates
+                coeffs = self.getSplineCoeffs(n,order)
+                retval[m] = map_coordinates(coeffs,[x,y],order=order,
+                                            mode='nearest',prefilter=False)
+                
+        if scalar:
+            return retval[0]
+        return retval
+    
+    def radec(self,ra,dec,interpolate=True):
+        """
+        Gets map values at the given FK5 (J2000) equatorial coordinates. The
+        conversion to galactic coordinates is done for all points at once.
+        
+        :param ra: Right ascension in degrees.
+        :type ra: scalar or array-like
+        :param dec: Declination in degrees.
+        :type dec: scalar or array-like
+        :param interpolate: Interpolation type as for :meth:`__call__`.
+        
+        :returns: The map values as a scalar or an array matching the inputs.
+        """
+        l,b = _equatorial_to_galactic(ra,dec)
+        return self(l,b,interpolate)
+    
+_eqgalmatrix = None
+def _equatorial_to_galactic(ra,dec):
+    """
+    Converts arrays of FK5 J2000 ra/dec in degrees to galactic l/b in degrees
+    using the same rotation as :class:`astropysics.coords.GalacticCoordinates`.
+    """
+    global _eqgalmatrix
+    if _eqgalmatrix is None:
+        from .coords import FK5Coordinates,GalacticCoordinates
+        _eqgalmatrix = np.asarray(GalacticCoordinates._fromFK5(FK5Coordinates(epoch=2000)))
+        
+    ra = np.radians(np.array(ra,dtype=float))
+    dec = np.radians(np.array(dec,dtype=float))
+    cd = np.cos(dec)
+    v = np.array((cd*np.cos(ra),cd*np.sin(ra),np.sin(dec)))
+    xp,yp,zp = np.tensordot(_eqgalmatrix,v,axes=(1,0))
+    
+    l = np.degrees(np.arctan2(yp,xp))%360
+    b = np.degrees(np.arctan2(zp,np.hypot(xp,yp)))
+    return l,b
+
+_sfdmaps = {}
+def get_SFD_dust(long,lat,dustmap='ebv',interpolate=True,mapdir=None):
     """
     Gets map values from Schlegel, Finkbeiner, and Davis 1998 extinction maps.
 
@@ -2285,13 +2940,18 @@ def get_SFD_dust(long,lat,dustmap='ebv',interpolate=True):
     * 'mask'
         Mask values
 
-    For these forms, the files are assumed to lie in the current directory.
+    For these forms, the files are assumed to lie in `mapdir`, or the current
+    directory if it is None.
 
     Input coordinates are in degrees of galactic latiude and logitude - they can
     be scalars or arrays.
 
     if `interpolate` is an integer, it can be used to specify the order of the
     interpolating polynomial
+    
+    The maps are opened as :class:`SFDDustMap` objects the first time they are
+    used and kept open for later calls - use :func:`close_SFD_dust_maps` to
+    close them.
 
     .. todo::
         Check mask for SMC/LMC/M31, E(B-V)=0.075 mag for the LMC, 0.037 mag for
@@ -2299,121 +2959,29 @@ def get_SFD_dust(long,lat,dustmap='ebv',interpolate=True):
         tests. Also allow for other bands.
 
     """
-    from numpy import sin,cos,round,isscalar,array,ndarray,ones_like
-    from pyfits import open
-
-    if type(dustmap) is not str:
-        raise ValueError('dustmap is not a string')
-    dml=dustmap.lower()
-    if dml == 'ebv' or dml == 'eb-v' or dml == 'e(b-v)' :
-        dustmapfn='SFD_dust_4096_%s.fits'
-    elif dml == 'i100':
-        dustmapfn='SFD_i100_4096_%s.fits'
-    elif dml == 'x':
-        dustmapfn='SFD_xmap_%s.fits'
-    elif dml == 't':
-        dustmapfn='SFD_temp_%s.fits'
-    elif dml == 'mask':
-        dustmapfn='SFD_mask_4096_%s.fits'
-    else:
-        dustmapfn=dustmap
-
-    if isscalar(long):
-        l=array([long])*pi/180
-    else:
-        l=array(long)*pi/180
-    if isscalar(lat):
-        b=array([lat])*pi/180
-    else:
-        b=array(lat)*pi/180
-
-    if not len(l)==len(b):
-        raise ValueError('input coordinate arrays are of different length')
-
-
-
-    if '%s' not in dustmapfn:
-        f=open(dustmapfn)
-        try:
-            mapds=[f[0].data]
-        finally:
-            f.close()
-        assert mapds[-1].shape[0] == mapds[-1].shape[1],'map dimensions not equal - incorrect map file?'
-
-        polename=dustmapfn.split('.')[0].split('_')[-1].lower()
-        if polename=='ngp':
-            n=[1]
-            if sum(b > 0) > 0:
-                print 'using ngp file when lat < 0 present... put %s wherever "ngp" or "sgp" should go in filename'
-        elif polename=='sgp':
-            n=[-1]
-            if sum(b < 0) > 0:
-                print 'using sgp file when lat > 0 present... put %s wherever "ngp" or "sgp" should go in filename'
-        else:
-            raise ValueError("couldn't determine South/North from filename - should have 'sgp' or 'ngp in it somewhere")
-        masks = [ones_like(b).astype(bool)]
-    else: #need to do things seperately for north and south files
-        nmask = b >= 0
-        smask = ~nmask
-
-        masks = [nmask,smask]
-        ns = [1,-1]
-
-        mapds=[]
-        f=open(dustmapfn%'ngp')
-        try:
-            mapds.append(f[0].data)
-        finally:
-            f.close()
-        assert mapds[-1].shape[0] == mapds[-1].shape[1],'map dimensions not equal - incorrect map file?'
-        f=open(dustmapfn%'sgp')
-        try:
-            mapds.append(f[0].data)
-        finally:
-            f.close()
-        assert mapds[-1].shape[0] == mapds[-1].shape[1],'map dimensions not equal - incorrect map file?'
-
-    retvals=[]
-    for n,mapd,m in zip(ns,mapds,masks):
-        #project from galactic longitude/latitude to lambert pixels (see SFD98)
-        npix=mapd.shape[0]
-
-        x=npix/2*cos(l[m])*(1-n*sin(b[m]))**0.5+npix/2-0.5
-        y=-npix/2*n*sin(l[m])*(1-n*sin(b[m]))**0.5+npix/2-0.5
-        #now remap indecies - numpy arrays have y and x convention switched from SFD98 appendix
-        x,y=y,x
-
-        if interpolate:
-            from scipy.ndimage import map_coordinates
-            if type(interpolate) is int:
-                retvals.append(map_coordinates(mapd,[x,y],order=interpolate))
-            else:
-                retvals.append(map_coordinates(mapd,[x,y]))
-        else:
-            x=round(x).astype(int)
-            y=round(y).astype(int)
-            retvals.append(mapd[x,y])
-
-
-
-
-    if isscalar(long) or isscalar(lat):
-        for r in retvals:
-            if len(r)>0:
-                return r[0]
-        assert False,'None of the return value arrays were populated - incorrect inputs?'
-    else:
-        #now recombine the possibly two arrays from above into one that looks like  the original
-        retval=ndarray(l.shape)
-        for m,val in zip(masks,retvals):
-            retval[m] = val
-        return retval
+    key = (dustmap,mapdir)
+    dmap = _sfdmaps.get(key,None)
+    if dmap is None:
+        dmap = _sfdmaps[key] = SFDDustMap(dustmap,mapdir)
+    return dmap(long,lat,interpolate)
 
+def close_SFD_dust_maps():
+    """
+    Closes all dust maps that have been opened by :func:`get_SFD_dust` or
+    :func:`get_dust_radec`.
+    """
+    for dmap in _sfdmaps.values():
+        dmap.close()
+    _sfdmaps.clear()
 
-def get_dust_radec(ra,dec,dustmap,interpolate=True):
-    from .coords import equatorial_to_galactic
-    l,b = equatorial_to_galactic(ra,dec)
-    return get_SFD_dust(l,b,dustmap,interpolate)
+def get_dust_radec(ra,dec,dustmap='ebv',interpolate=True,mapdir=None):
+    """
+    Gets map values from Schlegel, Finkbeiner, and Davis 1998 extinction maps
+    at FK5 (J2000) equatorial coordinates `ra` and `dec` in degrees (scalars or
+    arrays). Other arguments are the same as for :func:`get_SFD_dust`.
+    """
+    l,b = _equatorial_to_galactic(ra,dec)
+    return get_SFD_dust(l,b,dustmap,interpolate,mapdir)
 
 
 
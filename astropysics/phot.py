@@ -1821,6 +1821,284 @@ class PhotometryBase(object):
         return self._magToFlux(self._totalflux)
 
 
+
+def _fast_fft_length(n):
+    """
+    Returns the smallest integer >= `n` with no prime factors other than 2, 3,
+    and 5 (these are the lengths numpy's FFT handles efficiently).
+    """
+    n = int(n)
+    if n <= 6:
+        return max(n,1)
+    best = 2**int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            #smallest power of 2 that brings p35 up to n
+            p = p35
+            while p < n:
+                p *= 2
+            if p < best:
+                best = p
+            p35 *= 3
+        p5 *= 5
+    return best
+
+class ConvolutionEngine(object):
+    """
+    Convolves 2D images (or stacks of 2D postage stamps) with a fixed 2D kernel,
+    choosing between direct convolution, FFT convolution, and FFT overlap-add
+    based on the size of the kernel and the image.
+    
+    The kernel spectra needed for the FFT methods are cached for each padded
+    transform shape, so repeated convolution of images with the same shape
+    only transforms the kernel once.  
+    
+    Edge handling matches :func:`scipy.ndimage.convolve` with the kernel
+    centered at index ``kernel.shape//2``: `mode` can be 'constant' (pixels
+    beyond the edge take the `background` value), 'nearest', 'reflect',
+    'mirror', or 'wrap', and the output has the same shape as the input.
+    """
+    
+    #kernels with fewer pixels than this are always convolved directly
+    directmaxsize = 25
+    #use overlap-add when the image is this many times larger than the kernel
+    #along both axes
+    overlapaddratio = 8
+    
+    _padmodes = {'nearest':'edge','reflect':'symmetric','mirror':'reflect',
+                 'wrap':'wrap'}
+    
+    def __init__(self,kernel,method='auto',mode='constant'):
+        """
+        :param kernel: The 2D convolution kernel.
+        :type kernel: 2D array
+        :param method: 
+            The convolution method to use.  Can be 'direct', 'fft',
+            'overlapadd', or 'auto' to pick based on the array sizes (see
+            :meth:`chooseMethod`).
+        :param mode: 
+            How the edges of the image are handled (see class documentation).
+        
+        """
+        self.kernel = kernel
+        self.method = method
+        self.mode = mode
+        
+    def _getKernel(self):
+        return self._kernel
+    def _setKernel(self,val):
+        kernel = np.array(val,dtype=float)
+        if len(kernel.shape) != 2:
+            raise ValueError('Supplied kernel is not 2D')
+        self._kernel = kernel
+        self.clearCache()
+    kernel = property(_getKernel,_setKernel,doc="""
+    The 2D kernel for this convolution engine.  Setting this clears the kernel
+    spectrum cache.
+    """)
+    
+    def _getMethod(self):
+        return self._method
+    def _setMethod(self,val):
+        if val not in ('auto','direct','fft','overlapadd'):
+            raise ValueError('invalid convolution method %s'%val)
+        self._method = val
+    method = property(_getMethod,_setMethod,doc="""
+    The convolution method - 'auto', 'direct', 'fft', or 'overlapadd'.
+    """)
+    
+    def _getMode(self):
+        return self._mode
+    def _setMode(self,val):
+        if val != 'constant' and val not in self._padmodes:
+            raise ValueError('invalid convolution edge mode %s'%val)
+        self._mode = val
+    mode = property(_getMode,_setMode,doc="""
+    The edge handling mode - 'constant', 'nearest', 'reflect', 'mirror', or 
+    'wrap'.
+    """)
+    
+    def clearCache(self):
+        """
+        Clears all cached kernel spectra.
+        """
+        self._kspeccache = {}
+        
+    @property
+    def cachedshapes(self):
+        """
+        A list of the FFT shapes for which the kernel spectrum is cached.
+        """
+        return self._kspeccache.keys()
+    
+    def chooseMethod(self,imshape):
+        """
+        Determines the convolution method that will be used for an image of the
+        given shape.
+        
+        :param imshape: The shape of the image to be convolved.
+        :type imshape: 2-tuple
+        
+        :returns: 'direct', 'fft', or 'overlapadd'
+        """
+        if self._method != 'auto':
+            return self._method
+        
+        kx,ky = self._kernel.shape
+        nx,ny = imshape[-2:]
+        if kx*ky <= self.directmaxsize:
+            return 'direct'
+        
+        #direct cost scales as image*kernel, FFT cost as padded*log(padded)
+        padsize = _fast_fft_length(nx+kx-1)*_fast_fft_length(ny+ky-1)
+        if nx*ny*kx*ky <= 4*padsize*np.log2(padsize):
+            return 'direct'
+        
+        r = self.overlapaddratio
+        if nx >= r*kx and ny >= r*ky:
+            return 'overlapadd'
+        return 'fft'
+    
+    def getKernelSpectrum(self,fftshape):
+        """
+        Computes the real FFT of the kernel zero-padded to the requested shape,
+        using the cached value if it is present.
+        
+        :param fftshape: The shape of the (padded) transform.
+        :type fftshape: 2-tuple
+        
+        :returns: The complex kernel spectrum as an array.
+        """
+        fftshape = tuple(fftshape)
+        kspec = self._kspeccache.get(fftshape,None)
+        if kspec is None:
+            kspec = np.fft.rfftn(self._kernel,fftshape,axes=(0,1))
+            self._kspeccache[fftshape] = kspec
+        return kspec
+    
+    def _pad(self,arr,background):
+        """
+        Pads the last two axes of `arr` following the edge mode, returning the
+        padded array and the size of the padding before the first element. For
+        'constant' mode, the background is subtracted instead and the
+        zero-padding is done by the FFT.
+        """
+        if self._mode == 'constant':
+            if background:
+                arr = arr - background
+            return arr,(0,0)
+        
+        kx,ky = self._kernel.shape
+        lx,ly = kx-1-kx//2,ky-1-ky//2
+        padw = [(0,0)]*(arr.ndim-2)+[(lx,kx//2),(ly,ky//2)]
+        return np.pad(arr,padw,mode=self._padmodes[self._mode]),(lx,ly)
+    
+    def _finish(self,res,background):
+        if self._mode == 'constant' and background:
+            res += background*np.sum(self._kernel)
+        return res
+    
+    def _convolveFFT(self,arr,background):
+        kx,ky = self._kernel.shape
+        nx,ny = arr.shape[-2:]
+        padded,(ox,oy) = self._pad(arr,background)
+        px,py = padded.shape[-2:]
+        fftshape = (_fast_fft_length(px+kx-1),_fast_fft_length(py+ky-1))
+        
+        kspec = self.getKernelSpectrum(fftshape)
+        axes = (-2,-1)
+        full = np.fft.irfftn(np.fft.rfftn(padded,fftshape,axes=axes)*kspec,
+                             fftshape,axes=axes)
+        
+        sx,sy = kx//2+ox,ky//2+oy
+        return self._finish(full[...,sx:sx+nx,sy:sy+ny],background)
+    
+    def _convolveOverlapAdd(self,arr,background):
+        kx,ky = self._kernel.shape
+        nx,ny = arr.shape[-2:]
+        padded,(ox,oy) = self._pad(arr,background)
+        px,py = padded.shape[-2:]
+        
+        #blocks are sized so that each block transform is a few times the 
+        #kernel along each axis and is a fast length
+        fftshape = (_fast_fft_length(4*kx),_fast_fft_length(4*ky))
+        bx,by = fftshape[0]-kx+1,fftshape[1]-ky+1
+        kspec = self.getKernelSpectrum(fftshape)
+        
+        axes = (-2,-1)
+        full = np.zeros(padded.shape[:-2]+(px+kx-1,py+ky-1))
+        for i in range(0,px,bx):
+            for j in range(0,py,by):
+                block = padded[...,i:i+bx,j:j+by]
+                fblock = np.fft.irfftn(np.fft.rfftn(block,fftshape,axes=axes)*kspec,
+                                       fftshape,axes=axes)
+                ex = min(fftshape[0],full.shape[-2]-i)
+                ey = min(fftshape[1],full.shape[-1]-j)
+                full[...,i:i+ex,j:j+ey] += fblock[...,:ex,:ey]
+                
+        sx,sy = kx//2+ox,ky//2+oy
+        return self._finish(full[...,sx:sx+nx,sy:sy+ny],background)
+    
+    def _convolveDirect(self,arr,background):
+        from scipy.ndimage import convolve
+        
+        if arr.ndim == 3:
+            kernel = self._kernel[np.newaxis]
+        else:
+            kernel = self._kernel
+        return convolve(arr,kernel,mode=self._mode,cval=background)
+    
+    def convolve(self,arr2d,background=0):
+        """
+        Convolves the kernel with the supplied image.
+        
+        :param arr2d: The image to convolve.
+        :type arr2d: 2D array
+        :param background: 
+            The value to assume beyond the edges of the image if `mode` is
+            'constant'.
+        
+        :returns: The convolved image as a 2D array of the same shape as `arr2d`
+        """
+        arr2d = np.array(arr2d,copy=False,dtype=float)
+        if len(arr2d.shape) != 2:
+            raise ValueError('convolve requires a 2D array')
+        return self._dispatch(arr2d,background)
+    
+    def convolveStamps(self,stamps,background=0):
+        """
+        Convolves the kernel with each of a stack of postage stamps (images of
+        the same size). The FFT methods transform all stamps at once using a
+        single cached kernel spectrum.
+        
+        :param stamps: The postage stamps to convolve, with the first axis
+                       indexing the stamp.
+        :type stamps: 3D array
+        :param background: 
+            The value to assume beyond the edges of the stamps if `mode` is
+            'constant'.
+        
+        :returns: The convolved stamps as a 3D array of the same shape as
+                  `stamps`.
+        """
+        stamps = np.array(stamps,copy=False,dtype=float)
+        if len(stamps.shape) != 3:
+            raise ValueError('convolveStamps requires a 3D array')
+        return self._dispatch(stamps,background)
+    
+    def _dispatch(self,arr,background):
+        method = self.chooseMethod(arr.shape)
+        if method == 'direct':
+            return self._convolveDirect(arr,background)
+        elif method == 'fft':
+            return self._convolveFFT(arr,background)
+        elif method == 'overlapadd':
+            return self._convolveOverlapAdd(arr,background)
+        else:
+            raise ValueError('invalid convolution method %s'%method)
+
     
 class PointSpreadFunction(object):
     """
@@ -1839,6 +2117,20 @@ class PointSpreadFunction(object):
         edges. 
         """
         raise NotImplementedError
+    
+    def convolveStamps(self,stamps,background=0):
+        """
+        Convolve this psf with each of a stack of equal-sized postage stamps.
+        
+        `stamps` is a 3D array with the first axis indexing the stamp, and
+        background is as for :meth:`convolve`. Subclasses should override this
+        if they can do the convolution for all stamps at once - by default it
+        just calls :meth:`convolve` on each stamp.
+        """
+        stamps = np.array(stamps,copy=False)
+        if len(stamps.shape) != 3:
+            raise ValueError('convolveStamps requires a 3D array')
+        return np.array([self.convolve(st,background) for st in stamps])
         
     @abstractmethod
     def fit(self,arr2d):
@@ -1848,44 +2140,66 @@ class PointSpreadFunction(object):
         raise NotImplementedError
     
 class KernelPointSpreadFunction(PointSpreadFunction):
-    def __init__(self,kernelarr2d):
-        self.kernel = kernelarr2d
-        self.fftconvolve = False
-        self.convmode = 'constant'
+    """
+    A PSF specified by a 2D kernel array.  Convolution is done by a 
+    :class:`ConvolutionEngine`, so the kernel spectrum is cached for each image
+    shape.
+    """
+    def __init__(self,kernelarr2d,convmethod='auto',convmode='constant'):
+        self._engine = ConvolutionEngine(kernelarr2d,convmethod,convmode)
         
     def _getKernel(self):
-        return self._kernel
+        return self._engine.kernel
     def _setKernel(self,val):
-        kernel = np.array(val)
-        if len(self.kernel.shape) != 2:
-            raise ValueError('Supplied kernel is not 2D')
-        self._kernel = kernel
-        self._Kft = None
-    kernel = property(_getKernel,_setKernel,doc=None)        
+        self._engine.kernel = val
+    kernel = property(_getKernel,_setKernel,doc=None)
+    
+    def _getConvmethod(self):
+        return self._engine.method
+    def _setConvmethod(self,val):
+        self._engine.method = val
+    convmethod = property(_getConvmethod,_setConvmethod,doc="""
+    The convolution method - see :attr:`ConvolutionEngine.method`.
+    """)
+    
+    def _getConvmode(self):
+        return self._engine.mode
+    def _setConvmode(self,val):
+        self._engine.mode = val
+    convmode = property(_getConvmode,_setConvmode,doc="""
+    The edge handling mode - see :attr:`ConvolutionEngine.mode`.
+    """)
+    
+    def _getFftconvolve(self):
+        return self._engine.method == 'fft'
+    def _setFftconvolve(self,val):
+        self._engine.method = 'fft' if val else 'direct'
+    fftconvolve = property(_getFftconvolve,_setFftconvolve,doc="""
+    If True, always use FFT convolution, if False always convolve directly.  
+    Superseded by :attr:`convmethod`.
+    """)
     
     def convolve(self,arr2d,background=0):
-        if self.fftconvolve:
-            fft = np.fft.fftn
-            ifft = np.fft.ifftn
-            
-            if self._Kft is None:
-                self._Kft = K = fft(self._kernel)
-            else:
-                K = self._Kft
-            return np.fft.ifftshift(ifft(fft(arr2d)*K))
-        else:
-            from scipy.ndimage import convolve
-            return convolve(arr2d,self._kernel,mode=self.convmode,cval=background)
+        return self._engine.convolve(arr2d,background)
+    
+    def convolveStamps(self,stamps,background=0):
+        return self._engine.convolveStamps(stamps,background)
     
     def fit(self,arr2d):
         self.kernel = arr2d
     
 class ModelPointSpreadFunction(PointSpreadFunction):
+    """
+    A PSF specified by a 2D model.  The model is pixelized to generate the
+    convolution kernel, and the kernel (along with its spectra) is reused until
+    the model parameters or the kernel size change.
+    """
     def __init__(self,model):
         self.model = model
         self.convsize = None
         self.convsampling = None
         self.convmode = 'constant'
+        self.convmethod = 'auto'
         
     def _getModel(self):
         return self._mod
@@ -1893,21 +2207,39 @@ class ModelPointSpreadFunction(PointSpreadFunction):
         from .models import get_model_instance,FunctionModel2DScalar
         self._mod = get_model_instance(val,FunctionModel2DScalar)
         self._mod.incoordsys = 'polar'
+        self._engine = self._enginekey = None
     model = property(_getModel,_setModel,doc=None)
     
-    
-    def convolve(self,arr2d,background=False):
-        from scipy.ndimage import convolve
+    def getEngine(self,shape):
+        """
+        Returns the :class:`ConvolutionEngine` for an image of the given shape,
+        re-pixelizing the model only if the kernel size, sampling, or model
+        parameters have changed since the last call.
+        """
         if self.convsize is None:
-            nx,ny = arr2d.shape
+            nx,ny = shape[-2:]
         else:
             if np.isscalar(self.convsize):
                 nx = ny = self.convsize
             else:
                 nx,ny = self.convsize
-            
-        k = self.model.pixelize(-nx/2,nx/2,-ny/2,ny/2,nx,ny,sampling=self.convsampling)
-        return convolve(arr2d,k,mode=self.convmode,cval=background)
+                
+        key = (nx,ny,self.convsampling,tuple(self._mod.parvals))
+        if self._engine is None or key != self._enginekey:
+            k = self._mod.pixelize(-nx/2,nx/2,-ny/2,ny/2,nx,ny,sampling=self.convsampling)
+            self._engine = ConvolutionEngine(k)
+            self._enginekey = key
+        self._engine.method = self.convmethod
+        self._engine.mode = self.convmode
+        return self._engine
+    
+    def convolve(self,arr2d,background=0):
+        arr2d = np.array(arr2d,copy=False)
+        return self.getEngine(arr2d.shape).convolve(arr2d,background)
+    
+    def convolveStamps(self,stamps,background=0):
+        stamps = np.array(stamps,copy=False)
+        return self.getEngine(stamps.shape).convolveStamps(stamps,background)
     
     def fit(self,arr2d,**kwargs):
         """
@@ -1920,6 +2252,11 @@ class ModelPointSpreadFunction(PointSpreadFunction):
         self.model.fitData([x,y],arr2d,**kwargs)
     
 class GaussianPointSpreadFunction(PointSpreadFunction):
+    """
+    A circular gaussian PSF.  Convolution uses the separable 
+    :func:`scipy.ndimage.gaussian_filter`, which is always faster than a
+    generic kernel convolution.
+    """
     def __init__(self,sigma=1):
         self.sigma = sigma
         self.convmode = 'constant'
@@ -1936,6 +2273,14 @@ class GaussianPointSpreadFunction(PointSpreadFunction):
         from scipy.ndimage import gaussian_filter
         return gaussian_filter(arr2d,self.sigma,mode=self.convmode,cval=background)
     
+    def convolveStamps(self,stamps,background=0):
+        from scipy.ndimage import gaussian_filter
+        if np.isscalar(self.sigma):
+            sigma = (0,self.sigma,self.sigma)
+        else:
+            sigma = (0,)+tuple(self.sigma)
+        return gaussian_filter(stamps,sigma,mode=self.convmode,cval=background)
+    
     def fit(self,arr2d):
         """
         fits the image using a moment analysis - returns
@@ -2164,6 +2509,7 @@ class IsophotalEllipse(object):
                 raise ValueError('2D image data not provided')
         self._imdata = val
         self._fitted = False
+        self._splinecoeffs = {}
     imdata = property(_getImdata,_setImdata)
     
     def _getFitpoints(self):
@@ -2269,9 +2615,9 @@ class IsophotalEllipse(object):
             self._phi += pi/2
             
         if self._phi >= 2*pi:
-            self.phi -= 2*pi*np.floor(self.phi/2/pi)
+            self._phi -= 2*pi*np.floor(self._phi/2/pi)
         elif self._phi < 0:
-            self._phi += 2*pi*np.floor(-self.phi/2/pi)
+            self._phi += 2*pi*np.ceil(-self._phi/2/pi)
         
         self._fitted = True
         
@@ -2289,6 +2635,108 @@ class IsophotalEllipse(object):
             res = map_coordinates(1-self._level/self._imdata,self.cartesian(self._fitpoints),mode='nearest')
         return res
     
+    def _getSplineCoeffs(self,order):
+        """
+        Returns the spline coefficients of the image for the given order,
+        computing them only if they have not been computed since the image was
+        last set.
+        """
+        from scipy.ndimage import spline_filter
+        
+        coeffs = self._splinecoeffs.get(order,None)
+        if coeffs is None:
+            if order > 1:
+                coeffs = spline_filter(self._imdata.astype(float),order=order)
+            else:
+                coeffs = self._imdata.astype(float)
+            self._splinecoeffs[order] = coeffs
+        return coeffs
+    
+    def fitProfile(self,isolevels,npoints=None,order=3):
+        """
+        Fits ellipses for a sequence of isophote levels in one pass.
+        
+        The first level is fit the same way as a single isophote (see
+        :attr:`isolevel`), and each subsequent ellipse starts from the best fit
+        of the previous level.  These fits sample the image along the ellipse
+        using spline coefficients of the image that are computed once and
+        shared by all the levels (and by later calls with the same image).
+        
+        :param isolevels: 
+            The image levels of the isophotes to fit - these should be in
+            order from the center outwards (usually decreasing) so that the
+            previous ellipse is a good starting point for the next.
+        :type isolevels: array-like
+        :param npoints: 
+            The number of points along the ellipse at which to sample the image
+            or None to use :attr:`nfitpoints`.
+        :type npoints: int or None
+        :param order: The order of the spline used to interpolate the image.
+        :type order: int
+        
+        :returns: 
+            A record array with one entry per level and fields 'level', 'a'
+            (semi-major axis), 'b' (semi-minor axis), 'ellipticity' (1-b/a),
+            'phi' (rotation angle, from 0 to pi), 'x0', 'y0', and 'ier' (the
+            :func:`scipy.optimize.leastsq` status - 1 to 4 indicate success).
+            
+        After this method completes, the ellipse for this object is the one
+        for the last level.
+        """
+        from scipy.optimize import leastsq
+        from scipy.ndimage import map_coordinates
+        from math import pi
+        
+        isolevels = np.array(isolevels,copy=False,dtype=float).ravel()
+        npoints = self._fitpoints if npoints is None else npoints
+        coeffs = self._getSplineCoeffs(order)
+        
+        th = np.linspace(0,2*pi,npoints,endpoint=False)
+        costh,sinth = np.cos(th),np.sin(th)
+        
+        def resid(vals,level,cen):
+            a,b,phi = np.abs(vals[0]),np.abs(vals[1]),vals[2]
+            x0,y0 = cen if cen is not None else vals[3:]
+            aterm = a*(sinth*np.cos(phi)-costh*np.sin(phi))
+            bterm = b*(costh*np.cos(phi)+sinth*np.sin(phi))
+            r = a*b*(aterm*aterm+bterm*bterm)**-0.5
+            coords = np.array((r*costh+x0,r*sinth+y0))
+            imvals = map_coordinates(coeffs,coords,order=order,mode='nearest',
+                                     prefilter=False)
+            return imvals-level
+        
+        res = np.empty(isolevels.size,dtype=[('level',float),('a',float),
+                       ('b',float),('ellipticity',float),('phi',float),
+                       ('x0',float),('y0',float),('ier',int)])
+        
+        for i,level in enumerate(isolevels):
+            if i == 0:
+                self.isolevel = level
+                self._fitEllipse()
+            
+            if self._fixcen:
+                cen = (self._x0,self._y0)
+                v0 = [self._a,self._b,self._phi]
+            else:
+                cen = None
+                v0 = [self._a,self._b,self._phi,self._x0,self._y0]
+            soln,ier = leastsq(resid,v0,args=(level,cen))
+            
+            a,b,phi = np.abs(soln[0]),np.abs(soln[1]),soln[2]
+            x0,y0 = cen if cen is not None else soln[3:]
+            if a < b:
+                a,b = b,a
+                phi += pi/2
+            phi = phi % pi #the ellipse is symmetric under rotation by pi
+            
+            res[i] = (level,a,b,1-b/a,phi,x0,y0,ier)
+            self._a,self._b,self._phi,self._x0,self._y0 = a,b,phi,x0,y0
+        
+        self._level = isolevels[-1]
+        self.lastier = res['ier'][-1]
+        self._fitted = True
+        return res.view(np.recarray)
+    
     @property    
     def e(self):
         """
@@ -2365,6 +2813,7 @@ class ModelPhotometry(object):
         self.magzpt = magzpt #TODO: get from a band/image?
         
     normparam = ('A','Ae')
+    lastbatch = None
         
     def _getModel(self):
         return self._model
@@ -2373,8 +2822,25 @@ class ModelPhotometry(object):
         self._model = get_model_instance(val,FunctionModel2DScalar)
     model = property(_getModel,_setModel)
     
-    def fitPhot(self,im):
-        raise NotImplementedError
+    def fitPhot(self,im,scale=1,**kwargs):
+        """
+        Fits the model to an image, treating the image as it would be generated
+        by :meth:`simulate` with direct sampling (i.e. centered on the origin
+        and with pixels of size `scale`).
+        
+        `im` is the 2D image array and `scale` is either a scalar giving the
+        pixel scale or a 2-sequence (xscale,yscale) as units/pixel. kwargs are
+        passed into the model's `fitData` method.
+        
+        :returns: The best-fit parameter values (also set on :attr:`model`).
+        """
+        im = np.array(im,copy=False)
+        if len(im.shape) != 2:
+            raise ValueError('2D image data not provided')
+        
+        xscale,yscale = (scale,scale) if np.isscalar(scale) else scale
+        grid,da = _stamp_grid(im.shape[0],im.shape[1],xscale,yscale,1)
+        return self._model.fitData(grid,im.ravel()/da,**kwargs)
     
     def _getTotalflux(self):
         return self._model.integrateCircular(np.inf)
@@ -2409,6 +2875,35 @@ class ModelPhotometry(object):
         """
         return self.model.getFluxRadius(0.5,True,**kwargs)
     
+    @staticmethod
+    def _getSimulationPSF(psf,xscale,yscale):
+        """
+        Converts the `psf` argument of :meth:`simulate` into a
+        :class:`PointSpreadFunction`. PSFs made from a FWHM or a 2D array treat
+        the edges of the image as 'nearest', while :class:`PointSpreadFunction`
+        objects are returned unchanged and keep their own edge handling (the
+        `convmode` attribute of the built-in PSF classes, 'constant' by
+        default).
+        """
+        if isinstance(psf,PointSpreadFunction):
+            return psf
+        
+        psf = np.array(psf,copy=False)
+        if len(psf.shape)<2:
+            sigtofwhm = 2*np.sqrt(2*np.log(2))
+            if len(psf.shape)==0:
+                xpsf = ypsf = psf
+            else:
+                xpsf,ypsf = psf
+            psfobj = GaussianPointSpreadFunction((xpsf/xscale/sigtofwhm,
+                                                  ypsf/yscale/sigtofwhm))
+        elif len(psf.shape)==2:
+            psfobj = KernelPointSpreadFunction(psf/np.sum(psf))
+        else:
+            raise ValueError('input psf not valid')
+        psfobj.convmode = 'nearest'
+        return psfobj
+    
     def simulate(self,pixels,scale=1,background=0,noise=None,psf=None,sampling=None):
         """
         Simulate how this model would appear on an image. 
@@ -2441,8 +2936,14 @@ class ModelPhotometry(object):
           
         `psf` is the point-spread function to be applied before the noise,
         either a scalar/2-tuple for a gaussian PSF (specifies the FWHM in actual
-        units, not pixels), or a 2D measured PSF to convolve with the model. If
-        None, no psf will be included.
+        units, not pixels), a 2D measured PSF to convolve with the model, or a
+        :class:`PointSpreadFunction` object. If None, no psf will be included.
+        Measured PSFs are convolved with a :class:`ConvolutionEngine`, so
+        passing the same :class:`KernelPointSpreadFunction` to repeated calls
+        reuses the cached kernel spectrum. The edges of the image are treated
+        as 'nearest' for gaussian and 2D array PSFs, while
+        :class:`PointSpreadFunction` objects keep their own edge handling (e.g.
+        the `convmode` of :class:`KernelPointSpreadFunction`).
         
         `sampling` is passed into the model's `pixelize` method (see
         :meth:`FunctionModel2DScalar.pixelize`)
@@ -2467,28 +2968,9 @@ class ModelPhotometry(object):
         m = self._model
         modim = m.pixelize(-xsize/2,xsize/2,-ysize/2,ysize/2,nx,ny,sampling)
         
-        if psf: #TODO:generalize PSF in superclass
-            psf = np.array(psf,copy=False)
-            if len(psf.shape)==0:
-                from scipy.ndimage import gaussian_filter
-                sigtofwhm = 2*np.sqrt(2*np.log(2))
-                sigmas = (psf/xscale/sigtofwhm,psf/yscale/sigtofwhm)
-                modim = gaussian_filter(modim,sigmas,mode='nearest')
-                
-            elif len(psf.shape)==1:
-                from scipy.ndimage import gaussian_filter
-                sigtofwhm = 2*np.sqrt(2*np.log(2))
-                xpsf,ypsf = psf
-                sigmas = (xpsf/xscale/sigtofwhm,ypsf/yscale/sigtofwhm)
-                modim = gaussian_filter(modim,sigmas,mode='nearest')
-                
-            elif len(psf.shape)==2:
-                from scipy.ndimage import convolve
-                normpdf = psf/np.sum(psf)
-                modim = convolve(modim,normpsf,mode='nearest')
-                
-            else:
-                raise ValueError('input psf not valid')
+        if psf is not None:
+            psf = self._getSimulationPSF(psf,xscale,yscale)
+            modim = psf.convolve(modim)
             
         if background:
             modim += background
@@ -2503,8 +2985,260 @@ class ModelPhotometry(object):
                 
         return modim
     
+    def _batchParams(self,params,n=None):
+        """
+        Converts a mapping or structured array of parameter values into a list
+        of 1D arrays, one for each model parameter, of length `n` (or inferred
+        from `params` if `n` is None).  Parameters that are not present take
+        the model's current value.
+        """
+        m = self._model
+        if params is None:
+            params = {}
+        elif not hasattr(params,'keys'):
+            params = np.array(params,copy=False)
+            if params.dtype.names is None:
+                raise TypeError('batch parameters must be a mapping or a structured array')
+            params = dict([(k,params[k]) for k in params.dtype.names])
+            
+        for k in params:
+            if k not in m.params:
+                raise KeyError('model has no parameter %s'%k)
+            
+        if n is None:
+            sizes = [np.size(v) for v in params.values() if not np.isscalar(v)]
+            n = max(sizes) if len(sizes)>0 else 1
+            
+        cols = []
+        for p,default in zip(m.params,m.parvals):
+            col = np.array(params.get(p,default),dtype=float)
+            if col.shape == ():
+                col = np.repeat(col,n)
+            elif col.shape != (n,):
+                raise ValueError('parameter %s does not have %i values'%(p,n))
+            cols.append(col)
+        return cols
+    
+    def simulateBatch(self,params,pixels,scale=1,background=0,noise=None,
+                      psf=None,sampling=1,seed=None,out=None,chunksize=256):
+        """
+        Simulate many postage stamps of this model with different parameters.
+        
+        All of the stamps share one pixel grid, which is transformed into the
+        model's coordinate system once, and the model is evaluated for a chunk
+        of stamps at a time by broadcasting the parameters.  If the model
+        function does not broadcast, it is evaluated one stamp at a time.
+        The PSF is applied to all stamps at once with
+        :meth:`PointSpreadFunction.convolveStamps`.
+        
+        `params` gives the model parameters for each stamp - either a
+        dictionary mapping parameter names to arrays (or scalars to use for all
+        stamps) or a structured array with fields named for the parameters. Any
+        parameters not given take the current value from :attr:`model`.
+        
+        `pixels`, `scale`, `background`, and `psf` are the same as for
+        :meth:`simulate`, except that `pixels` cannot be a 2D array.
+        
+        `noise` is the same as for :meth:`simulate`, except that the random
+        numbers are generated from a :class:`numpy.random.RandomState` seeded
+        with `seed` (so the same seed gives identical noise), and callables are
+        called as noise(imagearr2d) for each stamp.
+        
+        `sampling` is the number of virtual pixels per pixel along each axis
+        (integration is not available for batches). 
+        
+        `out` is a 3D array of shape (nstamps,npixx,npixy) to store the result
+        in, or None to create a new array.
+        
+        `chunksize` is the number of stamps to evaluate the model on at once -
+        larger values are faster but use more memory.
+        
+        :returns: 
+            A 3D array of the stamps with the first axis indexing the stamp.
+            The number of stamps and the time taken are stored in the
+            :attr:`lastbatch` dictionary.
+        """
+        from time import time
+        
+        t0 = time()
+        if len(np.shape(pixels))==0:
+            nx = ny = int(pixels)
+        elif len(np.shape(pixels))==1:
+            nx,ny = np.array(pixels).astype(int)
+        else:
+            raise ValueError('Invalid input for pixels')
+        xscale,yscale = (scale,scale) if np.isscalar(scale) else scale
+        
+        if out is not None:
+            cols = self._batchParams(params,out.shape[0])
+        else:
+            cols = self._batchParams(params)
+        n = cols[0].size
+        
+        if out is None:
+            out = np.empty((n,nx,ny))
+        elif out.shape != (n,nx,ny):
+            raise ValueError('out array does not match the stamp size and number')
+        
+        sampling = max(int(sampling),1)
+        grid,da = _stamp_grid(nx,ny,xscale,yscale,sampling)
+        m = self._model
+        fgrid = m.transformCoordinates(grid,'cartesian')
+        bgrid = np.array(fgrid,copy=False)[:,np.newaxis,:]
+        
+        vectorized = True
+        for i in range(0,n,chunksize):
+            chunk = [c[i:i+chunksize] for c in cols]
+            nc = chunk[0].size
+            vals = None
+            if vectorized:
+                try:
+                    vals = m.f(bgrid,*[c[:,np.newaxis] for c in chunk])
+                    if np.shape(vals) != (nc,grid.shape[1]):
+                        vals = None
+                except Exception:
+                    vals = None
+                vectorized = vals is not None
+            if vals is None:
+                vals = np.array([m.f(fgrid,*pars) for pars in zip(*chunk)])
+                
+            vals = vals.reshape((nc,nx*sampling,ny*sampling))
+            if sampling > 1:
+                vals = vals.reshape((nc,nx*sampling,ny,sampling)).mean(axis=-1)
+                vals = vals.reshape((nc,nx,sampling,ny)).mean(axis=-2)
+            out[i:i+nc] = vals*da
+            
+        if psf is not None:
+            psf = self._getSimulationPSF(psf,xscale,yscale)
+            out[:] = psf.convolveStamps(out)
+            
+        if background is not None and np.any(background):
+            out += background
+            
+        if noise is not None:
+            rng = np.random.RandomState(seed)
+            if callable(noise):
+                for i in range(n):
+                    out[i] = noise(out[i])
+            elif isinstance(noise,basestring):
+                if noise == 'poisson':
+                    out[:] = rng.poisson(out)
+                else:
+                    raise ValueError('invalid noise type %s'%noise)
+            else:
+                out += rng.normal(size=out.shape)*noise
+                
+        dt = time()-t0
+        self.lastbatch = {'nstamps':n,'time':dt,'rate':n/dt if dt>0 else np.inf}
+        return out
+    
+    def fitBatch(self,stamps,scale=1,params0=None,nprocs=None,chunksize=16,
+                 **kwargs):
+        """
+        Fits the model to each of a stack of postage stamps (as generated by
+        :meth:`simulateBatch`) using a pool of worker processes.  The model
+        itself is not altered.
+        
+        `stamps` is a 3D array with the first axis indexing the stamp and
+        `scale` is the pixel scale as for :meth:`fitPhot`.
+        
+        `params0` are the initial guesses for the parameters, in any form 
+        accepted by :meth:`simulateBatch`, or None to start all fits from the
+        current model parameters.
+        
+        `nprocs` is the number of processes to use - if None, it will be the
+        number of CPUs, and if 1, the fits are done in this process. 
+        `chunksize` is the number of stamps sent to a worker at a time.
+        
+        kwargs are passed into the model's `fitData` method.
+        
+        :returns: 
+            A structured array with a field for each model parameter and a
+            boolean field 'success' that is False for fits that raised an
+            exception (the parameters for these are NaN). The number of stamps,
+            the time taken, and the number of failed fits are stored in the
+            :attr:`lastbatch` dictionary.
+        """
+        from time import time
+        from copy import deepcopy
+        
+        t0 = time()
+        stamps = np.array(stamps,copy=False)
+        if len(stamps.shape) != 3:
+            raise ValueError('fitBatch requires a 3D array of stamps')
+        n,nx,ny = stamps.shape
+        
+        xscale,yscale = (scale,scale) if np.isscalar(scale) else scale
+        grid,da = _stamp_grid(nx,ny,xscale,yscale,1)
+        p0s = np.array(self._batchParams(params0,n)).T
+        
+        model = deepcopy(self._model)
+        tasks = ((st.ravel()/da,p0) for st,p0 in zip(stamps,p0s))
+        
+        if nprocs == 1:
+            _batch_fit_init(model,grid,kwargs)
+            results = [_batch_fit_stamp(t) for t in tasks]
+        else:
+            from multiprocessing import Pool
+            
+            pool = Pool(nprocs,_batch_fit_init,(model,grid,kwargs))
+            try:
+                results = list(pool.imap(_batch_fit_stamp,tasks,chunksize))
+            finally:
+                pool.close()
+                pool.join()
+        
+        pnames = list(self._model.params)
+        res = np.empty(n,dtype=[(p,float) for p in pnames]+[('success',bool)])
+        for i,r in enumerate(results):
+            res['success'][i] = r is not None
+            for p,v in zip(pnames,np.nan*np.ones(len(pnames)) if r is None else r):
+                res[p][i] = v
+        
+        dt = time()-t0
+        self.lastbatch = {'nstamps':n,'time':dt,'rate':n/dt if dt>0 else np.inf,
+                          'nfailed':int(np.sum(~res['success']))}
+        return res
+    
+    
+
 
+def _stamp_grid(nx,ny,xscale,yscale,sampling):
+    """
+    Generates the (2,N) cartesian grid used to render or fit a postage stamp
+    of nx X ny pixels centered on the origin, matching the grid used by
+    :meth:`FunctionModel2DScalar.pixelize`.  Returns the grid and the area of a
+    pixel.
+    """
+    xu,yu = nx*xscale/2,ny*yscale/2
+    da = xscale*yscale
+    s = max(int(sampling),1)
+    xg,yg = np.mgrid[-xu:xu:1j*nx*s,-yu:yu:1j*ny*s]
+    return np.array((xg.ravel(),yg.ravel())),da
 
+_batchfitstate = None
+def _batch_fit_init(model,grid,kwargs):
+    """
+    Initializer for :meth:`ModelPhotometry.fitBatch` worker processes - stores
+    the model and pixel grid so they are only sent once per worker.
+    """
+    global _batchfitstate
+    _batchfitstate = (model,grid,kwargs)
+    
+def _batch_fit_stamp(args):
+    """
+    Fits one postage stamp for :meth:`ModelPhotometry.fitBatch`.  Returns the
+    parameter values or None if the fit failed.
+    """
+    model,grid,kwargs = _batchfitstate
+    stamp,p0 = args
+    model.parvals = p0
+    try:
+        return np.array(model.fitData(grid,stamp,savedata=False,**kwargs))
+    except Exception:
+        return None
+    
+    
 class SExtractor(object):
     """
     This class is an adaptor to the Sextractor program 
@@ -2515,9 +3249,36 @@ class SExtractor(object):
     
     output parameters are chosen by setting True/False values in the 
     params dictionary
+    
+    The program that is run is set by :attr:`executable` - use 
+    :meth:`setExecutable` to change it.
 
     """
     
+    #: The name or path of the sextractor executable
+    executable = 'sex'
+    
+    @staticmethod
+    def setExecutable(executable):
+        """
+        Sets the sextractor program to use and reloads the default options and
+        parameters from it.  This can be used to select a sextractor
+        installation that is not on the path or a stand-in program for testing.
+        
+        :param executable: The name or path of the sextractor program.
+        :type executable: string
+        
+        :except OSError: If the executable could not be run.
+        """
+        oldexec = SExtractor.executable
+        SExtractor.executable = executable
+        try:
+            SExtractor._getSexDefaults()
+            SExtractor._sexbinpresent = True
+        except OSError:
+            SExtractor.executable = oldexec
+            raise
+    
     @staticmethod
     def _getSexDefaults():
         from subprocess import Popen,PIPE
@@ -2529,12 +3290,13 @@ class SExtractor(object):
         parorder = []
         
         try:
-            pconf = Popen('sex -dd'.split(),executable='sex',stdout=PIPE,stderr=PIPE)
-            pparm = Popen('sex -dp'.split(),executable='sex',stdout=PIPE,stderr=PIPE)
+            sexbin = SExtractor.executable
+            pconf = Popen([sexbin,'-dd'],stdout=PIPE,stderr=PIPE)
+            pparm = Popen([sexbin,'-dp'],stdout=PIPE,stderr=PIPE)
             confstr = pconf.communicate()[0]
             parmstr = pparm.communicate()[0]
         except OSError:
-            raise OSError('Sextractor not found on system path')
+            raise OSError('Sextractor executable %s not found'%SExtractor.executable)
         
         comm = ''
         newk = k = None
@@ -2675,8 +3437,10 @@ class SExtractor(object):
             f.write(pstr)
                 
     
-    def _makeOptionStr(self):
-        ostr = [o+'\t'+str(self.options[o])+'\t # '+SExtractor._optinfo[o] for o in self._optorder]
+    def _makeOptionStr(self,options=None):
+        if options is None:
+            options = self.options
+        ostr = [o+'\t'+str(options[o])+'\t # '+SExtractor._optinfo[o] for o in self._optorder]
         ostr = '\n'.join(ostr)
         return ostr
         
@@ -2732,10 +3496,10 @@ class SExtractor(object):
                 
         self._saveFiles(fnbase)
         if analysisimfn:
-            clstr = 'sex {0} {1} -c {2}'.format(detimfn,analysisimfn,self.name+'.sex')
+            clstr = '{0} {1} {2} -c {3}'.format(self.executable,detimfn,analysisimfn,self.name+'.sex')
         else:
-            clstr = 'sex {0} -c {1}'.format(detimfn,self.name+'.sex')
-        proc = Popen(clstr.split(),executable='sex',stdout=PIPE,stderr=PIPE)
+            clstr = '{0} {1} -c {2}'.format(self.executable,detimfn,self.name+'.sex')
+        proc = Popen(clstr.split(),stdout=PIPE,stderr=PIPE)
         
         if mode == 'waiterror' or mode =='wait':
             res = proc.wait()
@@ -2751,6 +3515,332 @@ class SExtractor(object):
             return proc
         else:
             raise ValueError('unrecognized mode argument '+str(mode))
+        
+    def sextractImages(self,imfns,nprocs=4,cattype='ASCII_HEAD',**kwargs):
+        """
+        Runs sextractor on many images in parallel using a
+        :class:`SExtractorRunner` with the current options and parameters.
+        
+        :param imfns: 
+            The images to sextract, either as detection image filenames or
+            (detection,analysis) filename tuples.
+        :type imfns: sequence
+        :param nprocs: Maximum number of sextractor processes to run at once.
+        :type nprocs: int
+        :param cattype: The catalog type to have sextractor write.
+        :type cattype: string
+        
+        Additional keyword arguments are passed into :meth:`SExtractorRunner.run`.
+        
+        :returns: A list of catalogs as record arrays, in the order of `imfns`.
+        
+        :except SExtractorError: If any of the sextractor runs fails.
+        """
+        runner = SExtractorRunner(self,nprocs=nprocs,cattype=cattype)
+        for imfn in imfns:
+            if isinstance(imfn,basestring):
+                runner.addJob(imfn)
+            else:
+                runner.addJob(*imfn)
+        return [job.catalog for job in runner.run(**kwargs)]
+    
+    @staticmethod
+    def readCatalog(fn,cattype=None):
+        """
+        Reads a sextractor output catalog into a numpy record array.
+        
+        :param fn: The catalog file name.
+        :type fn: string
+        :param cattype: 
+            The catalog type - 'ASCII_HEAD', 'FITS_LDAC', or 'FITS_1.0'. If None,
+            it will be 'ASCII_HEAD' unless the file starts with a FITS header.
+        :type cattype: string or None
+        
+        :returns: 
+            A record array with a field for each output parameter.  Vector
+            parameters (e.g. FLUX_APER with several apertures) are stored as
+            subarray fields. For FITS catalogs of multi-extension images, a
+            list with one record array per extension is returned.
+        """
+        if cattype is None:
+            with open(fn,'rb') as f:
+                cattype = 'FITS_LDAC' if f.read(6) == 'SIMPLE' else 'ASCII_HEAD'
+        cattype = cattype.upper()
+                
+        if cattype == 'ASCII_HEAD':
+            return _read_sex_ascii_head(fn)
+        elif cattype.startswith('FITS'):
+            import pyfits
+            
+            extname = 'LDAC_OBJECTS' if cattype == 'FITS_LDAC' else None
+            f = pyfits.open(fn)
+            try:
+                cats = [np.array(hdu.data).view(np.recarray) for hdu in f[1:] 
+                        if hdu.data is not None and 
+                           (extname is None or hdu.name == extname)]
+            finally:
+                f.close()
+            return cats[0] if len(cats) == 1 else cats
+        else:
+            raise ValueError('Cannot read sextractor catalog type %s'%cattype)
+        
+def _read_sex_ascii_head(fn):
+    """
+    Reads an ASCII_HEAD sextractor catalog into a record array.
+    """
+    names = []
+    startcols = []
+    with open(fn) as f:
+        lines = f.readlines()
+    for l in lines:
+        if l.startswith('#'):
+            ls = l[1:].split()
+            startcols.append(int(ls[0])-1)
+            names.append(ls[1])
+        elif l.strip() != '':
+            ncols = len(l.split())
+            break
+    else:
+        ncols = startcols[-1]+1 if len(startcols)>0 else 0
+        
+    datalines = [l for l in lines if not l.startswith('#') and l.strip() != '']
+    if len(datalines) > 0:
+        strdata = np.array(' '.join(datalines).split()).reshape((len(datalines),ncols))
+    else:
+        strdata = np.zeros((0,ncols),dtype=str)
+        
+    dtype = []
+    arrs = []
+    for name,c0,c1 in zip(names,startcols,startcols[1:]+[ncols]):
+        col = strdata[:,c0:c1]
+        digits = np.char.isdigit(np.char.lstrip(col,'+-'))
+        if col.size > 0 and np.all(digits):
+            col = col.astype(int)
+        else:
+            col = col.astype(float)
+        if c1-c0 > 1:
+            dtype.append((name,col.dtype,(c1-c0,)))
+        else:
+            col = col[:,0]
+            dtype.append((name,col.dtype))
+        arrs.append(col)
+    
+    res = np.empty(strdata.shape[0],dtype=dtype)
+    for name,arr in zip(names,arrs):
+        res[name] = arr
+    return res.view(np.recarray)
+        
+class SExtractorJob(object):
+    """
+    A single sextractor run scheduled by a :class:`SExtractorRunner`.  After
+    the job finishes, the following attributes are set:
+    
+    * `returncode` : the return code of the sextractor process
+    * `stdout`/`stderr` : the output of the sextractor process as strings
+    * `catalog` : the output catalog as a record array (or None if failed)
+    * `error` : None if the job succeeded, or the exception raised
+    * `time` : the time the job took in seconds
+    """
+    def __init__(self,detimfn,analysisimfn=None,options=None,name=None):
+        """
+        :param detimfn: The detection image file name.
+        :type detimfn: string
+        :param analysisimfn: 
+            The analysis image file name or None to use the detection image.
+        :type analysisimfn: string or None
+        :param options: 
+            Options to override the :class:`SExtractor` options for this job.
+        :type options: dict or None
+        :param name: A name for this job - defaults to the detection image name.
+        :type name: string or None
+        """
+        self.detimfn = detimfn
+        self.analysisimfn = analysisimfn
+        self.options = {} if options is None else dict(options)
+        self.name = detimfn if name is None else name
+        
+        self.returncode = None
+        self.stdout = self.stderr = None
+        self.catalog = None
+        self.error = None
+        self.time = None
+        
+    def __repr__(self):
+        return '<SExtractorJob %s>'%self.name
+    
+    @property
+    def done(self):
+        """
+        True if this job has been run.
+        """
+        return self.returncode is not None or self.error is not None
+        
+class SExtractorRunner(object):
+    """
+    Runs many sextractor jobs concurrently with at most `nprocs` sextractor
+    processes at once.  Each job is run in its own temporary directory, which
+    holds the configuration files and the catalog, and the catalog is read
+    directly into a record array with :meth:`SExtractor.readCatalog`.
+    
+    For example::
+    
+        sex = SExtractor()
+        runner = SExtractorRunner(sex,nprocs=8)
+        for fn in glob('*.fits'):
+            runner.addJob(fn)
+        jobs = runner.run()
+        
+    """
+    def __init__(self,sextractor=None,nprocs=4,cattype='ASCII_HEAD',
+                       tmpdir=None,keepfiles=False):
+        """
+        :param sextractor: 
+            The :class:`SExtractor` object that gives the options and parameters
+            for the runs or None to use the defaults.
+        :type sextractor: :class:`SExtractor` or None
+        :param nprocs: Maximum number of sextractor processes to run at once.
+        :type nprocs: int
+        :param cattype: 
+            The catalog type to have sextractor write - 'ASCII_HEAD',
+            'FITS_LDAC', or 'FITS_1.0'.
+        :type cattype: string
+        :param tmpdir: 
+            The directory in which to make job directories, or None for the
+            system default temporary directory.
+        :type tmpdir: string or None
+        :param keepfiles: 
+            If True, the job directories are not deleted after the catalog is
+            read, and their path is stored in the job's `dir` attribute.
+        :type keepfiles: bool
+        """
+        if sextractor is None:
+            sextractor = SExtractor()
+        self.sextractor = sextractor
+        self.nprocs = nprocs
+        self.cattype = cattype
+        self.tmpdir = tmpdir
+        self.keepfiles = keepfiles
+        self.jobs = []
+        
+    def addJob(self,detimfn,analysisimfn=None,options=None,name=None):
+        """
+        Schedules a sextractor run.  Arguments are the same as for
+        :class:`SExtractorJob`.
+        
+        :returns: The new :class:`SExtractorJob` object.
+        """
+        job = SExtractorJob(detimfn,analysisimfn,options,name)
+        self.jobs.append(job)
+        return job
+    
+    def _runJob(self,job,outputcallback):
+        import os,shutil,tempfile
+        from subprocess import Popen,PIPE
+        from threading import Thread
+        from time import time
+        
+        t0 = time()
+        sex = self.sextractor
+        jobdir = tempfile.mkdtemp(prefix='sexjob',dir=self.tmpdir)
+        try:
+            opts = dict(sex.options)
+            opts.update(job.options)
+            opts['CATALOG_NAME'] = os.path.join(jobdir,'job.cat')
+            opts['CATALOG_TYPE'] = self.cattype
+            opts['PARAMETERS_NAME'] = os.path.join(jobdir,'job.param')
+            with open(os.path.join(jobdir,'job.sex'),'w') as f:
+                f.write(sex._makeOptionStr(opts))
+            with open(opts['PARAMETERS_NAME'],'w') as f:
+                f.write(sex._makeParamStr())
+            
+            args = [sex.executable,os.path.abspath(job.detimfn)]
+            if job.analysisimfn:
+                args.append(os.path.abspath(job.analysisimfn))
+            args.extend(['-c',os.path.join(jobdir,'job.sex')])
+            proc = Popen(args,cwd=jobdir,stdout=PIPE,stderr=PIPE)
+            
+            outlines = []
+            errlines = []
+            def readstream(stream,lines,streamname):
+                for l in iter(stream.readline,''):
+                    lines.append(l)
+                    if outputcallback is not None:
+                        outputcallback(job,streamname,l)
+                stream.close()
+            outthread = Thread(target=readstream,args=(proc.stdout,outlines,'stdout'))
+            outthread.start()
+            readstream(proc.stderr,errlines,'stderr')
+            outthread.join()
+            
+            job.returncode = proc.wait()
+            job.stdout = ''.join(outlines)
+            job.stderr = ''.join(errlines)
+            if job.returncode != 0:
+                raise SExtractorError(job.stderr,job.stdout)
+            job.catalog = SExtractor.readCatalog(opts['CATALOG_NAME'],self.cattype)
+        except Exception,e:
+            job.error = e
+        finally:
+            if self.keepfiles:
+                job.dir = jobdir
+            else:
+                shutil.rmtree(jobdir,ignore_errors=True)
+            job.time = time()-t0
+        
+    def run(self,raiseerrors=True,outputcallback=None,rerun=False):
+        """
+        Runs all scheduled jobs that have not yet been run and blocks until
+        they are complete.
+        
+        :param raiseerrors: 
+            If True, an exception is raised after all jobs are complete if any
+            of them failed. Otherwise, failures are recorded in the job's
+            `error` attribute.
+        :type raiseerrors: bool
+        :param outputcallback: 
+            A function called as outputcallback(job,streamname,line) for each
+            line sextractor writes, where streamname is 'stdout' or 'stderr'.
+            It is called from the thread that is watching the job, so it
+            should be thread-safe.
+        :type outputcallback: callable or None
+        :param rerun: If True, jobs that have already been run are run again.
+        :type rerun: bool
+        
+        :returns: A list of all :class:`SExtractorJob` objects for this runner.
+        
+        :except SExtractorError: 
+            If `raiseerrors` is True and a job failed - the error for the first
+            failed job is raised.
+        """
+        from threading import Thread
+        from Queue import Queue,Empty
+        
+        todo = Queue()
+        for job in self.jobs:
+            if rerun or not job.done:
+                job.returncode = job.error = None
+                todo.put(job)
+                
+        def worker():
+            while True:
+                try:
+                    job = todo.get_nowait()
+                except Empty:
+                    return
+                self._runJob(job,outputcallback)
+                
+        threads = [Thread(target=worker) for i in range(max(int(self.nprocs),1))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+            
+        if raiseerrors:
+            for job in self.jobs:
+                if job.error is not None:
+                    raise job.error
+        return self.jobs
+        
 try:
     SExtractor._getSexDefaults()
     SExtractor._sexbinpresent = True
@@ -97,11 +97,15 @@ class Pipeline(object):
     """
 
 
-    def __init__(self,elements=None):
+    def __init__(self,elements=None,checkpointdir=None):
         """
         :param elements: Initial pipeline elements for this pipeline.
         :type elements:
             Sequence of :class:`PipelineElements <PipelineElement>` or None
+        :param checkpointdir:
+            A directory in which to save checkpoints of the pipeline, or None
+            to not save checkpoints. See :attr:`checkpointdir`.
+        :type checkpointdir: str or None
 
         :except TypeError: If the input is not a :class:`PipelineElement`
         """
@@ -117,6 +121,169 @@ class Pipeline(object):
         self._elements = list(elements)
         self._cycles = [0 for i in range(len(elements))]
         self._datadeques = [deque() for i in range(len(elements)+1)]
+        self.checkpointdir = checkpointdir
+        self._stats = None
+
+    def __getstate__(self):
+        d = self.__dict__.copy()
+        #the checkpoint directory and instrumentation are not saved
+        d['_checkpointdir'] = d['_stats'] = None
+        return d
+
+    def __setstate__(self,d):
+        #pipelines pickled before checkpoints and instrumentation lack these
+        d.setdefault('_checkpointdir',None)
+        d.setdefault('_stats',None)
+        self.__dict__.update(d)
+
+    def _getCheckpointdir(self):
+        return self._checkpointdir
+    def _setCheckpointdir(self,val):
+        import os
+
+        if val is not None:
+            val = os.path.abspath(val)
+            if not os.path.isdir(val):
+                os.makedirs(val)
+        self._checkpointdir = val
+    checkpointdir = property(_getCheckpointdir,_setCheckpointdir,doc="""
+    The directory where checkpoints of this pipeline are saved, or None to not
+    save checkpoints. When set, :meth:`checkpoint` is called after each stage
+    is processed by :meth:`processToStage` (and hence :meth:`process`) and
+    :meth:`processSingle`, and at the end of :meth:`processConcurrent`, so that
+    the pipeline can be restored with :meth:`loadCheckpoint` if it is
+    interrupted.
+
+    The results of elements that have the :attr:`PipelineElement._plcache`
+    attribute set are also saved in this directory, keyed on a hash of the
+    element and its input data. When the same element (with the same
+    attributes) is given the same data again, the saved result is used instead
+    of calling :meth:`PipelineElement.plProcess`.
+    """)
+
+    def checkpoint(self,dirname=None):
+        """
+        Saves the state of the pipeline - the elements and their attributes,
+        the data waiting in each stage, and the processing cycle counts.
+
+        :param dirname:
+            The directory in which to save the checkpoint, or None to use
+            :attr:`checkpointdir`.
+        :type dirname: str or None
+
+        :except PipelineError: If `dirname` and :attr:`checkpointdir` are None.
+        """
+        import os
+        from cPickle import dump
+        from tempfile import mkstemp
+
+        if dirname is None:
+            dirname = self._checkpointdir
+            if dirname is None:
+                raise PipelineError('no checkpoint directory set')
+        elif not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        #write to a temporary file and rename so that an interruption never
+        #leaves a corrupt checkpoint
+        fd,tmpfn = mkstemp(dir=dirname,prefix='.tmp')
+        try:
+            with os.fdopen(fd,'wb') as f:
+                dump(self,f,-1)
+            os.rename(tmpfn,os.path.join(dirname,'pipeline.pkl'))
+        except:
+            os.remove(tmpfn)
+            raise
+
+    @staticmethod
+    def loadCheckpoint(dirname,checkpoint=True):
+        """
+        Loads a pipeline saved by :meth:`checkpoint`.
+
+        :param str dirname: The directory the checkpoint was saved in.
+        :param bool checkpoint:
+            If True, the loaded pipeline's :attr:`checkpointdir` is set to
+            `dirname` so that it continues to save checkpoints there.
+
+        :returns: The :class:`Pipeline` object.
+        """
+        import os
+        from cPickle import load
+
+        with open(os.path.join(dirname,'pipeline.pkl'),'rb') as f:
+            pl = load(f)
+        if checkpoint:
+            pl.checkpointdir = dirname
+        return pl
+
+    def instrument(self,enable=True,callback=None,memory=False):
+        """
+        Starts (or stops) recording statistics on how this pipeline's stages
+        perform. When this is not enabled, the pipeline runs with essentially
+        no overhead.
+
+        :param bool enable:
+            If True, a new :class:`PipelineStats` object is created to record
+            statistics from now on. If False, recording is stopped.
+        :param callback:
+            A function called as ``callback(stagenum,event)`` each time a stage
+            processes data or handles a message, where `event` is a dictionary
+            as described in :meth:`PipelineStats.addEvent`. It may be called
+            from worker threads in :meth:`processConcurrent`.
+        :type callback: callable or None
+        :param bool memory:
+            If True, the peak memory use of the process is recorded after each
+            event (requires the :mod:`resource` module).
+
+        :returns:
+            The new :class:`PipelineStats` object, or None if `enable` is False.
+            It is also available as :attr:`stats`.
+        """
+        self._stats = PipelineStats(callback,memory) if enable else None
+        return self._stats
+
+    @property
+    def stats(self):
+        """
+        The :class:`PipelineStats` object recording statistics for this
+        pipeline, or None if :meth:`instrument` has not been called.
+        """
+        return self._stats
+
+    def _plProcess(self,elem,data,stagenum):
+        #calls plProcess, using the saved result if the element is cacheable
+        import os
+        from cPickle import dumps,load,dump,PicklingError
+        from hashlib import sha1
+        from tempfile import mkstemp
+
+        if not elem._plcache or self._checkpointdir is None:
+            return elem.plProcess(data,self,stagenum)
+
+        try:
+            key = sha1(dumps((elem,data),-1)).hexdigest()
+        except (PicklingError,TypeError):
+            #e.g. an accumulator is attached to the element
+            return elem.plProcess(data,self,stagenum)
+        cachedir = os.path.join(self._checkpointdir,'cache')
+        fn = os.path.join(cachedir,key+'.pkl')
+
+        if os.path.exists(fn):
+            with open(fn,'rb') as f:
+                return load(f)
+
+        newdata = elem.plProcess(data,self,stagenum)
+        if newdata is not None:
+            if not os.path.isdir(cachedir):
+                try:
+                    os.mkdir(cachedir)
+                except OSError: #may have been made by another thread
+                    pass
+            fd,tmpfn = mkstemp(dir=cachedir,prefix='.tmp')
+            with os.fdopen(fd,'wb') as f:
+                dump(newdata,f,-1)
+            os.rename(tmpfn,fn)
+        return newdata
 
 
     @property
@@ -226,12 +393,18 @@ class Pipeline(object):
         from .utils import check_type
 
         st = self._elements[stagenum]
+        stats = self._stats
 
+        if stats is not None:
+            statnum = stagenum%len(self._elements)
+            stats.addEvent(statnum,'queue',queue=len(self._datadeques[stagenum]))
         data = self._datadeques[stagenum].pop()
         if isinstance(data,PipelineMessage):
             msg = data
             istarg = msg.isTarget(st)
             retcode = ''
+            if stats is not None:
+                stats.addEvent(statnum,'message')
 
             if istarg:
                 msg(st)
@@ -252,16 +425,17 @@ class Pipeline(object):
                 #if type-checking fails, let the data disppear
                 raise TypeError('TypeError in stage %i(%s), removing invalid data '%(stagenum,e))
             try:
-                newdata = st.plProcess(data,self,stagenum)
-                if newdata is None:
-                    newdata = st.plInteract(data,self,stagenum)
+                if stats is None:
+                    newdata = self._plProcess(st,data,stagenum)
                     if newdata is None:
-                        self._cycles[stagenum] += 1
-                        return False
-                    else:
-                        self._datadeques[stagenum+1].appendleft(newdata)
-                        self._cycles[stagenum] = 0
-                        return True
+                        newdata = st.plInteract(data,self,stagenum)
+                else:
+                    newdata = stats.timeCall(statnum,'process',self._plProcess,st,data,stagenum)
+                    if newdata is None:
+                        newdata = stats.timeCall(statnum,'interact',st.plInteract,data,self,stagenum)
+                if newdata is None:
+                    self._cycles[stagenum] += 1
+                    return False
                 else:
                     self._datadeques[stagenum+1].appendleft(newdata)
                     self._cycles[stagenum] = 0
@@ -329,6 +503,8 @@ class Pipeline(object):
                     raise PipelineError('hit processing limit at stage %i'%stage)
                 self.processStage(stage)
             #TODO:add checks?
+            if self._checkpointdir is not None:
+                self.checkpoint()
 
         return self._datadeques[-1].pop()
 
@@ -373,8 +549,114 @@ class Pipeline(object):
             else:
                 result = False
             results.append(result)
+            if self._checkpointdir is not None:
+                self.checkpoint()
         return results
 
+    def processConcurrent(self,repeat=True,queuesize=8):
+        """
+        Processes all of the data in the pipeline to the end, running the
+        stages at the same time in separate threads. Each stage takes data from
+        the previous stage through a queue of at most `queuesize` items, so a
+        slow stage holds back the earlier stages rather than letting data pile
+        up in memory.
+
+        Each stage's element may also process several data at once, by setting
+        the :attr:`PipelineElement._plnworkers` attribute. The results are still
+        passed on in the order the data arrived, and :class:`PipelineMessage`
+        objects reach each element only after all earlier data has been
+        processed, just as for :meth:`process`. An element that has been given
+        an :class:`AccumulateMessage` is processed by a single worker until the
+        accumulation completes.
+
+        Stages that are waiting for :meth:`PipelineElement.plInteract` do not
+        hold up the other stages, although only one element interacts at a
+        time. If the element's :attr:`PipelineElement._plasyncinteract` is
+        True, the stage also continues processing later data while the
+        interaction happens, passing on the results in order once it completes.
+
+        :param repeat:
+            If True, an element that does not complete (i.e.
+            :meth:`PipelineElement.plProcess` and
+            :meth:`PipelineElement.plInteract` return None) is simply run again
+            with the next data. If it is an integer, it will be taken as a
+            maximum number of times to attempt any given stage before a
+            PipelineError is raised.
+        :type repeat: bool or int
+        :param int queuesize: The maximum number of data waiting between stages.
+
+        :returns:
+            A list with a dictionary for each stage with keys 'nprocessed'
+            (number of data passed on), 'nmessages' (number of messages
+            handled), 'time' (seconds from the start of the run until the stage
+            finished) and 'rate' (data passed on per second).
+
+        :except PipelineError:
+            If a stage is repeated `repeat` or more times.
+
+        If an exception is raised in any stage, all of the stages are stopped
+        and the exception is re-raised. Any data that was not completely
+        processed by a stage is left in that stage's input, as for
+        :meth:`processStage`.
+        """
+        from threading import Event,Lock
+        from Queue import Queue
+        from time import time
+
+        nstages = len(self._elements)
+        if nstages == 0:
+            return []
+        for i,e in enumerate(self._elements):
+            if e._plworkertype not in ('thread','process'):
+                raise ValueError('invalid worker type %s for stage %i'%(e._plworkertype,i))
+
+        stop = Event()
+        interactlock = Lock()
+        queuesize = max(int(queuesize),1)
+        queues = [None]+[Queue(queuesize) for i in range(1,nstages)]
+        runners = [_StageRunner(self,i,queues,stop,repeat,queuesize,interactlock)
+                   for i in range(nstages)]
+
+        sttime = time()
+        interrupted = True
+        try:
+            for r in runners:
+                r.thread.start()
+            for r in runners:
+                while r.thread.is_alive():
+                    r.thread.join(0.1) #a timeout lets KeyboardInterrupt through
+            interrupted = False
+        except:
+            stop.set()
+            for r in runners:
+                r.thread.join()
+            raise
+        finally:
+            for r in runners:
+                r.close()
+            #return anything left in the queues to the stage inputs in order
+            for i in range(1,nstages):
+                dq = self._datadeques[i]
+                while not queues[i].empty():
+                    data = queues[i].get()
+                    if data is not _StageRunner.END:
+                        dq.appendleft(data)
+                for data in runners[i-1].spill:
+                    dq.appendleft(data)
+            if self._checkpointdir is not None:
+                try:
+                    self.checkpoint()
+                except:
+                    #a failed checkpoint should not hide the original error
+                    if not interrupted and not any([r.error for r in runners]):
+                        raise
+
+        for r in runners:
+            if r.error is not None:
+                raise r.error[0],r.error[1],r.error[2]
+
+        return [r.summary(sttime) for r in runners]
+
     def clear(self,stages=None):
         """
         Clears the inputs of the stage(s) requested.
@@ -391,6 +673,440 @@ class Pipeline(object):
         for st in stages:
             self._datadeques[st].clear()
 
+class PipelineStats(object):
+    """
+    Records statistics on the performance of each stage of a :class:`Pipeline`.
+    These are created by :meth:`Pipeline.instrument`, and the statistics are
+    available from :meth:`report` (or as a table by converting this object to
+    a string).
+
+    Times are in seconds. CPU times are for the whole process, so they include
+    other stages running at the same time in :meth:`Pipeline.processConcurrent`.
+    Calls to :meth:`PipelineElement.plProcess` in worker processes are timed
+    there, but do not record memory use.
+    """
+
+    _statnames = ('nprocessed','nincomplete','nmessages','processtime','cputime',
+                  'ninteract','interacttime','maxqueue','peakmem')
+
+    def __init__(self,callback=None,memory=False):
+        """
+        See :meth:`Pipeline.instrument` for the meaning of the arguments.
+        """
+        from threading import Lock
+
+        self.callback = callback
+        self.memory = memory
+        self._stages = []
+        self._lock = Lock()
+
+    def timeCall(self,stagenum,eventtype,func,*args):
+        """
+        Calls ``func(*args)`` and adds an event for the stage with the time the
+        call took (see :meth:`addEvent`).
+
+        :returns: The return value of `func`.
+        """
+        from time import time
+        from os import times
+
+        t0,c0 = time(),times()
+        res = func(*args)
+        c1 = times()
+        self.addEvent(stagenum,eventtype,time()-t0,max(c1[0]+c1[1]-c0[0]-c0[1],0),res is not None)
+        return res
+
+    def addEvent(self,stagenum,eventtype,walltime=0,cputime=0,completed=False,queue=None):
+        """
+        Records an event for a pipeline stage and calls the callback.
+
+        :param int stagenum: The stage the event happened at.
+        :param str eventtype:
+            The type of event:
+
+            * 'process'
+                A call to :meth:`PipelineElement.plProcess`. `completed`
+                indicates whether or not it returned a result.
+            * 'interact'
+                A call to :meth:`PipelineElement.plInteract`, i.e. the stage was
+                waiting for an interaction. `completed` indicates whether or not
+                it returned a result.
+            * 'message'
+                A :class:`PipelineMessage` was handled by the stage.
+            * 'queue'
+                Data was taken from the stage input, and `queue` is the number
+                of data that were waiting.
+
+        :param float walltime: The time taken by the event.
+        :param float cputime: The CPU time used during the event.
+        :param bool completed: If the processing completed.
+        :param int queue: The number of data waiting, for 'queue' events.
+
+        The callback is called with a dictionary with keys 'type',
+        'walltime', 'cputime', 'completed', 'queue', and 'peakmem' (the peak
+        memory use of the process in kilobytes, or None if it is not recorded).
+        """
+        peakmem = None
+        if self.memory and (eventtype == 'process' or eventtype == 'interact'):
+            peakmem = _peakMemory()
+
+        with self._lock:
+            while len(self._stages) <= stagenum:
+                st = dict.fromkeys(self._statnames,0)
+                st['peakmem'] = None
+                self._stages.append(st)
+            st = self._stages[stagenum]
+
+            if eventtype == 'process':
+                st['processtime'] += walltime
+                st['cputime'] += cputime
+                if completed:
+                    st['nprocessed'] += 1
+            elif eventtype == 'interact':
+                st['ninteract'] += 1
+                st['interacttime'] += walltime
+                st['cputime'] += cputime
+                if completed:
+                    st['nprocessed'] += 1
+                else:
+                    st['nincomplete'] += 1
+            elif eventtype == 'message':
+                st['nmessages'] += 1
+            elif eventtype == 'queue':
+                st['maxqueue'] = max(st['maxqueue'],queue)
+            else:
+                raise ValueError('invalid event type %s'%eventtype)
+            if peakmem is not None and (st['peakmem'] is None or peakmem > st['peakmem']):
+                st['peakmem'] = peakmem
+
+        if self.callback is not None:
+            self.callback(stagenum,{'type':eventtype,'walltime':walltime,
+                                    'cputime':cputime,'completed':completed,
+                                    'queue':queue,'peakmem':peakmem})
+
+    def report(self):
+        """
+        Generates a report of the statistics for each stage.
+
+        :returns:
+            A list with a dictionary for each stage, with keys:
+
+            * 'nprocessed': number of data passed on to the next stage
+            * 'nincomplete': number of times the stage did not complete
+            * 'nmessages': number of messages handled
+            * 'processtime': total time spent in
+              :meth:`PipelineElement.plProcess`
+            * 'cputime': CPU time used by the stage
+            * 'ninteract': number of calls to
+              :meth:`PipelineElement.plInteract`
+            * 'interacttime': total time spent in
+              :meth:`PipelineElement.plInteract`
+            * 'maxqueue': the largest number of data waiting for the stage
+            * 'peakmem': the peak memory use of the process after the stage ran
+              in kilobytes, or None if it is not recorded.
+        """
+        with self._lock:
+            return [dict(st) for st in self._stages]
+
+    def clear(self):
+        """
+        Resets all of the statistics.
+        """
+        with self._lock:
+            self._stages = []
+
+    def __str__(self):
+        lines = ['stage  processed  incomplete  messages  time(s)  cpu(s)  interact(s)  maxqueue  peakmem(kB)']
+        for i,st in enumerate(self.report()):
+            lines.append('%5i  %9i  %10i  %8i  %7.3f  %6.3f  %11.3f  %8i  %11s'%(i,
+                         st['nprocessed'],st['nincomplete'],st['nmessages'],
+                         st['processtime'],st['cputime'],st['interacttime'],
+                         st['maxqueue'],'-' if st['peakmem'] is None else st['peakmem']))
+        return '\n'.join(lines)
+
+def _peakMemory():
+    #peak memory use of this process in kB, or None if it can't be determined
+    import sys
+    try:
+        from resource import getrusage,RUSAGE_SELF
+    except ImportError:
+        return None
+    rss = getrusage(RUSAGE_SELF).ru_maxrss
+    return rss//1024 if sys.platform == 'darwin' else rss
+
+def _plProcessRemote(elem,data,elemi,timed=False):
+    #calls plProcess in a worker process, where the pipeline is not available
+    if timed:
+        from time import time
+        from os import times
+
+        t0,c0 = time(),times()
+        res = elem.plProcess(data,None,elemi)
+        c1 = times()
+        return res,time()-t0,max(c1[0]+c1[1]-c0[0]-c0[1],0)
+    else:
+        return elem.plProcess(data,None,elemi)
+
+class _DoneResult(object):
+    """
+    Stands in for a :class:`multiprocessing.pool.AsyncResult` when the result
+    is already known.
+    """
+    def __init__(self,value):
+        self.value = value
+    def ready(self):
+        return True
+    def wait(self,timeout=None):
+        pass
+    def get(self,timeout=None):
+        return self.value
+
+class _StageRunner(object):
+    """
+    Runs one stage of a :class:`Pipeline` in its own thread for
+    :meth:`Pipeline.processConcurrent`, using a pool of workers for the
+    processing if the element requests it.
+    """
+    END = object() #put in a queue after the last data for the next stage
+
+    def __init__(self,pipeline,stagenum,queues,stop,repeat,queuesize,interactlock):
+        from threading import Thread
+
+        self.thread = Thread(target=self.run,name='pipeline stage %i'%stagenum)
+        self.thread.daemon = True
+
+        self.pipeline = pipeline
+        self.stagenum = stagenum
+        self.elem = elem = pipeline._elements[stagenum]
+        self.inq = queues[stagenum]
+        self.outq = queues[stagenum+1] if stagenum+1 < len(queues) else None
+        self.stop = stop
+        self.repeat = repeat
+        self.stats = pipeline._stats
+        self.interactlock = interactlock
+
+        self.nworkers = max(int(elem._plnworkers),1)
+        self.pool = None
+        self.remote = elem._plworkertype == 'process'
+        if self.nworkers > 1:
+            if self.remote:
+                from multiprocessing import Pool
+                self.pool = Pool(self.nworkers)
+            else:
+                from multiprocessing.pool import ThreadPool
+                self.pool = ThreadPool(self.nworkers)
+
+        #keep extra data queued in the pool so workers aren't idle while
+        #waiting for the oldest result
+        self.maxpending = 2*self.nworkers
+        self.interactpool = None
+        if elem._plasyncinteract:
+            from multiprocessing.pool import ThreadPool
+            self.interactpool = ThreadPool(1)
+            self.maxpending = max(self.maxpending,queuesize)
+
+        self.pending = [] #(data,result,interacted) in the order of the data
+        self.spill = []
+        self.error = None
+        self.nprocessed = self.nmessages = 0
+        self.endtime = None
+
+    def summary(self,sttime):
+        dt = (self.endtime or sttime) - sttime
+        return {'nprocessed':self.nprocessed,'nmessages':self.nmessages,'time':dt,
+                'rate':self.nprocessed/dt if dt > 0 else 0.0}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        if self.interactpool is not None:
+            self.interactpool.terminate()
+            self.interactpool = None
+
+    def run(self):
+        from time import time
+
+        try:
+            self._run()
+        except:
+            import sys
+
+            self.error = sys.exc_info()
+            self.stop.set()
+        #return unfinished data to the stage input if stopped early
+        dq = self.pipeline._datadeques[self.stagenum]
+        for data,res,interacted in reversed(self.pending):
+            dq.append(data)
+        self.pending = []
+        self.endtime = time()
+
+    def _getInput(self):
+        #the next datum for this stage, or END if there will be no more, or None
+        #if there is nothing available yet
+        from Queue import Empty
+
+        dq = self.pipeline._datadeques[self.stagenum]
+        if self.stats is not None and (len(dq) > 0 or self.inq is not None):
+            nwaiting = len(dq) + (0 if self.inq is None else self.inq.qsize())
+            if nwaiting > 0:
+                self.stats.addEvent(self.stagenum,'queue',queue=nwaiting)
+
+        if len(dq) > 0:
+            return dq.pop()
+        elif self.inq is None or self.upstreamdone:
+            return self.END
+        try:
+            data = self.inq.get(timeout=0.02)
+        except Empty:
+            return None
+        if data is self.END:
+            self.upstreamdone = True
+            return self._getInput() #there may be resaved data
+        return data
+
+    def _output(self,data):
+        from Queue import Full
+
+        if self.outq is None:
+            self.pipeline._datadeques[-1].appendleft(data)
+        else:
+            while True:
+                if self.stop.is_set():
+                    self.spill.append(data)
+                    return
+                try:
+                    self.outq.put(data,timeout=0.05)
+                    return
+                except Full:
+                    pass
+
+    def _interact(self,data):
+        #only one element interacts at a time
+        pl,i = self.pipeline,self.stagenum
+        with self.interactlock:
+            if self.stats is None:
+                return self.elem.plInteract(data,pl,i)
+            else:
+                return self.stats.timeCall(i,'interact',self.elem.plInteract,data,pl,i)
+
+    def _finish(self,data,newdata,interacted=False):
+        #handles the result of plProcess as for Pipeline.processStage
+        pl,i = self.pipeline,self.stagenum
+        if newdata is None and not interacted:
+            try:
+                newdata = self._interact(data)
+            except:
+                #run() returns the data to the stage input, as for processStage
+                self.pending.insert(0,(data,None,False))
+                raise
+        if newdata is None:
+            pl._cycles[i] += 1
+            if self.repeat is not True and pl._cycles[i] >= self.repeat:
+                raise PipelineError('hit processing limit at stage %i'%i)
+        else:
+            pl._cycles[i] = 0
+            self.nprocessed += 1
+            self._output(newdata)
+
+    def _collect(self,block):
+        #passes on the results of finished workers, in order
+        while self.pending:
+            data,res,interacted = self.pending[0]
+            if not res.ready():
+                if not block:
+                    return
+                res.wait(0.05)
+                if self.stop.is_set():
+                    return
+                continue
+            newdata = res.get()
+            if self.remote and self.stats is not None and not interacted:
+                newdata,walltime,cputime = newdata
+                self.stats.addEvent(self.stagenum,'process',walltime,cputime,newdata is not None)
+            if newdata is None and not interacted and self.interactpool is not None:
+                #interact in the background while later data is processed
+                res = self.interactpool.apply_async(self._interact,(data,))
+                self.pending[0] = (data,res,True)
+                continue
+            del self.pending[0]
+            self._finish(data,newdata,interacted)
+
+    def _run(self):
+        from .utils import check_type
+
+        pl,i,elem = self.pipeline,self.stagenum,self.elem
+        self.upstreamdone = self.inq is None
+
+        maxpending = self.maxpending
+        while not self.stop.is_set():
+            self._collect(len(self.pending) >= maxpending)
+            if len(self.pending) >= maxpending:
+                continue
+
+            data = self._getInput()
+            if data is None:
+                continue
+            elif data is self.END:
+                if self.pending:
+                    self._collect(True)
+                    continue
+                break
+
+            if isinstance(data,PipelineMessage):
+                if self.pending:
+                    #all earlier data must reach the element first
+                    pl._datadeques[i].append(data)
+                    self._collect(True)
+                    continue
+
+                msg = data
+                istarg = msg.isTarget(elem)
+                if istarg:
+                    msg(elem)
+                if not istarg or istarg=='continue':
+                    if self.outq is not None:
+                        self._output(msg)
+                    elif not msg.nprocessed:
+                        raise PipelineError('message %s was never delivered to any element'%msg)
+                self.nmessages += 1
+                if self.stats is not None:
+                    self.stats.addEvent(i,'message')
+                continue
+
+            try:
+                check_type(elem._plintype,data) #no-op if elem._plintype is None
+            except TypeError,e:
+                raise TypeError('TypeError in stage %i(%s), removing invalid data '%(i,e))
+
+            if self.pool is None or hasattr(elem,'accumulator'):
+                try:
+                    if self.stats is None:
+                        newdata = pl._plProcess(elem,data,i)
+                    else:
+                        newdata = self.stats.timeCall(i,'process',pl._plProcess,elem,data,i)
+                except:
+                    pl._datadeques[i].append(data)
+                    raise
+                if self.pending or (newdata is None and self.interactpool is not None):
+                    #wait for earlier data or the interaction
+                    self.pending.append((data,_DoneResult(newdata),False))
+                else:
+                    self._finish(data,newdata)
+            elif self.remote:
+                args = (elem,data,i,self.stats is not None)
+                self.pending.append((data,self.pool.apply_async(_plProcessRemote,args),False))
+            elif self.stats is None:
+                args = (elem,data,i)
+                self.pending.append((data,self.pool.apply_async(pl._plProcess,args),False))
+            else:
+                args = (i,'process',pl._plProcess,elem,data,i)
+                self.pending.append((data,self.pool.apply_async(self.stats.timeCall,args),False))
+
+        if self.outq is not None and not self.stop.is_set():
+            self._output(self.END)
+
+
 class PipelineElement(object):
     """
     This class represents an element in a Pipeline. The :attr:`_plintype`
@@ -410,11 +1126,36 @@ class PipelineElement(object):
 
     * :meth:`plInteract`
 
+    The :attr:`_plnworkers` attribute may be set to the number of data this
+    element can process at once when the pipeline is run with
+    :meth:`Pipeline.processConcurrent`, and :attr:`_plworkertype` to 'thread'
+    to use a pool of threads or 'process' to use a pool of processes. In the
+    latter case, the element and data must be picklable, :meth:`plProcess` is
+    called with None as the pipeline, and changes to the element's attributes
+    in :meth:`plProcess` are lost.
+
+    If :attr:`_plcache` is True, the results of :meth:`plProcess` are saved
+    when the pipeline has a :attr:`Pipeline.checkpointdir`, and reused for the
+    same input data as long as the element's attributes are unchanged. It
+    should only be set if :meth:`plProcess` depends on nothing but the data
+    and the element's attributes, and the element and data are picklable.
+
+    If :attr:`_plasyncinteract` is True, :meth:`Pipeline.processConcurrent`
+    calls :meth:`plInteract` in a separate thread and meanwhile keeps calling
+    :meth:`plProcess` with later data. It should only be set if
+    :meth:`plInteract` does not depend on state left by the most recent call
+    to :meth:`plProcess`. This is useful for elements that wait on input or
+    slow I/O for only some of the data.
+
 
     """
     __metaclass__ = ABCMeta
 
     _plintype = None
+    _plnworkers = 1
+    _plworkertype = 'thread'
+    _plcache = False
+    _plasyncinteract = False
 
     @abstractmethod
     def plProcess(self,data,pipeline,elemi):
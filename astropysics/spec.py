@@ -1303,6 +1303,50 @@ class Spectrum(HasSpecUnits):
         return spylotinstance
 
 
+class LazySpectrum(Spectrum):
+    """
+    A :class:`Spectrum` that is only loaded (by calling a loader function like
+    :func:`astropysics.utils.io.load_deimos_spectrum`) the first time one of
+    its data attributes is accessed.  After that, it behaves exactly as the
+    :class:`Spectrum` returned by the loader.
+    """
+    def __init__(self,loader,*args,**kwargs):
+        """
+        `loader` is a function that returns a :class:`Spectrum` when called
+        with `args` and `kwargs`.  Attributes set before the spectrum is loaded
+        (e.g. :attr:`name`) take precedence over those from the loader.
+        """
+        self._loader = (loader,args,kwargs)
+        
+    def __getattr__(self,name):
+        #only called for missing attributes, so this loads the spectrum when
+        #any of the attributes set by Spectrum.__init__ are first needed.
+        #Special methods (e.g. looked up by pickle or copy) never load it.
+        loader = self.__dict__.get('_loader')
+        if loader is None or (name.startswith('__') and name.endswith('__')):
+            raise AttributeError(name)
+        
+        func,args,kwargs = loader
+        spec = func(*args,**kwargs)
+        for k,v in spec.__dict__.iteritems():
+            self.__dict__.setdefault(k,v)
+        del self._loader
+        return getattr(self,name)
+    
+    def __getstate__(self):
+        if self.loaded:
+            return super(LazySpectrum,self).__getstate__()
+        else:
+            return self.__dict__
+    
+    @property
+    def loaded(self):
+        """
+        True if the spectrum has been loaded.
+        """
+        return '_loader' not in self.__dict__
+    
+
 class FunctionSpectrum(Spectrum):
     """
     This is a :class:`Spectrum` generated by functional forms rather than using
@@ -0,0 +1,421 @@
+#Copyright 2012 Erik Tollerud
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+
+=====================================================
+timescales -- conversions between astronomical times
+=====================================================
+
+The :mod:`timescales` module converts Julian Dates between the UTC, TAI, TT,
+and UT1 time scales.  All of the functions accept scalars or arrays, and arrays
+are converted without any per-element python work, so they are suitable for
+large sets of timestamps.  They also accept :class:`~astropysics.obstools.JulianDate`
+objects, in which case a :class:`~astropysics.obstools.JulianDate` is returned
+and no precision is lost in the conversion.
+
+The leap second (TAI-UTC) table is loaded from the file ``leapseconds.dat`` in
+the astropysics data directory (see :func:`astropysics.config.get_data_dir`) if
+it is present, or from the copy distributed with astropysics otherwise.  UT1-UTC
+is taken to be 0 unless a table is loaded with :func:`load_delta_UT1` (or a file
+``dut1.dat`` is present in the data directory). Either table can be replaced at
+any time with :func:`load_leap_seconds` and :func:`load_delta_UT1`.
+
+.. todo:: examples/tutorials
+
+Module API
+----------
+
+"""
+
+from __future__ import division,with_statement
+from .obstools import mjdoffset,JulianDate
+import numpy as np
+
+#TT - TAI in seconds
+tt_minus_tai = 32.184
+
+class LeapSecondTable(object):
+    """
+    A table of TAI-UTC (delta(AT)) values, including the drifting offsets used
+    before 1972.
+
+    The table is stored as arrays of the UTC MJD at which each value takes
+    effect (:attr:`mjd`), the offset at that point (:attr:`dat`), and the
+    reference MJD (:attr:`driftmjd`) and drift rate in seconds per day
+    (:attr:`driftrate`) for the pre-1972 entries (these are 0 afterwards).
+    """
+    def __init__(self,fn=None):
+        """
+        :param fn:
+            The file to load the table from, or None to use the table in the
+            astropysics data directory or the one distributed with astropysics.
+            The file can be in the format of the distributed ``leapseconds.dat``
+            or the IERS ``Leap_Second.dat`` format.
+        :type fn: string or None
+        """
+        if fn is None:
+            fn = _find_data_file('leapseconds.dat')
+        if fn is None:
+            from .utils.io import get_package_data
+            lines = get_package_data('leapseconds.dat').split('\n')
+        else:
+            with open(fn) as f:
+                lines = f.readlines()
+        self._parse(lines)
+
+    def _parse(self,lines):
+        rows = []
+        self.validyear = None
+        for l in lines:
+            if l.startswith('#VALIDYEAR'):
+                self.validyear = int(l.split()[1])
+                continue
+            ls = l.split('#')[0].split()
+            if len(ls) == 4:
+                rows.append([float(v) for v in ls])
+            elif len(ls) == 5:
+                #IERS Leap_Second.dat: MJD day month year TAI-UTC
+                rows.append([float(ls[0]),float(ls[4]),0,0])
+            elif len(ls) > 0:
+                raise ValueError('Invalid line in leap second table: '+l)
+        if len(rows) == 0:
+            raise ValueError('No entries in leap second table')
+
+        from .obstools import jd_to_calendar,calendar_to_jd
+
+        rows = np.array(sorted(rows))
+        if self.validyear is None:
+            self.validyear = jd_to_calendar(rows[-1,0],mjd=True).year
+        #warn for dates more than 5 years past the end of the valid year
+        self._validmjd = calendar_to_jd((self.validyear+6,1,1,0),mjd=True)
+
+        self.mjd,self.dat,self.driftmjd,self.driftrate = rows.T
+
+    def __call__(self,mjdutc):
+        """
+        Computes TAI-UTC for UTC modified julian dates.
+
+        :param mjdutc: UTC as Modified Julian Dates.
+        :type mjdutc: scalar or array-like
+
+        :returns: TAI-UTC in seconds, as a scalar or an array matching `mjdutc`.
+        """
+        from warnings import warn
+
+        mjdutc = np.asarray(mjdutc,dtype=float)
+
+        i = np.searchsorted(self.mjd,mjdutc,side='right')-1
+        if np.any(i < 0):
+            warn('delta(AT) requested before start of UTC (MJD %i)'%self.mjd[0])
+            i = np.clip(i,0,None)
+        if np.any(mjdutc > self._validmjd):
+            warn('delta(AT) requested for more than 5 years after current leap seconds (%i)'%self.validyear)
+
+        return self.dat[i] + (mjdutc - self.driftmjd[i])*self.driftrate[i]
+
+class DeltaUT1Table(object):
+    """
+    A table of UT1-UTC values that are linearly interpolated.  Outside the
+    range of the table, the nearest value is used.
+    """
+    def __init__(self,fn):
+        """
+        :param fn:
+            The file to load the table from. It can either have two columns
+            (UTC MJD and UT1-UTC in seconds), or be in the IERS
+            ``finals2000A`` fixed-column format.
+        :type fn: string
+        """
+        mjd,dut1 = [],[]
+        with open(fn) as f:
+            for l in f:
+                if l.startswith('#') or l.strip() == '':
+                    continue
+                ls = l.split()
+                if len(ls) == 2:
+                    mjd.append(float(ls[0]))
+                    dut1.append(float(ls[1]))
+                elif len(l) >= 68 and l[58:68].strip() != '':
+                    #finals2000A: MJD in columns 8-15, UT1-UTC in 59-68
+                    mjd.append(float(l[7:15]))
+                    dut1.append(float(l[58:68]))
+        if len(mjd) == 0:
+            raise ValueError('No entries in UT1-UTC table '+fn)
+
+        sorti = np.argsort(mjd)
+        self.mjd = np.array(mjd)[sorti]
+        self.dut1 = np.array(dut1)[sorti]
+
+    def __call__(self,mjdutc):
+        """
+        Computes UT1-UTC for UTC modified julian dates.
+
+        :param mjdutc: UTC as Modified Julian Dates.
+        :type mjdutc: scalar or array-like
+
+        :returns: UT1-UTC in seconds, as a scalar or an array matching `mjdutc`.
+        """
+        return np.interp(mjdutc,self.mjd,self.dut1)
+
+def _find_data_file(fn):
+    """
+    Returns the path to `fn` in the astropysics data directory, or None if it is
+    not present.
+    """
+    import os
+    from .config import get_data_dir
+
+    try:
+        path = os.path.join(get_data_dir(False),fn)
+    except OSError:
+        return None
+    return path if os.path.isfile(path) else None
+
+_leapseconds = None
+_dut1 = None
+
+def load_leap_seconds(fn=None):
+    """
+    Loads the leap second table used in this module.
+
+    :param fn:
+        The file to load, or None to reload the default table (see
+        :class:`LeapSecondTable`).
+    :type fn: string or None
+
+    :returns: The new :class:`LeapSecondTable`.
+    """
+    global _leapseconds
+    _leapseconds = LeapSecondTable(fn)
+    return _leapseconds
+
+def load_delta_UT1(fn=None):
+    """
+    Loads the UT1-UTC table used in this module.
+
+    :param fn:
+        The file to load (see :class:`DeltaUT1Table`), or None to use
+        ``dut1.dat`` in the astropysics data directory if it exists, or
+        otherwise to assume UT1-UTC is 0.
+    :type fn: string or None
+
+    :returns: The new :class:`DeltaUT1Table` or None if no table was loaded.
+    """
+    global _dut1
+    if fn is None:
+        fn = _find_data_file('dut1.dat')
+    _dut1 = None if fn is None else DeltaUT1Table(fn)
+    return _dut1
+
+def get_leap_seconds():
+    """
+    Returns the :class:`LeapSecondTable` used in this module, loading it if
+    necessary.
+    """
+    if _leapseconds is None:
+        load_leap_seconds()
+    return _leapseconds
+
+def _asjd(jd):
+    return jd if isinstance(jd,JulianDate) else np.asarray(jd,dtype=float)
+
+def _to_mjd(jd,mjd):
+    if isinstance(jd,JulianDate):
+        return jd.mjd
+    jd = np.asarray(jd,dtype=float)
+    return jd if mjd else jd - mjdoffset
+
+def delta_AT(jdutc,mjd=False):
+    """
+    Computes the difference between International Atomic Time (TAI) and UTC,
+    known as delta(AT).
+
+    Note that this is not valid before UTC (Jan 1,1960) began and it is not
+    correct for future dates, as leap seconds are not predictable. Hence,
+    warnings are issued if before UTC or >5 years from the date of the leap
+    second table.
+
+    :param jdutc: UTC as Julian Dates.
+    :type jdutc: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input is interpreted as a modified julian date.
+
+    :returns: TAI - UTC in seconds as a float or an array matching `jdutc`.
+    """
+    return get_leap_seconds()(_to_mjd(jdutc,mjd))
+
+def delta_UT1(jdutc,mjd=False):
+    """
+    Computes UT1-UTC from the table loaded by :func:`load_delta_UT1`, or 0 if no
+    table is loaded.
+
+    :param jdutc: UTC as Julian Dates.
+    :type jdutc: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input is interpreted as a modified julian date.
+
+    :returns: UT1 - UTC in seconds as a float or an array matching `jdutc`.
+    """
+    mjdutc = _to_mjd(jdutc,mjd)
+    if _dut1 is None:
+        return np.zeros_like(mjdutc)
+    return _dut1(mjdutc)
+
+def utc_to_tai(jd,mjd=False):
+    """
+    Converts UTC Julian Dates to TAI.
+
+    :param jd: UTC as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: TAI as a float or an array matching `jd`.
+    """
+    jd = _asjd(jd)
+    return jd + delta_AT(jd,mjd)/86400
+
+def tai_to_utc(jd,mjd=False):
+    """
+    Converts TAI Julian Dates to UTC.  During a leap second, the result is the
+    start of the following UTC day.
+
+    :param jd: TAI as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: UTC as a float or an array matching `jd`.
+    """
+    jd = _asjd(jd)
+    #iterate, because delta(AT) is a function of UTC
+    utc = jd - delta_AT(jd,mjd)/86400
+    for i in range(2):
+        utc = jd - delta_AT(utc,mjd)/86400
+    return utc
+
+def tai_to_tt(jd,mjd=False):
+    """
+    Converts TAI Julian Dates to TT.
+
+    :param jd: TAI as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates (this does
+        not change the result, but is accepted for consistency).
+
+    :returns: TT as a float or an array matching `jd`.
+    """
+    return _asjd(jd) + tt_minus_tai/86400
+
+def tt_to_tai(jd,mjd=False):
+    """
+    Converts TT Julian Dates to TAI.
+
+    :param jd: TT as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates (this does
+        not change the result, but is accepted for consistency).
+
+    :returns: TAI as a float or an array matching `jd`.
+    """
+    return _asjd(jd) - tt_minus_tai/86400
+
+def utc_to_tt(jd,mjd=False):
+    """
+    Converts UTC Julian Dates to TT.
+
+    :param jd: UTC as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: TT as a float or an array matching `jd`.
+    """
+    return tai_to_tt(utc_to_tai(jd,mjd))
+
+def tt_to_utc(jd,mjd=False):
+    """
+    Converts TT Julian Dates to UTC.
+
+    :param jd: TT as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: UTC as a float or an array matching `jd`.
+    """
+    return tai_to_utc(tt_to_tai(jd),mjd)
+
+def utc_to_ut1(jd,mjd=False):
+    """
+    Converts UTC Julian Dates to UT1 using the table loaded by
+    :func:`load_delta_UT1`.
+
+    :param jd: UTC as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: UT1 as a float or an array matching `jd`.
+    """
+    jd = _asjd(jd)
+    return jd + delta_UT1(jd,mjd)/86400
+
+def ut1_to_utc(jd,mjd=False):
+    """
+    Converts UT1 Julian Dates to UTC using the table loaded by
+    :func:`load_delta_UT1`.
+
+    :param jd: UT1 as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: UTC as a float or an array matching `jd`.
+    """
+    jd = _asjd(jd)
+    #UT1-UTC changes slowly enough that one iteration is sufficient
+    utc = jd - delta_UT1(jd,mjd)/86400
+    return jd - delta_UT1(utc,mjd)/86400
+
+def tt_to_ut1(jd,mjd=False):
+    """
+    Converts TT Julian Dates to UT1.
+
+    :param jd: TT as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: UT1 as a float or an array matching `jd`.
+    """
+    return utc_to_ut1(tt_to_utc(jd,mjd),mjd)
+
+def ut1_to_tt(jd,mjd=False):
+    """
+    Converts UT1 Julian Dates to TT.
+
+    :param jd: UT1 as Julian Dates.
+    :type jd: scalar, array-like, or :class:`~astropysics.obstools.JulianDate`
+    :param bool mjd:
+        If True, the input and output are modified julian dates.
+
+    :returns: TT as a float or an array matching `jd`.
+    """
+    return utc_to_tt(ut1_to_utc(jd,mjd),mjd)
+
+load_delta_UT1()
@@ -195,10 +195,10 @@ def get_package_data(dataname):
     path = dirname(rootfile)+'/data/'+dataname
     return get_loader(rootname).get_data(path)
 
-def _readrem(remote,reportprogress=False):
+def _iterrem(remote,reportprogress=False,chunksize=65536):
     """
-    Reads the provided remote url and returns the result, possible reporting
-    on progress.
+    Iterates over the data read from the provided remote url in chunks,
+    possibly reporting on progress.
 
     Progress will be approximately once every percent, or less often for files
     under 100 kb. If the file size is unknown, messages progress will slowly
@@ -207,8 +207,10 @@ def _readrem(remote,reportprogress=False):
     :param remote: A :class:`urllib.addinfourl` object with the remote url.
     :param reportprogress:
         See :func:`set_data_download_reporter`
+    :param int chunksize:
+        The number of bytes to read at a time if progress is not reported.
 
-    :returns: The read data of the remote, e.g. remote.read()
+    :returns: An iterator over strings with the data from the remote.
     """
     from math import ceil
 
@@ -234,7 +236,7 @@ def _readrem(remote,reportprogress=False):
                     gb = mb/1000. if mb > 1000 else None
                     if gb is not None:
                         stdout.write('\rDownload progress:%.1f GB'%gb)
-                    elif gb is not None:
+                    elif mb is not None:
                         stdout.write('\rDownload progress:%.1f MB'%mb)
                     else:
                         stdout.write('\rDownload progress:%.1f kB'%kb)
@@ -253,32 +255,45 @@ def _readrem(remote,reportprogress=False):
             totbytes = 1
             nbytesper = 1024
 
-        res = []
         currres = True
         donebytes = 0
+        fracorbytes = 0
         reportprogress(0,False,False,remote.url)
         while currres!='':
             currres = remote.read(nbytesper)
-            res.append(currres)
+            if currres!='':
+                yield currres
             donebytes += len(currres)
             fracorbytes = donebytes/totbytes
             reportprogress(fracorbytes,True,False,remote.url)
         reportprogress(fracorbytes,True,True,remote.url)
-        return ''.join(res)
 
     else:
-        return remote.read()
+        currres = remote.read(chunksize)
+        while currres!='':
+            yield currres
+            currres = remote.read(chunksize)
 
 #TODO: Document these in future config docs
 _data_store = _io_config.get('data_store',True)
 _data_reporter = _io_config.get('data_reporter',True)
+_data_store_maxsize = _io_config.get('data_store_maxsize',None)
+if _data_store_maxsize is not None:
+    _data_store_maxsize = int(_data_store_maxsize)
 
 def get_data(dataurl,asfile=False,localfn=None):
     """
     Retrieves a data file from a remote source (usually the internet), and
     optionally caches that data locally. See :func:`set_data_store` for control
-    of caching behavior, and :func:`set_data_download_reporter` for control of
-    download progress reporting.
+    of caching behavior, :func:`set_data_store_maxsize` to limit the size of the
+    cache, and :func:`set_data_download_reporter` for control of download
+    progress reporting.
+
+    Cached data are kept in the 'store' directory inside the astropysics data
+    directory, in files named by the SHA1 hash of their content. Downloads are
+    streamed directly to disk and only added to the store once they are
+    complete, and the store is locked while it is being modified, so separate
+    processes can safely share it.
 
     :param str dataurl:
         The URL of the data to be retrieved. If not a URL (i.e. does not have a
@@ -288,16 +303,18 @@ def get_data(dataurl,asfile=False,localfn=None):
         If True, a file-like object is returned that can be used to access the
         data. Otherwise, a string with the full content of the file is returned.
     :param localfn:
-        The filename to use for saving (or loading, if the file is present)
-        locally. If it is None, the filename will be inferred from the URL
-        if possible. This file name is always relative to the astropysics data
-        directory (see :func:`astropysics.config.get_data_dir`). This has no
-        effect if :func:`set_data_store` is set to False.
+        A filename that the stored data will also be available as. If it is
+        None, the filename will be inferred from the URL if possible. This file
+        name is always relative to the astropysics data directory (see
+        :func:`astropysics.config.get_data_dir`), so the data can later be
+        accessed by passing the file name as `dataurl`. This has no effect if
+        :func:`set_data_store` is set to False.
 
     :returns: A file-like object or a string (see `asfile`)
 
     :raises urllib2.URLError:
-        If the `dataurl` request is a URL and cannot be found.
+        If the `dataurl` request is a URL and cannot be found or the download is
+        incomplete.
     :raises IOError:
         If the dataurl is requested as a local data file and not found.
 
@@ -308,7 +325,7 @@ def get_data(dataurl,asfile=False,localfn=None):
         for larger or optional data files that are downloaded as needed.
 
     """
-    import os,urlparse,urllib2,shelve,contextlib
+    import os,urllib2
     from ..config import get_data_dir
 
     global _data_store,_data_reporter
@@ -326,48 +343,239 @@ def get_data(dataurl,asfile=False,localfn=None):
     reportprogress = _data_reporter
 
     if store:
-        datadir = get_data_dir()
-        with contextlib.closing(shelve.open(os.path.join(datadir,'urlmap'))) as url2fn:
-            #decide if the url needs to be retrieved
-            if dataurl not in url2fn or store=='refresh' or \
-              not os.path.exists(os.path.join(datadir,url2fn[dataurl])):
-                with contextlib.closing(urllib2.urlopen(dataurl)) as remote:
-                    rinfo = remote.info()
-                    urldata = None
-                    if localfn is None:
-                        #figure out the local name from the data/URL
-                        if 'Content-Disposition' in rinfo:
-                            #often URLs that redirect to a download provide the fielname in the header info
-                            localfn = rinfo['Content-Disposition'].split('filename=')[1]
-                        else:
-                            #otherwise fallback on the url filename
-                            localfn = urlparse.urlsplit(dataurl)[2].split('/')[-1]
-                            if localfn.strip()=='':
-                                #url does not have a path, so try to use the title of the page
-                                localfn = None
-                                if 'html' in rinfo['content-type']:
-                                    urldata = _readrem(remote,reportprogress)
-                                    starttag = urldata.find('<title>')
-                                    endtag = urldata.find('<title>')
-                                    if startag>-1 and endtag>-1:
-                                        localfn = urldata[starttag:endtag]
-                        if localfn is None:
-                            raise urllib2.URLError('Could not determine local file name for the URL '+dataurl)
-                    if urldata is None:
-                        urldata = _readrem(remote,reportprogress)
-                #now save the downloaded data
-                with open(os.path.join(datadir,localfn),'w') as f:
-                    f.write(urldata)
-                url2fn[dataurl] = localfn
-
-            handle = open(os.path.join(datadir,url2fn[dataurl]),'r')
+        storedir = _get_data_store_dir()
+        handle = None
+        entry = None if store=='refresh' else _read_data_entry(storedir,dataurl)
+        if entry is not None:
+            with _DataStoreLock(storedir):
+                objfn = os.path.join(storedir,'objects',entry['hash'])
+                #the size check catches truncated or replaced files
+                if os.path.exists(objfn) and os.path.getsize(objfn)==entry['size']:
+                    os.utime(objfn,None) #marks as recently used for eviction
+                    handle = open(objfn,'rb')
+                    if localfn is not None and localfn != entry['localfn']:
+                        entry['localfn'] = localfn
+                        _copy_data_file(objfn,localfn)
+                        _write_data_entry(storedir,entry)
+        if handle is None:
+            handle = _download_data(storedir,dataurl,localfn,reportprogress)
     else:
         handle = urllib2.urlopen(dataurl)
 
     if asfile:
         return handle
     else:
-        return handle.read()
+        try:
+            return handle.read()
+        finally:
+            handle.close()
+
+class _DataStoreLock(object):
+    """
+    A context manager that holds an exclusive lock on the data store while it
+    is being modified. Locking requires :mod:`fcntl`, so on platforms without
+    it (i.e. Windows) this does nothing.
+    """
+    def __init__(self,storedir):
+        import os
+
+        self.fn = os.path.join(storedir,'lock')
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.fn,'a')
+        try:
+            import fcntl
+        except ImportError:
+            return self
+        fcntl.flock(self.f.fileno(),fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self,*exc_info):
+        self.f.close() #also releases the lock
+        self.f = None
+
+def _get_data_store_dir():
+    #returns the data store directory, creating it if necessary
+    import os
+    from ..config import get_data_dir
+
+    storedir = os.path.join(get_data_dir(),'store')
+    for d in (storedir,os.path.join(storedir,'objects'),os.path.join(storedir,'urls')):
+        if not os.path.isdir(d):
+            try:
+                os.mkdir(d)
+            except OSError:
+                if not os.path.isdir(d): #could have been made by another process
+                    raise
+    return storedir
+
+def _data_entry_fn(storedir,dataurl):
+    import os
+    from hashlib import sha1
+
+    return os.path.join(storedir,'urls',sha1(dataurl).hexdigest())
+
+def _read_data_entry(storedir,dataurl):
+    #returns the index entry for `dataurl`, or None if it is not in the store
+    import cPickle
+
+    try:
+        with open(_data_entry_fn(storedir,dataurl),'rb') as f:
+            entry = cPickle.load(f)
+    except (IOError,EOFError,cPickle.UnpicklingError):
+        return None
+    return entry if entry.get('url')==dataurl else None
+
+def _write_data_entry(storedir,entry):
+    #atomically writes the index entry - must be called with the store locked
+    import os,tempfile,cPickle
+
+    fn = _data_entry_fn(storedir,entry['url'])
+    fd,tmpfn = tempfile.mkstemp(dir=os.path.dirname(fn))
+    try:
+        with os.fdopen(fd,'wb') as f:
+            cPickle.dump(entry,f,cPickle.HIGHEST_PROTOCOL)
+        if os.name == 'nt' and os.path.exists(fn): #can't rename over files
+            os.remove(fn)
+        os.rename(tmpfn,fn)
+    except:
+        os.remove(tmpfn)
+        raise
+
+def _copy_data_file(objfn,localfn):
+    #makes the stored data at objfn available as localfn in the data directory -
+    #this is a copy rather than a link so that changing the file can't corrupt
+    #the stored data
+    import os,shutil,tempfile
+    from ..config import get_data_dir
+
+    fn = os.path.join(get_data_dir(),localfn)
+    fd,tmpfn = tempfile.mkstemp(dir=os.path.dirname(fn))
+    os.close(fd)
+    try:
+        shutil.copyfile(objfn,tmpfn)
+        if os.name == 'nt' and os.path.exists(fn):
+            os.remove(fn)
+        os.rename(tmpfn,fn)
+    except:
+        if os.path.exists(tmpfn):
+            os.remove(tmpfn)
+        raise
+
+def _remote_filename(dataurl,rinfo):
+    #infers a file name for the data at dataurl, or returns None if there is
+    #no obvious name
+    import os,urlparse
+
+    if 'Content-Disposition' in rinfo and 'filename=' in rinfo['Content-Disposition']:
+        #often URLs that redirect to a download provide the fielname in the header info
+        fn = rinfo['Content-Disposition'].split('filename=')[1].split(';')[0]
+        fn = fn.strip().strip('"\'')
+    else:
+        #otherwise fallback on the url filename
+        fn = urlparse.urlsplit(dataurl)[2].split('/')[-1]
+    fn = os.path.basename(fn)
+    return fn if fn.strip() else None
+
+def _download_data(storedir,dataurl,localfn,reportprogress):
+    #streams the data at `dataurl` into the store, and returns an open file
+    #with the data
+    import os,tempfile,urllib2,contextlib
+    from hashlib import sha1
+
+    hsh = sha1()
+    size = 0
+    fd,tmpfn = tempfile.mkstemp(dir=storedir,prefix='download')
+    try:
+        with os.fdopen(fd,'wb') as f:
+            with contextlib.closing(urllib2.urlopen(dataurl)) as remote:
+                rinfo = remote.info()
+                if localfn is None:
+                    localfn = _remote_filename(dataurl,rinfo)
+                for chunk in _iterrem(remote,reportprogress):
+                    hsh.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        if 'content-length' in rinfo and int(rinfo['content-length'])!=size:
+            raise urllib2.URLError('incomplete download of %s: got %i of %s bytes'%(dataurl,size,rinfo['content-length']))
+
+        entry = {'url':dataurl,'hash':hsh.hexdigest(),'size':size,'localfn':localfn}
+        with _DataStoreLock(storedir):
+            objfn = os.path.join(storedir,'objects',entry['hash'])
+            if os.path.exists(objfn) and os.path.getsize(objfn)==size:
+                #identical data already stored
+                os.remove(tmpfn)
+                os.utime(objfn,None)
+            else:
+                if os.name == 'nt' and os.path.exists(objfn):
+                    os.remove(objfn)
+                os.rename(tmpfn,objfn)
+            _write_data_entry(storedir,entry)
+            if localfn is not None:
+                _copy_data_file(objfn,localfn)
+            handle = open(objfn,'rb')
+            _evict_data(storedir,entry['hash'])
+    except:
+        if os.path.exists(tmpfn):
+            os.remove(tmpfn)
+        raise
+    return handle
+
+def _evict_data(storedir,keep=None):
+    #removes the least recently used data until the store is no larger than the
+    #maximum size - must be called with the store locked
+    import os,cPickle
+    from ..config import get_data_dir
+
+    maxsize = _data_store_maxsize
+    if maxsize is None:
+        return
+
+    objdir = os.path.join(storedir,'objects')
+    objs = []
+    for fn in os.listdir(objdir):
+        st = os.stat(os.path.join(objdir,fn))
+        objs.append((st.st_mtime,fn,st))
+    totsize = sum([st.st_size for t,fn,st in objs])
+
+    removed = {}
+    for t,fn,st in sorted(objs):
+        if totsize <= maxsize:
+            break
+        if fn != keep:
+            os.remove(os.path.join(objdir,fn))
+            removed[fn] = st
+            totsize -= st.st_size
+    if len(removed) == 0:
+        return
+
+    #remove the index entries and the unmodified copies of the removed data
+    urldir = os.path.join(storedir,'urls')
+    for efn in os.listdir(urldir):
+        try:
+            with open(os.path.join(urldir,efn),'rb') as f:
+                entry = cPickle.load(f)
+        except (IOError,EOFError,cPickle.UnpicklingError):
+            continue
+        if entry['hash'] in removed:
+            os.remove(os.path.join(urldir,efn))
+            if entry['localfn'] is not None:
+                localfn = os.path.join(get_data_dir(),entry['localfn'])
+                if (os.path.exists(localfn) and
+                    os.path.getsize(localfn) == entry['size'] and
+                    _file_sha1(localfn) == entry['hash']):
+                    os.remove(localfn)
+
+def _file_sha1(fn):
+    #the hex SHA1 digest of the contents of the file fn
+    from hashlib import sha1
+
+    hsh = sha1()
+    with open(fn,'rb') as f:
+        for chunk in iter(lambda:f.read(2**16),''):
+            hsh.update(chunk)
+    return hsh.hexdigest()
 
 def set_data_store(store=_data_store):
     """
@@ -455,6 +663,37 @@ def get_data_download_reporter():
     """
     return _data_reporter
 
+def set_data_store_maxsize(maxsize=_data_store_maxsize):
+    """
+    Sets the maximum total size of the data cached by :func:`get_data`. When
+    the stored data exceed this size, the least recently used files are removed
+    from the store. The value can subsequently be retrieved via
+    :func:`get_data_store_maxsize`.
+
+    :param maxsize: The maximum size in bytes, or None for no limit.
+    :type maxsize: int or None
+
+    :raises ValueError: If `maxsize` is negative.
+
+    """
+    if maxsize is not None:
+        maxsize = int(maxsize)
+        if maxsize < 0:
+            raise ValueError('data store size must be non-negative')
+
+    global _data_store_maxsize
+    _data_store_maxsize = maxsize
+
+def get_data_store_maxsize():
+    """
+    Returns the maximum size of the data cached by :func:`get_data`. See
+    :func:`set_data_store_maxsize` for details.
+
+    :returns: The maximum size in bytes, or None if there is no limit.
+
+    """
+    return _data_store_maxsize
+
 
 #<-----------------------General IO utilities---------------------------------->
 
@@ -740,7 +979,7 @@ class FixedColumnDataParser(object):
         """
         del self.cols[name]
 
-    def parseFile(self,fn,maskedarray=False):
+    def parseFile(self,fn,maskedarray=False,chunksize=100000):
         """
         Parse a file that follows this object's format.
 
@@ -750,6 +989,10 @@ class FixedColumnDataParser(object):
             If True, the function returns a masked array, otherwise a record
             array.
         :type maskedarray: bool
+        :param chunksize:
+            The number of lines to read from the file at a time. This only
+            affects how much memory is used while parsing, not the result.
+        :type chunksize: int
 
         :returns:
             If `maskedarray` is False, a tuple (recarr,masks) where recarr is a
@@ -757,58 +1000,146 @@ class FixedColumnDataParser(object):
             mapping column names to masks. The masks are True if the value is
             valid, and False if not.  If `maskedarray` is True, a
             :class:`numpy.ma.core.MaskedArray` is returned.
+
+        Blank entries are 0 for integer columns, NaN for floating point columns,
+        and empty strings for string columns (and are False in the masks).
+        Columns with no format are converted to integers if all the entries are
+        integers, otherwise floats if possible, or else they are left as
+        strings. Such columns with no entries at all are floats.
         """
-        lists = dict([(k,list()) for k in self.cols])
-        addi = -int(self.firstcolindx)
+        rawcols = None
+        for raw in self._iterRawColumns(fn,chunksize):
+            if rawcols is None:
+                rawcols = [[col] for col in raw]
+            else:
+                for cols,col in zip(rawcols,raw):
+                    cols.append(col)
+        if rawcols is None: #no data rows
+            rawcols = [[np.array([],dtype='S1')] for n in self._sortedNames()]
+        rawcols = [np.concatenate(cols) for cols in rawcols]
+
+        return self._convertColumns(rawcols,maskedarray)[0]
+
+    def iterParseFile(self,fn,maskedarray=False,chunksize=100000):
+        """
+        Parses a file that follows this object's format in chunks of rows, so
+        that files too large to fit in memory can be processed.
+
+        :param fn: File name of the file to parse
+        :type fn: string
+        :params maskedarray:
+            If True, masked arrays are generated, otherwise record arrays.
+        :type maskedarray: bool
+        :param chunksize: The maximum number of lines to read for each chunk.
+        :type chunksize: int
+
+        :returns:
+            An iterator over the results of :meth:`parseFile` for the valid rows
+            within each `chunksize` lines of the file.
+
+        :except ValueError:
+            If a column with no format was inferred to be a type from the
+            entries of an earlier chunk that later data does not match.
+        """
+        dtypes = None
+        for raw in self._iterRawColumns(fn,chunksize):
+            res,dtypes = self._convertColumns(raw,maskedarray,dtypes)
+            yield res
+
+    def _sortedNames(self):
+        return [n for l,n in sorted([(c[0],n) for n,c in self.cols.iteritems()])]
+
+    def _iterRawColumns(self,fn,chunksize):
+        #yields a list of arrays of the raw strings in each column (in order of
+        #the lower edge) for the valid rows in each chunk of lines
+        from itertools import islice
 
         if len(self.cols) == 0:
             raise IndexError('No columns defined in FixedColumnDataParser')
+        if chunksize < 1:
+            raise ValueError('chunksize must be positive')
 
-        with open(fn) as f:
-            for i,row in enumerate(f):
-                rs = row.strip()
-                validrow = i >= self.skiprows and rs != '' and rs[0] not in self.commentchars
-                if validrow:
-                    for n,(l,u,f,convs) in self.cols.iteritems():
-                        if convs is None:
-                            li,ui = l+addi,u+addi+1
-                            lists[n].append(row[li:ui])
-                        else:
-                            li,ui = l+addi,u+addi+1
-                            val = row[li:ui]
-                            lists[n].append(convs.get(val,val))
+        addi = -int(self.firstcolindx)
+        names = self._sortedNames()
+        edges = [(self.cols[n][0]+addi,self.cols[n][1]+addi+1) for n in names]
+        maxedge = max([u for l,u in edges])
+        commentbytes = [ord(c) for c in self.commentchars]
+
+        with open(fn,'rb') as f:
+            for i in range(self.skiprows):
+                f.readline()
+
+            while True:
+                lines = list(islice(f,chunksize))
+                if len(lines) == 0:
+                    break
 
-        sorti = np.argsort([l for l,u,f,convs in self.cols.values()])
-        sortnames = np.array(self.cols.keys())[sorti]
+                #the lines as a 2D array of bytes, padded with spaces
+                lines = np.array(lines,dtype='S')
+                nlines,width = len(lines),lines.dtype.itemsize
+                b = lines.view(np.uint8).reshape(nlines,width)
+                b[(b==0)|(b==10)|(b==13)] = 32
+                if width < maxedge:
+                    b = np.hstack((b,np.empty((nlines,maxedge-width),np.uint8)))
+                    b[:,width:] = 32
+
+                #remove blank and comment lines
+                nonspace = (b!=32)&(b!=9)
+                notblank = nonspace.any(axis=1)
+                firstchar = b[np.arange(nlines),nonspace.argmax(axis=1)]
+                b = b[notblank & ~np.in1d(firstchar,commentbytes)]
+
+                yield [np.ascontiguousarray(b[:,l:u]).view('S%i'%(u-l)).ravel()
+                       for l,u in edges]
+
+    def _convertColumns(self,rawcols,maskedarray,dtypes=None):
+        #converts raw column strings to the column formats, returning the
+        #parseFile output and the dtypes used.  If dtypes are given, they are
+        #used for the columns without formats instead of inferring them (unless
+        #they are None).  The returned dtype is None for inferred columns with
+        #no valid entries, so later data can still decide their type.
+        names = self._sortedNames()
 
         alist = []
-        masks = []
-        for n in sortnames:
-            lst = [e if e.strip()!='' else None for e in lists[n]]
-            f = self.cols[n][2]
-            masks.append((n,np.array([l is not None and l is not '' for l in lst])))
-
-            if f is not None:
-                print 'converting field',n,'to type',f
-                if f.kind == 'i':
-                    arr = np.array([0 if l is None else l for l in lst])
-                else:
-                    arr = np.array(lst)
-                alist.append(arr.astype(f))
+        masks = {}
+        newdtypes = []
+        for i,(n,raw) in enumerate(zip(names,rawcols)):
+            f,convs = self.cols[n][2:]
+            if convs:
+                for k,v in convs.iteritems():
+                    raw = np.where(raw==k,v,raw)
+            mask = np.char.strip(raw) != ''
+            masks[n] = mask
+
+            inferred = f is None and (dtypes is None or dtypes[i] is None)
+            if f is None and not inferred:
+                f = dtypes[i]
+                try:
+                    arr = _convertFixedColumn(raw,mask,f)
+                except (ValueError,OverflowError):
+                    raise ValueError('column %s can not be converted to the type %s inferred from earlier data - specify a format for it'%(n,f))
+            elif f is None:
+                #columns with no entries are float, so they are NaN
+                for f in ((int,float,None) if mask.any() else (float,)):
+                    try:
+                        arr = _convertFixedColumn(raw,mask,f)
+                        break
+                    except (ValueError,OverflowError):
+                        pass
             else:
-                arr = np.array(lst)
-                alist.append(arr)
+                arr = _convertFixedColumn(raw,mask,f)
+            alist.append(arr)
+            newdtypes.append(None if inferred and not mask.any() else arr.dtype)
 
-        recarr = np.rec.fromarrays(alist,names=','.join(sortnames))
-        masks = dict(masks)
+        recarr = np.rec.fromarrays(alist,names=','.join(names))
 
         if maskedarray:
             marr = np.ma.MaskedArray(recarr)
             for n,m in masks.iteritems():
                 marr[n].mask = ~m
-            return marr
+            return marr,newdtypes
         else:
-            return recarr,masks
+            return (recarr,masks),newdtypes
 
     def writeFile(self,fn,data,masks=None,colstart='# '):
         """
@@ -863,6 +1194,26 @@ class FixedColumnDataParser(object):
 
 
 
+def _convertFixedColumn(raw,mask,dtype):
+    #converts an array of strings to dtype, with blanks (where mask is False)
+    #replaced by 0, NaN or ''
+    if dtype is None:
+        return np.where(mask,raw,'')
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'b':
+        falses = np.in1d(np.char.strip(raw),['0','f','F','false','False','FALSE'])
+        return mask & ~falses.reshape(raw.shape)
+    elif dtype.kind in 'iu':
+        fill = '0'
+    elif dtype.kind in 'fc':
+        fill = 'nan'
+    else:
+        fill = ''
+    if dtype.kind in 'iu':
+        #strip first as not all versions of numpy accept whitespace for ints
+        raw = np.char.strip(raw)
+    return np.where(mask,raw,fill).astype(dtype)
+
 @_add_docs_and_sig(FixedColumnDataParser.parseFile,FixedColumnDataParser.addColumnsFromFile)
 @_add_docs(FixedColumnDataParser)
 def loadtxt_fixed_column_fields(fn,fncol=None,skiprows=0,comments='#',
@@ -922,12 +1273,158 @@ def loadtxt_fixed_column_fields(fn,fncol=None,skiprows=0,comments='#',
         updatedict.update(d)
     return arr
 
-def load_tipsy_format(fn):
+#fields of the particles of each type in binary Tipsy files, in file order
+_tipsy_particle_fields = (('gas',(('mass',()),('pos',(3,)),('vel',(3,)),
+                                  ('density',()),('temperature',()),
+                                  ('sph_smoothing',()),('metals',()),
+                                  ('potential_en',()))),
+                          ('dark',(('mass',()),('pos',(3,)),('vel',(3,)),
+                                   ('softening',()),('potential_en',()))),
+                          ('star',(('mass',()),('pos',(3,)),('vel',(3,)),
+                                   ('metals',()),('formation_time',()),
+                                   ('softening',()),('potential_en',()))))
+
+def _tipsy_key(field,ptype):
+    #the dictionary key used for a field of a particle type - fields of more
+    #than one particle type have the type appended
+    ntypes = len([pt for pt,fs in _tipsy_particle_fields if field in dict(fs)])
+    if ptype is None or ntypes == 1:
+        return field
+    return field+'_'+ptype
+
+def _tipsy_binary_header(fn):
+    #returns (byteorder,header size,time,ntotal,dims,ngas,ndark,nstar) if `fn`
+    #is a binary Tipsy file, or None if not
+    import os
+
+    fsize = os.path.getsize(fn)
+    with open(fn,'rb') as f:
+        hdr = f.read(32)
+    if len(hdr) < 28:
+        return None
+
+    for byteorder in ('<','>'):
+        time = float(np.frombuffer(hdr[:8],dtype=byteorder+'f8')[0])
+        ntotal,dims,ngas,ndark,nstar = [int(i) for i in np.frombuffer(hdr[8:28],dtype=byteorder+'i4')]
+        if min(ntotal,ngas,ndark,nstar) < 0 or ngas+ndark+nstar != ntotal:
+            continue
+        psize = 0
+        for ptype,n in zip(('gas','dark','star'),(ngas,ndark,nstar)):
+            fields = dict(_tipsy_particle_fields)[ptype]
+            psize += 4*n*sum([int(np.prod(shp)) for nm,shp in fields])
+        #the header is usually padded to 32 bytes
+        for hdrsize in (32,28):
+            if fsize == hdrsize+psize:
+                return byteorder,hdrsize,time,ntotal,dims,ngas,ndark,nstar
+    return None
+
+def load_tipsy_format(fn,fields=None,ptypes=None,concatenate=True):
     """
     This function loads a file in the Tipsy ASCII format
-    (http://www-hpcc.astro.washington.edu/tipsy/man/readascii.html)
-    and outputs a dictionary with entries for grouped data
+    (http://www-hpcc.astro.washington.edu/tipsy/man/readascii.html) or the
+    standard binary Tipsy format (in native or big-endian/XDR byte order) and
+    outputs a dictionary with entries for grouped data.
+
+    For binary files, the gas, dark, and star particle blocks are memory-mapped
+    as structured arrays that are available as the 'gas', 'dark', and 'star'
+    entries, and the entries for each particle type are views of these, so data
+    are only read from disk as they are accessed.
+
+    :param fn: The name of the Tipsy file to load.
+    :type fn: string
+    :param fields:
+        A sequence of the fields to load ('mass', 'pos', 'vel', 'softening',
+        'density', 'temperature', 'sph_smoothing', 'metals', 'formation_time',
+        or 'potential_en'), or None to load all of them.
+    :type fields: sequence of strings or None
+    :param ptypes:
+        A sequence of the particle types to load ('gas', 'dark', or 'star'), or
+        None to load all of them.
+    :type ptypes: sequence of strings or None
+    :param concatenate:
+        If True, the 'mass', 'pos', 'vel', and 'potential_en' entries for all of
+        the loaded particles are included.  For binary files or if `ptypes` is
+        given, these are copies of the data, so this should be False to avoid
+        reading the whole of a large binary file into memory.
+    :type concatenate: bool
+
+    :returns:
+        A dictionary with the header values ('ntotal', 'ngas', 'ndark',
+        'nstar', 'dims', and 'time') and arrays for each field.  Fields present
+        for more than one particle type have the type appended (e.g.
+        'mass_gas' or 'softening_star'), and 'pos' and 'vel' entries have shape
+        (dims,N).
+
+    :except ValueError: If an invalid field or particle type is requested.
+
     """
+    alltypes = [pt for pt,fs in _tipsy_particle_fields]
+    if ptypes is None:
+        ptypes = alltypes
+    else:
+        for pt in ptypes:
+            if pt not in alltypes:
+                raise ValueError('invalid Tipsy particle type '+str(pt))
+    allfields = set([nm for pt,fs in _tipsy_particle_fields for nm,shp in fs])
+    if fields is not None:
+        for fi in fields:
+            if fi not in allfields:
+                raise ValueError('invalid Tipsy field '+str(fi))
+
+    hdr = _tipsy_binary_header(fn)
+    if hdr is None:
+        dout = _load_tipsy_ascii(fn)
+    else:
+        dout = _load_tipsy_binary(fn,*hdr)
+
+    #remove entries for unrequested particle types and fields
+    combined = [nm for nm in allfields if
+                all([nm in dict(fs) for pt,fs in _tipsy_particle_fields])]
+    for pt,fs in _tipsy_particle_fields:
+        if pt not in ptypes:
+            dout.pop(pt,None)
+        for nm,shp in fs:
+            key = _tipsy_key(nm,pt)
+            if key in dout and (pt not in ptypes or (fields is not None and nm not in fields)):
+                del dout[key]
+    for nm in combined:
+        if nm in dout and (not concatenate or list(ptypes) != alltypes or (fields is not None and nm not in fields)):
+            del dout[nm]
+
+    if concatenate:
+        for nm in combined:
+            if nm not in dout and (fields is None or nm in fields):
+                arrs = [dout[_tipsy_key(nm,pt)] for pt in alltypes if pt in ptypes]
+                dout[nm] = np.concatenate(arrs,axis=-1)
+
+    return dout
+
+def _load_tipsy_binary(fn,byteorder,hdrsize,time,ntotal,dims,ngas,ndark,nstar):
+    dout = {}
+    dout['ntotal'] = ntotal
+    dout['ndark'] = ndark
+    dout['nstar'] = nstar
+    dout['ngas'] = ngas
+    dout['dims'] = dims
+    dout['time'] = time
+
+    offset = hdrsize
+    for (pt,fs),n in zip(_tipsy_particle_fields,(ngas,ndark,nstar)):
+        dt = np.dtype([(nm,byteorder+'f4',shp) for nm,shp in fs])
+        if n > 0:
+            arr = np.memmap(fn,dtype=dt,mode='r',offset=offset,shape=(n,))
+        else: #memmap cannot map an empty block
+            arr = np.zeros(0,dtype=dt)
+        offset += n*dt.itemsize
+
+        dout[pt] = arr
+        for nm,shp in fs:
+            #vector fields are (dims,N) as in the ASCII format
+            dout[_tipsy_key(nm,pt)] = arr[nm].T[:dims] if shp else arr[nm]
+
+    return dout
+
+def _load_tipsy_ascii(fn):
     dout = {}
     with open(fn) as f:
         ntotal,ngas,nstar = [int(e) for e in f.readline().split()]
@@ -946,7 +1443,7 @@ def load_tipsy_format(fn):
     j = ntotal
     dout['mass'] = A[i:j]
     dout['mass_gas'] = dout['mass'][:ngas]
-    dout['mass_dark'] = dout['mass'][ngas:ndark]
+    dout['mass_dark'] = dout['mass'][ngas:(ngas+ndark)]
     dout['mass_star'] = dout['mass'][(ngas+ndark):]
 
     pos = []
@@ -957,7 +1454,7 @@ def load_tipsy_format(fn):
 
     dout['pos'] = np.array(pos,copy=False)
     dout['pos_gas'] = dout['pos'][:,:ngas]
-    dout['pos_dark'] = dout['pos'][:,ngas:ndark]
+    dout['pos_dark'] = dout['pos'][:,ngas:(ngas+ndark)]
     dout['pos_star'] = dout['pos'][:,(ngas+ndark):]
 
     vel = []
@@ -967,7 +1464,7 @@ def load_tipsy_format(fn):
         vel.append(A[i:j])
     dout['vel'] = np.array(vel,copy=False)
     dout['vel_gas'] = dout['vel'][:,:ngas]
-    dout['vel_dark'] = dout['vel'][:,ngas:ndark]
+    dout['vel_dark'] = dout['vel'][:,ngas:(ngas+ndark)]
     dout['vel_star'] = dout['vel'][:,(ngas+ndark):]
 
     if ndark>0:
@@ -1006,7 +1503,7 @@ def load_tipsy_format(fn):
     j+= ntotal
     dout['potential_en'] = A[i:j]
     dout['potential_en_gas'] = dout['potential_en'][:ngas]
-    dout['potential_en_dark'] = dout['potential_en'][ngas:ndark]
+    dout['potential_en_dark'] = dout['potential_en'][ngas:(ngas+ndark)]
     dout['potential_en_star'] = dout['potential_en'][(ngas+ndark):]
 
     if j!=A.size:
@@ -1023,15 +1520,424 @@ def load_tipsy_format(fn):
 #    from warnings import warn
 #    warn('vo.table not found - VOTable processing limited to VOTableReader class')
 
+def _xmltag(elem):
+    #the tag of an ElementTree element without any namespace
+    return elem.tag.rsplit('}',1)[-1]
+
+class _VOTableField(object):
+    """
+    The data format of a VOTable FIELD, used to convert the serialized values of
+    the field into arrays.
+    """
+    def __init__(self,datatype,arraysize,null,dtypemap):
+        base = dtypemap[datatype]
+        if base is None:
+            raise NotImplementedError('datatype %s not supported'%datatype)
+
+        dims = [d.strip() for d in arraysize.split('x')] if arraysize else []
+        self.variable = len(dims)>0 and dims[-1].endswith('*')
+        if self.variable:
+            dims.pop()
+        self.strlen = None
+        if datatype in ('char','unicodeChar'):
+            #first dimension is the length of the strings
+            if len(dims)>0:
+                self.strlen = int(dims.pop(0))
+            elif not self.variable:
+                self.strlen = 1
+            if self.strlen is not None:
+                base = base+str(self.strlen)
+        if '*' in ''.join(dims):
+            raise ValueError('only the last dimension of arraysize can be variable - invalid VOTable?')
+
+        self.datatype = datatype
+        self.base = base
+        self.null = null
+        self.varstring = self.variable and self.strlen is None and datatype in ('char','unicodeChar')
+        self.shape = tuple(reversed([int(d) for d in dims])) #VOTable arrays are in Fortran order
+        self.count = int(np.prod(self.shape))*(self.strlen or 1)
+
+        if self.variable:
+            self.dtype = 'O'
+            self.coldtype = np.dtype(object)
+        else:
+            self.dtype = str(self.shape)+base if self.shape else base
+            self.coldtype = np.dtype((base,self.shape))
+
+        if datatype in ('bit','boolean'):
+            self.fill = '0'
+        elif datatype in ('char','unicodeChar'):
+            self.fill = ''
+        elif np.dtype(base).kind in 'fc':
+            self.fill = 'nan'
+        else:
+            self.fill = '0'
+
+    def nbytes(self,count):
+        """
+        The number of bytes in the binary serialization for `count` primitives.
+        """
+        if self.datatype == 'bit':
+            return (count+7)//8
+        elif self.datatype == 'unicodeChar':
+            return 2*count
+        elif self.datatype in ('char','boolean'):
+            return count
+        else:
+            return count*np.dtype(self.base).itemsize
+
+    def rawdtype(self,count):
+        """
+        The dtype of the binary serialization for `count` primitives.
+        """
+        if self.datatype == 'bit':
+            return np.dtype(('u1',(self.nbytes(count),)))
+        elif self.datatype == 'boolean':
+            return np.dtype(('u1',(count,)))
+        elif self.datatype == 'unicodeChar':
+            return np.dtype(('>u2',(count,)))
+        elif self.datatype == 'char':
+            if self.strlen is None:
+                return np.dtype('S%i'%count)
+            shape = (count//self.strlen,) if self.variable else self.shape
+            return np.dtype(('S%i'%self.strlen,shape))
+        else:
+            shape = (count,) if self.variable else self.shape
+            return np.dtype(('>'+self.base,shape))
+
+    @property
+    def directbinary(self):
+        """
+        True if the binary serialization can be read directly as the values,
+        apart from byte order.
+        """
+        return not self.variable and self.datatype not in ('bit','boolean','unicodeChar')
+
+    def nullmask(self,vals):
+        """
+        Returns a mask that is True for the rows of `vals` that are null.
+        """
+        kind = vals.dtype.kind
+        if kind in 'fc':
+            null = np.isnan(vals)
+        elif kind in 'iu' and self.null is not None:
+            null = vals == int(self.null)
+        else:
+            return np.zeros(len(vals),dtype=bool)
+        if null.ndim > 1:
+            null = null.all(axis=tuple(range(1,null.ndim)))
+        return null
+
+    def fromBinary(self,buf,count,nrows):
+        """
+        Converts the binary serialization of `nrows` rows with `count` primitives
+        each to an array of values and a mask that is True for null rows.
+        """
+        if count == 0:
+            if self.varstring:
+                return np.array(['']*nrows,dtype=self.base),np.ones(nrows,dtype=bool)
+            else:
+                vals = np.empty((nrows,0)+self.shape,dtype=self.base)
+                return vals,np.ones(nrows,dtype=bool)
+
+        raw = np.frombuffer(buf,dtype=self.rawdtype(count))
+        if len(raw) != nrows:
+            raise RuntimeError('binary stream does not match the fields - invalid VOTable?')
+
+        if self.varstring:
+            shape = ()
+        elif self.variable:
+            shape = (-1,)+self.shape
+        else:
+            shape = self.shape
+
+        null = None
+        if self.datatype == 'bit':
+            vals = np.unpackbits(raw.reshape(nrows,-1),axis=1)[:,:count].astype(bool)
+        elif self.datatype == 'boolean':
+            raw = raw.reshape(nrows,-1)
+            vals = (raw==ord('T'))|(raw==ord('t'))|(raw==ord('1'))
+            null = ((raw==ord('?'))|(raw==ord(' '))|(raw==0)).all(axis=1)
+        elif self.datatype == 'unicodeChar':
+            strlen = self.strlen or count
+            vals = raw.reshape(nrows,-1).astype('u4').view('U%i'%strlen)
+        else:
+            vals = raw
+        vals = vals.reshape((nrows,)+shape)
+
+        if null is None:
+            null = self.nullmask(vals)
+        return vals,null
+
+    def _tokens(self,text):
+        #splits a TABLEDATA cell into the strings for each primitive or string
+        if self.strlen is not None:
+            n = self.count if not self.variable else len(text)
+            text = text.ljust(n)
+            return [text[i:i+self.strlen] for i in range(0,n,self.strlen)]
+        elif self.datatype == 'bit':
+            return list(''.join(text.split()))
+        else:
+            return text.split()
+
+    def _tokenValues(self,tokens):
+        #converts a sequence of primitive strings into an array of values
+        if self.datatype in ('bit','boolean'):
+            return np.array([t[:1] in ('T','t','1') for t in tokens],dtype=bool)
+        elif self.datatype in ('char','unicodeChar'):
+            return np.array(tokens,dtype=self.base)
+        else:
+            return np.array(tokens).astype(self.base)
+
+    def fromText(self,texts):
+        """
+        Converts a sequence of TABLEDATA cell strings (None for empty cells) to
+        an array of values and a mask that is True for null cells.
+        """
+        n = len(texts)
+        texts = [t or '' for t in texts]
+        null = np.array([t.strip()=='' for t in texts],dtype=bool)
+
+        if self.variable:
+            vals = np.empty(n,dtype=object)
+            for i,t in enumerate(texts):
+                if self.varstring:
+                    vals[i] = t
+                else:
+                    vals[i] = self._tokenValues(self._tokens(t)).reshape((-1,)+self.shape)
+            return vals,null
+        elif not self.shape and self.datatype in ('char','unicodeChar'):
+            return np.array(texts,dtype=self.base),null
+        elif not self.shape and self.datatype not in ('bit','boolean'):
+            #scalars can be converted all at once
+            raw = np.array([self.fill if nl else t.strip() for t,nl in zip(texts,null)])
+            vals = raw.astype(self.base)
+        else:
+            tokens = []
+            for t,nl in zip(texts,null):
+                tks = [self.fill]*(self.count//(self.strlen or 1)) if nl else self._tokens(t)
+                if len(tks)*(self.strlen or 1) != self.count:
+                    raise ValueError('TABLEDATA entry "%s" does not match arraysize - invalid VOTable?'%t)
+                tokens.extend(tks)
+            vals = self._tokenValues(tokens).reshape((n,)+self.shape)
+            if self.datatype == 'boolean' and not self.shape:
+                null |= np.array([t.strip()=='?' for t in texts],dtype=bool)
+
+        return vals,null|self.nullmask(vals)
+
+class _VOTableData(object):
+    """
+    Accumulates the rows of a VOTable TABLE, converting them a chunk at a time
+    into preallocated arrays for each field.
+    """
+    def __init__(self,fields,nrows,chunksize):
+        self.names = [str(f[0]) for f in fields]
+        self.fields = [f[3] for f in fields]
+        self.chunksize = chunksize
+        size = nrows if nrows else chunksize
+
+        self.cols = [np.empty(size,dtype=fld.coldtype) for fld in self.fields]
+        self.mask = np.ones((size,len(fields)),dtype=bool)
+        self.n = 0
+        self.rows = []
+        self.array = None #set if the table is used directly from a binary stream
+
+    def _append(self,vals,nulls):
+        m = len(nulls[0])
+        n = self.n
+        size = len(self.mask)
+        if n+m > size:
+            size = max(n+m,2*size)
+            for i,c in enumerate(self.cols):
+                self.cols[i] = np.empty((size,)+c.shape[1:],dtype=c.dtype)
+                self.cols[i][:n] = c[:n]
+            mask = self.mask
+            self.mask = np.ones((size,mask.shape[1]),dtype=bool)
+            self.mask[:n] = mask[:n]
+
+        for c,v in zip(self.cols,vals):
+            c[n:n+m] = v
+        self.mask[n:n+m] = ~np.array(nulls).T
+        self.n += m
+
+    def addRow(self,texts):
+        """
+        Adds a row from TABLEDATA as a sequence of cell strings.
+        """
+        self.rows.append(texts)
+        if len(self.rows) >= self.chunksize:
+            self._flushRows()
+
+    def _flushRows(self):
+        rows = self.rows
+        if len(rows) == 0:
+            return
+        for r in rows:
+            if len(r) != len(self.fields):
+                raise RuntimeError('number of TDs does not match the FIELDs - invalid VOTable?')
+
+        vals,nulls = [],[]
+        for fld,texts in zip(self.fields,zip(*rows)):
+            v,nl = fld.fromText(texts)
+            vals.append(v)
+            nulls.append(nl)
+        self._append(vals,nulls)
+        self.rows = []
+
+    def _nullBits(self,buf,nrows,nulls):
+        #applies the BINARY2 null flags in `buf` to the list of null masks
+        nmask = (len(self.fields)+7)//8
+        bits = np.unpackbits(np.frombuffer(buf,dtype='u1').reshape(nrows,nmask),axis=1)
+        return [nl|bits[:,i].astype(bool) for i,nl in enumerate(nulls)]
+
+    def addBinary(self,buf,binary2=False):
+        """
+        Adds the rows from a decoded BINARY or BINARY2 stream.
+        """
+        fields = self.fields
+        nmask = (len(fields)+7)//8 if binary2 else 0
+
+        if not any([fld.variable for fld in fields]):
+            #fixed-size rows can be read as a record array in one step
+            offsets = np.cumsum([nmask]+[fld.nbytes(fld.count) for fld in fields])
+            rowsize = int(offsets[-1])
+            if len(buf)%rowsize != 0:
+                raise RuntimeError('binary stream does not match the FIELDs - invalid VOTable?')
+            nrows = len(buf)//rowsize
+
+            if self.n == 0 and all([fld.directbinary for fld in fields]):
+                dt = np.dtype({'names':self.names,'offsets':[int(o) for o in offsets[:-1]],
+                               'formats':[fld.rawdtype(fld.count) for fld in fields],
+                               'itemsize':rowsize})
+                raw = np.frombuffer(buf,dtype=dt).reshape(nrows)
+                #copy into native byte order so the array matches TABLEDATA
+                self.array = np.empty(nrows,dtype=[(nm,fld.coldtype) for fld,nm in zip(fields,self.names)])
+                for nm in self.names:
+                    self.array[nm] = raw[nm]
+                del raw
+                nulls = [fld.nullmask(self.array[nm]) for fld,nm in zip(fields,self.names)]
+                if binary2:
+                    nulls = self._nullBits(np.frombuffer(buf,dtype='u1').reshape(nrows,rowsize)[:,:nmask].tostring(),nrows,nulls)
+                self.mask = ~np.array(nulls).T.reshape(nrows,len(fields))
+                self.n = nrows
+                return
+
+            raw = np.frombuffer(buf,dtype='u1').reshape(nrows,rowsize)
+            for st in range(0,nrows,self.chunksize):
+                chunk = raw[st:st+self.chunksize]
+                m = len(chunk)
+                vals,nulls = [],[]
+                for i,fld in enumerate(fields):
+                    v,nl = fld.fromBinary(chunk[:,offsets[i]:offsets[i+1]].tostring(),fld.count,m)
+                    vals.append(v)
+                    nulls.append(nl)
+                if binary2:
+                    nulls = self._nullBits(chunk[:,:nmask].tostring(),m,nulls)
+                self._append(vals,nulls)
+        else:
+            from struct import unpack
+
+            rows = []
+            pos = 0
+            while pos < len(buf):
+                row = [buf[pos:pos+nmask]]
+                pos += nmask
+                for fld in fields:
+                    if fld.variable:
+                        count = unpack('>i',buf[pos:pos+4])[0]
+                        pos += 4
+                    else:
+                        count = fld.count
+                    nb = fld.nbytes(count)
+                    row.append((buf[pos:pos+nb],count))
+                    pos += nb
+                rows.append(row)
+                if len(rows) >= self.chunksize:
+                    self._addBinaryRows(rows,binary2)
+                    rows = []
+            if pos != len(buf):
+                raise RuntimeError('binary stream does not match the FIELDs - invalid VOTable?')
+            self._addBinaryRows(rows,binary2)
+
+    def _addBinaryRows(self,rows,binary2):
+        #rows are lists of the null flags and (bytes,count) for each field
+        m = len(rows)
+        if m == 0:
+            return
+
+        vals,nulls = [],[]
+        for i,fld in enumerate(self.fields):
+            if fld.variable:
+                v = np.empty(m,dtype=object)
+                nl = np.empty(m,dtype=bool)
+                for j,row in enumerate(rows):
+                    rv,rnl = fld.fromBinary(row[i+1][0],row[i+1][1],1)
+                    v[j] = rv[0]
+                    nl[j] = rnl[0]
+            else:
+                v,nl = fld.fromBinary(''.join([row[i+1][0] for row in rows]),fld.count,m)
+            vals.append(v)
+            nulls.append(nl)
+        if binary2:
+            nulls = self._nullBits(''.join([row[0] for row in rows]),m,nulls)
+        self._append(vals,nulls)
+
+    def addFITS(self,buf,extnum=1):
+        """
+        Adds the rows from a decoded FITS stream.
+        """
+        from cStringIO import StringIO
+
+        with open_with_pyfits(StringIO(buf)) as f:
+            data = f[extnum].data
+            if data is None or len(data) == 0:
+                return
+            vals,nulls = [],[]
+            for i,fld in enumerate(self.fields):
+                v = np.array(data.field(i))
+                vals.append(v)
+                nulls.append(fld.nullmask(v))
+        self._append(vals,nulls)
+
+    def finish(self):
+        """
+        Returns the array of the table data, the mask, and the final dtype of
+        each field.
+        """
+        self._flushRows()
+        if self.array is not None:
+            return self.array,self.mask,[fld.dtype for fld in self.fields]
+
+        n = self.n
+        cols = [c[:n] for c in self.cols]
+        dtypes = [fld.dtype for fld in self.fields]
+        for i,fld in enumerate(self.fields):
+            if fld.varstring:
+                #variable-length strings become fixed-length at the longest
+                cols[i] = np.array(cols[i].tolist(),dtype=fld.base)
+                dtypes[i] = fld.base+str(cols[i].dtype.itemsize//(4 if fld.base=='U' else 1))
+
+        arr = np.empty(n,dtype=[(nm,c.dtype,c.shape[1:]) for nm,c in zip(self.names,cols)])
+        for nm,c in zip(self.names,cols):
+            arr[nm] = c
+        return arr,self.mask[:n],dtypes
+
 class VOTableReader(object):
     """
     This class represents a VOTable. Currently, it is read-only, and will
     probably not be enhanced due to the existence of Michael Droettboom's
     vo.table package (http://trac6.assembla.com/astrolib).
+
+    The document is parsed incrementally, and table rows are converted in
+    chunks into preallocated arrays, so only the table data need fit in memory.
+    TABLEDATA, BINARY, BINARY2, and FITS serializations are supported, as are
+    fixed and variable-length strings and arrays (variable-length arrays are
+    loaded as object arrays of arrays, while variable-length strings are made
+    fixed-length at the longest string).
     """
 
-    dtypemap = {"boolean":'b',
-                "bit":None,
+    dtypemap = {"boolean":'?',
+                "bit":'?',
                 "unsignedByte":'u1',
                 "short":'i2',
                 "int":'i4',
@@ -1043,21 +1949,39 @@ class VOTableReader(object):
                 "floatComplex":'c8',
                 "doubleComplex":'c16'} #maps VOTable data types to numpy
 
-    def __init__(self,s,filename=True):
+    def __init__(self,s,filename=True,table=None,chunksize=10000):
         """
         instantiate a VOTable object from an XML VOTable
 
         If filename is True, the input string will be interpreted as
         a filename for a VOTable, otherwise s will be interpreted as
-        an XML-formatted string with the VOTable data
+        an XML-formatted string with the VOTable data.  `s` can also be
+        a file-like object.
+
+        If `table` is None, all tables are loaded.  Otherwise, it is the name
+        (as in :meth:`getTableNames`) or index of the only table to load - the
+        data of other tables are skipped, and parsing stops after the table is
+        read. `chunksize` is the number of rows that are converted to arrays at
+        a time.
         """
-        from xml.dom import pulldom
-        if filename:
-            events = pulldom.parse(s)
+        try:
+            from xml.etree.cElementTree import iterparse
+        except ImportError:
+            from xml.etree.ElementTree import iterparse
+        from base64 import b64decode
+
+        if hasattr(s,'read'):
+            f = s
+        elif filename:
+            f = open(s,'rb')
         else:
-            events = pulldom.parseString(s)
+            from cStringIO import StringIO
+            if isinstance(s,unicode):
+                s = s.encode('utf-8')
+            f = StringIO(s)
 
         self._tables = {} #keys are table names
+        self._tabnames = [] #table names in the order they appear
         self._masks = {} #keys are table names
         self._resnames = {} #keys are table names
         self._fields = {} #keys are table names
@@ -1075,123 +1999,159 @@ class VOTableReader(object):
         voparams=[]
         inres=None
         intab=None
-        indat=None
+        data=None
+        elems=[] #stack of open elements, excluding rows
+        tags={} #maps full tags to tags without namespaces
 
+        try:
+            for ev,n in iterparse(f,events=('start','end')):
+                nm = tags.get(n.tag)
+                if nm is None:
+                    nm = tags[n.tag] = _xmltag(n)
+
+                #rows are handled first as they are most of the document
+                if nm == 'TD':
+                    continue
+                elif nm == 'TR':
+                    if ev == 'end':
+                        if data is not None:
+                            data.addRow([td.text for td in n])
+                        elems[-1].clear() #drops the rows already read
+                    continue
+
+                if ev == 'start':
+                    elems.append(n)
+                    if nm == 'RESOURCE':
+                        if inres:
+                            raise NotImplementedError('no support for nested resources')
+
+                        rcounter+=1
+                        resparams = []
+                        inres = n.get('name','res%i'%rcounter)
+
+                    elif nm == 'TABLE':
+                        if not inres:
+                            raise RuntimeError('table outside of resource - invalid VOTable?')
+
+                        tcounter+=1
+                        tabparams = []
+                        fields = []
 
-        for ev,n in events:
-            if ev == 'START_ELEMENT':
-                nm = n.tagName
-                if nm == 'RESOURCE':
-                    if inres:
-                        raise NotImplementedError('no support for nested resources')
-
-                    rcounter+=1
-                    resparams = []
-
-                    if n.attributes.has_key('name'):
-                        inres = n.attributes['name'].value
-                    else:
-                        inres = 'res%i'%rcounter
-
-                elif nm == 'TABLE':
-                    if not inres:
-                        raise RuntimeError('table outside of resource - invalid VOTable?')
+                        if intab:
+                            raise RuntimeError('nested tables - invalid VOTable?')
 
-                    tcounter+=1
-                    tabparams = []
-                    fields = []
+                        if 'ref' in n.attrib:
+                            raise NotImplementedError('table refs not yet implemented')
 
-                    if intab:
-                        raise RuntimeError('nested tables - invalid VOTable?')
+                        if 'name' in n.attrib:
+                            intab = inres+namesep+n.get('name')
+                        else:
+                            intab = 'tab%i'%tcounter
+                        if intab in self._tables:
+                            intab = intab+'_'+str(tcounter)
 
-                    if n.attributes.has_key('ref'):
-                        raise NotImplementedError('table refs not yet implemented')
+                        nrows = int(n.get('nrows')) if 'nrows' in n.attrib else None
 
-                    if n.attributes.has_key('name'):
-                        intab = inres+namesep+n.attributes['name'].value
-                    else:
-                        intab = 'tab%i'%tcounter
-                    if intab in self._tables:
-                        intab = intab+'_'+str(tcounter)
+                        if table is None:
+                            skip = False
+                        elif isinstance(table,basestring):
+                            skip = intab != table
+                        else:
+                            skip = tcounter-1 != int(table)
+
+                    elif nm == 'GROUP':
+                        raise NotImplementedError('Groups not implemented')
+
+                    elif nm == 'DATA':
+                        if not intab:
+                            raise RuntimeError('Data not in a table - invalid VOTable?')
+                        if not skip:
+                            data = _VOTableData(fields,nrows,chunksize)
+
+                elif ev == 'end':
+                    elems.pop()
+                    parent = _xmltag(elems[-1]) if elems else None
+
+                    if nm == 'STREAM':
+                        if data is not None:
+                            if 'href' in n.attrib:
+                                raise NotImplementedError('remote data streams not implemented')
+                            enc = n.get('encoding','base64')
+                            if enc != 'base64':
+                                raise NotImplementedError('%s stream encoding not implemented'%enc)
+                            buf = b64decode(n.text or '')
+                            n.clear()
+                            if parent == 'FITS':
+                                data.addFITS(buf,int(elems[-1].get('extnum',1)))
+                            else:
+                                data.addBinary(buf,parent=='BINARY2')
+                            del buf
+                        else:
+                            n.clear()
 
-                    if n.attributes.has_key('nrows'):
-                        nrows = n.attributes['nrows'].value
-                    else:
-                        nrows = None
-
-                elif nm == 'DATA':
-                    if not intab:
-                        raise RuntimeError('Data not in a table - invalid VOTable?')
-                    params = []
-                    params.extend(voparams)
-                    params.extend(resparams)
-                    params.extend(tabparams)
-
-                    indat = True
-
-                #data types
-                elif nm == 'TABLEDATA':
-                    events.expandNode(n)
-                    array,mask = self._processTabledata(n,fields,params,nrows)
-
-                elif nm == 'BINARY':
-                    raise NotImplementedError('Binary data not implemented')
-
-                elif nm == 'FITS':
-                    raise NotImplementedError('FITS data not implemented')
-
-                elif nm == 'PARAM':
-                    events.expandNode(n)
-                    if inres and not intab:
-                        resparams.append(self._extractParam(n))
-                    elif intab:
-                        tabparams.append(self._extractParam(n))
-                    else:
-                        voparams.append(self._extractParam(n))
-                elif nm == 'FIELD':
-                    if not intab:
-                        raise RuntimeError('nested tables - invalid VOTable?')
-                    events.expandNode(n)
-                    fields.append(self._extractField(n))
-                elif nm == 'GROUP':
-                    raise NotImplementedError('Groups not implemented')
-                elif nm == 'DESCRIPTION':
-                    events.expandNode(n)
-                    n.normalize()
-                    desc = n.firstChild.nodeValue
-                    if inres:
-                        if intab:
-                            self._tabdescs[intab] = desc
+                    elif nm == 'PARAM':
+                        if inres and not intab:
+                            resparams.append(self._extractParam(n))
+                        elif intab:
+                            tabparams.append(self._extractParam(n))
                         else:
+                            voparams.append(self._extractParam(n))
+                        n.clear()
+
+                    elif nm == 'FIELD':
+                        if not intab:
+                            raise RuntimeError('field not in a table - invalid VOTable?')
+                        fields.append(self._extractField(n))
+                        n.clear()
+
+                    elif nm == 'DESCRIPTION':
+                        #FIELD and PARAM descriptions are handled in the _extract* methods
+                        desc = n.text or ''
+                        if parent == 'TABLE':
+                            self._tabdescs[intab] = desc
+                        elif parent == 'RESOURCE':
                             self._resdescs[inres] = desc
-                    else:
-                        self.description = desc
-
-
-            elif ev == 'END_ELEMENT':
-                nm = n.tagName
-                if nm == 'RESOURCE':
-                    inres = None
-                elif nm == 'TABLE':
-
-                    self._resnames[intab] = inres
-                    self._fields[intab] = fields
-                    self._applyParams(intab,params)
-                    self._tables[intab] = array
-                    self._masks[intab] = mask
-                    intab = None
-                    del array,mask,params,fields #do this to insure nothing funny happens in parsing - perhaps remove later?
-                elif nm == 'DATA':
-                    indat = False
-            if ev == 'CHARACTERS':
-                pass
+                        elif parent == 'VOTABLE':
+                            self.description = desc
+
+                    elif nm == 'RESOURCE':
+                        inres = None
+                        n.clear()
+
+                    elif nm == 'TABLE':
+                        done = not skip and table is not None
+                        if not skip:
+                            if data is None: #no DATA element
+                                data = _VOTableData(fields,0,chunksize)
+                            array,mask,dtypes = data.finish()
+                            fields = [(fl[0],dt)+fl[2:] for fl,dt in zip(fields,dtypes)]
+
+                            self._tabnames.append(intab)
+                            self._resnames[intab] = inres
+                            self._fields[intab] = fields
+                            self._applyParams(intab,voparams+resparams+tabparams)
+                            self._tables[intab] = array
+                            self._masks[intab] = mask
+                            del array,mask
+
+                        data = None
+                        intab = None
+                        n.clear()
+                        if done:
+                            break
+        finally:
+            if f is not s:
+                f.close()
+
+        if table is not None and len(self._tables) == 0:
+            raise KeyError('table %s not found'%table)
 
     def _applyParams(self,intab,params):
         self._pars[intab] = dict([(str(p[0]),p[1]) for p in params])
         self._parexts[intab] = dict([(str(p[0]),p[2]) for p in params])
 
     def getTableNames(self):
-        return self._tables.keys()
+        return list(self._tabnames)
 
     def getTableResource(self,table=0):
         nm = self._tableToName(table)
@@ -1199,11 +2159,11 @@ class VOTableReader(object):
 
     def getTableParams(self,table=0):
         nm = self._tableToName(table)
-        fs = self._pars[nm]
+        return self._pars[nm]
 
     def getTableParamExtras(self,table=0):
         nm = self._tableToName(table)
-        fs = self._parexts[nm]
+        return self._parexts[nm]
 
     def getTableFieldNames(self,table=0):
         nm = self._tableToName(table)
@@ -1235,107 +2195,43 @@ class VOTableReader(object):
             return table
         else:
             i = int(table)
-            return self._tables.keys()[i]
+            return self._tabnames[i]
 
-    def _extractField(self,n):
-        n.normalize()
-        name = n.attributes['name'].value
-        desc = n.getElementsByTagName('DESCRIPTION')
+    def _extractDescription(self,n,kind):
+        name = n.get('name')
+        desc = [c.text or '' for c in n if _xmltag(c) == 'DESCRIPTION']
         if len(desc) == 0:
-            desc = ''
+            return ''
         elif len(desc) == 1:
-            desc = desc[0].firstChild.nodeValue
+            return desc[0]
         else:
-            raise RuntimeError('multiple DESCRIPTIONs found in field %s - invalid VOTable?'%name)
-
-        dtype = self.dtypemap[n.attributes['datatype'].value]
-        if n.attributes.has_key('arraysize'):
-            szs = n.attributes['arraysize'].value.strip()
-            if dtype == 'a' or dtype == 'U':
-                if 'x' in szs:
-                    raise NotImplementedError('multidimensional strings not yet supported')
-                elif szs == '*':
-                    raise NotImplementedError('unlimited length strings not yet supported')
-                dtype = dtype+szs.replace('*','') #fixed length strings
-            else:
-                raise NotImplementedError('array primitives not yet supported')
-
-        #val = n.getElementsByTagName('VALUES') #not using this
+            raise RuntimeError('multiple DESCRIPTIONs found in %s %s - invalid VOTable?'%(kind,name))
 
+    def _extractExtras(self,n,desc):
         extrad={'DESCRIPTION':desc}
-        keys = n.attributes.keys()
-        for k in ('name','arraysize','datatype'):
-            if k in keys:
-                keys.remove(k)
-        for k in keys:
-            extrad[k] = n.attributes[k].value
+        for k,v in n.attrib.iteritems():
+            if k not in ('name','arraysize','datatype'):
+                extrad[k] = v
         if len(extrad)==0:
             extrad = None
+        return extrad
 
-        return name,dtype,extrad
+    def _extractField(self,n):
+        name = n.get('name')
+        desc = self._extractDescription(n,'field')
 
-    def _extractParam(self,n):
-        n.normalize()
-        name = n.attributes['name'].value
-        desc = n.getElementsByTagName('DESCRIPTION')
-        if len(desc) == 0:
-            desc = ''
-        elif len(desc) == 1:
-            desc = desc[0].firstChild.nodeValue
-        else:
-            raise RuntimeError('multiple DESCRIPTIONs found in param %s - invalid VOTable?'%name)
-        dtype = self.dtypemap[n.attributes['datatype'].value]
-        val = n.attributes['value'].value
-        npval = np.array(val,dtype=dtype)
-        #val = n.getElementsByTagName('VALUES') #not using this
+        nulls = [c.get('null') for c in n if _xmltag(c) == 'VALUES']
+        fmt = _VOTableField(n.get('datatype'),n.get('arraysize'),
+                            nulls[0] if nulls else None,self.dtypemap)
 
-        extrad={'DESCRIPTION':desc}
-        keys = n.attributes.keys()
-        for k in ('name','arraysize','datatype'):
-            if k in keys:
-                keys.remove(k)
-        for k in keys:
-            extrad[k] = n.attributes[k].value
-        if len(extrad)==0:
-            extrad = None
+        return name,fmt.dtype,self._extractExtras(n,desc),fmt
 
-        return name,val,extrad
-
-    def _processTabledata(self,n,fields,params,nrows):
-        n.normalize()
-        dt = np.dtype([(str(f[0]),str(f[1]))for f in fields])
-        if not nrows:
-            nrows = 0
-            for c in n.childNodes:
-                if c.nodeName == 'TR':
-                    nrows+=1
-
-        arr = np.ndarray(nrows,dtype=dt)
-        mask = np.ones((nrows,len(dt)),dtype=bool)
-
-        i = 0
-        for c in n.childNodes:
-            if c.nodeName == 'TR':
-                j = 0
-                for d in c.childNodes:
-                    if d.nodeName == 'TD':
-                        if d.hasChildNodes():
-                            arr[i][j] = d.firstChild.nodeValue
-                        else:
-                            arr[i][j] = 0
-                            mask[i][j] = False
-                    elif c.nodeType == 3 and c.nodeValue.strip()=='':
-                        pass #ignore whitespace text
-                    else:
-                        raise RuntimeError('non-TD inside TR - invalid VOTable?')
-                    j+=1
-                i+=1
-            elif c.nodeType == 3 and c.nodeValue.strip()=='':
-                pass #ignore whitespace text
-            else:
-                raise RuntimeError('non-TR inside Tabledata - invalid VOTable?')
+    def _extractParam(self,n):
+        name = n.get('name')
+        desc = self._extractDescription(n,'param')
+        val = n.get('value')
 
-        return arr,mask
+        return name,val,self._extractExtras(n,desc)
 
 class VOTable(VOTableReader): #name for backwards-compatibility
     def __init__(*args,**kwargs):
@@ -1509,7 +2405,8 @@ def load_deimos_spectrum(fn,plot=False,extraction='horne',retdata=False,smoothin
             return fobj
 
 def load_all_deimos_spectra(dir='.',pattern='spec1d*',extraction='horne',
-                            smoothing=None,verbose=True):
+                            smoothing=None,verbose=True,nprocs=1,lazy=False,
+                            cachefn=None,skiperrors=True):
     """
     loads all deimos spectra found in the specified directory that
     match the requested pattern and returns a list of the file names
@@ -1519,30 +2416,129 @@ def load_all_deimos_spectra(dir='.',pattern='spec1d*',extraction='horne',
 
     verbose indicates if information should be printed
 
+    nprocs is the number of processes used to load the files - if None, it
+    will be the number of CPUs, and if 1, they are loaded in this process.
+
+    if lazy is True, the spectra are :class:`~astropysics.spec.LazySpectrum`
+    objects that only read their file when they are first used (so errors
+    loading a file are raised at that point).
+
+    cachefn is the name of a file that all of the spectra are saved in together.
+    If it exists and was made from the same files (with the same modification
+    times), extraction, and smoothing, the spectra are loaded from it instead
+    of the individual files.  Otherwise, the spectra are loaded from the files
+    and the cache file is (re-)written.  lazy can't be used with cachefn.
+
+    if skiperrors is True, files that can't be loaded are skipped, otherwise
+    the exception is raised.
+
     returns dictionary mapping file names to Spectrum objects
     """
     from glob import glob
-    from os.path import join
+    from os.path import join,getmtime,exists
+
+    if lazy and cachefn is not None:
+        raise ValueError("lazy loading can't be used with a cache file")
 
     fns = glob(join(dir,pattern))
     fns.sort()
-    specs = []
 
-    fnrem=[]
-    for i,fn in enumerate(fns):
-        if verbose:
-            print 'Loading spectrum',fn
-        try:
-            s = load_deimos_spectrum(fn,False,extraction,False,smoothing)
-            specs.append(s)
-        except Exception,e:
+    if lazy:
+        from ..spec import LazySpectrum
+
+        specs = {}
+        for fn in fns:
+            s = LazySpectrum(load_deimos_spectrum,fn,False,extraction,False,smoothing)
+            s.name = fn
+            specs[fn] = s
+        return specs
+
+    mtimes = [getmtime(fn) for fn in fns]
+    if cachefn is not None and exists(cachefn):
+        specs = _load_deimos_cache(cachefn,fns,mtimes,extraction,smoothing)
+        if specs is not None:
             if verbose:
-                print 'Exception loading spectrum',fn,'skipping...'
-            fnrem.append(i)
-    for i in reversed(fnrem):
-        del fns[i]
+                print 'Loaded',len(specs),'spectra from cache',cachefn
+            return specs
+        elif verbose:
+            print 'Cache',cachefn,'out of date - reloading spectra'
 
-    return dict(zip(fns,specs))
+    tasks = [(fn,extraction,smoothing) for fn in fns]
+    from itertools import izip
+
+    if nprocs == 1:
+        from itertools import imap
+
+        pool = None
+        results = imap(_load_deimos_file,tasks)
+    else:
+        from multiprocessing import Pool
+
+        pool = Pool(nprocs)
+        results = pool.imap(_load_deimos_file,tasks)
+
+    specs = {}
+    try:
+        for fn,(s,e) in izip(fns,results):
+            if e is None:
+                if verbose:
+                    print 'Loaded spectrum',fn
+                specs[fn] = s
+            elif skiperrors:
+                if verbose:
+                    print 'Exception loading spectrum',fn,'skipping...'
+            else:
+                raise e
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if cachefn is not None:
+        _save_deimos_cache(cachefn,specs,fns,mtimes,extraction,smoothing)
+
+    return specs
+
+def _load_deimos_file(args):
+    #loads a spectrum for load_all_deimos_spectra, returning the Spectrum and
+    #None, or None and the exception if it could not be loaded
+    fn,extraction,smoothing = args
+    try:
+        return load_deimos_spectrum(fn,False,extraction,False,smoothing),None
+    except Exception,e:
+        return None,e
+
+def _save_deimos_cache(cachefn,specs,fns,mtimes,extraction,smoothing):
+    #pickles the spectra to a single file along with the options and files
+    #they were loaded with, so that every attribute of the spectra is kept
+    import os,tempfile,cPickle
+
+    cache = {'fns':fns,'mtimes':mtimes,'extraction':extraction,
+             'smoothing':smoothing,'specs':specs}
+
+    fd,tmpfn = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cachefn)))
+    try:
+        with os.fdopen(fd,'wb') as f:
+            cPickle.dump(cache,f,2)
+        os.rename(tmpfn,cachefn)
+    except:
+        os.remove(tmpfn)
+        raise
+
+def _load_deimos_cache(cachefn,fns,mtimes,extraction,smoothing):
+    #loads the spectra saved by _save_deimos_cache, or returns None if the
+    #cache does not match the requested files and options or can't be read
+    import cPickle
+
+    try:
+        with open(cachefn,'rb') as f:
+            cache = cPickle.load(f)
+        if (cache['fns'] != fns or cache['mtimes'] != mtimes or
+            cache['extraction'] != extraction or cache['smoothing'] != smoothing):
+            return None
+        return cache['specs']
+    except Exception:
+        return None
 
 def _load__old_spylot_spectrum(s,bandi):
     from ..spec import Spectrum
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+A stand-in for the sextractor executable used to test
+:class:`astropysics.phot.SExtractor` and :class:`astropysics.phot.SExtractorRunner`
+without a sextractor installation.  It understands the -dd and -dp flags and
+otherwise writes an ASCII_HEAD catalog of a few fake objects, with values
+computed from the object number and the length of the image file name.
+"""
+from __future__ import division,with_statement
+import sys
+
+_defaults = [('CATALOG_NAME','test.cat','name of the output catalog'),
+             ('CATALOG_TYPE','ASCII_HEAD','output catalog type'),
+             ('PARAMETERS_NAME','default.param','name of the file containing catalog contents'),
+             ('DETECT_THRESH','1.5','<sigmas> or <threshold>,<ZP> in mag.arcsec-2'),
+             ('PHOT_APERTURES','5','MAG_APERture diameter(s) in pixels'),
+             ('WEIGHT_IMAGE','weight.fits','weight-map filename'),
+             ('VERBOSE_TYPE','NORMAL','can be QUIET, NORMAL or FULL')]
+_params = [('NUMBER','Running object number',None),
+           ('FLUX_APER','Flux vector within fixed circular aperture(s)','count'),
+           ('FLUX_AUTO','Flux within a Kron-like elliptical aperture','count'),
+           ('X_IMAGE','Object position along x','pixel'),
+           ('Y_IMAGE','Object position along y','pixel'),
+           ('FLAGS','Extraction flags',None)]
+_nvals = {'FLUX_APER':3}
+_nobj = 5
+
+def main(args):
+    if '-dd' in args:
+        for k,v,comm in _defaults:
+            sys.stdout.write('%-16s %-16s # %s\n'%(k,v,comm))
+        return 0
+    if '-dp' in args:
+        for k,info,unit in _params:
+            sys.stdout.write('#%-22s %s%s\n'%(k,info,' [%s]'%unit if unit else ''))
+        return 0
+    
+    cfn = args[args.index('-c')+1]
+    opts = dict([(k,v) for k,v,comm in _defaults])
+    with open(cfn) as f:
+        for l in f:
+            ls = l.split('#')[0].split()
+            if len(ls)>1:
+                opts[ls[0]] = ls[1]
+    with open(opts['PARAMETERS_NAME']) as f:
+        params = [l.split()[0] for l in f if l.strip() and not l.startswith('#')]
+    
+    imfn = args[0]
+    try:
+        open(imfn).close()
+    except IOError:
+        sys.stderr.write('> ERROR: %s not found\n'%imfn)
+        return 1
+    if opts['CATALOG_TYPE'] != 'ASCII_HEAD':
+        sys.stderr.write('> ERROR: stand-in only writes ASCII_HEAD catalogs\n')
+        return 1
+    
+    sys.stderr.write('> Measuring objects in %s\n'%imfn)
+    with open(opts['CATALOG_NAME'],'w') as f:
+        col = 1
+        for p in params:
+            f.write('#%4i %s\n'%(col,p))
+            col += _nvals.get(p,1)
+        for i in range(1,_nobj+1):
+            vals = []
+            for p in params:
+                if p in ('NUMBER','FLAGS'):
+                    vals.append('%i'%(i if p == 'NUMBER' else 0))
+                else:
+                    for j in range(_nvals.get(p,1)):
+                        vals.append('%.4f'%(i*len(imfn)+j/10))
+            f.write(' '.join(vals)+'\n')
+    sys.stderr.write('> All done\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,573 @@
+#!/usr/bin/env python
+from __future__ import division,with_statement
+import os
+from astropysics.utils import io
+from nose import tools
+
+class _DataServer(object):
+    """
+    A local HTTP server that stands in for a remote data source, serving the
+    strings in the `files` dictionary (keyed on the URL path).
+    """
+    def __init__(self,files):
+        from BaseHTTPServer import HTTPServer,BaseHTTPRequestHandler
+        from threading import Thread
+
+        server = self
+        self.files = files
+        self.nrequests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.nrequests += 1
+                data = server.files.get(self.path)
+                if data is None:
+                    self.send_error(404)
+                else:
+                    self.send_response(200)
+                    self.send_header('Content-Length',str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+
+            def log_message(self,*args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1',0),Handler)
+        self.url = 'http://127.0.0.1:%i'%self.httpd.server_address[1]
+        self.thread = Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def test_data_store():
+    """
+    Test retrieving and storing remote data with get_data
+    """
+    import shutil,tempfile,urllib2
+    from hashlib import sha1
+    from astropysics import config
+
+    datadir = tempfile.mkdtemp()
+    oldgetdir = config.get_data_dir
+    oldsettings = (io.get_data_store(),io.get_data_download_reporter(),
+                   io.get_data_store_maxsize())
+    config.get_data_dir = lambda create=True:datadir
+    io.set_data_download_reporter(False)
+    io.set_data_store(True)
+    io.set_data_store_maxsize(None)
+    server = _DataServer({'/a.dat':'a'*1000,'/b.dat':'b'*2000,'/c.dat':'a'*1000})
+    try:
+        tools.assert_equal(io.get_data(server.url+'/a.dat'),'a'*1000)
+        tools.assert_equal(io.get_data(server.url+'/a.dat'),'a'*1000)
+        tools.assert_equal(server.nrequests,1)
+        objdir = os.path.join(datadir,'store','objects')
+        afn = os.path.join(objdir,sha1('a'*1000).hexdigest())
+        tools.assert_true(os.path.exists(afn))
+        #the data are also available by the file name from the URL
+        tools.assert_equal(io.get_data('a.dat'),'a'*1000)
+        #changing that file does not change the stored data
+        with open(os.path.join(datadir,'a.dat'),'w') as f:
+            f.write('changed')
+        tools.assert_equal(io.get_data(server.url+'/a.dat'),'a'*1000)
+        tools.assert_equal(server.nrequests,1)
+
+        #identical data are only stored once
+        f = io.get_data(server.url+'/c.dat',asfile=True)
+        tools.assert_equal(f.read(),'a'*1000)
+        f.close()
+        tools.assert_equal(os.listdir(objdir),[os.path.basename(afn)])
+
+        #damaged data are downloaded again
+        with open(afn,'w') as f:
+            f.write('a')
+        tools.assert_equal(io.get_data(server.url+'/a.dat'),'a'*1000)
+        tools.assert_equal(server.nrequests,3)
+        io.set_data_store('refresh')
+        tools.assert_equal(io.get_data(server.url+'/a.dat'),'a'*1000)
+        tools.assert_equal(server.nrequests,4)
+        io.set_data_store(True)
+
+        fn = os.path.join(datadir,'local.dat')
+        with open(fn,'w') as f:
+            f.write('local data')
+        tools.assert_equal(io.get_data('file://'+fn,localfn='local2.dat'),'local data')
+        tools.assert_equal(io.get_data('local2.dat'),'local data')
+
+        #the least recently used data are removed to stay under the maximum size
+        io.set_data_store_maxsize(2500)
+        os.utime(afn,(1,1))
+        tools.assert_equal(io.get_data(server.url+'/b.dat'),'b'*2000)
+        tools.assert_false(os.path.exists(afn))
+        tools.assert_false(os.path.exists(os.path.join(datadir,'a.dat')))
+        tools.assert_equal(io.get_data('local2.dat'),'local data')
+        tools.assert_equal(io.get_data(server.url+'/c.dat'),'a'*1000)
+        tools.assert_equal(server.nrequests,6)
+
+        tools.assert_raises(urllib2.HTTPError,io.get_data,server.url+'/missing.dat')
+        #nothing is left over from the failed download
+        tools.assert_equal(sorted(os.listdir(os.path.join(datadir,'store'))),
+                           ['lock','objects','urls'])
+    finally:
+        server.close()
+        config.get_data_dir = oldgetdir
+        io.set_data_store(oldsettings[0])
+        io.set_data_download_reporter(oldsettings[1])
+        io.set_data_store_maxsize(oldsettings[2])
+        shutil.rmtree(datadir)
+
+_votable_fmt = """<?xml version="1.0"?>
+<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">
+<RESOURCE name="res">
+<TABLE name="%s">
+%s
+<DATA>%s</DATA>
+</TABLE>
+</RESOURCE>
+</VOTABLE>"""
+
+def _votable(fields,data,name='tab'):
+    return _votable_fmt%(name,fields,data)
+
+def _votable_stream(fields,buf,kind='BINARY',name='tab'):
+    from base64 import b64encode
+    data = '<%s><STREAM encoding="base64">%s</STREAM></%s>'%(kind,b64encode(buf),kind)
+    return _votable(fields,data,name)
+
+_votable_fixed_fields = """<FIELD name="id" datatype="int"><VALUES null="-1"/></FIELD>
+<FIELD name="ra" datatype="double" unit="deg"/>
+<FIELD name="code" datatype="char" arraysize="4"/>
+<FIELD name="vec" datatype="float" arraysize="3"/>"""
+
+_votable_fixed_rows = [(1,10.5,'AB\0\0',(1,2,3)),
+                       (-1,float('nan'),'ABCD',(4,5,6)),
+                       (3,2,'xy  ',(7,8,9))]
+
+def _votable_fixed_binary(nullflags=None,extra=None):
+    #the BINARY (or BINARY2 if nullflags are given) stream of the fixed rows,
+    #with the strings in `extra` appended to each row
+    from struct import pack
+    buf = []
+    for i,(id,ra,code,vec) in enumerate(_votable_fixed_rows):
+        if nullflags is not None:
+            buf.append(chr(nullflags[i]))
+        buf.append(pack('>id',id,ra)+code+pack('>3f',*vec))
+        if extra is not None:
+            buf.append(extra[i])
+    return ''.join(buf)
+
+def test_votable_tabledata():
+    """
+    Test reading TABLEDATA VOTables from files, strings, and file objects
+    """
+    import tempfile
+    from StringIO import StringIO
+
+    fields = _votable_fixed_fields+"""
+<FIELD name="flag" datatype="boolean"/>
+<FIELD name="name" datatype="char" arraysize="*"/>
+<FIELD name="var" datatype="int" arraysize="*"/>"""
+    rows = ['<TD>1</TD><TD>10.5</TD><TD>AB</TD><TD>1 2 3</TD><TD>T</TD><TD>alpha</TD><TD>1 2</TD>',
+            '<TD>-1</TD><TD></TD><TD>ABCD</TD><TD>4 5 6</TD><TD>F</TD><TD></TD><TD></TD>',
+            '<TD>3</TD><TD>NaN</TD><TD>xy</TD><TD>7 8 9</TD><TD>?</TD><TD>b</TD><TD>7 8 9 10</TD>']
+    s = _votable(fields,'<TABLEDATA>%s</TABLEDATA>'%''.join(['<TR>%s</TR>'%r for r in rows]))
+
+    fd,fn = tempfile.mkstemp(suffix='.xml')
+    try:
+        with os.fdopen(fd,'w') as f:
+            f.write(s)
+        vts = [io.VOTableReader(fn),io.VOTableReader(s,filename=False),
+               io.VOTableReader(StringIO(s)),io.VOTableReader(s,filename=False,chunksize=2)]
+    finally:
+        os.remove(fn)
+
+    for vt in vts:
+        tools.assert_equal(vt.getTableNames(),['res:tab'])
+        tools.assert_equal(vt.getTableFieldNames(),['id','ra','code','vec','flag','name','var'])
+        tools.assert_equal(vt.getTableFieldExtras()['ra']['unit'],'deg')
+        arr = vt.getTableArray()
+        mask = vt.getTableMask()
+        tools.assert_equal(arr['id'].tolist(),[1,-1,3])
+        tools.assert_equal(arr['ra'][0],10.5)
+        tools.assert_equal(arr['code'].tolist(),['AB','ABCD','xy'])
+        tools.assert_equal(arr['vec'].tolist(),[[1,2,3],[4,5,6],[7,8,9]])
+        tools.assert_equal(arr['flag'].tolist(),[True,False,False])
+        tools.assert_equal(arr['name'].tolist(),['alpha','','b'])
+        tools.assert_equal([v.tolist() for v in arr['var']],[[1,2],[],[7,8,9,10]])
+        tools.assert_equal(mask[:,0].tolist(),[True,False,True])
+        tools.assert_equal(mask[:,1].tolist(),[True,False,False])
+
+    grp = _votable('<GROUP name="g"><FIELDref ref="x"/></GROUP><FIELD name="x" datatype="int"/>',
+                   '<TABLEDATA><TR><TD>1</TD></TR></TABLEDATA>')
+    tools.assert_raises(NotImplementedError,io.VOTableReader,grp,filename=False)
+
+def test_votable_binary():
+    """
+    Test reading BINARY and BINARY2 VOTable streams
+    """
+    from struct import pack
+
+    vt = io.VOTableReader(_votable_stream(_votable_fixed_fields,_votable_fixed_binary()),filename=False)
+    arr = vt.getTableArray()
+    tools.assert_equal(arr['id'].tolist(),[1,-1,3])
+    tools.assert_equal(arr['ra'][0],10.5)
+    tools.assert_equal(arr['code'].tolist(),['AB','ABCD','xy  '])
+    tools.assert_equal(arr['vec'].tolist(),[[1,2,3],[4,5,6],[7,8,9]])
+    tools.assert_equal(vt.getTableMask()[:,:2].tolist(),[[True,True],[False,False],[True,True]])
+    #the array is a native, writable copy like the TABLEDATA arrays
+    tools.assert_true(arr.flags.writeable)
+    tools.assert_true(all([arr.dtype[nm].base.isnative for nm in arr.dtype.names]))
+    arr['ra'][0] = 1
+    tools.assert_equal(arr['ra'][0],1)
+
+    #the null flags mark the second field of the last row as null
+    buf = _votable_fixed_binary([0,0,0x40])
+    vt = io.VOTableReader(_votable_stream(_votable_fixed_fields,buf,'BINARY2'),filename=False)
+    arr = vt.getTableArray()
+    tools.assert_equal(arr['id'].tolist(),[1,-1,3])
+    tools.assert_equal(arr['code'].tolist(),['AB','ABCD','xy  '])
+    tools.assert_equal(vt.getTableMask().tolist(),[[True,True,True,True],
+                                                   [False,False,True,True],
+                                                   [True,False,True,True]])
+
+    #fields that need conversion, read in chunks
+    fields = _votable_fixed_fields+"""
+<FIELD name="flag" datatype="boolean"/>
+<FIELD name="bits" datatype="bit" arraysize="10"/>"""
+    buf = _votable_fixed_binary(extra=[f+'\xa0\xc0' for f in 'TF?'])
+    vt = io.VOTableReader(_votable_stream(fields,buf),filename=False,chunksize=2)
+    arr = vt.getTableArray()
+    tools.assert_equal(arr['id'].tolist(),[1,-1,3])
+    tools.assert_equal(arr['flag'].tolist(),[True,False,False])
+    tools.assert_equal(arr['bits'][0].astype(int).tolist(),[1,0,1,0,0,0,0,0,1,1])
+    tools.assert_equal(vt.getTableMask()[:,4].tolist(),[True,True,False])
+
+def test_votable_variable():
+    """
+    Test reading variable-length strings and arrays from VOTable streams
+    """
+    from struct import pack
+
+    fields = """<FIELD name="id" datatype="int"/>
+<FIELD name="s" datatype="char" arraysize="*"/>
+<FIELD name="arr" datatype="double" arraysize="2x*"/>"""
+    rows = [(1,'hello',[1,2,3,4]),(2,'',[]),(3,'x',[5,6])]
+    buf = ''.join([pack('>ii',id,len(s))+s+pack('>i%id'%len(a),len(a),*a)
+                   for id,s,a in rows])
+
+    for kind in ('BINARY','BINARY2'):
+        if kind == 'BINARY2':
+            buf = ''.join([chr(0)+pack('>ii',id,len(s))+s+pack('>i%id'%len(a),len(a),*a)
+                           for id,s,a in rows])
+        vt = io.VOTableReader(_votable_stream(fields,buf,kind),filename=False,chunksize=2)
+        arr = vt.getTableArray()
+        tools.assert_equal(arr['id'].tolist(),[1,2,3])
+        tools.assert_equal(arr['s'].tolist(),['hello','','x'])
+        tools.assert_equal([a.tolist() for a in arr['arr']],[[[1,2],[3,4]],[],[[5,6]]])
+
+def test_votable_fits():
+    """
+    Test reading VOTables with FITS data
+    """
+    from base64 import b64encode
+    from StringIO import StringIO
+    import numpy as np
+    try:
+        import pyfits
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('pyfits not available')
+
+    cols = [pyfits.Column(name='x',format='D',array=np.array([1.5,np.nan])),
+            pyfits.Column(name='y',format='J',array=np.array([1,2]))]
+    sio = StringIO()
+    pyfits.HDUList([pyfits.PrimaryHDU(),pyfits.new_table(cols)]).writeto(sio)
+
+    fields = '<FIELD name="x" datatype="double"/><FIELD name="y" datatype="int"/>'
+    data = '<FITS extnum="1"><STREAM encoding="base64">%s</STREAM></FITS>'%b64encode(sio.getvalue())
+    vt = io.VOTableReader(_votable(fields,data),filename=False)
+    arr = vt.getTableArray()
+    tools.assert_equal(arr['x'][0],1.5)
+    tools.assert_equal(arr['y'].tolist(),[1,2])
+    tools.assert_equal(vt.getTableMask().tolist(),[[True,True],[False,True]])
+
+def test_votable_table_selection():
+    """
+    Test loading only one table of a VOTable
+    """
+    tab = '<TABLE name="%s"><FIELD name="x" datatype="double"/><DATA><TABLEDATA>%s</TABLEDATA></DATA></TABLE>'
+    s = """<VOTABLE><RESOURCE name="res">%s%s</RESOURCE></VOTABLE>"""%(
+            tab%('t1','<TR><TD>1</TD></TR>'),
+            tab%('t2','<TR><TD>2</TD></TR><TR><TD>3</TD></TR>'))
+
+    tools.assert_equal(io.VOTableReader(s,filename=False).getTableNames(),['res:t1','res:t2'])
+    for table in ('res:t2',1):
+        vt = io.VOTableReader(s,filename=False,table=table)
+        tools.assert_equal(vt.getTableNames(),['res:t2'])
+        tools.assert_equal(vt.getTableArray()['x'].tolist(),[2,3])
+    vt = io.VOTableReader(s,filename=False,table=0)
+    tools.assert_equal(vt.getTableArray('res:t1')['x'].tolist(),[1])
+    tools.assert_raises(KeyError,io.VOTableReader,s,filename=False,table='res:t3')
+
+def _fixed_column_file(lines):
+    import tempfile
+    fd,fn = tempfile.mkstemp(suffix='.dat')
+    with os.fdopen(fd,'w') as f:
+        f.write('\n'.join(lines)+'\n')
+    return fn
+
+def test_fixed_column_parser():
+    """
+    Test parsing fixed-width column files
+    """
+    import numpy as np
+
+    lines = ['header line',
+             '# comment',
+             '  1  2.5 abc  T',
+             '',
+             '     3.0  de  F',
+             '   # indented comment',
+             '  3 -1.0      ?']
+    fn = _fixed_column_file(lines)
+    try:
+        p = io.FixedColumnDataParser(skiprows=1)
+        p.addColumn('i',1,3)
+        p.addColumn('x',4,8)
+        p.addColumn('s',9,12)
+        p.addColumn('flag',13,15,bool,{'  ?':''})
+
+        for chunksize in (1,2,100000):
+            arr,masks = p.parseFile(fn,chunksize=chunksize)
+            tools.assert_equal(arr.i.dtype.kind,'i')
+            tools.assert_equal(arr.i.tolist(),[1,0,3])
+            tools.assert_equal(arr.x.dtype.kind,'f')
+            tools.assert_equal(arr.x.tolist(),[2.5,3,-1])
+            tools.assert_equal(arr.s.tolist(),[' abc','  de',''])
+            tools.assert_equal(arr.flag.tolist(),[True,False,False])
+            tools.assert_equal(masks['i'].tolist(),[True,False,True])
+            tools.assert_equal(masks['s'].tolist(),[True,True,False])
+            tools.assert_equal(masks['flag'].tolist(),[True,True,False])
+
+        marr = p.parseFile(fn,maskedarray=True)
+        tools.assert_equal(marr['i'].mask.tolist(),[False,True,False])
+    finally:
+        os.remove(fn)
+
+def test_fixed_column_parser_chunks():
+    """
+    Test parsing fixed-width column files in chunks with iterParseFile
+    """
+    import numpy as np
+
+    #chunks with no data rows or no entries for a column must not decide the
+    #type of the column
+    fn = _fixed_column_file(['# c1','# c2',' 1',' 2',' 3  1.5',' 4  2.5'])
+    try:
+        p = io.FixedColumnDataParser()
+        p.addColumn('i',1,2)
+        p.addColumn('x',3,7)
+        res = [arr.x for arr,masks in p.iterParseFile(fn,chunksize=2)]
+        tools.assert_equal([x.dtype.kind for x in res],['f','f','f'])
+        tools.assert_equal(len(res[0]),0)
+        tools.assert_true(np.all(np.isnan(res[1])))
+        tools.assert_equal(res[2].tolist(),[1.5,2.5])
+        arr,masks = p.parseFile(fn,chunksize=2)
+        tools.assert_equal(arr.i.tolist(),[1,2,3,4])
+        tools.assert_equal(arr.x[2:].tolist(),[1.5,2.5])
+        tools.assert_true(np.all(np.isnan(arr.x[:2])))
+        tools.assert_equal(masks['x'].tolist(),[False,False,True,True])
+        #the same as for a file with no entries in the column
+        p.addColumn('y',8,9)
+        arr,masks = p.parseFile(fn)
+        tools.assert_equal(arr.y.dtype.kind,'f')
+        tools.assert_true(np.all(np.isnan(arr.y)))
+    finally:
+        os.remove(fn)
+
+    #a type inferred from earlier data must match later data
+    fn = _fixed_column_file(['    1','    2','  2.5'])
+    try:
+        p = io.FixedColumnDataParser()
+        p.addColumn('x',1,5)
+        chunks = p.iterParseFile(fn,chunksize=2)
+        tools.assert_equal(chunks.next()[0].x.tolist(),[1,2])
+        tools.assert_raises(ValueError,chunks.next)
+        tools.assert_equal(p.parseFile(fn,chunksize=2)[0].x.tolist(),[1,2,2.5])
+    finally:
+        os.remove(fn)
+
+def _make_deimos_files(dirname,n):
+    #writes n spec1d files in the DEEP2 pipeline format with both sides
+    import numpy as np
+    import pyfits
+
+    for i in range(n):
+        hdus = [pyfits.PrimaryHDU()]
+        for side,x0 in (('B',5000),('R',7000)):
+            x = x0+np.arange(100,dtype=float)
+            cols = [pyfits.Column(name=nm,format='100E',array=arr.reshape(1,100))
+                    for nm,arr in (('LAMBDA',x),('SPEC',np.sin(x/10)+i),
+                                   ('IVAR',np.ones(100)*(i+1)),('SKYSPEC',x/1e3))]
+            hdu = pyfits.new_table(cols)
+            hdu.name = 'HORNE-'+side
+            hdus.append(hdu)
+        pyfits.HDUList(hdus).writeto(os.path.join(dirname,'spec1d.mask.%03i.obj.fits'%i))
+
+def test_load_all_deimos_spectra():
+    """
+    Test loading DEIMOS spectra in parallel, lazily, and from a cache file
+    """
+    import shutil,tempfile,cPickle
+    import numpy as np
+    try:
+        import pyfits
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('pyfits not available')
+    from astropysics.spec import LazySpectrum
+
+    def assert_same(specs1,specs2):
+        tools.assert_equal(sorted(specs1),sorted(specs2))
+        for fn in specs1:
+            s1,s2 = specs1[fn],specs2[fn]
+            tools.assert_equal(s1.name,s2.name)
+            tools.assert_true(np.all(s1.x==s2.x))
+            tools.assert_true(np.all(s1.flux==s2.flux))
+            tools.assert_true(np.allclose(s1.err,s2.err))
+            tools.assert_true(np.all(s1.sky==s2.sky))
+
+    def assert_identical(specs1,specs2):
+        #every attribute is the same, not just the spectral arrays
+        tools.assert_equal(sorted(specs1),sorted(specs2))
+        for fn in specs1:
+            d1,d2 = specs1[fn].__dict__,specs2[fn].__dict__
+            tools.assert_equal(sorted(d1),sorted(d2))
+            for k in d1:
+                if isinstance(d1[k],np.ndarray):
+                    tools.assert_true(np.array_equal(d1[k],d2[k]),k)
+                else:
+                    tools.assert_equal(d1[k],d2[k])
+            tools.assert_true(np.array_equal(specs1[fn].ivar,specs2[fn].ivar))
+
+    d = tempfile.mkdtemp()
+    try:
+        _make_deimos_files(d,4)
+        with open(os.path.join(d,'spec1d.bad.fits'),'w') as f:
+            f.write('not a fits file')
+
+        specs = io.load_all_deimos_spectra(d,verbose=False)
+        tools.assert_equal(len(specs),4)
+        fn = os.path.join(d,'spec1d.mask.002.obj.fits')
+        tools.assert_equal(specs[fn].name,fn)
+        tools.assert_equal(len(specs[fn].x),200)
+        tools.assert_true(np.allclose(specs[fn].err,1/3**0.5))
+        tools.assert_raises(Exception,io.load_all_deimos_spectra,d,verbose=False,skiperrors=False)
+
+        assert_same(specs,io.load_all_deimos_spectra(d,verbose=False,nprocs=2))
+
+        lazy = io.load_all_deimos_spectra(d,verbose=False,lazy=True)
+        tools.assert_equal(len(lazy),5)
+        tools.assert_true(isinstance(lazy[fn],LazySpectrum))
+        tools.assert_false(lazy[fn].loaded)
+        pickled = cPickle.loads(cPickle.dumps(lazy[fn],2))
+        tools.assert_false(pickled.loaded)
+        tools.assert_false(lazy[fn].loaded)
+        tools.assert_true(np.all(pickled.flux==specs[fn].flux))
+        tools.assert_true(np.all(lazy[fn].flux==specs[fn].flux))
+        tools.assert_true(lazy[fn].loaded)
+        tools.assert_raises(IOError,getattr,lazy[os.path.join(d,'spec1d.bad.fits')],'flux')
+        os.remove(os.path.join(d,'spec1d.bad.fits'))
+        del lazy[os.path.join(d,'spec1d.bad.fits')]
+        assert_same(specs,lazy)
+
+        #the cache file is used until the files or options change
+        cachefn = os.path.join(d,'cache.pkl')
+        cached = io.load_all_deimos_spectra(d,verbose=False,cachefn=cachefn)
+        tools.assert_true(os.path.exists(cachefn))
+        mtime = os.path.getmtime(cachefn)
+        assert_identical(specs,cached)
+        assert_identical(specs,io.load_all_deimos_spectra(d,verbose=False,cachefn=cachefn))
+        tools.assert_equal(os.path.getmtime(cachefn),mtime)
+        smoothed = io.load_all_deimos_spectra(d,verbose=False,cachefn=cachefn,smoothing=-3)
+        tools.assert_false(np.all(smoothed[fn].flux==specs[fn].flux))
+        assert_identical(smoothed,io.load_all_deimos_spectra(d,verbose=False,cachefn=cachefn,smoothing=-3))
+        tools.assert_raises(ValueError,io.load_all_deimos_spectra,d,lazy=True,cachefn=cachefn)
+    finally:
+        shutil.rmtree(d)
+
+def _write_tipsy_files(dirname,ngas,ndark,nstar):
+    #writes the same particles as ASCII and as binary Tipsy files in both byte
+    #orders, returning the file names and the particle arrays for each type
+    import numpy as np
+
+    rs = np.random.RandomState(0)
+    nfields = {'gas':12,'dark':9,'star':11}
+    parts = dict([(pt,rs.rand(n,nfields[pt]).astype('f4')) for pt,n in
+                  (('gas',ngas),('dark',ndark),('star',nstar))])
+    gas,dark,star = parts['gas'],parts['dark'],parts['star']
+    ntotal = ngas+ndark+nstar
+
+    fns = {}
+    for byteorder,name in (('<','little'),('>','big')):
+        fns[name] = os.path.join(dirname,'tipsy_%s.bin'%name)
+        hdr = np.zeros(1,dtype=[('time',byteorder+'f8'),('n',byteorder+'i4',(6,))])
+        hdr['time'] = 1.5
+        hdr['n'] = (ntotal,3,ngas,ndark,nstar,0)
+        with open(fns[name],'wb') as f:
+            f.write(hdr.tostring())
+            for arr in (gas,dark,star):
+                f.write(arr.astype(byteorder+'f4').tostring())
+
+    allparts = lambda i,j:np.concatenate((gas[:,i],dark[:,j],star[:,i]))
+    cols = [allparts(0,0)]
+    cols.extend([allparts(k,k) for k in range(1,7)])
+    cols.extend([dark[:,7],star[:,9]])
+    cols.extend([gas[:,k] for k in range(7,11)])
+    cols.extend([star[:,7],star[:,8]])
+    cols.append(np.concatenate((gas[:,11],dark[:,8],star[:,10])))
+    fns['ascii'] = os.path.join(dirname,'tipsy.txt')
+    with open(fns['ascii'],'w') as f:
+        f.write('%i %i %i\n3\n1.5\n'%(ntotal,ngas,nstar))
+        for col in cols:
+            for v in col:
+                f.write('%r\n'%float(v))
+
+    return fns,parts
+
+def test_load_tipsy_format():
+    """
+    Test loading ASCII and binary Tipsy files
+    """
+    import shutil,tempfile
+    import numpy as np
+
+    d = tempfile.mkdtemp()
+    try:
+        fns,parts = _write_tipsy_files(d,2,3,4)
+        ascii = io.load_tipsy_format(fns['ascii'])
+        tools.assert_equal(ascii['mass_dark'].tolist(),parts['dark'][:,0].astype(float).tolist())
+        tools.assert_equal(ascii['pos_dark'].shape,(3,3))
+        tools.assert_equal(ascii['vel_star'].shape,(3,4))
+        tools.assert_equal(ascii['potential_en_dark'].shape,(3,))
+        tools.assert_true(np.allclose(ascii['metals_star'],parts['star'][:,7]))
+
+        for byteorder in ('little','big'):
+            binary = io.load_tipsy_format(fns[byteorder])
+            tools.assert_true(isinstance(binary['gas'],np.memmap))
+            for k in ('ntotal','ngas','ndark','nstar','dims','time'):
+                tools.assert_equal(binary[k],ascii[k])
+            tools.assert_equal(sorted(set(binary)-set(['gas','dark','star'])),sorted(ascii))
+            for k in ascii:
+                tools.assert_true(np.allclose(binary[k],ascii[k]),k)
+
+        sel = io.load_tipsy_format(fns['big'],fields=['mass','pos'],ptypes=['star'],concatenate=False)
+        tools.assert_equal(sorted(sel),['dims','mass_star','ndark','ngas','nstar','ntotal','pos_star','star','time'])
+        sel = io.load_tipsy_format(fns['ascii'],fields=['mass'],ptypes=['gas','dark'])
+        tools.assert_equal(sel['mass'].tolist(),ascii['mass'][:5].tolist())
+        tools.assert_raises(ValueError,io.load_tipsy_format,fns['ascii'],fields=['notafield'])
+        tools.assert_raises(ValueError,io.load_tipsy_format,fns['ascii'],ptypes=['notatype'])
+    finally:
+        shutil.rmtree(d)
@@ -3,7 +3,8 @@ from __future__ import division,with_statement
 from astropysics.constants import pi
 import numpy as np
 from astropysics.objcat import StructuredFieldNode,Catalog,Field,CycleError, \
-                               CycleWarning,LinkField
+                               CycleWarning,LinkField,FieldNode, \
+                               ColumnarCatalog,ColumnarNode
 from nose import tools
 
 class Test1(StructuredFieldNode):
@@ -124,6 +125,49 @@ def test_derived_order():
     tools.assert_equal(o3.d(),o3.a()-o3.b()/2.0)
     
 
+def test_evaluate_derived():
+    """
+    Test batch evaluation of DerivedValue objects
+    """
+    from astropysics.objcat import evaluateDerivedValues
+
+    def makecat():
+        c = Catalog()
+        for i in range(10):
+            t1 = Test1(c,num=('src',(1.5+i,0.1*i)))
+            t4 = Test4(Test2(t1),val4=('src',float(i)))
+            t4['top'] = ('src',t1)
+        return c
+
+    c1 = makecat()
+    c2 = makecat()
+    tools.assert_equal(evaluateDerivedValues(c1),50)
+    for n1,n2 in zip(c1.iterNodes(),c2.iterNodes()):
+        if isinstance(n1,Test1):
+            for fn in ('f','f2','f3'):
+                tools.assert_almost_equal(n1[fn],n2[fn],12)
+                e1,e2 = n1[fn+'_err'],n2[fn+'_err']
+                tools.assert_almost_equal(e1[0],e2[0],12)
+                tools.assert_almost_equal(e1[1],e2[1],12)
+        elif isinstance(n1,Test4):
+            tools.assert_equal(n1.d1(),n2.d1())
+            tools.assert_equal(n1.d2(),n2.d2())
+
+    #only changed values are recomputed
+    tools.assert_equal(evaluateDerivedValues(c1),0)
+    c1[0]['num'] = ('src2',7)
+    tools.assert_equal(evaluateDerivedValues(c1,'f'),1)
+    tools.assert_equal(c1[0].f(),2*7+1+5.6)
+    tools.assert_equal(evaluateDerivedValues(c1),4)
+    c1[1]['num2'] = ('src2',(5.6,1.5,0.3))
+    tools.assert_equal(evaluateDerivedValues(c1),0)
+    tools.assert_equal(evaluateDerivedValues(c1,'f',force=True),10)
+
+    #cycles are left for the usual error
+    o2 = Test2(c1)
+    evaluateDerivedValues(c1)
+    tools.assert_raises(CycleError,o2.d1)
+
 def test_cat():
     """
     Test Catalog objects and related basic actions
@@ -142,6 +186,352 @@ def test_cat():
     
     return c
 
+def test_visit():
+    """
+    Test traversal orders for CatalogNode.visit and iterNodes
+    """
+    c = test_cat()
+    subc = c.children[2]
+    t1,t2 = c.children[:2]
+    ts1,ts2,ts3 = subc.children
+
+    tools.assert_equal(c.visit(lambda n:n),[t1,t2,ts1,ts2,ts3,subc,c])
+    tools.assert_equal(c.visit(lambda n:n,'preorder'),[c,t1,t2,subc,ts1,ts2,ts3])
+    tools.assert_equal(c.visit(lambda n:n,1),[t1,c,t2,ts1,subc,ts2,ts3])
+    tools.assert_equal(c.visit(lambda n:n,-2),[t1,t2,c,ts1,ts2,subc,ts3])
+    tools.assert_equal(c.visit(lambda n:n,'level'),[c,t1,t2,subc,ts1,ts2,ts3])
+    tools.assert_equal(c.visit(lambda n:n,'level',includeself=False),[t1,t2,subc,ts1,ts2,ts3])
+    tools.assert_equal(c.visit(lambda n:n,None),[c])
+    tools.assert_equal(c.visit(lambda n:n['num'] if n is not subc else None,
+                               filter=lambda n:n is not c),[4.2,7,8.5,12.7,10.3])
+    tools.assert_equal(c.nnodes,7)
+
+    #deep trees do not hit the recursion limit, and iteration can stop early
+    node = c
+    for i in range(5000):
+        node = Catalog(str(i),node)
+    tools.assert_equal(len(c.visit(lambda n:n)),5007)
+    tools.assert_true(c.visit(lambda n:n,'preorder')[-1] is node)
+    for n in c.iterNodes('preorder'):
+        if n is subc:
+            break
+    tools.assert_true(n is subc)
+
+def test_columnar():
+    """
+    Test ColumnarCatalog objects against an equivalent regular Catalog
+    """
+    from astropysics.objcat import arrayToNodes
+
+    n = 10
+    mags = np.linspace(18,22,n)
+    errs = np.linspace(.01,.1,n)
+    names = ['obj%i'%i for i in range(n)]
+
+    c = Catalog()
+    for i in range(n):
+        node = FieldNode(c)
+        node.addField(Field('mag',float))
+        node.addField(Field('name',str))
+        node.addField(Field('z',float,0.0))
+        node['mag'] = ('src1',(mags[i],errs[i]))
+        node['name'] = ('src1',names[i])
+        if i%2:
+            node['mag'] = ('src2',mags[i]+1)
+    c[3]['z'] = ('spec',0.5)
+
+    cc = ColumnarCatalog(fields=[Field('mag',float),Field('name',str),
+                                 Field('z',float,0.0)],nrows=n)
+    cc.setFieldValues('mag','src1',mags,errs)
+    cc.setFieldValues('name','src1',names)
+    odd = np.arange(n)%2==1
+    cc.setFieldValues('mag','src2',mags[odd]+1,rows=odd)
+    cc[3]['z'] = ('spec',0.5)
+
+    for fns in ('mag','mag,name,z'):
+        v1,e1,s1 = c.extractField(fns,errors=True,sources=True)
+        v2,e2,s2 = cc.extractField(fns,errors=True,sources=True)
+        tools.assert_equal(v1.tolist(),v2.tolist())
+        tools.assert_equal(e1.tolist(),e2.tolist())
+        tools.assert_equal(list(s1),list(s2))
+
+    #nodes are views of the rows
+    tools.assert_equal(c[1].fielddict,cc[1].fielddict)
+    tools.assert_equal(str(c[1].mag),str(cc[1].mag))
+    tools.assert_equal(cc[0]['mag_err'],(errs[0],errs[0]))
+    cc[1]['mag'] = 'src1'
+    tools.assert_equal(cc.extractField('mag')[1],mags[1])
+
+    cc.setToSource('src2')
+    FieldNode.setToSourceAtNode(c.children,'src2')
+    tools.assert_equal(cc.extractField('mag').tolist(),c.extractField('mag').tolist())
+    tools.assert_raises(ValueError,cc.setToSource,'spec',missing='raise')
+
+    #array filtering and lookups
+    sel = cc.extractField('mag')>20
+    tools.assert_equal(list(cc.extractField('name',filter=sel)),
+                       [nm for nm,s in zip(names,sel) if s])
+    tools.assert_equal(cc.getNodes(sel),[nd for nd in cc if nd['mag']>20])
+    tools.assert_true(cc.locateName('obj4')[0] is cc[4])
+    tools.assert_equal(cc.getFieldValueNodes('z',0.5),[cc[3]])
+
+    #adding, removing, and copying rows
+    node = ColumnarNode(cc,name=('src3','newobj'))
+    tools.assert_equal((cc.nrows,node['z'],node['mag']),(n+1,0.0,None))
+    tools.assert_equal(cc[3].toFieldNode().fielddict,cc[3].fielddict)
+    cc.deleteRows([0,2])
+    tools.assert_equal((cc.nrows,cc[0]['name'],cc[0].row),(n-1,'obj1',0))
+    node.parent = None
+    tools.assert_equal(cc.nrows,n-2)
+
+    #bulk updates from arrayToNodes
+    cc = ColumnarCatalog(nrows=n)
+    arrayToNodes(np.array([mags,mags+1]),'src1',['mag','mag2'],cc,errors=np.array([errs,errs]))
+    c = Catalog()
+    for i in range(n):
+        FieldNode(c)
+    arrayToNodes(np.array([mags,mags+1]),'src1',['mag','mag2'],c,errors=np.array([errs,errs]))
+    v1,e1 = c.extractField('mag,mag2',errors=True)
+    v2,e2 = cc.extractField('mag,mag2',errors=True)
+    tools.assert_equal(v1.tolist(),v2.tolist())
+    tools.assert_equal(e1.tolist(),e2.tolist())
+
+def test_array_ingest():
+    """
+    Test keyed and column-wise array ingestion against the per-node path
+    """
+    from astropysics.objcat import arrayToNodes,arrayToCatalog
+
+    n = 20
+    arr = np.zeros(n,dtype=[('id',int),('mag',float),('col',float)])
+    arr['id'] = np.arange(n)
+    arr['mag'] = np.linspace(18,22,n)
+    arr['col'] = np.linspace(-1,1,n)
+    errs = np.linspace(.01,.1,n)
+    bright = lambda row:row['mag']<21
+    fields = {'mag':'mag','col':'col'}
+    colconv = {'col':lambda cols:(cols[0]*2,cols[1],cols[2])}
+
+    c = arrayToCatalog(arr,'src1',fields,'cat',errors=[None,errs,errs],
+                       nodetype=FieldNode,filter=bright,namefield='id',
+                       nameconv=lambda i:i,colconverters=colconv)
+    cc = arrayToCatalog(arr,'src1',fields,'cat',errors=[None,errs,errs],
+                        nodetype=ColumnarNode,filter=bright,namefield='id',
+                        nameconv=lambda i:i,colconverters=colconv)
+    tools.assert_true(isinstance(cc,ColumnarCatalog))
+    tools.assert_equal(cc.nrows,np.sum(arr['mag']<21))
+    tools.assert_equal(cc._columns['mag'].dtype,np.dtype(float))
+    for cat in (c,cc):
+        v,e = cat.extractField('mag,col',errors=True)
+        tools.assert_equal(v[1].tolist(),(arr['col']*2)[arr['mag']<21].tolist())
+        tools.assert_equal(e[1][:,0].tolist(),errs[arr['mag']<21].tolist())
+    tools.assert_equal(c.extractField('id,mag').tolist(),cc.extractField('id,mag').tolist())
+
+    #update a shuffled subset of the nodes by their id
+    upd = arr[::-1][::3].copy()
+    upd['mag'] += 10
+    for cat in (c,cc):
+        arrayToNodes(upd,'src2',{'mag':'mag'},cat,key='id')
+    tools.assert_equal(c.extractField('mag').tolist(),cc.extractField('mag').tolist())
+    tools.assert_equal(cc.getFieldValueNodes('id',12)[0]['mag'],arr['mag'][12])
+    tools.assert_equal(cc.getFieldValueNodes('id',10)[0]['mag'],arr['mag'][10]+10)
+    tools.assert_equal(c.getFieldValueNodes('id',10)[0]['mag'],arr['mag'][10]+10)
+
+def test_ads_cache():
+    """
+    Test ADS lookups with a stub HTTP backend and a persistent ADSCache
+    """
+    import os,shutil,tempfile
+    from threading import Lock
+    from urllib2 import HTTPError
+    from astropysics.objcat import ADSCache,Source
+
+    bibcodes = ['2000ApJ...%03i..001A'%i for i in range(20)]
+    entry = '@ARTICLE{%s,\n  title = "Paper %i"\n}'
+    requests = []
+    lock = Lock()
+    def backend(url,timeout):
+        with lock:
+            requests.append(url)
+        code = url.split('/abs/')[1].split('>')[0]
+        if code == '2000ApJ...998..001A':
+            raise ValueError('unparseable request')
+        if code not in bibcodes:
+            raise HTTPError(url,404,'Not Found',None,None)
+        return 'Query Results from the ADS Database\n\n'+entry%(code,bibcodes.index(code))
+
+    olds = Source.adsurl,Source.adsbackend,Source.adscache
+    cachedir = tempfile.mkdtemp()
+    try:
+        Source.adsurl = 'ads.stub'
+        Source.adsbackend = backend
+        Source.useADSCache(True,persistent=os.path.join(cachedir,'ads'))
+        srcs = [Source('adssrc%i//%s'%(i,bc)) for i,bc in enumerate(bibcodes)]
+        srcs.append(Source('adssrc-missing//2000ApJ...999..001A'))
+        srcs.append(Source('adssrc-none'))
+
+        bibstr,fail = Source.build_bibliography(srcs)
+        tools.assert_equal(set(fail),set(srcs[-2:]))
+        tools.assert_equal(bibstr.count('@ARTICLE'),len(bibcodes))
+        tools.assert_equal(len(requests),len(bibcodes)+1)
+        #errors other than failed lookups are raised
+        badsrc = Source('adssrc-bad//2000ApJ...998..001A')
+        tools.assert_raises(ValueError,Source.build_bibliography,[badsrc])
+        del requests[-1]
+
+        #a new in-memory cache is filled from the persistent cache
+        Source.useADSCache(False)
+        Source.useADSCache(True,persistent=os.path.join(cachedir,'ads'))
+        tools.assert_equal(srcs[3].getBibEntry(),entry%(bibcodes[3],3))
+        tools.assert_equal(len(requests),len(bibcodes)+1)
+        Source.clearADSCache(bibcodes[3])
+        srcs[3].getBibEntry()
+        tools.assert_equal(len(requests),len(bibcodes)+2)
+        #backends may also be static methods or bound methods
+        class Backend(object):
+            def get(self,url,timeout):
+                return backend(url,timeout)
+        for be in (staticmethod(backend),Backend().get):
+            Source.adsbackend = be
+            Source.clearADSCache(bibcodes[3])
+            tools.assert_equal(srcs[3].getBibEntry(),entry%(bibcodes[3],3))
+        tools.assert_equal(len(requests),len(bibcodes)+4)
+
+        #least recently used entries are evicted, and old entries expire
+        cache = ADSCache(os.path.join(cachedir,'small'),ttl=100,maxsize=1000)
+        cache['a'] = 'x'*400
+        cache['b'] = 'x'*400
+        #'a' was used longest ago until it is accessed
+        for i,url in enumerate('ab'):
+            fn = cache._path(url)
+            os.utime(fn,(1000+i,os.path.getmtime(fn)))
+        cache['a']
+        cache['c'] = 'x'*400
+        tools.assert_equal(('a' in cache,'b' in cache,'c' in cache),(True,False,True))
+        tools.assert_true(cache.size<=1000)
+        cache.ttl = -1
+        tools.assert_true('a' not in cache)
+    finally:
+        Source.adsurl,Source.adsbackend = olds[:2]
+        Source.useADSCache(False)
+        Source.useADSCache(True,persistent=olds[2] if olds[2] else False)
+        shutil.rmtree(cachedir)
+
+def test_binary():
+    """
+    Test saving and loading catalogs with saveBinary and loadBinary
+    """
+    import os,shutil,tempfile
+    from astropysics.objcat import saveBinary,loadBinary,appendBinary
+
+    n = 20
+    c = Catalog('root')
+    cc = ColumnarCatalog('cc',c,fields=[Field('mag',float),Field('name',str)],nrows=n)
+    cc.setFieldValues('mag','src1',np.arange(n)/2.,np.ones(n)/10)
+    cc.setFieldValues('name','src1',['obj%i'%i for i in range(n)])
+    cc.setFieldValues('mag','src2',[30.],rows=[3])
+    node = FieldNode(c)
+    node.addField('z')
+    node['z'] = ('spec',0.1)
+
+    d = tempfile.mkdtemp()
+    try:
+        fn = os.path.join(d,'cat')
+        saveBinary(c,fn)
+        tools.assert_raises(IOError,saveBinary,c,fn)
+        for mmap in (True,False):
+            c2 = loadBinary(fn,mmap)
+            cc2,node2 = c2.children
+            tools.assert_equal(node2['z'],0.1)
+            tools.assert_equal(cc2.nrows,n)
+            tools.assert_true(cc2[0].parent is cc2)
+            v1,e1,s1 = cc.extractField('mag,name',errors=True,sources=True)
+            v2,e2,s2 = cc2.extractField('mag,name',errors=True,sources=True)
+            tools.assert_equal(v1.tolist(),v2.tolist())
+            tools.assert_equal(e1.tolist(),e2.tolist())
+            tools.assert_equal(list(s1),list(s2))
+            cc2[1]['mag'] = ('src3',1)
+            tools.assert_equal(cc2[1]['mag'],1)
+
+        #appended rows are added to the end of the saved catalog
+        cc3 = ColumnarCatalog('new',fields=[Field('mag',float),Field('name',str)],nrows=2)
+        cc3.setFieldValues('mag','src4',[5.,6.])
+        cc3.setFieldValues('name','src1',['a','b'])
+        appendBinary(fn,cc3)
+        appendBinary(fn,cc3,'cc')
+        cc2 = loadBinary(fn).children[0]
+        tools.assert_equal(cc2.nrows,n+4)
+        tools.assert_equal(cc2.extractField('mag')[-4:].tolist(),[5,6,5,6])
+        tools.assert_equal(cc2[n]['name'],'a')
+        tools.assert_equal(str(cc2[n].mag.currentsource),'src4')
+        tools.assert_equal(cc2.extractField('mag')[:n].tolist(),cc.extractField('mag').tolist())
+        tools.assert_raises(ValueError,appendBinary,fn,ColumnarCatalog(fields=['mag']))
+
+        #a lazily loaded catalog can be saved over the directory it came from
+        for mmap in (True,False):
+            c2 = loadBinary(fn,mmap)
+            saveBinary(c2,fn,overwrite=True)
+            cc2 = loadBinary(fn).children[0]
+            tools.assert_equal(cc2.nrows,n+4)
+            tools.assert_equal(cc2.extractField('mag')[-4:].tolist(),[5,6,5,6])
+            tools.assert_equal(cc2.extractField('name')[:n].tolist(),cc.extractField('name').tolist())
+        tools.assert_equal(os.listdir(d),['cat'])
+    finally:
+        shutil.rmtree(d)
+
+def test_index():
+    """
+    Test field indexes on Catalog objects
+    """
+    c = test_cat()
+    subc = c.children[2]
+    for kind in ('hash','sorted'):
+        c.addIndex('num',kind)
+        tools.assert_equal(c.getFieldValueNodes('num',8.5),[subc[0]])
+        tools.assert_equal(c.getFieldValueNodes('num',4.2),[c[0]])
+        tools.assert_equal(set(c.getFieldRangeNodes('num',7,11)),
+                           set([c[1],subc[0],subc[2]]))
+        tools.assert_equal(set(c.getFieldRangeNodes('num',upper=7)),
+                           set([c[0],c[1]]))
+
+    #values changing
+    idx = c.indexes['num']
+    subc[0]['num'] = ('testsrc3',3)
+    tools.assert_equal(c.getFieldValueNodes('num',8.5),[])
+    tools.assert_equal(c.getFieldValueNodes('num',3),[subc[0]])
+    subc[0]['num'] = 'testsrc2'
+    tools.assert_equal(c.getFieldValueNodes('num',8.5),[subc[0]])
+
+    #nodes and fields being added and removed
+    t = Test1(subc,num=('testsrc4',99))
+    tools.assert_equal(c.getFieldValueNodes('num',99),[t])
+    t.delField('num')
+    tools.assert_equal(c.getFieldValueNodes('num',99),[])
+    t.addField(Field('num',float))
+    t['num'] = ('testsrc4',99.)
+    tools.assert_equal(c.getFieldValueNodes('num',99),[t])
+    subc.parent = None
+    tools.assert_equal(c.getFieldValueNodes('num',99),[])
+    tools.assert_equal(len(idx),2)
+
+    #derived values follow their inputs
+    c.addIndex('f')
+    c[0]['num'] = ('testsrc5',10)
+    tools.assert_equal(c.getFieldValueNodes('f',26.6),[c[0]])
+
+    #columnar catalogs are indexed from their arrays
+    cc = ColumnarCatalog('cc',c,fields=[Field('num',float)],nrows=5)
+    cc.setFieldValues('num','src1',np.arange(5.))
+    tools.assert_equal(c.getFieldValueNodes('num',3),[cc[3]])
+    tools.assert_equal(len(c.getFieldRangeNodes('num',2,7)),4)
+    cc[3]['num'] = ('src2',2.)
+    tools.assert_equal(set(c.getFieldValueNodes('num',2)),set([cc[2],cc[3]]))
+    tools.assert_equal(cc.getFieldRangeNodes('num',3),[cc[4]])
+
+    c.delIndex('num')
+    tools.assert_equal(set(c.getFieldValueNodes('num',2)),set([cc[2],cc[3]]))
+    tools.assert_raises(KeyError,c.delIndex,'num')
+
 def test_sed():
     """
     Test SEDField
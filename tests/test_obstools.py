@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+from __future__ import division,with_statement
+import numpy as np
+from astropysics import obstools
+from nose import tools
+
+def test_band_extinction():
+    ext = obstools.CardelliExtinction(EBmV=1,Rv=3.1)
+    R = ext.coefficientTable(['B','V','I'])
+    assert abs(R[1]-3.1) < 0.1
+    assert R[0] > R[1] > R[2]
+    assert ('V' in [k[1] for k in obstools.Extinction._bandcache])
+    
+    #changing Rv must not reuse the cached values
+    ext2 = obstools.CardelliExtinction(EBmV=1,Rv=5)
+    assert abs(ext2.coefficientTable('V')-5) < 0.1
+    
+    mags = np.zeros((10,3))
+    ebmv = np.linspace(0,1,10)
+    corr = ext.correctBandPhotometry(mags,['B','V','I'],ebmv)
+    assert corr.shape == (10,3)
+    assert np.allclose(corr,-ebmv[:,np.newaxis]*R)
+    
+    #a law with no extinction can still be applied with a given normalization
+    ext0 = obstools.Extinction(A0=0)
+    ext0.f = lambda x:np.ones_like(x)
+    assert np.all(ext0.correctBandPhotometry(mags,['B','V','I']) == 0)
+    assert np.allclose(ext0.correctBandPhotometry(mags,['B','V','I'],ebmv),
+                       -ebmv[:,np.newaxis]*np.ones(3))
+    
+    #a new law function must not match the entry of a discarded one
+    ext3 = obstools.Extinction()
+    ext3.f = lambda x:np.ones_like(x)
+    assert ext3.bandIntegral('V') == 1
+    ext3.f = lambda x:2*np.ones_like(x)
+    assert ext3.bandIntegral('V') == 2
+    
+    oldsize = obstools.Extinction._bandcachesize
+    try:
+        obstools.Extinction._bandcachesize = 3
+        ext.coefficientTable(['U','B','V','R','I'])
+        assert len(obstools.Extinction._bandcache) <= 3
+        #the least recently used value is the one discarded
+        ext.coefficientTable(['R','U'])
+        assert set([k[1] for k in obstools.Extinction._bandcache]) == set(['I','R','U'])
+        ext.coefficientTable('I')
+        ext.coefficientTable('B')
+        assert set([k[1] for k in obstools.Extinction._bandcache]) == set(['I','U','B'])
+    finally:
+        obstools.Extinction._bandcachesize = oldsize
+    
+def test_delta_AT():
+    from astropysics import timescales
+    
+    assert obstools.delta_AT(2451544.5) == 32
+    assert abs(obstools.delta_AT(2451544.5,usett=True) - 64.184) < 1e-10
+    assert timescales.delta_AT(58119,mjd=True) == 37
+    assert timescales.delta_AT(41317,mjd=True) == 10
+    
+    jds = np.array([2441317.5,2451544.5,2458119.5])
+    assert np.all(obstools.delta_AT(jds) == [10,32,37])
+    
+    tai = timescales.utc_to_tai(jds)
+    assert np.allclose((tai-jds)*86400,[10,32,37])
+    assert np.allclose(timescales.tai_to_utc(tai),jds,rtol=0,atol=1e-8)
+    assert np.allclose(timescales.tt_to_utc(timescales.utc_to_tt(jds)),jds,
+                       rtol=0,atol=1e-8)
+    
+def test_julian_date():
+    from datetime import datetime
+    
+    jd = obstools.JulianDate(2451545,0.25)
+    assert jd.jd1 == 2451544.5 and jd.jd2 == 0.75
+    assert (jd + 0.5) - jd == 0.5
+    assert abs(((jd + 1e-11) - jd) - 1e-11) < 1e-16
+    assert obstools.JulianDate(51544.75,mjd=True) - jd == 0
+    assert isinstance(np.asarray(jd,dtype=float),np.ndarray)
+    assert np.asarray(jd).shape == ()
+    
+    dt = datetime(2016,7,4,13,14,15,123456)
+    jd = obstools.calendar_to_jd(dt,twopart=True)
+    assert obstools.jd_to_calendar(jd,rounding=0).replace(tzinfo=None) == dt
+    assert abs(float(jd) - obstools.calendar_to_jd(dt)) < 1e-9
+    
+    jds = obstools.JulianDate([2451545,2455197.5],[0,1e-10])
+    assert jds.shape == (2,)
+    assert np.all(jds[1] - jds >= [3652.5,0])
+    assert abs((jds[1] - jds[0]) - 3652.5 - 1e-10) < 1e-12
+    assert np.allclose(obstools.jd_to_epoch(jds),[2000,2010],rtol=0,atol=1e-12)
+    assert obstools.epoch_to_jd(2000,twopart=True) - jds[0] == 0
+    
+def test_datetime64_conversion():
+    from datetime import datetime,timedelta
+    from dateutil.tz import tzstr
+    
+    t64 = np.datetime64('2011-03-13') + np.arange(0,86400*2,1800).astype('timedelta64[s]')
+    jds = obstools.calendar_to_jd(t64)
+    assert np.allclose(jds,2455633.5+np.arange(len(t64))/48,rtol=0,atol=1e-9)
+    assert np.all(obstools.jd_to_calendar(jds,output='datetime64') == t64)
+    
+    #dates without times are at noon, as for datetime.date
+    from datetime import date
+    d64 = np.array(['2004-03-05','2004-03-09'],dtype='datetime64[D]')
+    assert np.all(obstools.calendar_to_jd(d64) == [2453070,2453074])
+    assert obstools.calendar_to_jd(d64[0]) == obstools.calendar_to_jd(date(2004,3,5))
+    
+    #vectorized time zone should match converting each time separately
+    tzi = tzstr('EST5EDT,M3.2.0,M11.1.0')
+    dts = [datetime(2011,3,13) + timedelta(hours=h/2) for h in range(96)]
+    jdtz = obstools.calendar_to_jd(t64,tz=tzi)
+    jdref = [obstools.calendar_to_jd(dt.replace(tzinfo=tzi)) for dt in dts]
+    assert np.allclose(jdtz,jdref,rtol=0,atol=1e-9)
+    assert np.allclose(obstools.calendar_to_jd(t64,tz=-5),jds+5/24,rtol=0,atol=1e-9)
+    
+def _sfd_reference(mapdir,l,b,order):
+    #map values looked up directly from the FITS files
+    import pyfits
+    from scipy.ndimage import map_coordinates
+    
+    res = np.empty(l.shape)
+    for n,pole,m in ((1,'ngp',b>=0),(-1,'sgp',b<0)):
+        mapd = pyfits.getdata(mapdir+'/SFD_dust_4096_%s.fits'%pole).astype(float)
+        npix = mapd.shape[0]
+        lr,br = np.radians(l[m]),np.radians(b[m])
+        x = npix/2*np.cos(lr)*(1-n*np.sin(br))**0.5+npix/2-0.5
+        y = -npix/2*n*np.sin(lr)*(1-n*np.sin(br))**0.5+npix/2-0.5
+        res[m] = map_coordinates(mapd,[y,x],order=order,mode='nearest')
+    return res
+    
+def test_sfd_dust():
+    import os,shutil,tempfile
+    try:
+        import pyfits
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('pyfits not available')
+    from astropysics.coords import FK5Coordinates,GalacticCoordinates
+    
+    mapdir = tempfile.mkdtemp()
+    try:
+        rs = np.random.RandomState(0)
+        for pole in ('ngp','sgp'):
+            mapd = rs.rand(64,64).astype('>f4')
+            pyfits.PrimaryHDU(mapd).writeto(os.path.join(mapdir,'SFD_dust_4096_%s.fits'%pole))
+        l = rs.rand(200)*360
+        b = rs.rand(200)*160-80
+        
+        for npycache in (False,True):
+            dmap = obstools.SFDDustMap('ebv',mapdir,npycache=npycache)
+            assert not dmap.isopen
+            assert np.allclose(dmap(l,b,False),_sfd_reference(mapdir,l,b,0))
+            assert np.allclose(dmap(l,b,1),_sfd_reference(mapdir,l,b,1))
+            assert np.allclose(dmap(l,b),_sfd_reference(mapdir,l,b,3))
+            assert np.isscalar(dmap(10.,20.))
+            assert dmap.isopen
+            dmap.close()
+            assert not dmap.isopen
+        assert os.path.exists(os.path.join(mapdir,'SFD_dust_4096_ngp_spline3.npy'))
+        
+        #one hemisphere only
+        dmap = obstools.SFDDustMap(os.path.join(mapdir,'SFD_dust_4096_ngp.fits'))
+        assert np.allclose(dmap(l[b>0],b[b>0]),_sfd_reference(mapdir,l[b>0],b[b>0],3))
+        tools.assert_raises(ValueError,obstools.SFDDustMap,os.path.join(mapdir,'nopole.fits'))
+        
+        #the module-level functions keep the maps open between calls
+        ebv = obstools.get_SFD_dust(l,b,mapdir=mapdir)
+        assert np.allclose(ebv,_sfd_reference(mapdir,l,b,3))
+        assert len(obstools._sfdmaps) == 1
+        ra,dec = 10.,20.
+        gal = FK5Coordinates(ra,dec).convert(GalacticCoordinates)
+        assert np.allclose(obstools.get_dust_radec(ra,dec,mapdir=mapdir),
+                           obstools.get_SFD_dust(gal.l.degrees,gal.b.degrees,mapdir=mapdir))
+        obstools.close_SFD_dust_maps()
+        assert len(obstools._sfdmaps) == 0
+    finally:
+        obstools.close_SFD_dust_maps()
+        shutil.rmtree(mapdir)
+    
+if __name__ == '__main__':
+    import nose
+    nose.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+from __future__ import division,with_statement
+import os
+import numpy as np
+from astropysics import phot
+from nose import tools
+
+_standin = os.path.join(os.path.dirname(os.path.abspath(__file__)),'sexstandin.py')
+
+def _make_images(imdir,n):
+    fns = []
+    for i in range(n):
+        fn = os.path.join(imdir,'im'+'x'*i+'.fits')
+        open(fn,'w').close()
+        fns.append(fn)
+    return fns
+
+#class attributes of SExtractor that setExecutable changes
+_sexattrs = ('executable','_sexbinpresent','_defaultopts','_optinfo','_optorder',
+             '_parinfo','_parorder')
+             
+def _getSExtractorState():
+    return dict([(k,phot.SExtractor.__dict__[k]) for k in _sexattrs 
+                 if k in phot.SExtractor.__dict__])
+                 
+def _setSExtractorState(state):
+    for k in _sexattrs:
+        if k in state:
+            setattr(phot.SExtractor,k,state[k])
+        elif k in phot.SExtractor.__dict__:
+            delattr(phot.SExtractor,k)
+
+def test_sextractor_runner():
+    import shutil,tempfile
+    
+    oldstate = _getSExtractorState()
+    imdir = tempfile.mkdtemp()
+    try:
+        phot.SExtractor.setExecutable(_standin)
+        sex = phot.SExtractor()
+        for p in sex.params:
+            sex.params[p] = p in ('NUMBER','FLUX_APER','X_IMAGE','FLAGS')
+        
+        fns = _make_images(imdir,6)
+        runner = phot.SExtractorRunner(sex,nprocs=3)
+        for fn in fns:
+            runner.addJob(fn)
+        lines = []
+        jobs = runner.run(outputcallback=lambda job,stream,l:lines.append(stream))
+        
+        assert len(jobs) == 6
+        assert 'stderr' in lines
+        for fn,job in zip(fns,jobs):
+            cat = job.catalog
+            assert job.error is None
+            assert cat.dtype.names == ('NUMBER','FLUX_APER','X_IMAGE','FLAGS')
+            assert cat.NUMBER.dtype.kind == 'i'
+            assert cat.FLUX_APER.shape == (5,3)
+            assert np.allclose(cat.X_IMAGE,np.arange(1,6)*len(os.path.abspath(fn)))
+    finally:
+        _setSExtractorState(oldstate)
+        shutil.rmtree(imdir)
+        
+def test_sextractor_runner_error():
+    import shutil,tempfile
+    
+    oldstate = _getSExtractorState()
+    imdir = tempfile.mkdtemp()
+    try:
+        phot.SExtractor.setExecutable(_standin)
+        fns = _make_images(imdir,2)+['doesnotexist.fits']
+        tools.assert_raises(phot.SExtractorError,phot.SExtractor().sextractImages,fns)
+    finally:
+        _setSExtractorState(oldstate)
+        shutil.rmtree(imdir)
+    
+def test_isophote_profile():
+    x,y = np.mgrid[0:101,0:101]-50.
+    phi,q,rs = 0.5,0.6,8
+    xr = x*np.cos(phi)+y*np.sin(phi)
+    yr = -x*np.sin(phi)+y*np.cos(phi)
+    im = 1000*np.exp(-(xr**2+(yr/q)**2)**0.5/rs)
+    
+    radii = np.array([5,10,20,30])
+    res = phot.IsophotalEllipse(im).fitProfile(1000*np.exp(-radii/rs))
+    assert np.allclose(res.a,radii,rtol=1e-3)
+    assert np.allclose(res.ellipticity,1-q,atol=1e-3)
+    assert np.allclose(res.phi,phi,atol=1e-3)
+    
+def test_convolution_engine():
+    from scipy.ndimage import convolve
+    
+    rs = np.random.RandomState(1)
+    for kshape,imshape in (((3,3),(20,20)),((5,6),(37,41)),((7,7),(128,130))):
+        k = rs.rand(*kshape)
+        im = rs.rand(*imshape)
+        for mode in ('constant','nearest','reflect','mirror','wrap'):
+            ref = convolve(im,k,mode=mode,cval=0.3)
+            for method in ('auto','direct','fft','overlapadd'):
+                eng = phot.ConvolutionEngine(k,method,mode)
+                assert np.allclose(eng.convolve(im,background=0.3),ref)
+                stamps = eng.convolveStamps(np.array([im,2*im]),0.3)
+                assert np.allclose(stamps[0],ref)
+                assert np.allclose(stamps[1],convolve(2*im,k,mode=mode,cval=0.3))
+                
+    #kernel spectra are cached for each transform shape
+    eng = phot.ConvolutionEngine(rs.rand(9,9),'fft')
+    eng.convolve(rs.rand(30,30))
+    eng.convolve(rs.rand(30,30))
+    assert len(eng.cachedshapes) == 1
+    eng.convolve(rs.rand(50,50))
+    assert len(eng.cachedshapes) == 2
+    eng.kernel = rs.rand(3,3)
+    assert len(eng.cachedshapes) == 0
+    
+    assert phot.ConvolutionEngine(np.ones((3,3))).chooseMethod((100,100)) == 'direct'
+    assert phot.ConvolutionEngine(np.ones((15,15))).chooseMethod((1000,1000)) == 'overlapadd'
+    tools.assert_raises(ValueError,phot.ConvolutionEngine,np.ones(3))
+    tools.assert_raises(ValueError,phot.ConvolutionEngine,np.ones((3,3)),'bad')
+    
+def test_model_photometry_batch():
+    mp = phot.ModelPhotometry('gaussian2d')
+    mp.model.A,mp.model.sigx,mp.model.sigy,mp.model.mux = 1,3,2,0.3
+    
+    #batches match simulating each stamp separately
+    stamps = mp.simulateBatch({'sigx':[3,2.5]},(20,21),scale=0.5,sampling=2,psf=1.5)
+    assert stamps.shape == (2,20,21)
+    assert np.allclose(stamps[0],mp.simulate((20,21),scale=0.5,sampling=2,psf=1.5))
+    assert mp.lastbatch['nstamps'] == 2
+    
+    #noise is reproducible with a seed
+    sigx = np.linspace(2,4,6)
+    stamps = mp.simulateBatch({'sigx':sigx},21,noise=0.001,seed=3)
+    assert np.all(stamps == mp.simulateBatch({'sigx':sigx},21,noise=0.001,seed=3))
+    
+    res = mp.fitBatch(stamps,nprocs=1)
+    assert np.all(res['success'])
+    assert np.allclose(res['sigx'],sigx,atol=0.01)
+    assert np.allclose(res['sigy'],2,atol=0.01)
+    assert mp.model.sigx == 3
+    assert np.all(mp.fitBatch(stamps,nprocs=2)['sigx'] == res['sigx'])
+    
+    tools.assert_raises(KeyError,mp.simulateBatch,{'notaparam':[1,2]},21)
+    tools.assert_raises(ValueError,mp.fitBatch,stamps[0])
+    
+if __name__ == '__main__':
+    import nose
+    nose.main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+from __future__ import division,with_statement
+import numpy as np
+from astropysics.pipeline import Pipeline,PipelineElement,PipelineError, \
+                                 SetAttributeMessage,AccumulateMessage
+from nose import tools
+
+class Scale(PipelineElement):
+    def __init__(self,factor,nworkers=1,workertype='thread',delay=0):
+        self.factor = factor
+        self._plnworkers = nworkers
+        self._plworkertype = workertype
+        self.delay = delay
+
+    def plProcess(self,data,pipeline,elemi):
+        from time import sleep
+        from random import random
+
+        if self.delay:
+            sleep(self.delay*random())
+        return data*self.factor
+
+class Offset(PipelineElement):
+    def __init__(self,offset):
+        self.offset = offset
+
+    def plProcess(self,data,pipeline,elemi):
+        if data is None or data < 0:
+            raise ValueError('negative data')
+        return data+self.offset
+
+class Combine(PipelineElement):
+    def plProcess(self,data,pipeline,elemi):
+        return sum(data) if isinstance(data,list) else data
+
+_squared = []
+class Square(PipelineElement):
+    _plcache = True
+
+    def plProcess(self,data,pipeline,elemi):
+        _squared.append(data)
+        return data**2
+
+class EvensOnly(PipelineElement):
+    def plProcess(self,data,pipeline,elemi):
+        return None
+
+    def plInteract(self,data,pipeline,elemi):
+        return data if data%2==0 else None
+
+class SlowInteract(PipelineElement):
+    _plasyncinteract = True
+
+    def __init__(self):
+        self.processed = []
+        self.interacted = []
+
+    def plProcess(self,data,pipeline,elemi):
+        from time import sleep
+
+        sleep(.02)
+        self.processed.append(data)
+        return None if data%3==0 else data
+
+    def plInteract(self,data,pipeline,elemi):
+        from time import sleep
+
+        sleep(.1)
+        self.interacted.append((data,len(self.processed)))
+        return data*10
+
+def _make_pipeline(nworkers,workertype='thread',delay=0):
+    scale = Scale(2,nworkers,workertype,delay)
+    offset = Offset(1)
+    return Pipeline([scale,offset,Combine()]),scale,offset
+
+def _feed(pl,offset,scale):
+    pl.feedMany(range(10))
+    pl.feed(SetAttributeMessage(offset,offset=100))
+    pl.feedMany(range(10,15))
+    pl.feed(AccumulateMessage(Combine,naccum=3))
+    pl.feedMany(range(15,20))
+    pl.feed(SetAttributeMessage(scale,factor=3))
+    pl.feedMany(range(20,25))
+
+def test_concurrent():
+    """
+    Test concurrent pipeline processing against serial processing
+    """
+    pl,scale,offset = _make_pipeline(1)
+    _feed(pl,offset,scale)
+    pl.process(True)
+    serial = pl.extract(True)
+
+    for nworkers,workertype in ((1,'thread'),(4,'thread'),(3,'process')):
+        pl,scale,offset = _make_pipeline(nworkers,workertype,delay=.01)
+        _feed(pl,offset,scale)
+        stats = pl.processConcurrent(repeat=True,queuesize=2)
+        tools.assert_equal(pl.extract(True),serial)
+        tools.assert_equal([st['nprocessed'] for st in stats],[25,25,len(serial)])
+        tools.assert_equal(stats[0]['nmessages'],3)
+
+    #an error stops the pipeline with the failed data left in its stage
+    pl,scale,offset = _make_pipeline(4,delay=.01)
+    pl.feedMany(range(20))
+    pl.feed(SetAttributeMessage(scale,factor=-1))
+    pl.feedMany(range(20,25))
+    tools.assert_raises(ValueError,pl.processConcurrent)
+    tools.assert_equal(sum([len(dq) for dq in pl._datadeques]),25)
+    tools.assert_equal(pl._datadeques[1][-1],-20)
+
+    #as is data that fails in plInteract
+    pl = Pipeline([EvensOnly(),Offset(1)])
+    pl.feedMany([2,'x',4])
+    tools.assert_raises(TypeError,pl.processConcurrent)
+    tools.assert_equal(list(pl._datadeques[0]),[4,'x'])
+    tools.assert_equal(len(pl._datadeques[1])+len(pl._datadeques[2]),1)
+
+def test_checkpoint():
+    """
+    Test restoring pipelines from checkpoints and skipping cached results
+    """
+    import shutil,tempfile
+
+    cpdir = tempfile.mkdtemp()
+    try:
+        pl = Pipeline([Square(),Scale(1),Offset(None)],checkpointdir=cpdir)
+        pl.feedMany(range(5))
+        tools.assert_raises(TypeError,pl.process,True)
+
+        #the checkpoint was saved after the last stage to finish
+        pl = Pipeline.loadCheckpoint(cpdir)
+        tools.assert_equal([len(dq) for dq in pl._datadeques],[0,0,5,0])
+        pl.elements[2].offset = 1
+        pl.process(True)
+        tools.assert_equal(pl.extract(True),[1,2,5,10,17])
+        tools.assert_equal(len(_squared),5)
+        tools.assert_equal(Pipeline.loadCheckpoint(cpdir).extract(True),[1,2,5,10,17])
+
+        #unchanged stages with unchanged inputs are skipped
+        pl = Pipeline([Square(),Offset(1)],checkpointdir=cpdir)
+        pl.feedMany(range(7))
+        pl.process(True)
+        tools.assert_equal(pl.extract(True),[1,2,5,10,17,26,37])
+        tools.assert_equal(len(_squared),7)
+
+        #a checkpoint that can't be saved doesn't hide the error in a stage
+        offset = Offset(1)
+        offset.func = lambda x:x #can't be pickled
+        pl = Pipeline([offset],checkpointdir=cpdir)
+        pl.feedMany([1,-1])
+        tools.assert_raises(ValueError,pl.processConcurrent)
+    finally:
+        shutil.rmtree(cpdir)
+
+    #pipelines pickled before checkpointing can still be processed
+    pl = Pipeline([Offset(1)])
+    state = pl.__dict__.copy()
+    del state['_checkpointdir'],state['_stats']
+    pl = Pipeline.__new__(Pipeline)
+    pl.__setstate__(state)
+    tools.assert_equal(pl.processSingle(1),2)
+    pl.feed(2)
+    pl.process(True)
+    tools.assert_equal(pl.extract(),3)
+
+def test_instrument():
+    """
+    Test recording pipeline statistics
+    """
+    events = []
+    pl = Pipeline([Scale(2),EvensOnly(),Offset(1)])
+    stats = pl.instrument(callback=lambda i,ev:events.append((i,ev['type'])),memory=True)
+    pl.feedMany([1,2,3])
+    pl.feed(SetAttributeMessage(pl.elements[0],factor=1))
+    pl.feedMany([1,3,2])
+    pl.process(True)
+    tools.assert_equal(pl.extract(True),[3,5,7,3])
+
+    rep = stats.report()
+    tools.assert_equal([st['nprocessed'] for st in rep],[6,4,4])
+    tools.assert_equal([st['nmessages'] for st in rep],[1,0,0])
+    tools.assert_equal((rep[1]['ninteract'],rep[1]['nincomplete']),(6,2))
+    tools.assert_equal(rep[0]['maxqueue'],7)
+    tools.assert_true(rep[0]['peakmem'] is None or rep[0]['peakmem'] > 0)
+    tools.assert_equal(len([ev for ev in events if ev[1]=='interact']),6)
+    tools.assert_equal(len(str(stats).split('\n')),4)
+
+    stats.clear()
+    pl.feedMany(range(10))
+    pl.processConcurrent()
+    tools.assert_equal([st['nprocessed'] for st in stats.report()],[10,5,5])
+
+    pl.instrument(False)
+    tools.assert_true(pl.stats is None)
+
+def test_async_interact():
+    """
+    Test interactions that run while later data is processed
+    """
+    pl = Pipeline([SlowInteract(),Offset(1)])
+    pl.feedMany(range(9))
+    pl.process(True)
+    serial = pl.extract(True)
+    tools.assert_equal(serial,[1,2,3,31,5,6,61,8,9])
+
+    elem = SlowInteract()
+    pl = Pipeline([elem,Offset(1)])
+    pl.feedMany(range(9))
+    pl.processConcurrent()
+    tools.assert_equal(pl.extract(True),serial)
+    #the first interaction finished after later data was processed
+    tools.assert_true(elem.interacted[0][1] > 2)
+    tools.assert_equal([d for d,n in elem.interacted],[0,3,6])
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the calendar/JD conversions in :mod:`astropysics.obstools`,
+comparing the datetime-based forms with the array-native
+:class:`numpy.datetime64` forms.
+
+Run as ``python timebench.py [ntimes]``.
+"""
+from __future__ import division
+
+from astropysics import obstools
+from datetime import datetime,timedelta
+from time import time
+import numpy as np
+
+def timeit(f,*args,**kwargs):
+    st = time()
+    res = f(*args,**kwargs)
+    return time()-st,res
+
+def loop_tz_calendar_to_jd(dts,tzi):
+    """
+    Reference implementation that applies the time zone to each time
+    separately, as :func:`obstools.calendar_to_jd` used to.
+    """
+    jds = obstools.calendar_to_jd(dts)
+    offs = [dt.replace(tzinfo=tzi).utcoffset() for dt in dts]
+    return jds - np.array([o.days*24 + o.seconds/3600 for o in offs])/24
+
+def main(n,tzname='America/New_York'):
+    from dateutil.tz import gettz
+
+    t64 = np.datetime64('2010-01-01') + \
+          np.random.randint(0,5*365*86400,n).astype('timedelta64[s]')
+    dts = t64.astype(datetime).tolist()
+
+    print 'Benchmarking',n,'times'
+
+    t1,jd1 = timeit(obstools.calendar_to_jd,dts)
+    t2,jd2 = timeit(obstools.calendar_to_jd,t64)
+    assert np.allclose(jd1,jd2,rtol=0,atol=1e-9)
+    print 'calendar_to_jd: datetime %.3fs, datetime64 %.3fs (x%.1f)'%(t1,t2,t1/t2)
+
+    tzi = gettz(tzname)
+    t1,jd1 = timeit(loop_tz_calendar_to_jd,dts,tzi)
+    t2,jd2 = timeit(obstools.calendar_to_jd,t64,tz=tzi)
+    assert np.allclose(jd1,jd2,rtol=0,atol=1e-9)
+    print 'calendar_to_jd with %s: per-time %.3fs, vectorized %.3fs (x%.1f)'%(tzname,t1,t2,t1/t2)
+
+    t1,res1 = timeit(obstools.jd_to_calendar,jd2)
+    t2,res2 = timeit(obstools.jd_to_calendar,jd2,output='datetime64')
+    print 'jd_to_calendar: datetime %.3fs, datetime64 %.3fs (x%.1f)'%(t1,t2,t1/t2)
+
+    jd = obstools.calendar_to_jd(t64,twopart=True)
+    t1,res1 = timeit(obstools.jd_to_calendar,jd,output='datetime64')
+    assert np.all(res1 == t64)
+    print 'jd_to_calendar from JulianDate: datetime64 %.3fs'%t1
+
+if __name__ == '__main__':
+    import sys
+
+    main(int(sys.argv[1]) if len(sys.argv)>1 else 100000)